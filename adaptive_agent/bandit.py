@@ -0,0 +1,369 @@
+# adaptive_agent/bandit.py
+"""
+Contextual bandit for suggestion choice.
+A suggestion is a one-step decision, so instead of Q-learning over
+exact-match states the bandit fits one ridge regression per suggestion on
+hashed context features and picks by LinUCB or Thompson sampling.
+
+Each suggestion keeps the inverse design matrix A^-1 and the vector b; an
+update is a Sherman-Morrison rank-one change of A^-1, so choosing and
+learning both cost O(actions * dim^2) regardless of how much history there is.
+
+A and b are sums over updates, so worker processes sharing the saved state
+each keep the changes they made since their last save and add them to the
+state on disk under a file lock; no worker's updates are overwritten.
+"""
+import atexit
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import rl_engine
+from state_encoders import RL_STATE_KEYS, HashingStateEncoder, stable_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
+logger = logging.getLogger(__name__)
+
+# Suggestion strategy: q_learning (RLEngine, the default), linucb or thompson
+ADAPTIVE_STRATEGY = os.getenv("ADAPTIVE_STRATEGY", "q_learning").lower()
+BANDIT_DIM = int(os.getenv("BANDIT_DIM", "64"))
+# LinUCB: width of the confidence bonus; Thompson: scale of the posterior
+BANDIT_ALPHA = float(os.getenv("BANDIT_ALPHA", "1.0"))
+# Ridge penalty: A starts as ridge * I
+BANDIT_RIDGE = float(os.getenv("BANDIT_RIDGE", "1.0"))
+BANDIT_FLUSH_EVERY = int(os.getenv("BANDIT_FLUSH_EVERY", "50"))
+
+BANDIT_POLICIES = ("linucb", "thompson")
+
+
+class ContextFeaturizer:
+    """Hash a context's features into a unit-norm vector with a bias term."""
+
+    def __init__(self, dim: int = BANDIT_DIM, encoder: Optional[HashingStateEncoder] = None):
+        """
+        Initialize featurizer.
+
+        Args:
+            dim: Vector length, including the bias component
+            encoder: Supplies the allow-list, discretizers and text handling
+        """
+        self.dim = max(2, dim)
+        self.encoder = encoder if encoder is not None else HashingStateEncoder(keys=RL_STATE_KEYS or None)
+
+    def transform(self, context: Dict[str, Any]) -> np.ndarray:
+        """
+        Feature vector of a context.
+
+        Args:
+            context: Agent context
+
+        Returns:
+            Unit-norm float64 vector of length dim
+        """
+        x = np.zeros(self.dim)
+        x[0] = 1.0
+        for feature in self.encoder.features(context, text_tokens=True):
+            h = stable_hash(feature)
+            # the sign bit keeps colliding features from always adding up
+            x[1 + h % (self.dim - 1)] += 1.0 if (h >> 63) else -1.0
+        return x / np.linalg.norm(x)
+
+
+class ContextualBandit:
+    """
+    LinUCB / linear Thompson sampling over registered suggestions.
+
+    Both policies share the per-suggestion state (A^-1, b); only the
+    scoring differs:
+      linucb    theta.x + alpha * sqrt(x' A^-1 x)
+      thompson  a draw from N(theta.x, alpha^2 * x' A^-1 x)
+    The Thompson draw is the marginal of the posterior sample along x, which
+    is all the choice depends on, so no d x d Cholesky is needed.
+
+    Saving re-reads the file, adds this instance's unsaved changes to A, b
+    and the counts, writes the sum and adopts it, so the state also picks
+    up what other processes have learned.
+    """
+
+    def __init__(self, agent_name: str, policy: str = "linucb", dim: int = BANDIT_DIM,
+                 alpha: float = BANDIT_ALPHA, ridge: float = BANDIT_RIDGE,
+                 featurizer: Optional[ContextFeaturizer] = None, flush_every: int = BANDIT_FLUSH_EVERY,
+                 seed: Optional[int] = None):
+        """
+        Initialize bandit, loading saved state if present.
+
+        Args:
+            agent_name: Agent name; state is saved next to its Q-table
+            policy: "linucb" or "thompson"
+            dim: Feature vector length
+            alpha: Exploration width
+            ridge: Ridge penalty of the per-suggestion regressions
+            featurizer: Context featurizer (default: ContextFeaturizer(dim))
+            flush_every: Updates between saves
+            seed: Random seed for Thompson sampling
+
+        Raises:
+            ValueError: If the policy is unknown
+        """
+        if policy not in BANDIT_POLICIES:
+            raise ValueError(f"Unknown bandit policy: {policy}")
+        self.agent_name = agent_name
+        self.policy = policy
+        self.alpha = alpha
+        self.ridge = ridge
+        self.featurizer = featurizer if featurizer is not None else ContextFeaturizer(dim)
+        self.dim = self.featurizer.dim
+        self.flush_every = max(1, flush_every)
+        self.actions: List[str] = []
+        self.action_ids: Dict[str, int] = {}
+        self.a_inv = np.zeros((0, self.dim, self.dim))
+        self.b = np.zeros((0, self.dim))
+        self.theta = np.zeros((0, self.dim))
+        self.counts = np.zeros(0, dtype=np.int64)
+        # A as of the last load or save, and the changes made since
+        self._a = np.zeros((0, self.dim, self.dim))
+        self._delta_a = np.zeros((0, self.dim, self.dim))
+        self._delta_b = np.zeros((0, self.dim))
+        self._delta_counts = np.zeros(0, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._load()
+        atexit.register(self.flush)
+
+    @property
+    def path(self) -> Path:
+        return rl_engine.DATA_DIR / f"{self.agent_name}_bandit.npz"
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".lock")
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(f, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(f)
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        """Saved state, or None if there is none for this feature size."""
+        if not self.path.exists():
+            return None
+        with np.load(self.path, allow_pickle=False) as data:
+            if data["a_inv"].shape[1] != self.dim:
+                logger.warning(f"Ignoring {self.path.name}: saved for dim {data['a_inv'].shape[1]}, not {self.dim}")
+                return None
+            # files written before A was saved only hold A^-1
+            a = data["a"] if "a" in data.files else np.linalg.inv(data["a_inv"])
+            return {"actions": data["actions"].tolist(), "a": a, "a_inv": data["a_inv"],
+                    "b": data["b"], "counts": data["counts"]}
+
+    def _load(self) -> None:
+        """Load saved state; a different feature size starts over."""
+        try:
+            with self._file_lock():
+                state = self._read_state()
+            if state is None:
+                return
+            self.register_actions(state["actions"])
+            self._a, self.a_inv, self.b, self.counts = state["a"], state["a_inv"], state["b"], state["counts"]
+            self.theta = np.einsum("kij,kj->ki", self.a_inv, self.b)
+            logger.info(f"Loaded bandit for {self.agent_name} with {len(self.actions)} suggestions")
+        except Exception as e:
+            logger.error(f"Failed to load bandit: {e}")
+
+    def save(self) -> None:
+        """Add unsaved changes to the saved state and write it to the .npz file atomically."""
+        with self._lock, self._file_lock():
+            base_a, base_b, base_counts = self._a.copy(), self.b - self._delta_b, self.counts - self._delta_counts
+            state = self._read_state()
+            if state is not None:
+                self.register_actions(state["actions"])
+                ids = [self.action_ids[action] for action in state["actions"]]
+                # register_actions may have grown the arrays
+                base_a, base_b, base_counts = self._a.copy(), self.b - self._delta_b, self.counts - self._delta_counts
+                base_a[ids], base_b[ids], base_counts[ids] = state["a"], state["b"], state["counts"]
+
+            a = base_a + self._delta_a
+            b = base_b + self._delta_b
+            counts = base_counts + self._delta_counts
+            a_inv = np.linalg.inv(a)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, actions=np.array(self.actions, dtype=str), a=a, a_inv=a_inv, b=b, counts=counts)
+            os.replace(tmp_path, self.path)
+
+            self._a, self.a_inv, self.b, self.counts = a, a_inv, b, counts
+            self.theta = np.einsum("kij,kj->ki", a_inv, b)
+            self._delta_a = np.zeros_like(a)
+            self._delta_b = np.zeros_like(b)
+            self._delta_counts = np.zeros_like(counts)
+
+    def flush(self) -> None:
+        """Save unsaved updates now."""
+        with self._lock:
+            if self._pending:
+                self._pending = 0
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.error(f"Failed to save bandit: {e}")
+
+    def register_actions(self, actions: List[str]) -> None:
+        """Add suggestions; new ones start from the ridge prior."""
+        with self._lock:
+            new_actions = [action for action in dict.fromkeys(actions) if action not in self.action_ids]
+            if not new_actions:
+                return
+            k = len(new_actions)
+            for action in new_actions:
+                self.action_ids[action] = len(self.actions)
+                self.actions.append(action)
+            eye = np.broadcast_to(np.eye(self.dim), (k, self.dim, self.dim))
+            self.a_inv = np.concatenate([self.a_inv, eye / self.ridge])
+            self._a = np.concatenate([self._a, eye * self.ridge])
+            self._delta_a = np.concatenate([self._delta_a, np.zeros((k, self.dim, self.dim))])
+            self.b = np.concatenate([self.b, np.zeros((k, self.dim))])
+            self._delta_b = np.concatenate([self._delta_b, np.zeros((k, self.dim))])
+            self.theta = np.concatenate([self.theta, np.zeros((k, self.dim))])
+            self.counts = np.concatenate([self.counts, np.zeros(k, dtype=np.int64)])
+            self._delta_counts = np.concatenate([self._delta_counts, np.zeros(k, dtype=np.int64)])
+
+    def scores(self, context: Dict[str, Any], candidates: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Policy scores of the candidate suggestions for a context.
+
+        Args:
+            context: Agent context
+            candidates: Suggestions to score (default: all registered)
+
+        Returns:
+            Mapping of suggestion to score (Thompson scores are random draws)
+        """
+        x = self.featurizer.transform(context)
+        with self._lock:
+            ids = np.array([self.action_ids[a] for a in (self.actions if candidates is None else candidates)],
+                           dtype=np.int64)
+            mean = self.theta[ids] @ x
+            width = np.sqrt(np.maximum(np.einsum("i,kij,j->k", x, self.a_inv[ids], x), 0.0))
+            if self.policy == "linucb":
+                score = mean + self.alpha * width
+            else:
+                score = mean + self.alpha * width * self._rng.standard_normal(len(ids))
+        return dict(zip((self.actions[i] for i in ids), score.tolist()))
+
+    def choose(self, context: Dict[str, Any], candidates: Optional[List[str]] = None) -> str:
+        """
+        Pick a suggestion for a context.
+
+        Args:
+            context: Agent context
+            candidates: Suggestions to choose from (default: all registered)
+
+        Returns:
+            Chosen suggestion
+
+        Raises:
+            ValueError: If there is nothing to choose from
+        """
+        scores = self.scores(context, candidates)
+        if not scores:
+            raise ValueError("No suggestions registered")
+        return max(scores, key=scores.get)
+
+    def expected_reward(self, context: Dict[str, Any], action: str) -> float:
+        """Estimated mean reward of a suggestion in a context (no exploration bonus)."""
+        x = self.featurizer.transform(context)
+        with self._lock:
+            return float(self.theta[self.action_ids[action]] @ x)
+
+    def update(self, context: Dict[str, Any], action: str, reward: float) -> float:
+        """
+        Learn from the reward a suggestion received.
+
+        Args:
+            context: Context the suggestion was shown in
+            action: Suggestion
+            reward: Observed reward
+
+        Returns:
+            Updated expected reward of the suggestion in this context
+        """
+        x = self.featurizer.transform(context)
+        with self._lock:
+            if action not in self.action_ids:
+                self.register_actions([action])
+            k = self.action_ids[action]
+            a_inv = self.a_inv[k]
+            a_inv_x = a_inv @ x
+            # Sherman-Morrison: (A + x x')^-1 = A^-1 - (A^-1 x)(A^-1 x)' / (1 + x' A^-1 x)
+            a_inv -= np.outer(a_inv_x, a_inv_x) / (1.0 + x @ a_inv_x)
+            self.b[k] += reward * x
+            self.theta[k] = a_inv @ self.b[k]
+            self.counts[k] += 1
+            self._delta_a[k] += np.outer(x, x)
+            self._delta_b[k] += reward * x
+            self._delta_counts[k] += 1
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+            return float(self.theta[k] @ x)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-suggestion update counts.
+
+        Returns:
+            Dictionary with policy, dimension and updates per suggestion
+        """
+        with self._lock:
+            return {"policy": self.policy, "dim": self.dim,
+                    "updates": dict(zip(self.actions, self.counts.tolist()))}
+
+
+_bandits: Dict[str, ContextualBandit] = {}
+_bandits_lock = threading.Lock()
+
+
+def get_bandit(agent_name: str, policy: Optional[str] = None, **kwargs) -> ContextualBandit:
+    """
+    Get the process-wide bandit for an agent, creating it on first use.
+
+    Args:
+        agent_name: Agent name
+        policy: "linucb" or "thompson" (default: ADAPTIVE_STRATEGY if it
+            names a bandit policy, else linucb)
+        **kwargs: ContextualBandit arguments, used only when the bandit is created
+
+    Returns:
+        ContextualBandit instance shared by every caller in the process
+    """
+    with _bandits_lock:
+        bandit = _bandits.get(agent_name)
+        if bandit is None:
+            if policy is None:
+                policy = ADAPTIVE_STRATEGY if ADAPTIVE_STRATEGY in BANDIT_POLICIES else "linucb"
+            bandit = _bandits[agent_name] = ContextualBandit(agent_name, policy=policy, **kwargs)
+        return bandit
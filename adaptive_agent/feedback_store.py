@@ -0,0 +1,308 @@
+# adaptive_agent/feedback_store.py
+"""
+Append-optimized store for the adaptive agent's feedback and improvement logs.
+
+Records are NDJSON lines in rolling segment files (segment-00000001.ndjson,
+...). Appends are buffered and written in one write per flush; the fsync
+policy decides when they reach the disk. Per-suggestion rollups (count,
+mean reward, first/last seen) are maintained as records are written and
+saved with a watermark, so analytics read one small JSON file instead of
+parsing the whole log.
+
+Several worker processes can share a store: flushes take an exclusive lock
+on the directory's .lock file and first fold in what other processes
+appended since the watermark.
+"""
+import atexit
+import csv
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_SEGMENT_MAX_BYTES = int(os.getenv("FEEDBACK_SEGMENT_MAX_BYTES", str(8 * 1024 * 1024)))
+# Buffered records are written after this many appends or seconds, whichever comes first
+FEEDBACK_BUFFER_SIZE = int(os.getenv("FEEDBACK_BUFFER_SIZE", "64"))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "1.0"))
+# fsync policy: always (every flush), interval (at most every FEEDBACK_FSYNC_INTERVAL seconds) or never
+FEEDBACK_FSYNC = os.getenv("FEEDBACK_FSYNC", "interval").lower()
+FEEDBACK_FSYNC_INTERVAL = float(os.getenv("FEEDBACK_FSYNC_INTERVAL", "5.0"))
+
+FSYNC_POLICIES = ("always", "interval", "never")
+SEGMENT_PREFIX, SEGMENT_SUFFIX = "segment-", ".ndjson"
+
+
+class FeedbackStore:
+    """Segmented, buffered append log with per-suggestion rollups."""
+
+    def __init__(self, directory: Path, headers: Sequence[str], reward_field: str,
+                 legacy_csv: Optional[Path] = None, segment_max_bytes: int = FEEDBACK_SEGMENT_MAX_BYTES,
+                 buffer_size: int = FEEDBACK_BUFFER_SIZE, flush_interval: float = FEEDBACK_FLUSH_INTERVAL,
+                 fsync: str = FEEDBACK_FSYNC, fsync_interval: float = FEEDBACK_FSYNC_INTERVAL):
+        """
+        Initialize store; files are opened on first use.
+
+        Args:
+            directory: Directory holding the segments, rollups and lock file
+            headers: Record fields, in column order
+            reward_field: Numeric field the rollups average
+            legacy_csv: CSV log imported once when the store is first created
+            segment_max_bytes: Size at which a new segment is started
+            buffer_size: Appends buffered before a write (1 = write every append)
+            flush_interval: Seconds a buffered append may wait
+            fsync: "always", "interval" or "never"
+            fsync_interval: Seconds between fsyncs for the interval policy
+
+        Raises:
+            ValueError: If the fsync policy is unknown
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = Path(directory)
+        self.headers = list(headers)
+        self.reward_field = reward_field
+        self.legacy_csv = legacy_csv
+        self.segment_max_bytes = segment_max_bytes
+        self.buffer_size = max(1, buffer_size)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._buffer: List[str] = []
+        self._rollups: Dict[str, Dict[str, Any]] = {}
+        self._watermark: Tuple[int, int] = (1, 0)  # (segment number, byte offset) folded into the rollups
+        self._last_fsync = time.monotonic()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._opened = False
+        atexit.register(self.flush)
+
+    @property
+    def rollups_path(self) -> Path:
+        return self.directory / "rollups.json"
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> List[int]:
+        """Segment numbers on disk, in order."""
+        return sorted(int(p.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                      for p in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive cross-process lock on the store (thread lock held by the caller)."""
+        with open(self.directory / ".lock", "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(f, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(f)
+
+    def _open(self) -> None:
+        """Load the saved rollups, importing the legacy CSV on first creation (thread lock held)."""
+        if self._opened:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            if self.rollups_path.exists():
+                with open(self.rollups_path, encoding="utf-8") as f:
+                    saved = json.load(f)
+                self._rollups = saved["rollups"]
+                self._watermark = tuple(saved["watermark"])
+            elif not self._segments() and self.legacy_csv is not None and self.legacy_csv.exists():
+                self._import_csv(self.legacy_csv)
+            self._catch_up()
+            self._save_rollups()
+        self._opened = True
+
+    def _import_csv(self, path: Path) -> None:
+        """Copy a legacy CSV log into the first segment (file lock held)."""
+        df = pd.read_csv(path).reindex(columns=self.headers)
+        df = df.astype(object).where(df.notna(), None)
+        lines = [self._encode(record) for record in df.to_dict("records")]
+        if lines:
+            self._write_lines(lines)
+        logger.info(f"Imported {len(lines)} records from {path.name} into {self.directory}")
+
+    def _encode(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        """Fold one record into the rollups."""
+        suggestion_id = str(record.get("suggestion_id", ""))
+        rollup = self._rollups.setdefault(suggestion_id, {"count": 0, "rewarded": 0, "reward_sum": 0.0,
+                                                          "first_seen": None, "last_seen": None})
+        rollup["count"] += 1
+        try:
+            reward = float(record.get(self.reward_field))
+        except (TypeError, ValueError):
+            reward = None
+        if reward is not None and not math.isnan(reward):
+            rollup["rewarded"] += 1
+            rollup["reward_sum"] += reward
+        timestamp = record.get("timestamp") or None
+        if timestamp:
+            if rollup["first_seen"] is None or timestamp < rollup["first_seen"]:
+                rollup["first_seen"] = timestamp
+            if rollup["last_seen"] is None or timestamp > rollup["last_seen"]:
+                rollup["last_seen"] = timestamp
+
+    def _read_from(self, number: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Complete records of a segment after an offset, and the offset after the last one."""
+        try:
+            with open(self._segment_path(number), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        return [json.loads(line) for line in data[:end].splitlines() if line.strip()], offset + end
+
+    def _catch_up(self) -> None:
+        """Fold records appended since the watermark, by any process, into the rollups (file lock held)."""
+        number, offset = self._watermark
+        for segment in self._segments():
+            if segment < number:
+                continue
+            records, end = self._read_from(segment, offset if segment == number else 0)
+            for record in records:
+                self._apply(record)
+            number, offset = segment, end
+        self._watermark = (number, offset)
+
+    def _save_rollups(self) -> None:
+        tmp_path = self.rollups_path.with_name(self.rollups_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watermark": list(self._watermark), "rollups": self._rollups}, f)
+        os.replace(tmp_path, self.rollups_path)
+
+    def _write_lines(self, lines: List[str]) -> None:
+        """Append lines to the current segment in one write, rotating first if it is full (file lock held)."""
+        segments = self._segments()
+        number = segments[-1] if segments else 1
+        path = self._segment_path(number)
+        if path.exists() and path.stat().st_size >= self.segment_max_bytes:
+            number += 1
+            path = self._segment_path(number)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, "".join(lines).encode("utf-8"))
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(fd)
+                self._last_fsync = now
+        finally:
+            os.close(fd)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Buffer one record; it is written after buffer_size appends or flush_interval seconds.
+
+        Args:
+            record: Record with the store's header fields
+        """
+        line = self._encode({field: record.get(field) for field in self.headers})
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write buffered records and update the rollups."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return
+            try:
+                self._open()
+                with self._file_lock():
+                    self._catch_up()
+                    self._write_lines(self._buffer)
+                    self._buffer = []
+                    self._catch_up()
+                    self._save_rollups()
+            except Exception:
+                logger.exception(f"Failed to write feedback records to {self.directory}")
+
+    def get_rollups(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-suggestion rollups over every record written so far (buffered ones included).
+
+        Returns:
+            Mapping of suggestion_id to count, rewarded (numeric rewards),
+            reward_sum, mean_reward, first_seen and last_seen
+        """
+        with self._lock:
+            self.flush()
+            self._open()
+            with self._file_lock():
+                self._catch_up()
+            rollups = {suggestion_id: dict(rollup) for suggestion_id, rollup in self._rollups.items()}
+        for rollup in rollups.values():
+            rollup["mean_reward"] = rollup["reward_sum"] / rollup["rewarded"] if rollup["rewarded"] else None
+        return rollups
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """All written records in append order (flushes the buffer first)."""
+        with self._lock:
+            self.flush()
+            self._open()
+            segments = self._segments()
+        for segment in segments:
+            records, _ = self._read_from(segment, 0)
+            yield from records
+
+    def to_frame(self) -> pd.DataFrame:
+        """All records as a DataFrame with the store's columns."""
+        return pd.DataFrame(list(self.iter_records()), columns=self.headers)
+
+    def export_csv(self, path: Path, sanitize=None) -> int:
+        """
+        Write all records to a CSV file (e.g. for spreadsheets).
+
+        Args:
+            path: Output path
+            sanitize: Optional function applied to every text field
+
+        Returns:
+            Number of records written
+        """
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.headers)
+            for record in self.iter_records():
+                writer.writerow([sanitize(value) if sanitize and isinstance(value, str) else value
+                                 for value in (record.get(field) for field in self.headers)])
+                count += 1
+        return count
@@ -1,12 +1,27 @@
 # adaptive_agent/storage.py
+import atexit
 import csv
 import datetime
 import logging
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
+from .feedback_store import FeedbackStore
+
 logger = logging.getLogger(__name__)
 
 # Resolve data directory relative to project root (one level up from this file)
@@ -15,6 +30,12 @@ DATA_DIR = BASE_DIR / "data"
 WEIGHTS_CSV = DATA_DIR / "weights.csv"
 FEEDBACK_CSV = DATA_DIR / "feedback.csv"
 IMPROVE_CSV = DATA_DIR / "improvement_log.csv"
+# Append-optimized logs; the CSVs above are imported into them once
+FEEDBACK_STORE_DIR = Path(os.getenv("FEEDBACK_STORE_DIR", str(DATA_DIR / "feedback_log")))
+IMPROVE_STORE_DIR = Path(os.getenv("IMPROVE_STORE_DIR", str(DATA_DIR / "improvement_log")))
+
+# Weight changes are written behind, this many seconds after the first unsaved change (0 = write immediately)
+WEIGHTS_WRITE_DELAY = float(os.getenv("WEIGHTS_WRITE_DELAY", "1.0"))
 
 DEFAULT_TEMPLATES = [
     ("SUG-1", "Try a 25-minute focused study sprint, then 5-minute break.", 0.0),
@@ -52,34 +73,6 @@ def _sanitize_csv_field(value: Union[str, None]) -> str:
     return s
 
 
-# Optional cross-process file locking if portalocker is available
-try:
-    import portalocker  # type: ignore
-
-    _HAVE_PORTALOCKER = True
-except Exception:  # pragma: no cover - optional dependency
-    portalocker = None
-    _HAVE_PORTALOCKER = False
-
-
-def _append_row_csv(path: Path, row: list) -> None:
-    """Append a single CSV row with optional file locking."""
-    _ensure_dir()
-    try:
-        if _HAVE_PORTALOCKER:
-            with open(path, "a", newline="", encoding="utf-8") as f:
-                portalocker.lock(f, portalocker.LOCK_EX)
-                csv.writer(f).writerow(row)
-                f.flush()
-                portalocker.unlock(f)
-        else:
-            with open(path, "a", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow(row)
-    except Exception:
-        # Let caller handle logging so context is preserved
-        raise
-
-
 def _init_csvs() -> None:
     _ensure_dir()
 
@@ -93,27 +86,211 @@ def _init_csvs() -> None:
         except Exception:
             logger.exception("Failed to initialize weights CSV")
 
-    if not FEEDBACK_CSV.exists():
-        try:
-            with open(FEEDBACK_CSV, "w", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow(FEEDBACK_HEADERS)
-        except Exception:
-            logger.exception("Failed to initialize feedback CSV")
 
-    if not IMPROVE_CSV.exists():
+class WeightsRepository:
+    """
+    In-memory weights table backed by weights.csv.
+
+    The file is parsed once; reads are served from memory and only re-parse
+    it when its mtime or size shows an external edit. Changes are written
+    behind: one atomic rewrite (temp file + os.replace) write_delay seconds
+    after the first unsaved change. If the file was edited externally in the
+    meantime, the edit is loaded first and the unsaved changes re-applied on
+    top, so other processes' changes to other suggestions are kept. The
+    reload and rewrite run under an exclusive lock on weights.csv.lock, so
+    two processes flushing at once cannot overwrite each other's changes.
+    """
+
+    def __init__(self, path: Path = WEIGHTS_CSV, write_delay: float = WEIGHTS_WRITE_DELAY):
+        """
+        Initialize repository; the file is read on first use.
+
+        Args:
+            path: Weights CSV path
+            write_delay: Seconds between the first unsaved change and the write
+        """
+        self.path = Path(path)
+        self.write_delay = write_delay
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._fieldnames: List[str] = list(WEIGHTS_HEADERS)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._stats = {"reads": 0, "parses": 0, "writes": 0}
+        atexit.register(self.flush)
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
         try:
-            with open(IMPROVE_CSV, "w", newline="", encoding="utf-8") as f:
-                csv.writer(f).writerow(IMPROVE_HEADERS)
-        except Exception:
-            logger.exception("Failed to initialize improvement CSV")
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive cross-process lock on the weights file (thread lock held by the caller)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(f, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(f)
+
+    def _refresh(self) -> None:
+        """Re-parse the file if it changed since it was last read or written (lock held)."""
+        stamp = self._file_stamp()
+        if stamp is None and self.path == WEIGHTS_CSV:
+            _init_csvs()
+            stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        rows: Dict[str, Dict[str, Any]] = {}
+        fieldnames = list(WEIGHTS_HEADERS)
+        if stamp is not None:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                fieldnames = list(reader.fieldnames or WEIGHTS_HEADERS)
+                for row in reader:
+                    row["weight"] = float(row.get("weight") or 0.0)
+                    rows[row["suggestion_id"]] = row
+        for suggestion_id, weight in self._pending.items():
+            if suggestion_id in rows:
+                rows[suggestion_id]["weight"] = weight
+        self._rows, self._fieldnames, self._stamp = rows, fieldnames, stamp
+        self._stats["parses"] += 1
+        logger.info(f"Loaded {len(rows)} weights")
+
+    def suggestion_ids(self) -> List[str]:
+        """Suggestion ids in file order."""
+        with self._lock:
+            self._refresh()
+            self._stats["reads"] += 1
+            return list(self._rows)
+
+    def get(self, suggestion_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get one suggestion's row.
+
+        Args:
+            suggestion_id: Suggestion id
+
+        Returns:
+            Copy of the row (suggestion_id, text, weight), or None if unknown
+        """
+        with self._lock:
+            self._refresh()
+            self._stats["reads"] += 1
+            row = self._rows.get(suggestion_id)
+            return dict(row) if row is not None else None
+
+    def set_weight(self, suggestion_id: str, weight: float) -> bool:
+        """
+        Change a suggestion's weight; the file is written behind.
+
+        Args:
+            suggestion_id: Suggestion id
+            weight: New weight
+
+        Returns:
+            True if the suggestion exists
+        """
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(suggestion_id)
+            if row is None:
+                return False
+            row["weight"] = float(weight)
+            self._pending[suggestion_id] = float(weight)
+            self._schedule()
+            return True
+
+    def replace(self, df: pd.DataFrame) -> None:
+        """
+        Replace the whole table (e.g. from a DataFrame returned by to_frame()).
+
+        Args:
+            df: Frame with at least the WEIGHTS_HEADERS columns
+        """
+        with self._lock:
+            self._rows = {}
+            for row in df.to_dict("records"):
+                row["weight"] = float(row["weight"])
+                self._rows[str(row["suggestion_id"])] = row
+            self._fieldnames = list(df.columns)
+            self._pending = {suggestion_id: row["weight"] for suggestion_id, row in self._rows.items()}
+            with self._file_lock():
+                self._write()
+
+    def to_frame(self) -> pd.DataFrame:
+        """The table as a DataFrame (a copy)."""
+        with self._lock:
+            self._refresh()
+            self._stats["reads"] += 1
+            return pd.DataFrame(list(self._rows.values()), columns=self._fieldnames)
+
+    def _schedule(self) -> None:
+        if self.write_delay <= 0:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.write_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _write(self) -> None:
+        """Rewrite the file atomically (lock held)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self._fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self._rows.values())
+        os.replace(tmp_path, self.path)
+        self._stamp = self._file_stamp()
+        self._pending = {}
+        self._stats["writes"] += 1
+        logger.info("Weights saved")
+
+    def flush(self) -> None:
+        """Write unsaved changes now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            try:
+                with self._file_lock():
+                    self._refresh()  # merge external edits under the unsaved changes
+                    self._write()
+            except Exception:
+                logger.exception("Failed to save weights")
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get repository counters.
+
+        Returns:
+            Dictionary with reads served, file parses, file writes and unsaved changes
+        """
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+# Global weights repository instance
+weights_repository = WeightsRepository()
 
 
 def load_weights() -> pd.DataFrame:
     try:
-        _init_csvs()
-        df = pd.read_csv(WEIGHTS_CSV)
-        logger.info(f"Loaded {len(df)} weights")
-        return df
+        return weights_repository.to_frame()
     except Exception:
         logger.exception("Failed to load weights")
         return pd.DataFrame(columns=WEIGHTS_HEADERS)
@@ -121,25 +298,26 @@ def load_weights() -> pd.DataFrame:
 
 def save_weights(df: pd.DataFrame) -> None:
     try:
-        _ensure_dir()
-        df.to_csv(WEIGHTS_CSV, index=False)
-        logger.info("Weights saved")
+        weights_repository.replace(df)
     except Exception:
         logger.exception("Failed to save weights")
 
 
+# Global append-optimized log instances
+feedback_store = FeedbackStore(FEEDBACK_STORE_DIR, FEEDBACK_HEADERS, reward_field="feedback", legacy_csv=FEEDBACK_CSV)
+improvement_store = FeedbackStore(IMPROVE_STORE_DIR, IMPROVE_HEADERS, reward_field="reward", legacy_csv=IMPROVE_CSV)
+
+
 def log_feedback(suggestion_id: str, user_text: str, suggestion_text: str, reward: Union[int, float]) -> None:
     try:
-        _init_csvs()
         ts = _timezone_aware_utc_iso()
-        row = [
-            ts,
-            suggestion_id,
-            _sanitize_csv_field(user_text),
-            _sanitize_csv_field(suggestion_text),
-            reward,
-        ]
-        _append_row_csv(FEEDBACK_CSV, row)
+        feedback_store.append({
+            "timestamp": ts,
+            "suggestion_id": suggestion_id,
+            "user_text": _sanitize_csv_field(user_text),
+            "suggestion_text": _sanitize_csv_field(suggestion_text),
+            "feedback": reward,
+        })
         logger.info(f"Logged feedback for {suggestion_id} with reward {reward}")
     except Exception:
         logger.exception("Failed to log feedback")
@@ -147,10 +325,9 @@ def log_feedback(suggestion_id: str, user_text: str, suggestion_text: str, rewar
 
 def log_improvement(suggestion_id: str, prev_w: float, reward: Union[int, float], new_w: float) -> None:
     try:
-        _init_csvs()
         ts = _timezone_aware_utc_iso()
-        row = [ts, suggestion_id, prev_w, reward, new_w]
-        _append_row_csv(IMPROVE_CSV, row)
+        improvement_store.append({"timestamp": ts, "suggestion_id": suggestion_id, "prev_weight": prev_w,
+                                  "reward": reward, "new_weight": new_w})
         logger.info(f"Logged improvement for {suggestion_id}")
     except Exception:
         logger.exception("Failed to log improvement")
@@ -158,8 +335,7 @@ def log_improvement(suggestion_id: str, prev_w: float, reward: Union[int, float]
 
 def load_feedback() -> pd.DataFrame:
     try:
-        _init_csvs()
-        return pd.read_csv(FEEDBACK_CSV)
+        return feedback_store.to_frame()
     except Exception:
         logger.exception("Failed to load feedback")
         return pd.DataFrame(columns=FEEDBACK_HEADERS)
@@ -167,8 +343,16 @@ def load_feedback() -> pd.DataFrame:
 
 def load_improvements() -> pd.DataFrame:
     try:
-        _init_csvs()
-        return pd.read_csv(IMPROVE_CSV)
+        return improvement_store.to_frame()
     except Exception:
         logger.exception("Failed to load improvements")
         return pd.DataFrame(columns=IMPROVE_HEADERS)
+
+
+def feedback_rollups() -> Dict[str, Dict[str, Any]]:
+    """Per-suggestion feedback count, mean reward and first/last seen, without parsing the log."""
+    try:
+        return feedback_store.get_rollups()
+    except Exception:
+        logger.exception("Failed to load feedback rollups")
+        return {}
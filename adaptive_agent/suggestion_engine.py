@@ -1,27 +1,36 @@
 # adaptive_agent/suggestion_engine.py
 import numpy as np
 from typing import Dict, Any, Optional
-from rl_engine import RLEngine
-from .storage import load_weights
+from rl_engine import get_rl_engine
+from .bandit import ADAPTIVE_STRATEGY, BANDIT_POLICIES, get_bandit
+from .storage import weights_repository
 
-rl_engine = RLEngine(agent_name="adaptive_feedback", epsilon=0.1, alpha=0.1)
+# Same engine (and Q-table) as adaptive_agent.tuner
+rl_engine = get_rl_engine("adaptive_feedback", epsilon=0.1, alpha=0.1)
 
 def initialize_rl():
     """Initialize RL with suggestions as actions."""
-    df = load_weights()
-    if df.empty:
+    actions = weights_repository.suggestion_ids()  # served from memory unless weights.csv changed
+    if not actions:
+        return
+    bandit = get_bandit("adaptive_feedback", ADAPTIVE_STRATEGY) if ADAPTIVE_STRATEGY in BANDIT_POLICIES else None
+    # A loaded Q-table already holds its actions, so check the bandit separately
+    if actions == rl_engine.actions and (bandit is None or bandit.action_ids.keys() >= set(actions)):
         return
-    actions = df["suggestion_id"].tolist()
     rl_engine.register_actions(actions)
+    if bandit is not None:
+        bandit.register_actions(actions)
 
 def choose_suggestion(context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     initialize_rl()
     if not rl_engine.actions:
         return None
-    state = rl_engine.get_state(context)
-    action = rl_engine.choose_action(state)
-    df = load_weights()
-    row = df[df["suggestion_id"] == action].iloc[0]
+    if ADAPTIVE_STRATEGY in BANDIT_POLICIES:
+        action = get_bandit("adaptive_feedback", ADAPTIVE_STRATEGY).choose(context, rl_engine.actions)
+    else:
+        state = rl_engine.get_state(context)
+        action = rl_engine.choose_action(state)
+    row = weights_repository.get(action)
     return {"suggestion_id": action, "text": row["text"], "weight": float(row["weight"])}
 
 # Call initialize_rl() on module load
@@ -0,0 +1,206 @@
+# adaptive_agent/trainer.py
+"""
+Offline Q-learning from the feedback log.
+Replays the feedback log store (FEEDBACK_STORE_DIR, via load_feedback) in
+vectorized mini-batches (experience replay over NumPy arrays) for any
+alpha/gamma and number of epochs, and writes the result as a Q-table
+snapshot the RL engine loads.
+"""
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from rl_engine import QTable
+from state_encoders import StateEncoder, make_state_encoder
+from .storage import load_feedback
+
+logger = logging.getLogger(__name__)
+
+
+def default_context(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Context rebuilt from a feedback row (the log keeps only the user's text)."""
+    return {"user_text": row.get("user_text", "")}
+
+
+class Transitions:
+    """Encoded feedback: parallel arrays of state, action, reward and next state ids (-1 = terminal)."""
+
+    def __init__(self, q_table: QTable, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                 next_states: np.ndarray):
+        self.q_table = q_table
+        self.states = states
+        self.actions = actions
+        self.rewards = rewards
+        self.next_states = next_states
+
+    def __len__(self) -> int:
+        return len(self.rewards)
+
+
+class OfflineTrainer:
+    """
+    Batched Q-learning over logged transitions.
+
+    Each mini-batch computes its TD targets from the table as it was before
+    the batch, then applies them together. n updates of one (state, action)
+    cell in a batch move it by 1 - (1 - alpha)**n towards their mean target.
+    When the n targets are equal this matches n sequential updates; when
+    they differ it approximates them, since sequential updates weight later
+    targets more heavily than earlier ones.
+    """
+
+    def __init__(self, alpha: float = 0.1, gamma: float = 0.99, epochs: int = 1, batch_size: int = 256,
+                 state_encoder: Optional[StateEncoder] = None,
+                 context_fn: Callable[[Dict[str, Any]], Dict[str, Any]] = default_context,
+                 context_columns: Sequence[str] = ("user_text",), sequential: bool = False, shuffle: bool = True, seed: Optional[int] = None):
+        """
+        Initialize trainer.
+
+        Args:
+            alpha: Learning rate
+            gamma: Discount factor
+            epochs: Passes over the log
+            batch_size: Transitions per vectorized update
+            state_encoder: Encoder for the rebuilt contexts (default from RL_STATE_ENCODER);
+                use the same one as the online engine
+            context_fn: Builds the context from a row's context_columns
+            context_columns: Feedback columns the context depends on; each
+                distinct combination is encoded only once
+            sequential: Treat the next logged row as the next state (default:
+                every interaction is terminal, as tuner.update_weight logs them)
+            shuffle: Shuffle transitions every epoch
+            seed: Random seed for shuffling
+        """
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epochs = max(1, epochs)
+        self.batch_size = max(1, batch_size)
+        self.state_encoder = state_encoder if state_encoder is not None else make_state_encoder()
+        self.context_fn = context_fn
+        self.context_columns = list(context_columns)
+        self.sequential = sequential
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+
+    def build_transitions(self, feedback: pd.DataFrame, actions: Optional[List[str]] = None) -> Transitions:
+        """
+        Encode feedback rows as transitions.
+
+        Args:
+            feedback: Rows with suggestion_id, feedback (reward) and the
+                context columns, in log order
+            actions: Actions to register first, fixing their column order
+
+        Returns:
+            Transitions whose (all-zero) q_table holds the interned states and actions
+        """
+        rewards = pd.to_numeric(feedback["feedback"], errors="coerce")
+        rows = feedback[rewards.notna() & feedback["suggestion_id"].notna()]
+        rewards = rewards[rows.index]
+
+        # Encode each distinct context (and intern each action) once, not once per row
+        q_table = QTable()
+        for action in actions or []:
+            q_table.action_id(action)
+        # empty CSV fields read back as NaN; they were logged as ""
+        context_frame = rows[self.context_columns].fillna("")
+        context_codes: Dict[tuple, int] = {}
+        state_codes = np.fromiter(
+            (context_codes.setdefault(key, len(context_codes))
+             for key in zip(*(context_frame[column].tolist() for column in self.context_columns))),
+            dtype=np.int64, count=len(rows))
+        state_map = np.array([
+            q_table.state_id(self.state_encoder.encode(self.context_fn(dict(zip(self.context_columns, key)))),
+                             create=True)
+            for key in context_codes], dtype=np.int64)
+        action_codes, action_names = pd.factorize(rows["suggestion_id"].astype(str))
+        action_map = np.array([q_table.action_id(action) for action in action_names], dtype=np.int64)
+        states = state_map[state_codes]
+        action_ids = action_map[action_codes]
+
+        next_states = np.full(len(rows), -1, dtype=np.int64)
+        if self.sequential and len(rows) > 1:
+            next_states[:-1] = states[1:]
+        return Transitions(q_table, states, action_ids, rewards.to_numpy(dtype=np.float64), next_states)
+
+    def fit(self, transitions: Transitions, initial: Optional[QTable] = None) -> QTable:
+        """
+        Run Q-learning over the transitions.
+
+        Args:
+            transitions: Output of build_transitions()
+            initial: Table to start from (default: all zeros)
+
+        Returns:
+            Trained QTable
+        """
+        table = QTable.from_dict(initial.to_dict()) if initial is not None else QTable()
+        # intern in the encoded order and translate the transition ids to the new table
+        states_map = np.array([table.state_id(s, create=True) for s in transitions.q_table.states], dtype=np.int64)
+        actions_map = np.array([table.action_id(a) for a in transitions.q_table.actions], dtype=np.int64)
+        states = states_map[transitions.states]
+        actions = actions_map[transitions.actions]
+        next_states = np.where(transitions.next_states >= 0, states_map[np.maximum(transitions.next_states, 0)], -1)
+
+        q = np.ascontiguousarray(table.q_values, dtype=np.float64)
+        n_actions = q.shape[1]
+        rewards = transitions.rewards
+        if n_actions:
+            for _ in range(self.epochs):
+                order = self.rng.permutation(len(rewards)) if self.shuffle else np.arange(len(rewards))
+                for start in range(0, len(order), self.batch_size):
+                    batch = order[start:start + self.batch_size]
+                    self._update_batch(q, states[batch], actions[batch], rewards[batch], next_states[batch])
+        table.q_values[:] = q
+        return table
+
+    def _update_batch(self, q: np.ndarray, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                      next_states: np.ndarray) -> None:
+        terminal = next_states < 0
+        max_next = q[np.where(terminal, 0, next_states)].max(axis=1)
+        td = rewards + self.gamma * np.where(terminal, 0.0, max_next) - q[states, actions]
+        cells, inverse, counts = np.unique(states * q.shape[1] + actions, return_inverse=True, return_counts=True)
+        mean_td = np.bincount(inverse, weights=td, minlength=len(cells)) / counts
+        q.flat[cells] += (1.0 - (1.0 - self.alpha) ** counts) * mean_td
+
+    def train(self, feedback: Optional[pd.DataFrame] = None, actions: Optional[List[str]] = None,
+              initial: Optional[QTable] = None) -> QTable:
+        """
+        Encode and fit the feedback log.
+
+        Args:
+            feedback: Feedback rows (default: load_feedback())
+            actions: Actions to register first
+            initial: Table to start from
+
+        Returns:
+            Trained QTable
+        """
+        started = time.perf_counter()
+        feedback = load_feedback() if feedback is None else feedback
+        transitions = self.build_transitions(feedback, actions)
+        table = self.fit(transitions, initial)
+        logger.info(f"Trained Q-table on {len(transitions)} transitions x {self.epochs} epochs "
+                    f"({len(table)} states) in {time.perf_counter() - started:.3f}s")
+        return table
+
+    def train_to_snapshot(self, path: Path, **kwargs) -> QTable:
+        """
+        Train and write the table as an .npz snapshot atomically.
+
+        Args:
+            path: Snapshot path, e.g. RLEngine.q_table_path
+            **kwargs: Passed to train()
+
+        Returns:
+            Trained QTable
+        """
+        table = self.train(**kwargs)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table.save(path)
+        logger.info(f"Wrote Q-table snapshot {path}")
+        return table
@@ -1,22 +1,25 @@
 # adaptive_agent/tuner.py
 from typing import Dict, Any, Optional
 
-from rl_engine import RLEngine
-from .storage import load_weights, save_weights, log_improvement
+from rl_engine import get_rl_engine
+from .bandit import ADAPTIVE_STRATEGY, BANDIT_POLICIES, get_bandit
+from .storage import weights_repository, log_improvement
 
-rl_engine = RLEngine(agent_name="adaptive_feedback")
+# Same engine (and Q-table) as adaptive_agent.suggestion_engine
+rl_engine = get_rl_engine("adaptive_feedback", epsilon=0.1, alpha=0.1)
 
 def update_weight(suggestion_id: str, reward: int, context: Dict[str, Any], next_context: Optional[Dict[str, Any]] = None):
-    df = load_weights()
-    idx = df.index[df["suggestion_id"] == suggestion_id]
-    if len(idx) == 0:
+    row = weights_repository.get(suggestion_id)
+    if row is None:
         return
-    i = idx[0]
-    prev = float(df.at[i, "weight"])
-    state = rl_engine.get_state(context)
-    next_state = rl_engine.get_state(next_context) if next_context else None
-    rl_engine.update_q_value(state, suggestion_id, reward, next_state)
-    new_w = rl_engine.q_table[state][suggestion_id]  # Sync with Q-value
-    df.at[i, "weight"] = new_w
-    save_weights(df)
+    prev = float(row["weight"])
+    if ADAPTIVE_STRATEGY in BANDIT_POLICIES:
+        # One-step choice: next_context does not apply; the weight tracks the expected reward
+        new_w = get_bandit("adaptive_feedback", ADAPTIVE_STRATEGY).update(context, suggestion_id, reward)
+    else:
+        state = rl_engine.get_state(context)
+        next_state = rl_engine.get_state(next_context) if next_context else None
+        rl_engine.update_q_value(state, suggestion_id, reward, next_state)
+        new_w = rl_engine.q_table[state][suggestion_id]  # Sync with Q-value
+    weights_repository.set_weight(suggestion_id, new_w)  # written behind
     log_improvement(suggestion_id, prev, reward, new_w)
\ No newline at end of file
@@ -1,56 +1,53 @@
 import streamlit as st
 import pandas as pd
-import json
-import glob
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 
-# Function to load data from JSON files
-def load_data():
+from dashboard_loader import (
+    DASHBOARD_BUCKET_DIR, DASHBOARD_SNAPSHOT_DIR, DASHBOARD_SNAPSHOT_FORMAT, BucketFrameLoader
+)
+from data_manager import DataManager
+
+# Process-wide loaders: they remember which bucket files are already ingested
+@st.cache_resource
+def get_loaders():
+    return {
+        # Add filename to track submissions per team
+        "submission": BucketFrameLoader(DASHBOARD_BUCKET_DIR, "submission", add_filename=True,
+                                        snapshot_dir=DASHBOARD_SNAPSHOT_DIR or None,
+                                        snapshot_format=DASHBOARD_SNAPSHOT_FORMAT),
+        "reward": BucketFrameLoader(DASHBOARD_BUCKET_DIR, "reward",
+                                    snapshot_dir=DASHBOARD_SNAPSHOT_DIR or None,
+                                    snapshot_format=DASHBOARD_SNAPSHOT_FORMAT),
+    }
+
+# Cheap fingerprint of everything the dashboard shows (directory listings, no file bodies)
+def data_fingerprint():
+    listings = {kind: loader.scan() for kind, loader in get_loaders().items()}
+    fingerprint = "|".join([str(DataManager().teams.version)] +
+                           [BucketFrameLoader.fingerprint(listing) for listing in listings.values()])
+    return fingerprint, listings
+
+# Function to load data, re-run only when the fingerprint changes
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_data(fingerprint, _listings):
     # Load team data
-    teams_data = []
-    if os.path.exists("data/teams.json"):
-        with open("data/teams.json", "r") as f:
-            teams_data = json.load(f)
-    
-    # Load submission data from bucket
-    submission_files = glob.glob("data/bucket/submission_*.json")
-    submissions_data = []
-    for file_path in submission_files:
-        try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-                # Add filename to track submissions per team
-                data["filename"] = os.path.basename(file_path)
-                submissions_data.append(data)
-        except Exception as e:
-            st.warning(f"Error loading {file_path}: {e}")
+    teams_data = DataManager().get_teams()
     
-    # Load reward data from bucket
-    reward_files = glob.glob("data/bucket/reward_*.json")
-    rewards_data = []
-    for file_path in reward_files:
-        try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
-                rewards_data.append(data)
-        except Exception as e:
-            st.warning(f"Error loading {file_path}: {e}")
+    # Ingest bucket files not seen before
+    loaders = get_loaders()
+    errors = []
+    for kind, loader in loaders.items():
+        errors.extend(loader.refresh(_listings[kind]))
     
-    return teams_data, submissions_data, rewards_data
+    processed = process_data(teams_data, loaders["submission"].frame.copy(), loaders["reward"].frame.copy())
+    return teams_data, processed, errors
 
 # Function to process data for visualizations
-def process_data(teams_data, submissions_data, rewards_data):
+def process_data(teams_data, submissions_df, rewards_df):
     # Create teams dataframe
     teams_df = pd.DataFrame(teams_data)
     
-    # Create submissions dataframe
-    submissions_df = pd.DataFrame(submissions_data)
-    
-    # Create rewards dataframe
-    rewards_df = pd.DataFrame(rewards_data)
-    
     # Calculate metrics
     if not submissions_df.empty:
         # Extract team_id from submissions
@@ -84,22 +81,21 @@ st.title("📊 HackaVerse Dashboard")
 if st.button("🔄 Refresh Data"):
     st.experimental_rerun()
 
-# Load data
-teams_data, submissions_data, rewards_data = load_data()
-
-# Process data
-teams_df, submissions_df, rewards_df, submission_counts, reward_distribution = process_data(
-    teams_data, submissions_data, rewards_data
-)
+# Load and process data
+fingerprint, listings = data_fingerprint()
+teams_data, processed, load_errors = load_data(fingerprint, listings)
+teams_df, submissions_df, rewards_df, submission_counts, reward_distribution = processed
+for error in load_errors:
+    st.warning(error)
 
 # Display metrics
 col1, col2, col3 = st.columns(3)
 with col1:
     st.metric("Total Teams", len(teams_data))
 with col2:
-    st.metric("Total Submissions", len(submissions_data))
+    st.metric("Total Submissions", len(submissions_df))
 with col3:
-    st.metric("Total Rewards", len(rewards_data))
+    st.metric("Total Rewards", len(rewards_df))
 
 # Display dataframes
 st.subheader("Teams Data")
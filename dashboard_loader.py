@@ -0,0 +1,221 @@
+# dashboard_loader.py
+"""
+Incremental loading of bucket files for the Streamlit dashboard.
+
+BucketFrameLoader keeps the {kind}_*.json files of the bucket directory as
+a DataFrame and remembers which files it has ingested (name, mtime, size).
+Each refresh lists the directory, parses only files it has not seen and
+appends their records; a file that changed or disappeared makes that kind
+reload from scratch (bucket files are written once, so this is rare).
+
+fingerprint() is the cheap part (a directory listing, no file bodies) and
+is meant as the st.cache_data key, so unchanged data skips the refresh and
+the frame building altogether.
+
+With DASHBOARD_SNAPSHOT_DIR set, the frame and its file list are also kept
+in a Parquet (or Feather) snapshot, so a restarted dashboard reads one
+columnar file instead of every JSON file. Snapshots need pyarrow.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_BUCKET_DIR = os.getenv("DASHBOARD_BUCKET_DIR", os.path.join("data", "bucket"))
+# Directory for columnar snapshots of the loaded frames (empty = no snapshots)
+DASHBOARD_SNAPSHOT_DIR = os.getenv("DASHBOARD_SNAPSHOT_DIR", "")
+DASHBOARD_SNAPSHOT_FORMAT = os.getenv("DASHBOARD_SNAPSHOT_FORMAT", "parquet").lower()
+
+SNAPSHOT_FORMATS = ("parquet", "feather")
+_MANIFEST_KEY = b"dashboard_manifest"
+
+Listing = Dict[str, Tuple[int, int]]
+
+
+class BucketFrameLoader:
+    """DataFrame of one kind of bucket file, refreshed incrementally."""
+
+    def __init__(self, bucket_dir: str, kind: str, add_filename: bool = False,
+                 snapshot_dir: Optional[str] = None, snapshot_format: str = DASHBOARD_SNAPSHOT_FORMAT):
+        """
+        Initialize loader; the snapshot, if any, is read on the first refresh.
+
+        Args:
+            bucket_dir: Bucket directory
+            kind: Filename prefix, e.g. "submission" for submission_*.json
+            add_filename: Add the file's name to each record as "filename"
+            snapshot_dir: Directory for the columnar snapshot (None = no snapshot)
+            snapshot_format: "parquet" or "feather"
+
+        Raises:
+            ValueError: If the snapshot format is unknown
+        """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        self.bucket_dir = bucket_dir
+        self.kind = kind
+        self.add_filename = add_filename
+        self.snapshot_path = os.path.join(snapshot_dir, f"{kind}.{snapshot_format}") if snapshot_dir else None
+        self.snapshot_format = snapshot_format
+        if self.snapshot_path and pa is None:
+            logger.warning("pyarrow is not installed; dashboard snapshots are disabled")
+            self.snapshot_path = None
+        self._frame = pd.DataFrame()
+        self._files: Listing = {}
+        self._started = False
+        self._lock = threading.Lock()
+        self._stats = {"refreshes": 0, "files_parsed": 0, "full_reloads": 0, "snapshot_loads": 0}
+
+    def scan(self) -> Listing:
+        """
+        List the kind's files without opening them.
+
+        Returns:
+            Mapping of filename to (mtime_ns, size)
+        """
+        prefix = f"{self.kind}_"
+        listing = {}
+        try:
+            with os.scandir(self.bucket_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(prefix) and entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        listing[entry.name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+        return listing
+
+    @staticmethod
+    def fingerprint(listing: Listing) -> str:
+        """Digest of a listing; changes whenever a file is added, removed or rewritten."""
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(listing):
+            digest.update(f"{name}\0{listing[name][0]}\0{listing[name][1]}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def refresh(self, listing: Optional[Listing] = None) -> List[str]:
+        """
+        Bring the frame up to date with the directory.
+
+        Args:
+            listing: Result of scan() if the caller already has one
+
+        Returns:
+            Error messages for files that could not be read (retried next refresh)
+        """
+        listing = self.scan() if listing is None else listing
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._load_snapshot()
+            self._stats["refreshes"] += 1
+            if any(listing.get(name) != stamp for name, stamp in self._files.items()):
+                # a file we ingested was rewritten or removed: its rows cannot be told apart, start over
+                self._frame = pd.DataFrame()
+                self._files = {}
+                self._stats["full_reloads"] += 1
+            new_files = sorted(name for name in listing if name not in self._files)
+            if not new_files:
+                return []
+
+            records, errors = [], []
+            for name in new_files:
+                try:
+                    with open(os.path.join(self.bucket_dir, name), "r") as f:
+                        data = json.load(f)
+                    if self.add_filename:
+                        data["filename"] = name
+                except Exception as e:
+                    errors.append(f"Error loading {os.path.join(self.bucket_dir, name)}: {e}")
+                    continue
+                records.append(data)
+                self._files[name] = listing[name]
+            self._stats["files_parsed"] += len(records)
+            if records:
+                new_frame = pd.DataFrame(records)
+                self._frame = pd.concat([self._frame, new_frame], ignore_index=True) if len(self._frame) else new_frame
+                self._save_snapshot()
+            return errors
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Records ingested so far (shared; copy before modifying)."""
+        return self._frame
+
+    # ---- snapshots ----
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            if self.snapshot_format == "parquet":
+                table = pq.read_table(self.snapshot_path)
+            else:
+                table = feather.read_table(self.snapshot_path)
+            manifest = json.loads(table.schema.metadata[_MANIFEST_KEY])
+            frame = table.to_pandas()
+            for column in manifest["json_columns"]:
+                frame[column] = [json.loads(value) if value is not None else None for value in frame[column]]
+        except Exception as e:
+            logger.warning(f"Ignoring dashboard snapshot {self.snapshot_path}: {e}")
+            return
+        self._frame = frame
+        self._files = {name: tuple(stamp) for name, stamp in manifest["files"].items()}
+        self._stats["snapshot_loads"] += 1
+
+    def _save_snapshot(self) -> None:
+        """Write the frame and its file list as one columnar file, atomically."""
+        if not self.snapshot_path:
+            return
+        frame = self._frame.copy()
+        json_columns = []
+        for column in frame.columns[frame.dtypes == object]:
+            values = frame[column].dropna()
+            kinds = {type(value) for value in values}
+            # nested or mixed-type columns have no Arrow type; store them as JSON text
+            if len(kinds) > 1 or kinds & {dict, list, tuple}:
+                frame[column] = [json.dumps(value) if value is not None and not _is_nan(value) else None
+                                 for value in frame[column]]
+                json_columns.append(column)
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            manifest = json.dumps({"files": self._files, "json_columns": json_columns}).encode("utf-8")
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _MANIFEST_KEY: manifest})
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.tmp.{os.getpid()}"
+            if self.snapshot_format == "parquet":
+                pq.write_table(table, tmp_path)
+            else:
+                feather.write_feather(table, tmp_path)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Failed to write dashboard snapshot {self.snapshot_path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ingestion counters.
+
+        Returns:
+            Dictionary with kind, ingested file and row counts, and how often
+            the loader refreshed, parsed files, reloaded fully or read a snapshot
+        """
+        with self._lock:
+            return {"kind": self.kind, "files": len(self._files), "rows": len(self._frame), **self._stats}
+
+
+def _is_nan(value: Any) -> bool:
+    return isinstance(value, float) and value != value
@@ -1,23 +1,50 @@
 """
 Data Management Module for HackaAIverse
 Handles JSON-based data storage and retrieval
+
+Each JSON file is served by an indexed in-memory store (json_store.py):
+it is loaded once, lookups by id, team name and judge are hash lookups,
+and writes go to an append-only journal that is compacted back into the
+file. Returned records are shared with the store; treat them as read-only.
 """
 
 import json
 import os
+import threading
 import uuid
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from config import Config
+from json_store import JsonStore, get_json_store, write_json_atomic
+
+# Per-team score sums shared by every DataManager in the process (Streamlit
+# builds a new one per rerun): scores file -> (store version, team -> sums).
+# Rebuilt in one pass when the scores change, updated in place by submit_score.
+_score_aggregates: Dict[str, Tuple[int, Dict[str, Dict[str, Any]]]] = {}
+# Taken before any store lock
+_score_aggregates_lock = threading.RLock()
 
 class DataManager:
     """Handles all data operations for the hackathon system"""
     
     def __init__(self):
         Config.create_data_directory()
+        self.problems = get_json_store(Config.PROBLEM_FILE)
+        self.teams = get_json_store(Config.TEAMS_FILE, indexes=("team_name",))
+        self.projects = get_json_store(Config.PROJECTS_FILE, indexes=("team_name",))
+        self.scores = get_json_store(Config.SCORES_FILE, indexes=("team_name", "judge_name"))
+        self.outreach = get_json_store(Config.OUTREACH_FILE)
+        self._stores = {store.path: store for store in
+                        (self.problems, self.teams, self.projects, self.scores, self.outreach)}
+    
+    def _store_for(self, file_path: str) -> Optional[JsonStore]:
+        return self._stores.get(file_path)
     
     def load_json(self, file_path: str) -> List[Dict[str, Any]]:
         """Load data from JSON file"""
+        store = self._store_for(file_path)
+        if store is not None:
+            return store.all()
         try:
             if os.path.exists(file_path):
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -28,24 +55,31 @@ class DataManager:
             return []
     
     def save_json(self, file_path: str, data: List[Dict[str, Any]]) -> bool:
-        """Save data to JSON file"""
+        """Save data to JSON file (atomically; replaces the whole collection)"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            store = self._store_for(file_path)
+            if store is not None:
+                store.replace(data)
+            else:
+                write_json_atomic(file_path, data)
             return True
         except Exception as e:
             print(f"Error saving {file_path}: {e}")
             return False
     
+    def compact(self):
+        """Fold every store's journal back into its JSON file"""
+        for store in self._stores.values():
+            store.compact()
+    
     # Problem Statements Management
     def get_problems(self) -> List[Dict[str, Any]]:
         """Get all problem statements"""
-        return self.load_json(Config.PROBLEM_FILE)
+        return self.problems.all()
     
     def add_problem(self, title: str, description: str, category: str = "Open Innovation", 
                    difficulty: str = "Medium", tech_stack: List[str] = None) -> str:
         """Add a new problem statement"""
-        problems = self.get_problems()
         problem_id = str(uuid.uuid4())[:8]
         
         new_problem = {
@@ -58,114 +92,105 @@ class DataManager:
             "created_at": datetime.now().isoformat()
         }
         
-        problems.append(new_problem)
-        self.save_json(Config.PROBLEM_FILE, problems)
+        self.problems.put(new_problem)
         return problem_id
     
     def get_problem_by_id(self, problem_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific problem by ID"""
-        problems = self.get_problems()
-        return next((p for p in problems if p.get("id") == problem_id), None)
+        return self.problems.get(problem_id)
     
     # Team Management
     def get_teams(self) -> List[Dict[str, Any]]:
         """Get all registered teams"""
-        return self.load_json(Config.TEAMS_FILE)
+        return self.teams.all()
     
     def register_team(self, team_name: str, members: List[str], email: str, 
                      college: str = "", contact_number: str = "") -> str:
         """Register a new team"""
-        teams = self.get_teams()
-        
-        # Check if team name already exists
-        if any(team.get("team_name") == team_name for team in teams):
-            raise ValueError(f"Team name '{team_name}' already exists")
-        
-        team_id = str(uuid.uuid4())[:8]
-        new_team = {
-            "id": team_id,
-            "team_name": team_name,
-            "members": members,
-            "email": email,
-            "college": college,
-            "contact_number": contact_number,
-            "registered_at": datetime.now().isoformat(),
-            "status": "registered"
-        }
-        
-        teams.append(new_team)
-        self.save_json(Config.TEAMS_FILE, teams)
+        with self.teams.transaction():
+            # Check if team name already exists
+            if self.teams.find_one("team_name", team_name):
+                raise ValueError(f"Team name '{team_name}' already exists")
+            
+            team_id = str(uuid.uuid4())[:8]
+            new_team = {
+                "id": team_id,
+                "team_name": team_name,
+                "members": members,
+                "email": email,
+                "college": college,
+                "contact_number": contact_number,
+                "registered_at": datetime.now().isoformat(),
+                "status": "registered"
+            }
+            
+            self.teams.put(new_team)
         return team_id
     
     def get_team_by_name(self, team_name: str) -> Optional[Dict[str, Any]]:
         """Get team by name"""
-        teams = self.get_teams()
-        return next((t for t in teams if t.get("team_name") == team_name), None)
+        return self.teams.find_one("team_name", team_name)
     
     # Project Submissions Management
     def get_projects(self) -> List[Dict[str, Any]]:
         """Get all project submissions"""
-        return self.load_json(Config.PROJECTS_FILE)
+        return self.projects.all()
     
     def submit_project(self, team_name: str, project_title: str, description: str,
                       github_link: str = "", demo_link: str = "", tech_stack: List[str] = None,
                       problem_id: str = "") -> str:
         """Submit a project"""
-        projects = self.get_projects()
-        
         # Check if team exists
         team = self.get_team_by_name(team_name)
         if not team:
             raise ValueError(f"Team '{team_name}' not found")
         
-        # Check if team already submitted
-        existing_project = next((p for p in projects if p.get("team_name") == team_name), None)
-        if existing_project:
-            # Update existing submission
-            existing_project.update({
-                "project_title": project_title,
-                "description": description,
-                "github_link": github_link,
-                "demo_link": demo_link,
-                "tech_stack": tech_stack or [],
-                "problem_id": problem_id,
-                "updated_at": datetime.now().isoformat()
-            })
-            submission_id = existing_project["id"]
-        else:
-            # Create new submission
-            submission_id = str(uuid.uuid4())[:8]
-            new_project = {
-                "id": submission_id,
-                "team_name": team_name,
-                "project_title": project_title,
-                "description": description,
-                "github_link": github_link,
-                "demo_link": demo_link,
-                "tech_stack": tech_stack or [],
-                "problem_id": problem_id,
-                "submitted_at": datetime.now().isoformat(),
-                "status": "submitted"
-            }
-            projects.append(new_project)
+        with self.projects.transaction():
+            # Check if team already submitted
+            existing_project = self.projects.find_one("team_name", team_name)
+            if existing_project:
+                # Update existing submission
+                submission_id = existing_project["id"]
+                self.projects.update(submission_id, {
+                    "project_title": project_title,
+                    "description": description,
+                    "github_link": github_link,
+                    "demo_link": demo_link,
+                    "tech_stack": tech_stack or [],
+                    "problem_id": problem_id,
+                    "updated_at": datetime.now().isoformat()
+                })
+            else:
+                # Create new submission
+                submission_id = str(uuid.uuid4())[:8]
+                new_project = {
+                    "id": submission_id,
+                    "team_name": team_name,
+                    "project_title": project_title,
+                    "description": description,
+                    "github_link": github_link,
+                    "demo_link": demo_link,
+                    "tech_stack": tech_stack or [],
+                    "problem_id": problem_id,
+                    "submitted_at": datetime.now().isoformat(),
+                    "status": "submitted"
+                }
+                self.projects.put(new_project)
         
-        self.save_json(Config.PROJECTS_FILE, projects)
         return submission_id
     
     def get_project_by_team(self, team_name: str) -> Optional[Dict[str, Any]]:
         """Get project submission by team name"""
-        projects = self.get_projects()
-        return next((p for p in projects if p.get("team_name") == team_name), None)
+        return self.projects.find_one("team_name", team_name)
     
     # Scoring Management
     def get_scores(self) -> List[Dict[str, Any]]:
         """Get all scores"""
-        return self.load_json(Config.SCORES_FILE)
+        return self.scores.all()
     
     def submit_score(self, team_name: str, judge_name: str, scores: Dict[str, int],
                     comments: str = "") -> str:
         """Submit scores for a team"""
-        all_scores = self.get_scores()
         score_id = str(uuid.uuid4())[:8]
         
         # Calculate total score
@@ -181,60 +206,91 @@ class DataManager:
             "submitted_at": datetime.now().isoformat()
         }
         
-        all_scores.append(new_score)
-        self.save_json(Config.SCORES_FILE, all_scores)
+        with _score_aggregates_lock, self.scores.transaction():
+            cached = _score_aggregates.get(self.scores.path)
+            current = cached is not None and cached[0] == self.scores.version
+            self.scores.put(new_score)
+            if current:
+                self._add_to_aggregates(cached[1], new_score)
+                _score_aggregates[self.scores.path] = (self.scores.version, cached[1])
         return score_id
     
     def get_team_scores(self, team_name: str) -> List[Dict[str, Any]]:
         """Get all scores for a specific team"""
-        all_scores = self.get_scores()
-        return [score for score in all_scores if score.get("team_name") == team_name]
+        return self.scores.find("team_name", team_name)
     
-    def calculate_team_average_score(self, team_name: str) -> Dict[str, float]:
-        """Calculate average scores for a team"""
-        team_scores = self.get_team_scores(team_name)
-        
-        if not team_scores:
-            return {"total_average": 0.0, "criteria_averages": {}}
+    def get_judge_scores(self, judge_name: str) -> List[Dict[str, Any]]:
+        """Get all scores submitted by a specific judge"""
+        return self.scores.find("judge_name", judge_name)
+    
+    @staticmethod
+    def _add_to_aggregates(aggregates: Dict[str, Dict[str, Any]], score_entry: Dict[str, Any]):
+        """Add one score entry to its team's running sums"""
+        aggregate = aggregates.setdefault(score_entry.get("team_name"), {
+            "count": 0, "total_sum": 0, "criteria_sums": {}, "criteria_counts": {}
+        })
+        aggregate["count"] += 1
+        aggregate["total_sum"] += score_entry.get("total_score", 0)
         
-        # Calculate averages for each criteria
-        criteria_sums = {}
-        criteria_counts = {}
-        total_sum = 0
+        for criteria, score in score_entry.get("scores", {}).items():
+            aggregate["criteria_sums"][criteria] = aggregate["criteria_sums"].get(criteria, 0) + score
+            aggregate["criteria_counts"][criteria] = aggregate["criteria_counts"].get(criteria, 0) + 1
+    
+    def _team_aggregates(self) -> Dict[str, Dict[str, Any]]:
+        """Per-team score sums, grouped in one pass over the scores if they changed (hold _score_aggregates_lock)"""
+        # read the version first: scores written meanwhile only make the cache look stale
+        version = self.scores.version
+        cached = _score_aggregates.get(self.scores.path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
         
-        for score_entry in team_scores:
-            scores = score_entry.get("scores", {})
-            total_sum += score_entry.get("total_score", 0)
-            
-            for criteria, score in scores.items():
-                if criteria not in criteria_sums:
-                    criteria_sums[criteria] = 0
-                    criteria_counts[criteria] = 0
-                criteria_sums[criteria] += score
-                criteria_counts[criteria] += 1
+        aggregates = {}
+        for score_entry in self.scores.all():
+            self._add_to_aggregates(aggregates, score_entry)
+        _score_aggregates[self.scores.path] = (version, aggregates)
+        return aggregates
+    
+    @staticmethod
+    def _average_scores(aggregate: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """Averages from a team's running sums"""
+        if not aggregate:
+            return {"total_average": 0.0, "criteria_averages": {}}
         
         criteria_averages = {
-            criteria: criteria_sums[criteria] / criteria_counts[criteria]
-            for criteria in criteria_sums
+            criteria: aggregate["criteria_sums"][criteria] / aggregate["criteria_counts"][criteria]
+            for criteria in aggregate["criteria_sums"]
         }
         
-        total_average = total_sum / len(team_scores)
+        total_average = aggregate["total_sum"] / aggregate["count"]
         
         return {
             "total_average": round(total_average, 2),
             "criteria_averages": {k: round(v, 2) for k, v in criteria_averages.items()},
-            "judge_count": len(team_scores)
+            "judge_count": aggregate["count"]
         }
     
+    def calculate_team_average_score(self, team_name: str) -> Dict[str, float]:
+        """Calculate average scores for a team"""
+        with _score_aggregates_lock:
+            return self._average_scores(self._team_aggregates().get(team_name))
+    
     def get_leaderboard(self) -> List[Dict[str, Any]]:
         """Generate leaderboard with team rankings"""
         teams = self.get_teams()
+        with _score_aggregates_lock:
+            aggregates = self._team_aggregates()
+            team_scores = {team["team_name"]: self._average_scores(aggregates.get(team["team_name"]))
+                           for team in teams}
+        # first submission per team, as get_project_by_team returns
+        projects = {}
+        for project in self.get_projects():
+            projects.setdefault(project.get("team_name"), project)
         leaderboard = []
         
         for team in teams:
             team_name = team["team_name"]
-            project = self.get_project_by_team(team_name)
-            score_data = self.calculate_team_average_score(team_name)
+            project = projects.get(team_name)
+            score_data = team_scores[team_name]
             
             leaderboard_entry = {
                 "team_name": team_name,
@@ -260,13 +316,12 @@ class DataManager:
     # Outreach Management
     def get_outreach_data(self) -> List[Dict[str, Any]]:
         """Get outreach campaign data"""
-        return self.load_json(Config.OUTREACH_FILE)
+        return self.outreach.all()
     
     def add_outreach_contact(self, college_name: str, contact_person: str, 
                            contact_email: str, contact_phone: str = "",
                            outreach_method: str = "", status: str = "contacted") -> str:
         """Add outreach contact information"""
-        outreach_data = self.get_outreach_data()
         contact_id = str(uuid.uuid4())[:8]
         
         new_contact = {
@@ -281,26 +336,24 @@ class DataManager:
             "responses": []
         }
         
-        outreach_data.append(new_contact)
-        self.save_json(Config.OUTREACH_FILE, outreach_data)
+        self.outreach.put(new_contact)
         return contact_id
     
     def update_outreach_status(self, contact_id: str, status: str, response_note: str = "") -> bool:
         """Update outreach contact status"""
-        outreach_data = self.get_outreach_data()
-        
-        for contact in outreach_data:
-            if contact.get("id") == contact_id:
-                contact["status"] = status
-                if response_note:
-                    contact["responses"].append({
-                        "note": response_note,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                self.save_json(Config.OUTREACH_FILE, outreach_data)
-                return True
-        
-        return False
+        with self.outreach.transaction():
+            contact = self.outreach.get(contact_id)
+            if contact is None:
+                return False
+            
+            responses = list(contact.get("responses", []))
+            if response_note:
+                responses.append({
+                    "note": response_note,
+                    "timestamp": datetime.now().isoformat()
+                })
+            self.outreach.update(contact_id, {"status": status, "responses": responses})
+        return True
     
     # Statistics and Analytics
     def get_statistics(self) -> Dict[str, Any]:
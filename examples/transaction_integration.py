@@ -54,11 +54,13 @@ def main():
     print("✅ Testing successful transaction flow")
     
     # Create a successful transaction
+    # Reasoning and reward only need the submission, so they run concurrently
     txn = Transaction(f"txn_{team_id}_{int(time.time())}")
-    txn.add_step(submit_to_db, team_payload)
-    txn.add_step(run_reasoning, team_payload)
-    txn.add_step(calculate_reward, team_payload)
-    txn.add_step(storage_service.save_submission, team_id, team_payload)
+    txn.add_task("submit", submit_to_db, args=(team_payload,))
+    txn.add_task("reasoning", run_reasoning, args=(team_payload,), depends_on=["submit"])
+    txn.add_task("reward", calculate_reward, args=(team_payload,), depends_on=["submit"])
+    txn.add_task("store", storage_service.save_submission, args=(team_id, team_payload),
+                 depends_on=["reasoning", "reward"])
     
     try:
         results = txn.commit()
@@ -66,6 +68,8 @@ def main():
         print(f"   Results: {len(results)} steps completed")
         for i, result in enumerate(results):
             print(f"   Step {i+1}: {result}")
+        for name, timing in txn.get_timings().items():
+            print(f"   {name}: {timing['duration_ms']} ms")
     except TransactionError as e:
         print(f"❌ Transaction failed: {e}")
     
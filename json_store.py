@@ -0,0 +1,418 @@
+# json_store.py
+"""
+Indexed JSON collection store for DataManager.
+
+A collection (teams.json, scores.json, ...) is a JSON list of records with
+an "id". It is loaded once and kept in memory with hash indexes on chosen
+fields, so lookups no longer parse the file. Writes append one line to a
+journal next to the file (<file>.journal) instead of rewriting it; every
+JSON_STORE_COMPACT_EVERY journal entries (and at exit) the journal is
+folded back into the JSON file, which is written to a temporary file and
+moved into place so readers never see a torn file.
+
+Journal entries are upserts by id, so replaying one twice is harmless: a
+crash between rewriting the JSON file and truncating the journal loses
+nothing. Other processes sharing the files are picked up by comparing the
+file and journal stamps on every access; writers hold an exclusive lock on
+<file>.lock.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
+logger = logging.getLogger(__name__)
+
+# Journal entries written before the JSON file is rewritten (0 = rewrite on every write)
+JSON_STORE_COMPACT_EVERY = int(os.getenv("JSON_STORE_COMPACT_EVERY", "100"))
+
+Stamp = Optional[Tuple[int, int, int]]
+
+
+def _stamp(path: str) -> Stamp:
+    """(inode, mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Write JSON to a temporary file and move it over path."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class JsonStore:
+    """
+    One JSON list file held in memory with hash indexes.
+
+    Records returned by the getters are shared with the store: treat them
+    as read-only and write changes back with put().
+    """
+
+    def __init__(self, path: str, indexes: Sequence[str] = (), compact_every: int = JSON_STORE_COMPACT_EVERY):
+        """
+        Initialize store; the file is loaded on first access.
+
+        Args:
+            path: JSON file holding a list of records
+            indexes: Fields to keep a hash index on (the id is always indexed)
+            compact_every: Journal entries written before the file is rewritten
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.lock_path = f"{path}.lock"
+        self.index_fields = list(indexes)
+        self.compact_every = max(0, compact_every)
+        self._records: Dict[str, Dict[str, Any]] = {}  # key -> record, in file order
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {}  # field -> value -> ordered keys
+        self._base_stamp: Stamp = None
+        self._journal_stamp: Stamp = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._loaded = False
+        self._version = 0
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        self._stats = {"loads": 0, "journal_reads": 0, "writes": 0, "compactions": 0}
+        atexit.register(self._compact_at_exit)
+
+    # ---- loading and catching up ----
+
+    def _load(self) -> None:
+        """Read the JSON file and replay the whole journal (lock held)."""
+        self._records = {}
+        self._indexes = {field: {} for field in self.index_fields}
+        self._base_stamp = _stamp(self.path)
+        records: List[Dict[str, Any]] = []
+        if self._base_stamp is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading {self.path}: {e}")
+        for record in records if isinstance(records, list) else []:
+            key = record.get("id")
+            if key is None or key in self._records:
+                # keep records without (or with a duplicate) id under a key no upsert can hit
+                key = f"\x00row{len(self._records)}"
+            self._insert(key, record)
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._version += 1
+        self._read_journal()
+        self._loaded = True
+        self._stats["loads"] += 1
+
+    def _read_journal(self) -> None:
+        """Apply complete journal lines after the current offset (lock held)."""
+        self._journal_stamp = _stamp(self.journal_path)
+        if self._journal_stamp is None or self._journal_stamp[2] <= self._journal_offset:
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable journal entry in {self.journal_path}")
+                continue
+            if entry.get("op") == "put":
+                self._apply_put(entry["record"])
+            self._journal_entries += 1
+        self._journal_offset += end
+        self._stats["journal_reads"] += 1
+
+    def _sync(self) -> None:
+        """Bring the in-memory copy up to date with the files (lock held)."""
+        if not self._loaded or _stamp(self.path) != self._base_stamp:
+            self._load()
+            return
+        journal_stamp = _stamp(self.journal_path)
+        if journal_stamp == self._journal_stamp:
+            return
+        if self._journal_stamp is not None and (
+                journal_stamp is None or journal_stamp[0] != self._journal_stamp[0]
+                or journal_stamp[2] < self._journal_offset):
+            self._load()  # journal replaced or truncated under us
+            return
+        self._read_journal()
+
+    # ---- index maintenance ----
+
+    def _insert(self, key: str, record: Dict[str, Any]) -> None:
+        self._records[key] = record
+        for field in self.index_fields:
+            value = record.get(field)
+            if value is not None:
+                self._indexes[field].setdefault(value, {})[key] = None
+
+    def _apply_put(self, record: Dict[str, Any]) -> None:
+        self._version += 1
+        key = record["id"]
+        old = self._records.get(key)
+        if old is None:
+            self._insert(key, record)
+            return
+        for field in self.index_fields:
+            old_value, value = old.get(field), record.get(field)
+            if old_value == value:
+                continue
+            if old_value is not None:
+                bucket = self._indexes[field].get(old_value, {})
+                bucket.pop(key, None)
+                if not bucket:
+                    self._indexes[field].pop(old_value, None)
+            if value is not None:
+                self._indexes[field].setdefault(value, {})[key] = None
+        self._records[key] = record
+
+    # ---- locking ----
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(f, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(f)
+
+    @contextmanager
+    def transaction(self) -> Iterator["JsonStore"]:
+        """
+        Hold the store's write lock, with the in-memory copy caught up, for
+        a read-check-write sequence (e.g. "insert unless the name is taken").
+        Nested transactions reuse the outer lock.
+        """
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._write_depth -= 1
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._file_lock():
+                self._write_depth = 1
+                try:
+                    self._sync()
+                    yield self
+                finally:
+                    self._write_depth = 0
+
+    # ---- reads ----
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All records, in file order."""
+        with self._lock:
+            self._sync()
+            return list(self._records.values())
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Record with an id, or None."""
+        with self._lock:
+            self._sync()
+            return self._records.get(record_id)
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """
+        Records whose field equals a value.
+
+        Args:
+            field: Field name; indexed fields are a hash lookup, others a scan
+            value: Value to match
+
+        Returns:
+            Matching records, in insertion order
+        """
+        with self._lock:
+            self._sync()
+            if field in self._indexes:
+                return [self._records[key] for key in self._indexes[field].get(value, ())]
+            return [record for record in self._records.values() if record.get(field) == value]
+
+    def find_one(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """First record whose field equals a value, or None."""
+        with self._lock:
+            self._sync()
+            if field in self._indexes:
+                keys = self._indexes[field].get(value)
+                return self._records[next(iter(keys))] if keys else None
+            return next((record for record in self._records.values() if record.get(field) == value), None)
+
+    def values(self, field: str) -> List[Any]:
+        """Distinct values of an indexed field."""
+        with self._lock:
+            self._sync()
+            return list(self._indexes[field])
+
+    @property
+    def version(self) -> int:
+        """
+        Counter that changes whenever the records do (own writes, other
+        processes' writes, reloads), for caching values derived from them.
+        """
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._records)
+
+    # ---- writes ----
+
+    def put(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a record, or replace the one with the same id, via the journal.
+
+        Args:
+            record: Record with an "id"
+
+        Returns:
+            The stored record
+
+        Raises:
+            ValueError: If the record has no id
+        """
+        if record.get("id") is None:
+            raise ValueError("Records need an 'id'")
+        record = dict(record)
+        with self.transaction():
+            line = json.dumps({"op": "put", "record": record}, ensure_ascii=False) + "\n"
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+            self._apply_put(record)
+            self._journal_entries += 1
+            self._journal_offset += len(line.encode("utf-8"))
+            self._journal_stamp = _stamp(self.journal_path)
+            self._stats["writes"] += 1
+            if self._journal_entries >= self.compact_every:
+                self._compact()
+        return record
+
+    def update(self, record_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Merge changes into a record.
+
+        Args:
+            record_id: Id of the record
+            changes: Fields to set
+
+        Returns:
+            The updated record, or None if there is no record with that id
+        """
+        with self.transaction():
+            record = self._records.get(record_id)
+            if record is None:
+                return None
+            return self.put({**record, **changes})
+
+    def replace(self, records: List[Dict[str, Any]]) -> None:
+        """Overwrite the whole collection (rewrites the file, empties the journal)."""
+        with self.transaction():
+            self._write_base(list(records))
+            self._load()
+
+    def _write_base(self, records: List[Dict[str, Any]]) -> None:
+        """Rewrite the JSON file, then empty the journal (write lock held)."""
+        write_json_atomic(self.path, records)
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+
+    def _compact(self) -> None:
+        self._write_base(list(self._records.values()))
+        self._base_stamp = _stamp(self.path)
+        self._journal_stamp = _stamp(self.journal_path)
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._stats["compactions"] += 1
+
+    def compact(self) -> None:
+        """Fold the journal into the JSON file now."""
+        with self.transaction():
+            if self._journal_entries:
+                self._compact()
+
+    def _compact_at_exit(self) -> None:
+        if not self._loaded or not self._journal_entries:
+            return
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Failed to compact {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get load/write counters.
+
+        Returns:
+            Dictionary with record count, pending journal entries, and how
+            often the file was loaded, the journal read, written and compacted
+        """
+        with self._lock:
+            return {"path": self.path, "records": len(self._records), "journal_entries": self._journal_entries,
+                    **self._stats}
+
+
+_stores: Dict[str, JsonStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_json_store(path: str, indexes: Sequence[str] = (), **kwargs) -> JsonStore:
+    """
+    Get the process-wide store for a JSON file, creating it on first use.
+
+    Args:
+        path: JSON file
+        indexes: Indexed fields, used only when the store is created
+        **kwargs: JsonStore arguments, used only when the store is created
+
+    Returns:
+        JsonStore shared by every caller in the process
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = JsonStore(path, indexes=indexes, **kwargs)
+        return store
@@ -2,16 +2,33 @@
 """
 Production-level RL engine for agents.
 Supports epsilon-greedy exploration, Q-value updates, and persistent storage.
+
+The Q-table lives either in process memory (saved to an .npz snapshot) or,
+with the shared backend, in a memory-mapped file that every worker process
+reads and updates in place under per-row locks.
 """
 
 import os
 import json
+import atexit
+import struct
 import logging
+import threading
+import time
 import numpy as np
-from typing import Any, Dict, List, Optional, Tuple
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from state_encoders import StateEncoder, make_state_encoder
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the shared backend needs it
+    fcntl = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -20,97 +37,668 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data" / "rl_data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Q-table writes are coalesced: flushed after RL_FLUSH_EVERY changes or
+# RL_FLUSH_INTERVAL seconds after the first unflushed change
+RL_FLUSH_EVERY = int(os.getenv("RL_FLUSH_EVERY", "50"))
+RL_FLUSH_INTERVAL = float(os.getenv("RL_FLUSH_INTERVAL", "5.0"))
+
+# Q-table backend: "shared" (memory-mapped, shared by all worker processes),
+# "memory" (per-process, .npz snapshot) or "auto" (shared where fcntl exists)
+RL_QTABLE_BACKEND = os.getenv("RL_QTABLE_BACKEND", "auto").lower()
+# Initial column capacity of a new shared table; doubled as more actions are registered
+RL_SHARED_MAX_ACTIONS = int(os.getenv("RL_SHARED_MAX_ACTIONS", "64"))
+RL_SHARED_INITIAL_STATES = int(os.getenv("RL_SHARED_INITIAL_STATES", "1024"))
+
+
+class QRow(MutableMapping):
+    """Dict-like view of one state's Q-values (action -> value)."""
+
+    def __init__(self, table: "QTable", state_id: int):
+        self._table = table
+        self._state_id = state_id
+
+    def __getitem__(self, action: str) -> float:
+        action_id = self._table.action_id(action, create=False)
+        if action_id is None:
+            raise KeyError(action)
+        return float(self._table.row(self._state_id)[action_id])
+
+    def __setitem__(self, action: str, value: float) -> None:
+        action_id = self._table.action_id(action)  # may grow the array, so look it up first
+        self._table.update(self._state_id, action_id, lambda _: value)
+
+    def __delitem__(self, action: str) -> None:
+        raise TypeError("Q-table columns cannot be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._table.actions))
+
+    def __len__(self) -> int:
+        return len(self._table.actions)
+
+
+class QTable(Mapping):
+    """
+    Compact Q-table: states are interned to row ids, actions to column ids,
+    and Q-values live in one float64 array that grows by doubling.
+
+    Reads like the nested dict it replaces (q_table[state][action]).
+    """
+
+    def __init__(self, capacity: int = 64, action_capacity: int = 8):
+        self.state_ids: Dict[str, int] = {}
+        self.states: List[str] = []
+        self.action_ids: Dict[str, int] = {}
+        self.actions: List[str] = []
+        self._values = np.zeros((max(1, capacity), max(1, action_capacity)))
+
+    @property
+    def q_values(self) -> np.ndarray:
+        """Q-values of all known states and actions (a view, not a copy)."""
+        self._refresh()
+        return self._values[:len(self.states), :len(self.actions)]
+
+    def _refresh(self) -> None:
+        """Pick up states and actions added elsewhere (nothing to do in memory)."""
+
+    def _grow(self, rows: int, cols: int) -> None:
+        cap_rows, cap_cols = self._values.shape
+        if rows <= cap_rows and cols <= cap_cols:
+            return
+        while cap_rows < rows:
+            cap_rows *= 2
+        while cap_cols < cols:
+            cap_cols *= 2
+        grown = np.zeros((cap_rows, cap_cols))
+        grown[:len(self.states), :len(self.actions)] = self.q_values
+        self._values = grown
+
+    def state_id(self, state: str, create: bool = False) -> Optional[int]:
+        """Row id of a state, adding a zero row if create is set."""
+        state_id = self.state_ids.get(state)
+        if state_id is None and create:
+            self._grow(len(self.states) + 1, len(self.actions))
+            state_id = len(self.states)
+            self.state_ids[state] = state_id
+            self.states.append(state)
+        return state_id
+
+    def action_id(self, action: str, create: bool = True) -> Optional[int]:
+        """Column id of an action, adding a zero column if it is new and create is set."""
+        action_id = self.action_ids.get(action)
+        if action_id is None and create:
+            self._grow(len(self.states), len(self.actions) + 1)
+            action_id = len(self.actions)
+            self.action_ids[action] = action_id
+            self.actions.append(action)
+        return action_id
+
+    def row(self, state_id: int) -> np.ndarray:
+        """Q-values of one state over all known actions (a view, not a copy)."""
+        return self._values[state_id, :len(self.actions)]
+
+    def update(self, state_id: int, action_id: int, fn: Callable[[float], float]) -> Tuple[float, float]:
+        """
+        Replace one Q-value with fn(old value).
+
+        Args:
+            state_id: Row id from state_id()
+            action_id: Column id from action_id()
+            fn: Function of the current value returning the new value
+
+        Returns:
+            Tuple of (old value, new value)
+        """
+        old = float(self._values[state_id, action_id])
+        new = float(fn(old))
+        self._values[state_id, action_id] = new
+        return old, new
+
+    def sync(self) -> None:
+        """Make updates durable (in memory there is nothing to sync; see save())."""
+
+    def __getitem__(self, state: str) -> QRow:
+        state_id = self.state_id(state)
+        if state_id is None:
+            raise KeyError(state)
+        return QRow(self, state_id)
+
+    def __iter__(self) -> Iterator[str]:
+        self._refresh()
+        return iter(list(self.states))
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self.states)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Nested dict form, as the legacy JSON file stored it."""
+        values = self.q_values
+        actions = self.actions[:values.shape[1]]
+        return {state: {action: float(values[i, j]) for j, action in enumerate(actions)}
+                for i, state in enumerate(self.states[:values.shape[0]])}
+
+    @classmethod
+    def from_dict(cls, table: Dict[str, Dict[str, float]]) -> "QTable":
+        """Build from the legacy nested dict; missing cells become 0.0."""
+        q_table = cls(capacity=len(table) or 1)
+        for state, row in table.items():
+            state_id = q_table.state_id(state, create=True)
+            for action, value in row.items():
+                action_id = q_table.action_id(action)
+                q_table.q_values[state_id, action_id] = value
+        return q_table
+
+    def save(self, path: Path) -> None:
+        """Write the table to an .npz file atomically."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, states=np.array(self.states, dtype=str), actions=np.array(self.actions, dtype=str),
+                     values=self.q_values)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "QTable":
+        """Read a table written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            states, actions, values = data["states"].tolist(), data["actions"].tolist(), data["values"]
+        q_table = cls(capacity=len(states) or 1, action_capacity=len(actions) or 1)
+        q_table.states = states
+        q_table.state_ids = {state: i for i, state in enumerate(states)}
+        q_table.actions = actions
+        q_table.action_ids = {action: j for j, action in enumerate(actions)}
+        q_table._values[:len(states), :len(actions)] = values
+        return q_table
+
+
+class SharedQTable(QTable):
+    """
+    Q-table in a memory-mapped file shared by every process on the host.
+
+    Files next to each other, all derived from one base path:
+      .shm      header (magic, column count, retired flag) then a float64
+                rows x columns matrix; rows are added by doubling the file,
+                columns by copying into a new file with twice as many
+      .states   state keys, one JSON string per line; line n is row n
+      .actions  action keys, one JSON string per line; line n is column n
+      .lock     fcntl byte-range locks: byte 0 guards adding states,
+                actions and rows, byte 1 + n guards row n
+
+    Readers never lock; updates are read-modify-write under the row lock, so
+    concurrent updates from different processes are never lost. Adding
+    columns takes every row lock, writes the wider matrix to a new file that
+    replaces .shm, and sets the retired flag in the old one; a process whose
+    mapping is retired remaps before its next update. fcntl locks
+    belong to the process, so each is paired with a thread lock. Use open(),
+    which keeps one instance per file and process: closing a second handle
+    on the lock file would drop the locks held through the first.
+    """
+
+    MAGIC = b"HVQTAB01"
+    HEADER = struct.Struct("<8sq")
+    RETIRED_OFFSET = HEADER.size  # one byte, set once the file has been replaced
+    HEADER_SIZE = 4096  # keeps the matrix page-aligned
+    ROW_LOCK_STRIPES = 64
+
+    _instances: Dict[Tuple[int, str], "SharedQTable"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, base_path: Path, max_actions: int = RL_SHARED_MAX_ACTIONS,
+                 initial_states: int = RL_SHARED_INITIAL_STATES):
+        """
+        Open or create the shared table files.
+
+        Args:
+            base_path: Path without suffix, e.g. data/rl_data/agent_q_table
+            max_actions: Column capacity when creating the file (doubled as actions are added)
+            initial_states: Row capacity when creating the file
+        """
+        if fcntl is None:
+            raise RuntimeError("The shared Q-table backend needs fcntl (POSIX only)")
+        self.base_path = Path(base_path)
+        self.state_ids, self.states = {}, []
+        self.action_ids, self.actions = {}, []
+        self._paths = {suffix: self.base_path.with_name(self.base_path.name + suffix)
+                       for suffix in (".shm", ".states", ".actions", ".lock")}
+        self._offsets = {".states": 0, ".actions": 0}
+        self._mutex = threading.RLock()
+        self._row_locks = [threading.Lock() for _ in range(self.ROW_LOCK_STRIPES)]
+        self._lock_fd = os.open(self._paths[".lock"], os.O_RDWR | os.O_CREAT, 0o644)
+        with self._structure_lock():
+            self._create(max(1, max_actions), max(1, initial_states))
+            self._map()
+            self._refresh()
+
+    @classmethod
+    def open(cls, base_path: Path, **kwargs) -> "SharedQTable":
+        """
+        Shared table for a base path, one instance per process.
+
+        Args:
+            base_path: Path without suffix
+            **kwargs: Passed to the constructor on first open
+
+        Returns:
+            SharedQTable instance
+        """
+        key = (os.getpid(), str(Path(base_path).resolve()))
+        with cls._instances_lock:
+            table = cls._instances.get(key)
+            if table is None:
+                table = cls._instances[key] = cls(base_path, **kwargs)
+            return table
+
+    @contextmanager
+    def _structure_lock(self):
+        with self._mutex:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, 0)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, 0)
+
+    @contextmanager
+    def _all_rows_lock(self):
+        """Every row lock at once, in this process and across processes."""
+        for lock in self._row_locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 0, 1)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 0, 1)
+        finally:
+            for lock in reversed(self._row_locks):
+                lock.release()
+
+    @contextmanager
+    def _row_lock(self, state_id: int):
+        with self._row_locks[state_id % self.ROW_LOCK_STRIPES]:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, 1 + state_id)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, 1 + state_id)
+
+    def _create(self, max_actions: int, initial_states: int) -> None:
+        """Write the header and initial rows if the file is new (structure lock held)."""
+        path = self._paths[".shm"]
+        if path.exists() and path.stat().st_size >= self.HEADER_SIZE:
+            return
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, max_actions))
+            f.truncate(self.HEADER_SIZE + initial_states * max_actions * 8)
+        for suffix in (".states", ".actions"):
+            open(self._paths[suffix], "wb").close()
+
+    def _map(self) -> None:
+        """(Re)map the matrix at the file's current size."""
+        path = self._paths[".shm"]
+        with open(path, "rb") as f:
+            magic, cols = self.HEADER.unpack(f.read(self.HEADER.size))
+            rows = (os.fstat(f.fileno()).st_size - self.HEADER_SIZE) // (cols * 8)
+        if magic != self.MAGIC:
+            raise ValueError(f"{path} is not a shared Q-table")
+        self.max_actions = cols
+        self._values = np.memmap(path, dtype=np.float64, mode="r+", offset=self.HEADER_SIZE, shape=(rows, cols))
+        self._retired = np.memmap(path, dtype=np.uint8, mode="r+", offset=self.RETIRED_OFFSET, shape=(1,))
+
+    def _read_new_keys(self, suffix: str) -> List[str]:
+        """Keys appended to a .states/.actions file since the last read (complete lines only)."""
+        path = self._paths[suffix]
+        with open(path, "rb") as f:
+            f.seek(self._offsets[suffix])
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self._offsets[suffix] += end
+        return [json.loads(line) for line in data[:end].splitlines()]
+
+    def _append_key(self, suffix: str, key: str) -> None:
+        """Append one key (structure lock held, local view refreshed)."""
+        line = (json.dumps(key) + "\n").encode("utf-8")
+        with open(self._paths[suffix], "ab") as f:
+            f.write(line)
+        self._offsets[suffix] += len(line)
+
+    def _refresh(self) -> None:
+        with self._mutex:
+            for state in self._read_new_keys(".states"):
+                self.state_ids[state] = len(self.states)
+                self.states.append(state)
+            for action in self._read_new_keys(".actions"):
+                self.action_ids[action] = len(self.actions)
+                self.actions.append(action)
+            if self._retired[0] or len(self.states) > self._values.shape[0]:
+                self._map()
+
+    def _grow(self, rows: int, cols: int) -> None:
+        """Double the file until it holds rows and cols (structure lock held)."""
+        if cols > self.max_actions:
+            self._grow_columns(max(rows, self._values.shape[0]), cols)
+            return
+        if rows <= self._values.shape[0]:
+            return
+        capacity = self._values.shape[0]
+        while capacity < rows:
+            capacity *= 2
+        self._values.flush()
+        with open(self._paths[".shm"], "r+b") as f:
+            f.truncate(self.HEADER_SIZE + capacity * self.max_actions * 8)
+        self._map()
+
+    def _grow_columns(self, rows: int, cols: int) -> None:
+        """Copy the matrix into a new file with doubled columns and swap it in (structure lock held)."""
+        capacity = self.max_actions
+        while capacity < cols:
+            capacity *= 2
+        path = self._paths[".shm"]
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with self._all_rows_lock():
+            old = self._values
+            with open(tmp_path, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, capacity))
+                f.truncate(self.HEADER_SIZE + rows * capacity * 8)
+            grown = np.memmap(tmp_path, dtype=np.float64, mode="r+", offset=self.HEADER_SIZE, shape=(rows, capacity))
+            grown[:old.shape[0], :old.shape[1]] = old
+            grown.flush()
+            del grown
+            os.replace(tmp_path, path)
+            # processes still mapping the old file remap before their next update
+            self._retired[0] = 1
+            self._retired.flush()
+            self._map()
+        logger.info(f"Shared Q-table {self.base_path} grown to {capacity} action columns")
+
+    def _intern(self, suffix: str, ids: Dict[str, int], keys: List[str], key: str) -> int:
+        with self._structure_lock():
+            self._refresh()
+            key_id = ids.get(key)
+            if key_id is None:
+                key_id = len(keys)
+                if suffix == ".states":
+                    self._grow(key_id + 1, len(self.actions))
+                else:
+                    self._grow(len(self.states), key_id + 1)
+                # the row exists before any process can learn its id
+                self._append_key(suffix, key)
+                ids[key] = key_id
+                keys.append(key)
+            return key_id
+
+    def state_id(self, state: str, create: bool = False) -> Optional[int]:
+        state_id = self.state_ids.get(state)
+        if state_id is None:
+            self._refresh()
+            state_id = self.state_ids.get(state)
+        if state_id is None and create:
+            state_id = self._intern(".states", self.state_ids, self.states, state)
+        return state_id
+
+    def action_id(self, action: str, create: bool = True) -> Optional[int]:
+        action_id = self.action_ids.get(action)
+        if action_id is None:
+            self._refresh()
+            action_id = self.action_ids.get(action)
+        if action_id is None and create:
+            action_id = self._intern(".actions", self.action_ids, self.actions, action)
+        return action_id
+
+    def row(self, state_id: int) -> np.ndarray:
+        if state_id >= self._values.shape[0] or self._retired[0]:
+            self._refresh()
+        return self._values[state_id, :len(self.actions)]
+
+    def update(self, state_id: int, action_id: int, fn: Callable[[float], float]) -> Tuple[float, float]:
+        if state_id >= self._values.shape[0] or action_id >= len(self.actions):
+            self._refresh()
+        while True:
+            with self._row_lock(state_id):
+                # a retired mapping no longer reaches the file other processes write to
+                if not self._retired[0]:
+                    values = self._values
+                    old = float(values[state_id, action_id])
+                    new = float(fn(old))
+                    values[state_id, action_id] = new
+                    return old, new
+            self._refresh()
+
+    def seed(self, table: Dict[str, Dict[str, float]]) -> bool:
+        """
+        Import a nested dict table if the shared table is still empty.
+
+        Args:
+            table: state -> action -> Q-value, e.g. QTable.to_dict()
+
+        Returns:
+            True if the table was imported, False if it already had states
+        """
+        with self._structure_lock():
+            self._refresh()
+            if self.states:
+                return False
+            for action in sorted({action for row in table.values() for action in row}):
+                self._grow(len(self.states), len(self.actions) + 1)
+                self._append_key(".actions", action)
+                self.action_ids[action] = len(self.actions)
+                self.actions.append(action)
+            for state, row in table.items():
+                state_id = len(self.states)
+                self._grow(state_id + 1, len(self.actions))
+                for action, value in row.items():
+                    self._values[state_id, self.action_ids[action]] = value
+                self._append_key(".states", state)
+                self.state_ids[state] = state_id
+                self.states.append(state)
+            self._values.flush()
+            return True
+
+    def sync(self) -> None:
+        """Flush the mapped matrix to disk (other processes see updates immediately)."""
+        self._values.flush()
+
+    def save(self, path: Path) -> None:
+        """Write an .npz snapshot of the shared table."""
+        QTable.from_dict(self.to_dict()).save(path)
+
+
 class RLEngine:
     """Reinforcement Learning Engine for adaptive agents."""
     
-    def __init__(self, agent_name: str, epsilon: float = 0.1, alpha: float = 0.1, gamma: float = 0.99):
+    def __init__(self, agent_name: str, epsilon: float = 0.1, alpha: float = 0.1, gamma: float = 0.99,
+                 flush_every: int = RL_FLUSH_EVERY, flush_interval: float = RL_FLUSH_INTERVAL,
+                 backend: str = RL_QTABLE_BACKEND, state_encoder: Optional[StateEncoder] = None):
         """
         Initialize RL engine.
         - epsilon: Exploration rate (0-1).
         - alpha: Learning rate for Q-updates.
         - gamma: Discount factor for future rewards.
+        - flush_every: Changes between Q-table writes.
+        - flush_interval: Seconds before unflushed changes are written.
+        - backend: "shared", "memory" or "auto" (see RL_QTABLE_BACKEND).
+        - state_encoder: Context-to-state encoder (default from RL_STATE_ENCODER).
         """
         self.agent_name = agent_name
         self.epsilon = max(0.0, min(1.0, epsilon))  # Validate epsilon
         self.alpha = alpha
         self.gamma = gamma
-        self.q_table: Dict[str, Dict[str, float]] = {}  # state -> action -> Q-value
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        if backend == "auto":
+            backend = "shared" if fcntl is not None else "memory"
+        if backend not in ("shared", "memory"):
+            raise ValueError(f"Unknown Q-table backend: {backend}")
+        self.backend = backend
+        self.state_encoder = state_encoder if state_encoder is not None else make_state_encoder()
+        self.q_table = QTable()  # state -> action -> Q-value
         self.actions: List[str] = []  # List of possible actions (e.g., suggestion IDs)
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._flush_timer: Optional[threading.Timer] = None
         self._load_q_table()
-        logger.info(f"RL Engine initialized for {agent_name} with epsilon={self.epsilon}")
+        logger.info(f"RL Engine initialized for {agent_name} with epsilon={self.epsilon} ({self.backend} Q-table)")
+
+    @property
+    def q_table_path(self) -> Path:
+        return DATA_DIR / f"{self.agent_name}_q_table.npz"
+
+    @property
+    def shared_q_table_path(self) -> Path:
+        """Base path of the shared table files (.shm, .states, .actions, .lock)."""
+        return DATA_DIR / f"{self.agent_name}_q_table"
+
+    def _read_q_table_file(self) -> Optional[QTable]:
+        """Read the .npz snapshot, or the legacy JSON file, if either exists."""
+        legacy_path = DATA_DIR / f"{self.agent_name}_q_table.json"
+        if self.q_table_path.exists():
+            return QTable.load(self.q_table_path)
+        if legacy_path.exists():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                return QTable.from_dict(json.load(f))
+        return None
 
     def _load_q_table(self) -> None:
-        """Load Q-table from JSON file."""
-        file_path = DATA_DIR / f"{self.agent_name}_q_table.json"
+        """Open the shared Q-table, or load it from the .npz file, migrating the legacy JSON file if needed."""
         try:
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.q_table = json.load(f)
-                self.actions = list(set(action for state in self.q_table for action in self.q_table[state]))
+            if self.backend == "shared":
+                self.q_table = SharedQTable.open(self.shared_q_table_path)
+                if not self.q_table:
+                    snapshot = self._read_q_table_file()
+                    if snapshot and self.q_table.seed(snapshot.to_dict()):
+                        logger.info(f"Seeded shared Q-table for {self.agent_name} from {self.q_table_path.name}")
+            else:
+                self.q_table = self._read_q_table_file() or QTable()
+            self.actions = list(self.q_table.actions)
+            if self.q_table:
                 logger.info(f"Loaded Q-table for {self.agent_name} with {len(self.q_table)} states")
         except Exception as e:
             logger.error(f"Failed to load Q-table: {e}")
-            self.q_table = {}
+            self.backend = "memory"
+            self.q_table = QTable()
 
     def _save_q_table(self) -> None:
-        """Save Q-table to JSON file."""
-        file_path = DATA_DIR / f"{self.agent_name}_q_table.json"
+        """Sync the shared Q-table, or save the in-memory one to its .npz file."""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.q_table, f, indent=4)
+            if self.backend == "shared":
+                self.q_table.sync()
+            else:
+                self.q_table.save(self.q_table_path)
             logger.info(f"Saved Q-table for {self.agent_name}")
         except Exception as e:
             logger.error(f"Failed to save Q-table: {e}")
 
+    def _mark_dirty(self) -> None:
+        """Record a change; write after flush_every changes or flush_interval seconds."""
+        with self._lock:
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> None:
+        """Write unflushed Q-table changes now."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._pending:
+                self._pending = 0
+                self._save_q_table()
+
     def register_actions(self, actions: List[str]) -> None:
         """Register possible actions (e.g., suggestion IDs)."""
-        self.actions = actions
-        for state in self.q_table:
-            for action in actions:
-                if action not in self.q_table[state]:
-                    self.q_table[state][action] = 0.0
-        self._save_q_table()
+        with self._lock:
+            self.actions = actions
+            new_actions = [action for action in actions if self.q_table.action_id(action, create=False) is None]
+            for action in new_actions:
+                self.q_table.action_id(action)
+            if new_actions:
+                self._mark_dirty()
 
     def get_state(self, context: Dict[str, Any]) -> str:
-        """Convert context to a state string (customizable per agent)."""
-        # Example: Hash user input + progress metrics
-        return json.dumps(context, sort_keys=True)  # Simple JSON hash for state
+        """Convert context to a state string using the engine's state encoder."""
+        return self.state_encoder.encode(context)
+
+    def get_state_stats(self) -> Dict[str, Any]:
+        """State-space cardinality: encoder statistics plus the Q-table's size."""
+        stats = self.state_encoder.get_stats()
+        stats["q_table_states"] = len(self.q_table)
+        stats["q_table_actions"] = len(self.q_table.actions)
+        return stats
 
     def choose_action(self, state: str) -> str:
         """Epsilon-greedy action selection."""
-        if state not in self.q_table:
-            self.q_table[state] = {action: 0.0 for action in self.actions}
-            self._save_q_table()
-        
-        if np.random.rand() < self.epsilon:
-            action = np.random.choice(self.actions)  # Explore
-            logger.debug(f"Exploration: Selected {action}")
-        else:
-            q_values = self.q_table[state]
-            action = max(q_values, key=q_values.get)  # Exploit
-            logger.debug(f"Exploitation: Selected {action} with Q={q_values[action]}")
+        with self._lock:
+            state_id = self.q_table.state_id(state)
+            if state_id is None:
+                state_id = self.q_table.state_id(state, create=True)
+                for action in self.actions:
+                    self.q_table.action_id(action)
+                self._mark_dirty()
+            
+            if np.random.rand() < self.epsilon:
+                action = np.random.choice(self.actions)  # Explore
+                logger.debug(f"Exploration: Selected {action}")
+            else:
+                q_values = self.q_table.row(state_id)
+                action = self.q_table.actions[int(np.argmax(q_values))]  # Exploit
+                logger.debug(f"Exploitation: Selected {action} with Q={q_values.max()}")
         return action
 
     def update_q_value(self, state: str, action: str, reward: float, next_state: Optional[str] = None) -> None:
         """Update Q-value using Q-learning formula."""
-        if state not in self.q_table:
-            # Initialize unseen state with default Q-values
-            self.q_table[state] = {a: 0.0 for a in self.actions}
-        if action not in self.q_table[state]:
-            self.q_table[state][action] = 0.0
-        
-        current_q = self.q_table[state][action]
-        max_next_q = 0.0
-        if next_state and next_state in self.q_table:
-            max_next_q = max(self.q_table[next_state].values())
-        
-        new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
-        self.q_table[state][action] = new_q
-        self._save_q_table()
+        with self._lock:
+            # Unseen states and actions start at 0.0
+            state_id = self.q_table.state_id(state, create=True)
+            action_id = self.q_table.action_id(action)
+            
+            max_next_q = 0.0
+            next_id = self.q_table.state_id(next_state) if next_state else None
+            if next_id is not None:
+                max_next_q = float(self.q_table.row(next_id).max())
+            
+            # Read-modify-write of the current value is atomic (row-locked on the shared table)
+            current_q, new_q = self.q_table.update(
+                state_id, action_id, lambda q: q + self.alpha * (reward + self.gamma * max_next_q - q))
+            self._mark_dirty()
         logger.info(f"Updated Q for {state}/{action}: {current_q} -> {new_q} (reward={reward})")
 
     def log_interaction(self, state: str, action: str, reward: float) -> None:
         """Log RL interaction for auditing."""
         log_path = DATA_DIR / f"{self.agent_name}_interactions.log"
         with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(f"{datetime.now().isoformat()} | State: {state} | Action: {action} | Reward: {reward}\n")
\ No newline at end of file
+            f.write(f"{datetime.now().isoformat()} | State: {state} | Action: {action} | Reward: {reward}\n")
+
+
+_engines: Dict[str, RLEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def _flush_engines() -> None:
+    """Write unflushed changes of every registry engine at exit."""
+    for engine in list(_engines.values()):
+        engine.flush()
+
+
+atexit.register(_flush_engines)
+
+
+def get_rl_engine(agent_name: str, **kwargs) -> RLEngine:
+    """
+    Get the process-wide engine for an agent, creating it on first use.
+
+    Args:
+        agent_name: Agent name
+        **kwargs: RLEngine arguments, used only when the engine is created
+
+    Returns:
+        RLEngine instance shared by every caller in the process
+    """
+    with _engines_lock:
+        engine = _engines.get(agent_name)
+        if engine is None:
+            engine = _engines[agent_name] = RLEngine(agent_name, **kwargs)
+        return engine
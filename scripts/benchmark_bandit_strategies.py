@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Simulate suggestion strategies on a toy environment.
+
+SuggestionEnv follows toy_q_learning.SimpleEnv: reset() draws a user
+context (stage, progress and free text with a hidden need plus noise words),
+and step(action) returns +1 or -1, with +1 far more likely for the
+suggestion that matches the need. Each strategy picks a suggestion and learns
+from the reward for --rounds rounds:
+
+  q_learning         RLEngine epsilon-greedy over JSON states (the current default)
+  q_learning_hashed  the same over feature-hashed states
+  linucb / thompson  adaptive_agent.bandit.ContextualBandit
+
+Usage:
+    python scripts/benchmark_bandit_strategies.py [--rounds 5000] [--seed 7]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import rl_engine
+from adaptive_agent.bandit import ContextFeaturizer, ContextualBandit
+from rl_engine import RLEngine
+from state_encoders import HashingStateEncoder, NumericDiscretizer, make_state_encoder
+
+SUGGESTIONS = ["SUG-1", "SUG-2", "SUG-3", "SUG-4", "SUG-5"]
+NEEDS = {"sprint": "SUG-1", "plan": "SUG-2", "stuck": "SUG-3", "bug": "SUG-4", "feedback": "SUG-5"}
+NOISE = "today team demo api model data ui deadline idea judge score repo test docs".split()
+DISCRETIZERS = {"progress": NumericDiscretizer([25, 50, 75])}
+
+
+class SuggestionEnv:
+    """One-step suggestion environment: a context per episode, one reward per suggestion."""
+
+    def __init__(self, rng: np.random.Generator, p_good: float = 0.8, p_bad: float = 0.25):
+        self.rng = rng
+        self.p_good = p_good
+        self.p_bad = p_bad
+        self.need = None
+
+    def reset(self) -> dict:
+        self.need = self.rng.choice(list(NEEDS))
+        words = list(self.rng.choice(NOISE, size=6)) + [self.need]
+        self.rng.shuffle(words)
+        return {"stage": self.rng.choice(["ideation", "build", "submit"]),
+                "progress": int(self.rng.integers(0, 100)),
+                "user_text": "i am working on " + " ".join(words)}
+
+    def expected_reward(self, action: str) -> float:
+        p = self.p_good if NEEDS[self.need] == action else self.p_bad
+        return 2 * p - 1
+
+    def step(self, action: str) -> float:
+        p = self.p_good if NEEDS[self.need] == action else self.p_bad
+        return 1.0 if self.rng.random() < p else -1.0
+
+
+class QLearningStrategy:
+    def __init__(self, encoder):
+        self.engine = RLEngine("benchmark_bandit", backend="memory", flush_every=10 ** 9, flush_interval=3600,
+                               state_encoder=encoder)
+        self.engine.register_actions(SUGGESTIONS)
+
+    def choose(self, context):
+        return self.engine.choose_action(self.engine.get_state(context))
+
+    def update(self, context, action, reward):
+        self.engine.update_q_value(self.engine.get_state(context), action, reward)
+
+    def discard(self):
+        self.engine._pending = 0  # nothing to save at exit
+
+
+class BanditStrategy:
+    def __init__(self, policy, seed):
+        featurizer = ContextFeaturizer(encoder=HashingStateEncoder(discretizers=DISCRETIZERS))
+        self.bandit = ContextualBandit("benchmark_bandit", policy=policy, featurizer=featurizer,
+                                       alpha=0.5, flush_every=10 ** 9, seed=seed)
+        self.bandit.register_actions(SUGGESTIONS)
+
+    def choose(self, context):
+        return self.bandit.choose(context)
+
+    def update(self, context, action, reward):
+        self.bandit.update(context, action, reward)
+
+    def discard(self):
+        self.bandit._pending = 0  # nothing to save at exit
+
+
+def simulate(strategy, rounds: int, seed: int) -> dict:
+    env = SuggestionEnv(np.random.default_rng(seed))
+    best = env.p_good * 2 - 1
+    optimal = np.zeros(rounds, dtype=bool)
+    rewards = np.zeros(rounds)
+    regret = bad = 0.0
+    started = time.perf_counter()
+    for t in range(rounds):
+        context = env.reset()
+        action = strategy.choose(context)
+        expected = env.expected_reward(action)
+        optimal[t] = expected == best
+        bad += expected < 0
+        regret += best - expected
+        rewards[t] = env.step(action)
+        strategy.update(context, action, rewards[t])
+    elapsed = time.perf_counter() - started
+    window = np.convolve(optimal, np.ones(200) / 200, mode="valid")
+    reached = np.flatnonzero(window >= 0.8)
+    return {"avg_reward": rewards.mean(), "optimal": optimal[-1000:].mean(), "bad": int(bad), "regret": regret,
+            "converged": int(reached[0]) + 200 if len(reached) else None, "us": elapsed / rounds * 1e6}
+
+
+def run(rounds: int, seed: int) -> None:
+    logging.getLogger("rl_engine").setLevel(logging.WARNING)
+    print(f"{rounds} rounds, {len(SUGGESTIONS)} suggestions, seed {seed}\n")
+    print(f"  {'strategy':<19}{'avg reward':>11}{'optimal*':>10}{'bad shown':>11}{'regret':>9}"
+          f"{'80% at':>9}{'us/req':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        rl_engine.DATA_DIR = Path(tmp)
+        strategies = {
+            "q_learning": lambda: QLearningStrategy(make_state_encoder("json")),
+            "q_learning_hashed": lambda: QLearningStrategy(
+                HashingStateEncoder(n_buckets=1024, discretizers=DISCRETIZERS)),
+            "linucb": lambda: BanditStrategy("linucb", seed),
+            "thompson": lambda: BanditStrategy("thompson", seed),
+        }
+        for name, make in strategies.items():
+            np.random.seed(seed)  # RLEngine explores with the global generator
+            strategy = make()
+            result = simulate(strategy, rounds, seed)
+            strategy.discard()
+            converged = result["converged"] if result["converged"] is not None else "never"
+            print(f"  {name:<19}{result['avg_reward']:>11.3f}{result['optimal']:>10.1%}{result['bad']:>11}"
+                  f"{result['regret']:>9.0f}{converged:>9}{result['us']:>9.0f}")
+    print("\n* share of optimal suggestions over the last 1000 rounds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Q-learning vs contextual bandit suggestion strategies")
+    parser.add_argument("--rounds", type=int, default=5000, help="Simulated requests")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed")
+    args = parser.parse_args()
+    run(args.rounds, args.seed)
+
+
+if __name__ == "__main__":
+    main()
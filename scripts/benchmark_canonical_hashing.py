@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark canonical hashing of ledger and provenance entries.
+
+Compares the per-call json.dumps encoding the hash functions used before
+src/canonical.py, the cached standard-library encoder, and the orjson fast
+path (when installed), for both the compact and the spaced encoding, and
+checks that every variant produces the same digests.
+
+Usage:
+    python scripts/benchmark_canonical_hashing.py [--entries 100000]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import src.canonical as canonical_module
+from src.canonical import canonical_hash
+
+
+def make_entries(count: int):
+    """Transaction-ledger-like entries with a chained previous_hash."""
+    previous = None
+    entries = []
+    for n in range(count):
+        entry = {
+            "id": f"txn_{n + 1}",
+            "timestamp": 1700000000 + n,
+            "action": "save_submission",
+            "team_id": f"team_{n % 500}",
+            "filename": f"submission_team_{n % 500}_{1700000000 + n}.json",
+            "score": round(50 + (n % 997) / 19.0, 3),
+            "previous_hash": previous,
+        }
+        previous = hashlib.sha256(str(n).encode()).hexdigest()
+        entries.append(entry)
+    return entries
+
+
+def timed(label: str, fn, entries, baseline=None):
+    started = time.perf_counter()
+    digests = [fn(entry) for entry in entries]
+    elapsed = time.perf_counter() - started
+    speedup = f"{baseline / elapsed:>6.2f}x" if baseline else f"{'1.00x':>7}"
+    print(f"  {label:<28}{elapsed * 1000:>10.1f} ms{len(entries) / elapsed:>12,.0f}/s {speedup}")
+    return elapsed, digests
+
+
+def run(count: int) -> None:
+    entries = make_entries(count)
+    print(f"{count} entries, orjson {'available' if canonical_module.orjson else 'not installed'}")
+
+    for compact in (True, False):
+        separators = (',', ':') if compact else (', ', ': ')
+        print(f"\n{'compact' if compact else 'spaced'} encoding")
+        baseline, expected = timed(
+            "json.dumps per call",
+            lambda e: hashlib.sha256(json.dumps(e, sort_keys=True, separators=separators).encode('utf-8')).hexdigest(),
+            entries)
+        with patch.object(canonical_module, "USE_ORJSON", False):
+            _, digests = timed("cached stdlib encoder", lambda e: canonical_hash(e, compact), entries, baseline)
+        assert digests == expected, "cached encoder changed a digest"
+        if compact and canonical_module.orjson is not None:
+            with patch.object(canonical_module, "USE_ORJSON", True):
+                _, digests = timed("orjson fast path", lambda e: canonical_hash(e, compact), entries, baseline)
+            assert digests == expected, "orjson fast path changed a digest"
+
+    print("\nAll variants produced identical digests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark canonical entry hashing")
+    parser.add_argument("--entries", type=int, default=100000, help="Number of entries to hash")
+    args = parser.parse_args()
+    run(args.entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark consensus aggregation strategies on synthetic judge panels.
+
+Each submission has a hidden "true" score per criterion. Judges report it
+with Gaussian noise, and with some probability one judge on the panel is
+an outlier who is several points off. For every strategy we report the
+batch cost and how far the consensus lands from the truth, including the
+share of submissions whose overall score is off by more than the
+re-judge threshold.
+
+Usage:
+    python scripts/benchmark_consensus_strategies.py [--submissions 10000] [--judges 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.judging.aggregation_strategies import AGGREGATION_STRATEGIES, apply_strategy
+from src.judging.score_matrix import criteria_vectors
+
+
+def make_panels(submissions: int, judges: int, outlier_rate: float, seed: int = 7):
+    """Generate (truth, scores, confidences) for a synthetic event."""
+    rng = np.random.default_rng(seed)
+    weights, max_scores = criteria_vectors()
+    truth = rng.uniform(3, 9, size=(submissions, len(max_scores)))
+    scores = truth[:, None, :] + rng.normal(0, 0.8, size=(submissions, judges, len(max_scores)))
+    confidences = rng.uniform(0.6, 0.95, size=(submissions, judges))
+
+    # One outlier judge on a fraction of panels, reporting with low confidence
+    has_outlier = rng.random(submissions) < outlier_rate
+    outlier_judge = rng.integers(0, judges, size=submissions)
+    shift = rng.choice([-1, 1], size=(submissions, len(max_scores))) * rng.uniform(3, 6, size=(submissions, len(max_scores)))
+    rows = np.nonzero(has_outlier)[0]
+    scores[rows, outlier_judge[rows]] += shift[rows]
+    confidences[rows, outlier_judge[rows]] *= 0.6
+
+    return truth, np.clip(scores, 0, max_scores), confidences, weights, max_scores
+
+
+def overall(consensus: np.ndarray, weights: np.ndarray, max_scores: np.ndarray) -> np.ndarray:
+    return (consensus * weights).sum(axis=-1) / (max_scores * weights).sum() * 100
+
+
+def run(submissions: int, judges: int, outlier_rate: float, rejudge_threshold: float) -> None:
+    truth, scores, confidences, weights, max_scores = make_panels(submissions, judges, outlier_rate)
+    true_overall = overall(truth, weights, max_scores)
+    event_mean = scores.mean(axis=(0, 1))
+
+    print(f"{submissions} submissions x {judges} judges, outlier rate {outlier_rate:.0%}")
+    print(f"{'strategy':<22}{'batch ms':>10}{'RMSE':>8}{'max err':>9}{'re-judge':>10}")
+    for name in AGGREGATION_STRATEGIES:
+        params = {"max_scores": max_scores}
+        if name == "bayesian_shrinkage":
+            params["prior_means"] = event_mean
+        start = time.perf_counter()
+        consensus = apply_strategy(scores, confidences, name, **params)
+        elapsed = (time.perf_counter() - start) * 1000
+        error = overall(consensus, weights, max_scores) - true_overall
+        rmse = float(np.sqrt(np.mean(error ** 2)))
+        rejudge = float(np.mean(np.abs(error) > rejudge_threshold))
+        print(f"{name:<22}{elapsed:>10.2f}{rmse:>8.2f}{np.abs(error).max():>9.2f}{rejudge:>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--submissions", type=int, default=10000)
+    parser.add_argument("--judges", type=int, default=3)
+    parser.add_argument("--outlier-rate", type=float, default=0.2)
+    parser.add_argument("--rejudge-threshold", type=float, default=5.0,
+                        help="Overall-score error (out of 100) that would trigger a re-judge")
+    args = parser.parse_args()
+    run(args.submissions, args.judges, args.outlier_rate, args.rejudge_threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark DataManager.get_leaderboard at event scale.
+
+Builds synthetic teams, projects and scores files, then times the
+original per-team implementation (reload and scan projects.json and
+scores.json for every team) against the single-pass leaderboard: cold
+(files not loaded yet), after a score from another process (one-pass
+regrouping), right after submit_score (incremental update) and warm.
+
+The original implementation is timed on --legacy-sample teams and
+extrapolated, since a full run takes minutes at the default sizes.
+
+Usage:
+    python scripts/benchmark_leaderboard.py [--teams 1000] [--scores 10000]
+                                            [--judges 20] [--legacy-sample 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from data_manager import DataManager
+from json_store import JsonStore
+
+CRITERIA = ["usefulness", "creativity", "teamwork", "tech_stack", "clarity"]
+
+
+def make_files(directory: str, teams: int, scores: int, judges: int, seed: int = 7) -> None:
+    """Write teams, projects (for 80% of teams) and scores files."""
+    rng = random.Random(seed)
+    team_names = [f"Team {n}" for n in range(teams)]
+    records = {
+        "teams.json": [{"id": f"t{n}", "team_name": name, "members": ["A", "B", "C"], "college": f"College {n % 50}"}
+                       for n, name in enumerate(team_names)],
+        "projects.json": [{"id": f"p{n}", "team_name": name, "project_title": f"Project {n}"}
+                          for n, name in enumerate(team_names) if rng.random() < 0.8],
+        "scores.json": [],
+        "problems.json": [],
+        "outreach.json": [],
+    }
+    for n in range(scores):
+        marks = {criteria: rng.randint(1, 10) for criteria in CRITERIA}
+        records["scores.json"].append({"id": f"s{n}", "team_name": rng.choice(team_names),
+                                       "judge_name": f"Judge {rng.randrange(judges)}",
+                                       "scores": marks, "total_score": sum(marks.values())})
+    for name, data in records.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+def load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def legacy_team_entry(team):
+    """One team's leaderboard entry as the original get_leaderboard computed it."""
+    team_name = team["team_name"]
+    project = next((p for p in load(Config.PROJECTS_FILE) if p.get("team_name") == team_name), None)
+    team_scores = [s for s in load(Config.SCORES_FILE) if s.get("team_name") == team_name]
+    total_average = round(sum(s.get("total_score", 0) for s in team_scores) / len(team_scores), 2) \
+        if team_scores else 0
+    return {"team_name": team_name, "has_submission": bool(project), "total_average": total_average,
+            "judge_count": len(team_scores)}
+
+
+def timed(fn, repeat: int = 1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def run(teams: int, scores: int, judges: int, legacy_sample: int) -> None:
+    print(f"{teams} teams, {scores} scores, {judges} judges")
+    with tempfile.TemporaryDirectory() as tmp:
+        for attr, name in [("PROBLEM_FILE", "problems.json"), ("TEAMS_FILE", "teams.json"),
+                           ("PROJECTS_FILE", "projects.json"), ("SCORES_FILE", "scores.json"),
+                           ("OUTREACH_FILE", "outreach.json")]:
+            setattr(Config, attr, os.path.join(tmp, name))
+        make_files(tmp, teams, scores, judges)
+
+        sample = load(Config.TEAMS_FILE)[:legacy_sample]
+        legacy_entries, legacy = timed(lambda: [legacy_team_entry(team) for team in sample])
+        legacy = legacy / len(sample) * teams
+        print(f"  {'original (extrapolated)':<32}{legacy * 1000:>10.1f} ms")
+
+        manager = DataManager()
+        leaderboard, cold = timed(manager.get_leaderboard)
+        print(f"  {'single pass, cold':<32}{cold * 1000:>10.1f} ms{legacy / cold:>9.0f}x")
+
+        # a score written by another process: the aggregates are regrouped in one pass
+        JsonStore(Config.SCORES_FILE).put({"id": "other", "team_name": "Team 0", "judge_name": "Judge 0",
+                                           "scores": {"usefulness": 5}, "total_score": 5})
+        _, regroup = timed(manager.get_leaderboard)
+        print(f"  {'after external score':<32}{regroup * 1000:>10.1f} ms{legacy / regroup:>9.0f}x")
+
+        manager.submit_score("Team 1", "Judge 1", {criteria: 7 for criteria in CRITERIA})
+        _, incremental = timed(manager.get_leaderboard)
+        print(f"  {'after submit_score':<32}{incremental * 1000:>10.1f} ms{legacy / incremental:>9.0f}x")
+
+        _, warm = timed(manager.get_leaderboard, repeat=20)
+        print(f"  {'warm':<32}{warm * 1000:>10.1f} ms{legacy / warm:>9.0f}x")
+
+        by_team = {entry["team_name"]: entry for entry in leaderboard}
+        mismatches = [entry["team_name"] for entry in legacy_entries
+                      if any(by_team[entry["team_name"]][key] != value for key, value in entry.items())]
+        print(f"\n{len(legacy_entries) - len(mismatches)}/{len(legacy_entries)} sampled teams match the original")
+        manager.compact()  # nothing left to fold back at exit, after the directory is gone
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DataManager leaderboard")
+    parser.add_argument("--teams", type=int, default=1000, help="Registered teams")
+    parser.add_argument("--scores", type=int, default=10000, help="Submitted scores")
+    parser.add_argument("--judges", type=int, default=20, help="Judges")
+    parser.add_argument("--legacy-sample", type=int, default=50, help="Teams the original implementation is timed on")
+    args = parser.parse_args()
+    run(args.teams, args.scores, args.judges, max(1, min(args.legacy_sample, args.teams)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline Q-table training against the online update path.
+
+Replays a synthetic feedback log once through RLEngine.update_q_value (one
+call per interaction, as tuner.update_weight does) and once through the
+batched OfflineTrainer, then compares the two tables.
+
+Usage:
+    python scripts/benchmark_offline_trainer.py [--rows 20000] [--contexts 200]
+                                                [--batch-size 256]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import rl_engine
+from adaptive_agent.trainer import OfflineTrainer, default_context
+from rl_engine import RLEngine
+from state_encoders import make_state_encoder
+
+
+def make_feedback(rows: int, contexts: int, actions: int, seed: int = 7) -> pd.DataFrame:
+    """Feedback log where each context has a preferred suggestion."""
+    rng = np.random.default_rng(seed)
+    context_ids = rng.integers(0, contexts, rows)
+    action_ids = rng.integers(0, actions, rows)
+    liked = rng.random(rows) < np.where(action_ids == context_ids % actions, 0.8, 0.3)
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp("2025-01-01").isoformat(),
+        "suggestion_id": [f"SUG-{a + 1}" for a in action_ids],
+        "user_text": [f"progress update {c}" for c in context_ids],
+        "suggestion_text": "",
+        "feedback": np.where(liked, 1, -1),
+    })
+
+
+def run(rows: int, contexts: int, actions: int, batch_size: int) -> None:
+    feedback = make_feedback(rows, contexts, actions)
+    action_names = [f"SUG-{a + 1}" for a in range(actions)]
+    logging.getLogger("rl_engine").setLevel(logging.WARNING)  # time the updates, not per-update logging
+    print(f"{rows} interactions, {contexts} contexts, {actions} suggestions")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rl_engine.DATA_DIR = Path(tmp)
+        engine = RLEngine("benchmark", backend="memory", flush_every=10 ** 9, flush_interval=3600,
+                          state_encoder=make_state_encoder("json"))
+        engine.register_actions(action_names)
+        started = time.perf_counter()
+        for row in feedback.to_dict("records"):
+            engine.update_q_value(engine.get_state(default_context(row)), row["suggestion_id"], row["feedback"])
+        online = time.perf_counter() - started
+        engine._pending = 0
+        print(f"  {'online update_q_value':<28}{online * 1000:>10.1f} ms{rows / online:>12,.0f}/s")
+
+        trainer = OfflineTrainer(batch_size=batch_size, shuffle=False, state_encoder=make_state_encoder("json"))
+        started = time.perf_counter()
+        offline_table = trainer.train(feedback, actions=action_names)
+        offline = time.perf_counter() - started
+        print(f"  {'offline trainer (1 epoch)':<28}{offline * 1000:>10.1f} ms{rows / offline:>12,.0f}/s "
+              f"{online / offline:>6.1f}x")
+
+    online_q = engine.q_table.to_dict()
+    offline_q = offline_table.to_dict()
+    diff = max(abs(online_q[s][a] - offline_q[s][a]) for s in online_q for a in online_q[s])
+    greedy = np.mean([max(online_q[s], key=online_q[s].get) == max(offline_q[s], key=offline_q[s].get)
+                      for s in online_q])
+    print(f"\nMax |Q online - Q offline|: {diff:.4f}; same greedy suggestion in {greedy:.1%} of states")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline vs online Q-learning")
+    parser.add_argument("--rows", type=int, default=20000, help="Logged interactions")
+    parser.add_argument("--contexts", type=int, default=200, help="Distinct contexts")
+    parser.add_argument("--actions", type=int, default=5, help="Suggestions")
+    parser.add_argument("--batch-size", type=int, default=256, help="Offline batch size")
+    args = parser.parse_args()
+    run(args.rows, args.contexts, args.actions, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Replay script for the dead-letter queue.
+Imports new lines from the legacy failure logs, then replays pending dead
+letters in batches with rate limiting and idempotency keys.
+
+Usage:
+    python scripts/replay_dead_letters.py [--kind core_send] [--limit 1000]
+                                          [--rate 10] [--batch-size 100]
+                                          [--no-import] [--stats]
+"""
+
+import argparse
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dead_letter import DEAD_LETTER_REPLAY_RATE, dead_letters
+
+
+def replay_dead_letters():
+    """Replay pending dead letters"""
+    parser = argparse.ArgumentParser(description="Replay failed BHIV deliveries from the dead-letter queue")
+    parser.add_argument("--kind", help="Only replay this kind (core_send, bucket_save, log_relay)")
+    parser.add_argument("--limit", type=int, help="Maximum number of records to attempt")
+    parser.add_argument("--rate", type=float, default=DEAD_LETTER_REPLAY_RATE, help="Maximum deliveries per second")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-consecutive-failures", type=int, default=5)
+    parser.add_argument("--no-import", action="store_true", help="Skip importing the legacy failure logs")
+    parser.add_argument("--stats", action="store_true", help="Only print queue depth and age")
+    args = parser.parse_args()
+
+    try:
+        if not args.no_import:
+            imported = dead_letters.import_legacy_logs()
+            print(f"Imported from legacy logs: {imported}")
+
+        if not args.stats:
+            summary = dead_letters.replay(
+                kind=args.kind,
+                limit=args.limit,
+                batch_size=args.batch_size,
+                rate_per_second=args.rate,
+                max_consecutive_failures=args.max_consecutive_failures
+            )
+            print(f"Replayed {summary['replayed']} of {summary['attempted']} attempted "
+                  f"({summary['failed']} failed, {summary['skipped']} without a replay handler)")
+            if summary["stopped_early"]:
+                print("Stopped early after repeated failures; the target may still be down.")
+
+        print(json.dumps(dead_letters.get_stats(), indent=2))
+
+    except Exception as e:
+        print(f"Error during replay: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    replay_dead_letters()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rescore script for stored judgments.
+Recomputes total_score for every submission from the stored per-criterion
+scores using the current rubric WEIGHTS. No LLM calls are made.
+
+Usage:
+    python scripts/rescore_judgments.py [--event-id EVENT] [--tenant-id TENANT]
+                                        [--run-id RUN] [--batch-size 500] [--no-resume]
+"""
+
+import argparse
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.database import connect_to_db_with_retry, get_db
+from src.judging.rescore import RescoreJob, DEFAULT_CHECKPOINT_PATH
+
+
+def rescore_judgments():
+    """Rescore stored judgments against the current rubric weights"""
+    parser = argparse.ArgumentParser(description="Rescore stored judgments without LLM calls")
+    parser.add_argument("--tenant-id", help="Only rescore this tenant")
+    parser.add_argument("--event-id", help="Only rescore this event")
+    parser.add_argument("--run-id", help="Run identifier; reuse it to resume an interrupted run")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH)
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    try:
+        # Connect to database
+        connect_to_db_with_retry(retries=1, delay=1)
+        db = get_db()
+        if db is None:
+            print("Database unavailable. Aborting rescore.")
+            sys.exit(1)
+
+        job = RescoreJob(
+            db,
+            batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint,
+            tenant_id=args.tenant_id,
+            event_id=args.event_id
+        )
+        summary = job.run(run_id=args.run_id, resume=not args.no_resume)
+
+        print(f"Rescore run {summary['run_id']} completed in {summary['duration_seconds']}s")
+        print(f"Processed {summary['processed']} submissions, wrote {summary['updated']} new judgment versions.")
+
+    except Exception as e:
+        print(f"Error during rescore: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    rescore_judgments()
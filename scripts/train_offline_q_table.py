@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Retrain an agent's Q-table from the feedback log.
+Replays the feedback log store (FEEDBACK_STORE_DIR, data/feedback_log by
+default) with the given alpha/gamma and writes the result atomically to the
+agent's .npz snapshot (or --output). A legacy data/feedback.csv is only
+imported into the store once, when the store is first created.
+
+The memory backend loads the snapshot on the next start. The shared backend
+seeds from it only while its .shm table is empty, so stop the workers and
+remove data/rl_data/<agent>_q_table.{shm,states,actions} to switch a shared
+deployment to the retrained table.
+
+Usage:
+    python scripts/train_offline_q_table.py [--agent adaptive_feedback]
+                                            [--alpha 0.1] [--gamma 0.99]
+                                            [--epochs 5] [--batch-size 256]
+                                            [--sequential] [--output path]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import rl_engine
+from adaptive_agent.storage import load_weights
+from adaptive_agent.trainer import OfflineTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain a Q-table offline from the feedback log store")
+    parser.add_argument("--agent", default="adaptive_feedback", help="RL agent name")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Learning rate")
+    parser.add_argument("--gamma", type=float, default=0.99, help="Discount factor")
+    parser.add_argument("--epochs", type=int, default=5, help="Passes over the log")
+    parser.add_argument("--batch-size", type=int, default=256, help="Transitions per vectorized update")
+    parser.add_argument("--sequential", action="store_true", help="Use the next logged row as the next state")
+    parser.add_argument("--seed", type=int, help="Shuffle seed")
+    parser.add_argument("--output", type=Path, help="Snapshot path (default: the agent's .npz snapshot)")
+    args = parser.parse_args()
+
+    output = args.output or rl_engine.DATA_DIR / f"{args.agent}_q_table.npz"
+    trainer = OfflineTrainer(alpha=args.alpha, gamma=args.gamma, epochs=args.epochs, batch_size=args.batch_size,
+                             sequential=args.sequential, seed=args.seed)
+    table = trainer.train_to_snapshot(output, actions=load_weights()["suggestion_id"].astype(str).tolist())
+    print(f"Wrote {len(table)} states x {len(table.actions)} actions to {output}")
+
+
+if __name__ == "__main__":
+    main()
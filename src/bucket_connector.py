@@ -1,11 +1,30 @@
 # src/bucket_connector.py
 # Production-ready connector for BHIV Bucket (MongoDB)
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import ast
+import glob
+import hashlib
+import json
 import os
+import threading
+import time
 import logging
+from contextlib import contextmanager
 from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from .canonical import canonical_bytes
 from .database import get_db
 
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -13,6 +32,17 @@ logger = logging.getLogger(__name__)
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 BUCKET_DB_NAME = os.getenv("BUCKET_DB_NAME", "blackholeinifverse60_db_user")
 
+# Degraded-mode fallback journal: NDJSON, rotated at BUCKET_FALLBACK_MAX_BYTES,
+# keeping at most BUCKET_FALLBACK_BACKUPS rotated files
+BUCKET_FALLBACK_LOG = os.getenv("BUCKET_FALLBACK_LOG", "bucket_fallback.log")
+BUCKET_FALLBACK_MAX_BYTES = int(os.getenv("BUCKET_FALLBACK_MAX_BYTES", str(10 * 1024 * 1024)))
+BUCKET_FALLBACK_BACKUPS = int(os.getenv("BUCKET_FALLBACK_BACKUPS", "5"))
+BUCKET_FALLBACK_REINGEST_INTERVAL = float(os.getenv("BUCKET_FALLBACK_REINGEST_INTERVAL", "60"))
+
+DUPLICATE_KEY_ERROR = 11000
+
+_fallback_lock = threading.Lock()
+
 # Dummy exports for testing compatibility
 client = None
 db = None
@@ -43,8 +73,245 @@ def relay_to_bucket(log_data: Dict[str, Any]) -> str:
         # Fallback to file logging
         try:
             # Fallback to file logging
-            with open("bucket_fallback.log", "a") as f:
-                f.write(f"{datetime.now().isoformat()}: {str(log_data)}\n")
+            _append_fallback(log_data)
             return "Log relayed to fallback file (MongoDB error)"
         except Exception as file_e:
-            return f"Error relaying log: {str(e)}, File fallback error: {str(file_e)}"
\ No newline at end of file
+            return f"Error relaying log: {str(e)}, File fallback error: {str(file_e)}"
+
+def relay_many_to_bucket(records: List[Dict[str, Any]]) -> str:
+    """
+    Relay several logs to BHIV Bucket with a single insert_many.
+    
+    Args:
+        records: Log records to insert
+        
+    Returns:
+        Status message indicating success or failure
+        
+    Raises:
+        Exception: If the insert fails; callers are expected to retry
+    """
+    if not records:
+        return "No logs to relay"
+        
+    db = get_db()
+    for record in records:
+        if "timestamp" not in record:
+            record["timestamp"] = datetime.now().isoformat()
+            
+    db.logs.insert_many(records, ordered=False)
+    logger.info(f"Successfully relayed {len(records)} logs to bucket")
+    return "Logs relayed successfully"
+
+
+def _record_id(record: Dict[str, Any]) -> str:
+    """Return the record's _id as a string, deriving one from its content if absent."""
+    if record.get("_id") is not None:
+        return str(record["_id"])
+    return hashlib.sha1(canonical_bytes(record, default=str)).hexdigest()
+
+
+def _rotated_fallback_files() -> List[str]:
+    """Rotated fallback files, oldest first."""
+    rotated = [p for p in glob.glob(f"{glob.escape(BUCKET_FALLBACK_LOG)}.*") if p.rsplit(".", 1)[-1].isdigit()]
+    return sorted(rotated, key=lambda p: int(p.rsplit(".", 1)[-1]))
+
+
+@contextmanager
+def _fallback_locked():
+    """Hold _fallback_lock and an exclusive lock on <log>.lock, so rotation is safe across processes."""
+    # os.open: the journal itself stays the only file opened with open()
+    with _fallback_lock, os.fdopen(os.open(f"{BUCKET_FALLBACK_LOG}.lock", os.O_RDWR | os.O_CREAT, 0o644), "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif portalocker is not None:
+            portalocker.lock(f, portalocker.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif portalocker is not None:
+                portalocker.unlock(f)
+
+
+def _rotate_fallback() -> None:
+    """Move the active fallback file aside and drop the oldest beyond the cap. Caller holds _fallback_locked()."""
+    try:
+        os.replace(BUCKET_FALLBACK_LOG, f"{BUCKET_FALLBACK_LOG}.{time.time_ns()}")
+    except FileNotFoundError:
+        pass  # nothing written since the last rotation
+    rotated = _rotated_fallback_files()
+    for path in rotated[:max(0, len(rotated) - BUCKET_FALLBACK_BACKUPS)]:
+        logger.warning(f"Bucket fallback cap reached, dropping {path}")
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _append_fallback(log_data: Dict[str, Any]) -> None:
+    """
+    Append one record to the fallback journal as a JSON line.
+
+    The record carries an _id so re-ingesting it more than once cannot
+    create duplicates in db.logs.
+    """
+    record = dict(log_data)
+    record["_id"] = _record_id(log_data)
+    line = json.dumps(record, default=str) + "\n"
+    with _fallback_locked():
+        try:
+            if os.path.getsize(BUCKET_FALLBACK_LOG) + len(line) > BUCKET_FALLBACK_MAX_BYTES:
+                _rotate_fallback()
+        except OSError:
+            pass
+        with open(BUCKET_FALLBACK_LOG, "a") as f:
+            f.write(line)
+
+
+def _parse_fallback_line(line: str) -> Optional[Dict[str, Any]]:
+    """Parse an NDJSON line, or a legacy "<iso time>: <python repr>" line."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        _, _, legacy = line.partition(": ")
+        try:
+            record = ast.literal_eval(legacy)
+        except (ValueError, SyntaxError):
+            return None
+    if not isinstance(record, dict):
+        return None
+    record["_id"] = _record_id(record)
+    return record
+
+
+def _insert_fallback_batch(collection, records: List[Dict[str, Any]]) -> Dict[str, int]:
+    for record in records:
+        if ObjectId.is_valid(record["_id"]):
+            record["_id"] = ObjectId(record["_id"])
+    try:
+        collection.insert_many(records, ordered=False)
+        return {"inserted": len(records), "duplicates": 0}
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+        return {"inserted": e.details.get("nInserted", len(records) - len(errors)), "duplicates": len(errors)}
+
+
+def reingest_fallback_logs(batch_size: int = 500) -> Dict[str, int]:
+    """
+    Bulk-insert the fallback journal into db.logs.
+
+    The active file is rotated first so writers never append to a file that
+    is being ingested. Each file is inserted with insert_many in batches and
+    removed once fully ingested; records already present (same _id) are
+    counted as duplicates, so an interrupted run can simply be repeated.
+    Legacy repr lines are recovered where possible; unparseable lines are
+    counted as skipped.
+
+    Args:
+        batch_size: Records per insert_many call
+
+    Returns:
+        Dictionary with files, inserted, duplicates and skipped counts
+
+    Raises:
+        RuntimeError: If the bucket database is unavailable
+        Exception: If an insert fails; the file is kept for the next run
+    """
+    db = get_db()
+    if db is None:
+        raise RuntimeError("BHIV Bucket database is unavailable")
+
+    with _fallback_locked():
+        if os.path.exists(BUCKET_FALLBACK_LOG) and os.path.getsize(BUCKET_FALLBACK_LOG) > 0:
+            _rotate_fallback()
+        files = _rotated_fallback_files()
+
+    summary = {"files": 0, "inserted": 0, "duplicates": 0, "skipped": 0}
+    for path in files:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                batch = []
+                for line in f:
+                    record = _parse_fallback_line(line)
+                    if record is None:
+                        if line.strip():
+                            summary["skipped"] += 1
+                        continue
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        for key, value in _insert_fallback_batch(db.logs, batch).items():
+                            summary[key] += value
+                        batch = []
+                if batch:
+                    for key, value in _insert_fallback_batch(db.logs, batch).items():
+                        summary[key] += value
+        except FileNotFoundError:
+            # Dropped by a concurrent rotation
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # removed by a concurrent re-ingest
+        summary["files"] += 1
+
+    if summary["files"]:
+        logger.info(f"Re-ingested bucket fallback logs: {summary}")
+    return summary
+
+
+class FallbackReingester:
+    """Background thread that re-ingests the fallback journal once the database is reachable."""
+
+    def __init__(self, interval: float = BUCKET_FALLBACK_REINGEST_INTERVAL):
+        """
+        Initialize the re-ingester.
+
+        Args:
+            interval: Seconds between checks for fallback files
+        """
+        self.interval = interval
+        self._stop = threading.Event()
+        self._worker = None
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        """Re-ingest if there is anything to ingest and the database is up; return the summary or None."""
+        has_active = os.path.exists(BUCKET_FALLBACK_LOG) and os.path.getsize(BUCKET_FALLBACK_LOG) > 0
+        if not has_active and not _rotated_fallback_files():
+            return None
+        try:
+            if get_db() is None:
+                return None
+            return reingest_fallback_logs()
+        except Exception as e:
+            logger.warning(f"Bucket fallback re-ingest deferred: {e}")
+            return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        """Start the background thread if it is not running."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="bucket-fallback-reingest", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._worker = None
+
+
+# Global re-ingester instance
+fallback_reingester = FallbackReingester()
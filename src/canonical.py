@@ -0,0 +1,130 @@
+"""
+Canonical JSON Encoding for HackaVerse
+One place that turns entries and payloads into the exact bytes that get
+hashed, so ledger, provenance and storage hashes cannot drift apart
+
+Two encodings exist because hashes already on disk and in MongoDB depend on
+them:
+  compact  sort_keys, separators (',', ':')   StorageService transactions
+  spaced   sort_keys, separators (', ', ': ') provenance, payload and
+                                              security ledger hashes
+Both are ASCII-only (non-ASCII characters are \\u-escaped), exactly like
+json.dumps(sort_keys=True). New hashes should use the compact encoding.
+
+When orjson is installed, compact encoding goes through it for values it
+encodes byte-for-byte like the standard library (str keys, ASCII output,
+64-bit ints, floats printed without an exponent); anything else falls back
+to the cached standard-library encoder. Set CANONICAL_JSON_ORJSON=false to
+disable the fast path.
+
+Callers that hash arbitrary payloads (dead-letter idempotency keys, bucket
+record ids) pass default=str so values JSON cannot encode are stringified.
+"""
+import functools
+import hashlib
+import json
+import math
+import os
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+USE_ORJSON = orjson is not None and os.getenv("CANONICAL_JSON_ORJSON", "true").lower() == "true"
+
+COMPACT_SEPARATORS = (',', ':')
+SPACED_SEPARATORS = (', ', ': ')
+
+# Encoders are built once; json.dumps builds a new one on every call with
+# non-default arguments
+_compact_encoder = json.JSONEncoder(sort_keys=True, separators=COMPACT_SEPARATORS, check_circular=False)
+_spaced_encoder = json.JSONEncoder(sort_keys=True, separators=SPACED_SEPARATORS, check_circular=False)
+
+
+
+@functools.lru_cache(maxsize=None)
+def _encoder_with_default(compact: bool, default: Callable[[Any], Any]) -> json.JSONEncoder:
+    separators = COMPACT_SEPARATORS if compact else SPACED_SEPARATORS
+    return json.JSONEncoder(sort_keys=True, separators=separators, check_circular=False, default=default)
+
+
+_ORJSON_OPTIONS = orjson.OPT_SORT_KEYS if orjson is not None else 0
+_INT_MIN, _INT_MAX = -(2 ** 63), 2 ** 64 - 1
+
+
+def _orjson_safe(value: Any) -> bool:
+    """True if orjson encodes value exactly like the standard library (ASCII aside)."""
+    kind = type(value)
+    if kind is str or kind is bool or value is None:
+        return True
+    if kind is int:
+        return _INT_MIN <= value <= _INT_MAX
+    if kind is float:
+        # repr switches to exponent notation outside this range; orjson does not always agree
+        return math.isfinite(value) and (value == 0 or 1e-4 <= abs(value) < 1e16)
+    if kind is dict:
+        return all(type(k) is str and _orjson_safe(v) for k, v in value.items())
+    if kind is list or kind is tuple:
+        return all(_orjson_safe(v) for v in value)
+    return False
+
+
+def canonical_bytes(value: Any, compact: bool = True,
+                    default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Encode a value canonically.
+
+    Args:
+        value: JSON-serializable value
+        compact: Use the compact encoding (False for the spaced encoding)
+        default: Called for values JSON cannot encode, as in json.dumps
+
+    Returns:
+        UTF-8 (in practice ASCII) bytes
+
+    Raises:
+        TypeError: If the value is not JSON-serializable
+    """
+    if compact and USE_ORJSON and _orjson_safe(value):
+        encoded = orjson.dumps(value, option=_ORJSON_OPTIONS)
+        if encoded.isascii():
+            return encoded
+    if default is not None:
+        encoder = _encoder_with_default(compact, default)
+    else:
+        encoder = _compact_encoder if compact else _spaced_encoder
+    return encoder.encode(value).encode("utf-8")
+
+
+def canonical_json(value: Any, compact: bool = True,
+                   default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Encode a value canonically as a string.
+
+    Args:
+        value: JSON-serializable value
+        compact: Use the compact encoding (False for the spaced encoding)
+        default: Called for values JSON cannot encode, as in json.dumps
+
+    Returns:
+        Canonical JSON text
+    """
+    return canonical_bytes(value, compact, default).decode("utf-8")
+
+
+def canonical_hash(value: Any, compact: bool = True,
+                   default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    SHA256 of the canonical encoding.
+
+    Args:
+        value: JSON-serializable value
+        compact: Use the compact encoding (False for the spaced encoding)
+        default: Called for values JSON cannot encode, as in json.dumps
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(canonical_bytes(value, compact, default)).hexdigest()
@@ -5,7 +5,7 @@ import time
 import logging
 from typing import Optional
 from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure
+from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, OperationFailure
 from fastapi import HTTPException
 
 # Configure logging
@@ -127,6 +127,15 @@ def _create_indexes(database):
         database.judgments.create_index([("submission_hash", 1)])
         database.judgments.create_index([("team_id", 1)])
         database.judgments.create_index([("version", 1)])
+        database.judgments.create_index([("submission_hash", 1), ("version", -1)])
+        # One document per submission version, so a resumed or concurrent rescore cannot insert a
+        # version twice. A separate key pattern keeps the existing index in place; if old data already
+        # holds duplicate versions the build fails and the collection keeps working without it.
+        try:
+            database.judgments.create_index([("submission_hash", 1), ("version", 1)], unique=True,
+                                            name="judgment_version_unique")
+        except OperationFailure as e:
+            logger.warning(f"Unique judgment version index not created (duplicate versions?): {e}")
         
         logger.info("✅ Database indexes created successfully")
     except Exception as e:
@@ -0,0 +1,342 @@
+"""
+Dead-Letter Queue for HackaVerse
+Structured, replayable store for side effects that could not be delivered:
+failed BHIV Core sends, failed transactions and write-behind jobs that ran
+out of attempts
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from .canonical import canonical_hash
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_DB = os.getenv("DEAD_LETTER_DB", "data/dead_letters.sqlite3")
+DEAD_LETTER_REPLAY_RATE = float(os.getenv("DEAD_LETTER_REPLAY_RATE", "10"))
+
+LEGACY_CORE_LOG = "data/failed_core_sends.log"
+LEGACY_TRANSACTION_LOG = "data/failed_transactions.json"
+
+KIND_CORE_SEND = "core_send"
+KIND_BUCKET_SAVE = "bucket_save"
+KIND_LOG_RELAY = "log_relay"
+KIND_TRANSACTION = "transaction"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    error TEXT,
+    source TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_attempt_at REAL,
+    replayed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_dead_letters_status_kind ON dead_letters (status, kind, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def idempotency_key(kind: str, payload: Any) -> str:
+    """
+    Derive a stable idempotency key from the record kind and payload.
+
+    Args:
+        kind: Dead-letter kind
+        payload: JSON-serializable payload
+
+    Returns:
+        SHA256 hex digest
+    """
+    return canonical_hash([kind, payload], default=str)
+
+
+def _replay_core_send(payload: Dict[str, Any], key: str) -> None:
+    from src.integrations.bhiv_connectors import send_to_core
+    send_to_core(payload, max_retries=1, log_failures=False, idempotency_key=key)
+
+
+def _replay_bucket_save(payload: Dict[str, Any], key: str) -> None:
+    from src.integrations.bhiv_connectors import save_to_bucket
+    save_to_bucket(payload["payload"], payload["filename"])
+
+
+def _replay_log_relay(payload: Dict[str, Any], key: str) -> None:
+    from src.bucket_connector import relay_many_to_bucket
+    relay_many_to_bucket([payload])
+
+
+# Replay handlers receive (payload, idempotency_key) and raise on failure.
+# Transactions have no handler: their steps are arbitrary callables, so they
+# stay in the queue for manual review.
+REPLAY_HANDLERS: Dict[str, Callable[[Dict[str, Any], str], None]] = {
+    KIND_CORE_SEND: _replay_core_send,
+    KIND_BUCKET_SAVE: _replay_bucket_save,
+    KIND_LOG_RELAY: _replay_log_relay,
+}
+
+
+class DeadLetterQueue:
+    """
+    SQLite-backed dead-letter store.
+
+    Records are deduplicated on their idempotency key, so the same failure
+    reported twice (e.g. once directly and once from a legacy log import)
+    is stored once, and a replayed record is never sent again.
+    """
+
+    def __init__(self, db_path: str = DEAD_LETTER_DB):
+        """
+        Initialize the queue. The database is opened on first use.
+
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def add(self, kind: str, payload: Any, error: Optional[str] = None, source: Optional[str] = None,
+            key: Optional[str] = None, created_at: Optional[float] = None) -> bool:
+        """
+        Record an undeliverable item.
+
+        Args:
+            kind: Dead-letter kind, e.g. KIND_CORE_SEND
+            payload: JSON-serializable payload needed to replay the item
+            error: Error from the last delivery attempt
+            source: Component that gave up on the item
+            key: Idempotency key (derived from kind and payload if omitted)
+            created_at: Failure time (defaults to now)
+
+        Returns:
+            True if the record was added, False if it was already present
+        """
+        key = key or idempotency_key(kind, payload)
+        with self._lock:
+            conn = self._db()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO dead_letters (kind, idempotency_key, payload, error, source, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, key, json.dumps(payload, default=str), error, source, created_at or time.time())
+                )
+        return cursor.rowcount == 1
+
+    def import_legacy_logs(self, core_log: str = LEGACY_CORE_LOG,
+                           transaction_log: str = LEGACY_TRANSACTION_LOG) -> Dict[str, int]:
+        """
+        Import records from the line-oriented failure logs.
+
+        Each file is read from the byte offset reached by the previous
+        import, so repeated imports only pick up new lines. Lines that are
+        not valid JSON are skipped.
+
+        Args:
+            core_log: Path of failed_core_sends.log
+            transaction_log: Path of failed_transactions.json
+
+        Returns:
+            Dictionary with the number of records imported per kind
+        """
+        imported = {KIND_CORE_SEND: 0, KIND_TRANSACTION: 0}
+        for path, kind in ((core_log, KIND_CORE_SEND), (transaction_log, KIND_TRANSACTION)):
+            for record in self._read_new_lines(path):
+                if kind == KIND_CORE_SEND:
+                    if "payload" not in record:
+                        continue
+                    payload = record["payload"]
+                else:
+                    payload = {k: v for k, v in record.items() if k not in ("error", "timestamp")}
+                if self.add(kind, payload, error=record.get("error"), source=f"import:{os.path.basename(path)}",
+                            created_at=record.get("timestamp")):
+                    imported[kind] += 1
+        return imported
+
+    def _read_new_lines(self, path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        meta_key = f"offset:{os.path.abspath(path)}"
+        with self._lock:
+            row = self._db().execute("SELECT value FROM meta WHERE key = ?", (meta_key,)).fetchone()
+        offset = int(row[0]) if row else 0
+        if offset > os.path.getsize(path):
+            # File was truncated or replaced
+            offset = 0
+
+        records = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial line still being written
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (meta_key, str(offset)))
+        return records
+
+    def pending(self, kind: Optional[str] = None, limit: int = 100, after_id: int = 0) -> List[Dict[str, Any]]:
+        """
+        Return pending records in insertion order.
+
+        Args:
+            kind: Optional kind filter
+            limit: Maximum number of records
+            after_id: Only return records with a larger id
+
+        Returns:
+            List of record dictionaries
+        """
+        query = ("SELECT id, kind, idempotency_key, payload, error, source, attempts, created_at "
+                 "FROM dead_letters WHERE status = 'pending' AND id > ?")
+        params: List[Any] = [after_id]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db().execute(query, params).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "idempotency_key": r[2], "payload": json.loads(r[3]), "error": r[4],
+             "source": r[5], "attempts": r[6], "created_at": r[7]}
+            for r in rows
+        ]
+
+    def _mark(self, record_id: int, replayed: bool, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            with conn:
+                if replayed:
+                    conn.execute(
+                        "UPDATE dead_letters SET status = 'replayed', attempts = attempts + 1, "
+                        "last_attempt_at = ?, replayed_at = ? WHERE id = ?",
+                        (now, now, record_id)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE dead_letters SET attempts = attempts + 1, last_attempt_at = ?, error = ? WHERE id = ?",
+                        (now, error, record_id)
+                    )
+
+    def replay(self, kind: Optional[str] = None, limit: Optional[int] = None, batch_size: int = 100,
+               rate_per_second: float = DEAD_LETTER_REPLAY_RATE, max_consecutive_failures: int = 5) -> Dict[str, Any]:
+        """
+        Replay pending records in batches.
+
+        Deliveries are spaced to at most rate_per_second, and the run stops
+        early after max_consecutive_failures in a row so a target that is
+        still down is not hammered. Records without a replay handler are
+        left pending.
+
+        Args:
+            kind: Optional kind filter
+            limit: Maximum number of records to attempt (None for all)
+            batch_size: Records read from the store per query
+            rate_per_second: Maximum deliveries per second (0 for no limit)
+            max_consecutive_failures: Stop after this many failures in a row
+
+        Returns:
+            Summary with attempted, replayed, failed and skipped counts and
+            whether the run stopped early
+        """
+        summary = {"attempted": 0, "replayed": 0, "failed": 0, "skipped": 0, "stopped_early": False}
+        interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        next_send = time.monotonic()
+        consecutive_failures = 0
+        after_id = 0
+
+        while limit is None or summary["attempted"] < limit:
+            batch = self.pending(kind=kind, limit=batch_size, after_id=after_id)
+            if not batch:
+                break
+            for record in batch:
+                after_id = record["id"]
+                handler = REPLAY_HANDLERS.get(record["kind"])
+                if handler is None:
+                    summary["skipped"] += 1
+                    continue
+                if limit is not None and summary["attempted"] >= limit:
+                    break
+
+                wait = next_send - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                next_send = max(next_send, time.monotonic()) + interval
+
+                summary["attempted"] += 1
+                try:
+                    handler(record["payload"], record["idempotency_key"])
+                    self._mark(record["id"], replayed=True)
+                    summary["replayed"] += 1
+                    consecutive_failures = 0
+                except Exception as e:
+                    self._mark(record["id"], replayed=False, error=str(e))
+                    summary["failed"] += 1
+                    consecutive_failures += 1
+                    if consecutive_failures >= max_consecutive_failures:
+                        logger.warning(f"Stopping dead-letter replay after {consecutive_failures} consecutive failures")
+                        summary["stopped_early"] = True
+                        return summary
+
+        logger.info(f"Dead-letter replay finished: {summary}")
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and age.
+
+        Returns:
+            Dictionary with pending and replayed totals, pending depth per
+            kind and the age in seconds of the oldest pending record
+        """
+        with self._lock:
+            conn = self._db()
+            by_status = dict(conn.execute("SELECT status, COUNT(*) FROM dead_letters GROUP BY status").fetchall())
+            by_kind = dict(conn.execute(
+                "SELECT kind, COUNT(*) FROM dead_letters WHERE status = 'pending' GROUP BY kind"
+            ).fetchall())
+            oldest = conn.execute("SELECT MIN(created_at) FROM dead_letters WHERE status = 'pending'").fetchone()[0]
+        return {
+            "pending": by_status.get("pending", 0),
+            "replayed": by_status.get("replayed", 0),
+            "pending_by_kind": by_kind,
+            "oldest_pending_age_seconds": round(time.time() - oldest, 3) if oldest else 0.0
+        }
+
+
+# Global dead-letter queue instance
+dead_letters = DeadLetterQueue()
@@ -3,11 +3,27 @@ import time
 import json
 from src.integrations.bhiv_connectors import send_to_core, save_to_bucket
 from src.bucket_connector import relay_to_bucket
+from src.write_behind import KIND_BUCKET, KIND_CORE, KIND_LOG, get_write_behind_queue
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class Executor:
+    def __init__(self, write_behind=None):
+        """
+        Args:
+            write_behind: WriteBehindQueue for side effects; defaults to the
+                global queue when WRITE_BEHIND_ENABLED is set, otherwise side
+                effects run inline
+        """
+        self.write_behind = write_behind if write_behind is not None else get_write_behind_queue()
+        
+    def _relay(self, log_data):
+        if self.write_behind is not None:
+            self.write_behind.enqueue(KIND_LOG, log_data)
+        else:
+            relay_to_bucket(log_data)
+        
     def execute(self, action: str) -> str:
         logger.info(f"Executing action: {action}")
         
@@ -19,7 +35,7 @@ class Executor:
             "context": f"Action: {action}",
             "outcome": "started"
         }
-        relay_to_bucket(execution_start_log)
+        self._relay(execution_start_log)
         
         try:
             # Simulate execution (replace with actual logic)
@@ -35,7 +51,7 @@ class Executor:
                 "context": f"Steps to execute: {steps}",
                 "outcome": "processing"
             }
-            relay_to_bucket(step_processing_log)
+            self._relay(step_processing_log)
             
             executed = [f"Executed: {step}" for step in steps if step]
             result = " | ".join(executed) if executed else "No steps executed"
@@ -48,7 +64,7 @@ class Executor:
                 "context": f"Result: {result}",
                 "outcome": "completed"
             }
-            relay_to_bucket(execution_complete_log)
+            self._relay(execution_complete_log)
             
             # Prepare payload for BHIV integration
             payload = {
@@ -58,6 +74,14 @@ class Executor:
                 "steps_count": len(executed)
             }
             
+            if self.write_behind is not None:
+                # Delivered by the write-behind worker, which records the outcomes
+                self.write_behind.enqueue_many([
+                    (KIND_CORE, payload, None, "executor"),
+                    (KIND_BUCKET, payload, f"execution_{int(time.time())}.json", "executor")
+                ])
+                return result
+            
             # Send to BHIV Core and save to BHIV Bucket
             try:
                 core_resp = send_to_core(payload)
@@ -71,7 +95,7 @@ class Executor:
                     "context": "Successfully sent to BHIV Core",
                     "outcome": "success"
                 }
-                relay_to_bucket(core_success_log)
+                self._relay(core_success_log)
             except Exception as e:
                 logger.warning(f"Failed to send to BHIV Core: {str(e)}")
                 
@@ -83,7 +107,7 @@ class Executor:
                     "context": f"Failed to send to BHIV Core: {str(e)}",
                     "outcome": "failure"
                 }
-                relay_to_bucket(core_failure_log)
+                self._relay(core_failure_log)
             
             try:
                 filename = f"execution_{int(time.time())}.json"
@@ -98,7 +122,7 @@ class Executor:
                     "context": f"Saved to BHIV Bucket: {bucket_path}",
                     "outcome": "success"
                 }
-                relay_to_bucket(bucket_success_log)
+                self._relay(bucket_success_log)
             except Exception as e:
                 logger.warning(f"Failed to save to BHIV Bucket: {str(e)}")
                 
@@ -110,7 +134,7 @@ class Executor:
                     "context": f"Failed to save to BHIV Bucket: {str(e)}",
                     "outcome": "failure"
                 }
-                relay_to_bucket(bucket_failure_log)
+                self._relay(bucket_failure_log)
             
             return result
         except ValueError as ve:
@@ -124,7 +148,7 @@ class Executor:
                 "context": f"Execution failed: {str(ve)}",
                 "outcome": "error"
             }
-            relay_to_bucket(execution_error_log)
+            self._relay(execution_error_log)
             
             raise
         except Exception as e:
@@ -138,6 +162,6 @@ class Executor:
                 "context": f"Unexpected execution failure: {str(e)}",
                 "outcome": "error"
             }
-            relay_to_bucket(unexpected_error_log)
+            self._relay(unexpected_error_log)
             
             raise
\ No newline at end of file
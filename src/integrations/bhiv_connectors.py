@@ -2,9 +2,13 @@ import requests
 import json
 import os
 import time
-from typing import Dict
+from typing import Dict, List, Tuple
 import logging
 
+from .bucket_writer import get_bucket_writer
+from ..dead_letter import KIND_CORE_SEND, dead_letters
+from ..retry import full_jitter_delay, retry_budget
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -17,14 +21,20 @@ FAILED_LOG_PATH = "data/failed_core_sends.log"
 os.makedirs(BUCKET_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(FAILED_LOG_PATH) if os.path.dirname(FAILED_LOG_PATH) else ".", exist_ok=True)
 
-def send_to_core(payload: Dict, max_retries=3, backoff=1):
+def send_to_core(payload: Dict, max_retries=3, backoff=1, log_failures=True, idempotency_key=None):
     """
     Send payload to BHIV Core with retry logic.
     
     Args:
         payload: Dictionary containing the data to send
         max_retries: Maximum number of retry attempts
-        backoff: Backoff multiplier for retry delays
+        backoff: Full-jitter backoff base; retries also draw on the
+            process-wide retry budget
+        log_failures: Record the payload in FAILED_LOG_PATH and the dead-letter
+            queue when every attempt fails; callers that keep their own retry
+            state turn this off
+        idempotency_key: Sent as the Idempotency-Key header so Core can drop
+            duplicates of a replayed payload
         
     Returns:
         Response from BHIV Core
@@ -33,10 +43,14 @@ def send_to_core(payload: Dict, max_retries=3, backoff=1):
         Exception: If all retry attempts fail
     """
     logger.info(f"Sending payload to BHIV Core: {BHIV_CORE_URL}")
+    request_kwargs = {"json": payload, "timeout": 5}
+    if idempotency_key:
+        request_kwargs["headers"] = {"Idempotency-Key": idempotency_key}
     
+    retry_budget.record_call()
     for i in range(max_retries):
         try:
-            resp = requests.post(BHIV_CORE_URL, json=payload, timeout=5)
+            resp = requests.post(BHIV_CORE_URL, **request_kwargs)
             resp.raise_for_status()
             logger.info("Successfully sent payload to BHIV Core")
             return resp.json()
@@ -44,7 +58,13 @@ def send_to_core(payload: Dict, max_retries=3, backoff=1):
             logger.warning(f"Attempt {i+1} failed: {str(e)}")
             last_exception = e
             if i < max_retries - 1:  # Don't sleep on the last attempt
-                time.sleep(backoff * (i+1))
+                if not retry_budget.try_acquire():
+                    logger.warning("Retry budget exhausted, not retrying BHIV Core")
+                    break
+                time.sleep(full_jitter_delay(i, backoff, 30.0))
+    
+    if not log_failures:
+        raise last_exception
     
     # After retries, log failure and raise
     logger.error(f"All retry attempts failed. Logging to {FAILED_LOG_PATH}")
@@ -58,27 +78,71 @@ def send_to_core(payload: Dict, max_retries=3, backoff=1):
     except Exception as log_error:
         logger.error(f"Failed to write to error log: {str(log_error)}")
     
+    try:
+        dead_letters.add(KIND_CORE_SEND, payload, error=str(last_exception), source="send_to_core")
+    except Exception as dlq_error:
+        logger.error(f"Failed to record dead letter: {str(dlq_error)}")
+    
     raise last_exception
 
-def save_to_bucket(payload: Dict, filename: str):
+def store_in_bucket(payload: Dict, filename: str) -> Dict[str, str]:
     """
     Save payload to BHIV Bucket (local file storage).
+
+    The payload is written as compact JSON using the layout configured by
+    BHIV_BUCKET_LAYOUT (flat, sharded or segment) and recorded in the
+    bucket index so StorageService can look it up without scanning the
+    directory. If filename is already taken, a "-{n}" suffix is added
+    rather than overwriting the existing file.
     
     Args:
         payload: Dictionary containing the data to save
         filename: Name of the file to save the data to
         
     Returns:
-        Path to the saved file
+        Dictionary with the stored filename and its path (the segment
+        file in segment mode)
     """
-    path = os.path.join(BUCKET_DIR, filename)
-    logger.info(f"Saving payload to BHIV Bucket: {path}")
+    logger.info(f"Saving payload to BHIV Bucket: {filename}")
     
     try:
-        with open(path, "w") as f:
-            json.dump(payload, f, indent=2)
+        stored_name, relpath = get_bucket_writer(BUCKET_DIR).write(payload, filename)
+        path = os.path.join(BUCKET_DIR, relpath)
         logger.info(f"Successfully saved payload to {path}")
-        return path
+        return {"filename": stored_name, "path": path}
     except Exception as e:
         logger.error(f"Failed to save payload to bucket: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def save_to_bucket(payload: Dict, filename: str):
+    """
+    Save payload to BHIV Bucket (local file storage).
+    
+    Args:
+        payload: Dictionary containing the data to save
+        filename: Name of the file to save the data to
+        
+    Returns:
+        Path to the saved file
+    """
+    return store_in_bucket(payload, filename)["path"]
+
+def save_batch_to_bucket(items: List[Tuple[str, Dict]]) -> List[Dict[str, str]]:
+    """
+    Save several payloads to BHIV Bucket with one index transaction
+    (and, in segment mode, one append).
+    
+    Args:
+        items: List of (filename, payload) pairs
+        
+    Returns:
+        Dictionaries with the stored filename and path, in the order of items
+    """
+    logger.info(f"Saving {len(items)} payloads to BHIV Bucket")
+    
+    try:
+        stored = get_bucket_writer(BUCKET_DIR).write_batch(items)
+        return [{"filename": name, "path": os.path.join(BUCKET_DIR, relpath)} for name, relpath in stored]
+    except Exception as e:
+        logger.error(f"Failed to save batch to bucket: {str(e)}")
+        raise
@@ -0,0 +1,574 @@
+"""
+BHIV Bucket Index
+SQLite index over the local bucket directory so lookups and listings do not
+scan the directory or open file bodies
+"""
+import base64
+import gzip
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".bucket_index.sqlite3"
+SCHEMA_VERSION = 3
+SEGMENTS_DIRNAME = "segments"
+SEGMENT_INDEX_SUFFIX = ".idx"
+
+# Bodies at least this large are read through a memory map
+MMAP_THRESHOLD_BYTES = int(os.getenv("BHIV_BUCKET_MMAP_THRESHOLD", str(1024 * 1024)))
+
+_COLUMNS = "filename, kind, team_id, timestamp, size, relpath, offset, length, compressed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    filename TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    team_id TEXT,
+    timestamp INTEGER,
+    size INTEGER,
+    relpath TEXT NOT NULL,
+    offset INTEGER,
+    length INTEGER,
+    compressed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_kind_team_ts ON entries (kind, team_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_kind_ts ON entries (kind, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def parse_bucket_filename(filename: str) -> Optional[Tuple[str, Optional[str], Optional[int]]]:
+    """
+    Split a bucket filename into (kind, team_id, timestamp).
+
+    Recognised formats are {kind}_{timestamp}.json and
+    {kind}_{team_id}_{timestamp}.json, where team_id may contain underscores
+    and the timestamp may carry a "-{n}" de-duplication suffix. A non-numeric
+    timestamp is returned as None.
+
+    Args:
+        filename: Name of the file in the bucket directory
+
+    Returns:
+        Tuple of (kind, team_id, timestamp), or None for non-JSON files
+    """
+    if not filename.endswith(".json") or filename.startswith("."):
+        return None
+    parts = filename[:-len(".json")].split("_")
+    kind = parts[0]
+    rest = parts[1:]
+    if not rest:
+        return kind, None, None
+    timestamp_part = rest[-1].split("-", 1)[0]
+    timestamp = int(timestamp_part) if timestamp_part.isdigit() else None
+    team_id = "_".join(rest[:-1]) or None
+    return kind, team_id, timestamp
+
+
+class BucketIndex:
+    """
+    Index of bucket entries keyed on (kind, team_id, timestamp).
+
+    An entry is a flat file in the bucket directory, a file in a sharded
+    subdirectory, or a record inside an NDJSON segment (relpath plus
+    offset and length); see bucket_writer for the layouts.
+
+    save_to_bucket records every write here. Flat files created or
+    removed by anything else are picked up by comparing the directory
+    mtime with the value recorded after the last indexed change; when they
+    differ, the top-level listing (names only) is reconciled with the
+    index. Sharded files and segment records are only written through the
+    bucket writer, so they are not rescanned. A file dropped in by another
+    process during an indexed write can be missed; rebuild() recovers
+    from that and re-reads shards and segment offset files.
+    """
+
+    def __init__(self, bucket_dir: str, index_path: Optional[str] = None):
+        """
+        Initialize the index for a bucket directory.
+
+        Args:
+            bucket_dir: Bucket directory to index
+            index_path: SQLite file; defaults to a hidden file inside bucket_dir
+        """
+        self.bucket_dir = bucket_dir
+        self.index_path = index_path or os.path.join(bucket_dir, INDEX_FILENAME)
+        self._lock = threading.RLock()
+        try:
+            self._conn = sqlite3.connect(self.index_path, timeout=5, check_same_thread=False)
+            # A persistent journal keeps commits from creating/deleting files in
+            # the bucket directory, which would change the mtime being tracked
+            self._conn.execute("PRAGMA journal_mode=PERSIST")
+            self._create_schema()
+        except sqlite3.Error as e:
+            # Read-only bucket: keep the index in memory for this process
+            logger.warning(f"Bucket index unavailable at {self.index_path}, using in-memory index: {e}")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._create_schema()
+
+    def _create_schema(self) -> None:
+        # The index can always be rebuilt from the directory, so an older
+        # schema is dropped rather than migrated
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS meta;")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def file_row(self, filename: str, relpath: Optional[str] = None) -> Optional[Tuple]:
+        """
+        Build an index row for a file stored on its own.
+
+        Args:
+            filename: Logical filename
+            relpath: Path relative to the bucket directory (defaults to filename)
+
+        Returns:
+            Row tuple, or None if filename is not a bucket JSON file
+        """
+        parsed = parse_bucket_filename(filename)
+        if parsed is None:
+            return None
+        relpath = relpath or filename
+        try:
+            size = os.stat(os.path.join(self.bucket_dir, relpath)).st_size
+        except OSError:
+            size = None
+        return (filename,) + parsed + (size, relpath, None, None, 0)
+
+    def segment_row(self, filename: str, relpath: str, offset: int, length: int,
+                    size: int, compressed: bool) -> Optional[Tuple]:
+        """
+        Build an index row for a record stored inside a segment file.
+
+        Args:
+            filename: Logical filename of the record
+            relpath: Segment path relative to the bucket directory
+            offset: Byte offset of the record in the segment
+            length: Stored (possibly compressed) length in bytes
+            size: Uncompressed JSON length in bytes
+            compressed: Whether the record is a gzip member
+
+        Returns:
+            Row tuple, or None if filename is not a bucket JSON file
+        """
+        parsed = parse_bucket_filename(filename)
+        if parsed is None:
+            return None
+        return (filename,) + parsed + (size, relpath, offset, length, int(compressed))
+
+    def _insert(self, rows: List[Optional[Tuple]]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (filename, kind, team_id, timestamp, size, relpath, offset, length, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row is not None]
+            )
+
+    def reserve(self, row: Tuple) -> bool:
+        """
+        Insert an entry unless its filename is already taken.
+
+        Call inside recording(): the plain INSERT opens the write transaction
+        that the block commits, so the filename stays claimed against other
+        processes from here until the commit.
+
+        Args:
+            row: Row from file_row() or segment_row()
+
+        Returns:
+            True if the row was inserted, False if the filename exists
+        """
+        try:
+            self._conn.execute(
+                "INSERT INTO entries (filename, kind, team_id, timestamp, size, relpath, offset, length, compressed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def _dir_mtime(self) -> Optional[str]:
+        try:
+            return str(os.stat(self.bucket_dir).st_mtime_ns)
+        except OSError:
+            return None
+
+    def _recorded_mtime(self) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dir_mtime'").fetchone()
+        return row[0] if row else None
+
+    def _record_mtime(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime', ?)",
+                (self._dir_mtime(),)
+            )
+
+    def is_fresh(self) -> bool:
+        """Return True when no unindexed change has been made to the directory."""
+        return self._recorded_mtime() == self._dir_mtime()
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Reconcile the index with the directory listing.
+
+        Only filenames and sizes are read; file bodies are never opened.
+
+        Returns:
+            Dictionary with the number of entries added and removed
+        """
+        with self._lock:
+            try:
+                on_disk = {name for name in os.listdir(self.bucket_dir) if parse_bucket_filename(name)}
+            except OSError:
+                on_disk = set()
+            indexed = {row[0] for row in self._conn.execute(
+                "SELECT filename FROM entries WHERE relpath = filename AND offset IS NULL"
+            )}
+            added = on_disk - indexed
+            removed = indexed - on_disk
+            self._insert([self.file_row(name) for name in added])
+            with self._conn:
+                self._conn.executemany("DELETE FROM entries WHERE filename = ?", [(name,) for name in removed])
+            self._record_mtime()
+            if added or removed:
+                logger.info(f"Bucket index reconciled: {len(added)} added, {len(removed)} removed")
+            return {"added": len(added), "removed": len(removed)}
+
+    def rebuild(self) -> Dict[str, int]:
+        """
+        Drop every entry and rebuild the index from the bucket directory,
+        including sharded subdirectories and segment offset files.
+
+        Returns:
+            Dictionary with the number of entries added
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM entries")
+            rows = []
+            segments_dir = os.path.join(self.bucket_dir, SEGMENTS_DIRNAME)
+            for root, dirs, files in os.walk(self.bucket_dir):
+                if root == self.bucket_dir:
+                    continue
+                relroot = os.path.relpath(root, self.bucket_dir)
+                if root == segments_dir:
+                    for name in files:
+                        if name.endswith(SEGMENT_INDEX_SUFFIX):
+                            rows.extend(self._read_segment_index(os.path.join(relroot, name)))
+                    continue
+                rows.extend(self.file_row(name, os.path.join(relroot, name)) for name in files)
+            self._insert(rows)
+            result = self.sync()
+            result["added"] += len([row for row in rows if row is not None])
+            return result
+
+    def _read_segment_index(self, relpath: str) -> List[Optional[Tuple]]:
+        segment_relpath = relpath[:-len(SEGMENT_INDEX_SUFFIX)]
+        rows = []
+        with open(os.path.join(self.bucket_dir, relpath), "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from an interrupted append
+                    continue
+                rows.append(self.segment_row(record["filename"], segment_relpath, record["offset"],
+                                             record["length"], record["size"], record["compressed"]))
+        return rows
+
+    def _ensure_fresh(self) -> None:
+        if not self.is_fresh():
+            self.sync()
+
+    @contextmanager
+    def recording(self):
+        """
+        Context manager wrapping writes into the bucket.
+
+        Yields a list; append file_row()/segment_row() results to it and
+        they are inserted in one transaction when the block completes,
+        together with any rows claimed through reserve(). Pending external
+        changes are reconciled first, so the directory mtime can be
+        re-recorded afterwards and the index stays fresh across indexed
+        writes. If the block raises, reserved rows are rolled back.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            rows: List[Optional[Tuple]] = []
+            try:
+                yield rows
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._insert(rows)
+            self._record_mtime()
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the entry for a logical filename.
+
+        Args:
+            filename: Logical filename
+
+        Returns:
+            Entry dictionary or None
+        """
+        with self._lock:
+            self._ensure_fresh()
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM entries WHERE filename = ?", (filename,)).fetchone()
+        return self._entry(row) if row else None
+
+    def _entry(self, row: Tuple) -> Dict[str, Any]:
+        filename, kind, team_id, timestamp, size, relpath, offset, length, compressed = row
+        return {
+            "filename": filename,
+            "kind": kind,
+            "team_id": team_id,
+            "timestamp": timestamp,
+            "size": size,
+            "relpath": relpath,
+            "path": os.path.join(self.bucket_dir, relpath),
+            "offset": offset,
+            "length": length,
+            "compressed": bool(compressed)
+        }
+
+    def _where(self, kind: str, team_id: Optional[str]) -> Tuple[str, List[Any]]:
+        query = f"SELECT {_COLUMNS} FROM entries WHERE kind = ? AND timestamp IS NOT NULL"
+        params: List[Any] = [kind]
+        if team_id is not None:
+            query += " AND team_id = ?"
+            params.append(team_id)
+        return query, params
+
+    def latest(self, kind: str, team_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the newest entry of a kind, optionally for one team.
+
+        Args:
+            kind: Filename prefix, e.g. "submission"
+            team_id: Optional team filter
+
+        Returns:
+            Entry dictionary or None
+        """
+        entries = self.list(kind, team_id=team_id, limit=1)
+        return entries[0] if entries else None
+
+    def list(self, kind: str, team_id: Optional[str] = None, limit: Optional[int] = None,
+             offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        List entries of a kind, newest first.
+
+        Entries without a numeric timestamp are excluded.
+
+        Args:
+            kind: Filename prefix, e.g. "submission"
+            team_id: Optional team filter
+            limit: Maximum number of entries to return (None for all)
+            offset: Number of entries to skip
+
+        Returns:
+            List of entry dictionaries with filename, kind, team_id, timestamp, size,
+            relpath and path, plus offset/length/compressed for segment records
+        """
+        query, params = self._where(kind, team_id)
+        query += " ORDER BY timestamp DESC, filename DESC LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+        with self._lock:
+            self._ensure_fresh()
+            return [self._entry(row) for row in self._conn.execute(query, params)]
+
+    def page(self, kind: str, team_id: Optional[str] = None, cursor: Optional[str] = None,
+             limit: int = 100) -> Dict[str, Any]:
+        """
+        Return one page of entries, newest first, using keyset pagination.
+
+        Unlike list() with an offset, the cost of a page does not grow with
+        how far into the listing it is, and files added while paging do not
+        shift later pages.
+
+        Args:
+            kind: Filename prefix, e.g. "submission"
+            team_id: Optional team filter
+            cursor: next_cursor from the previous page (None for the first page)
+            limit: Maximum number of entries on the page
+
+        Returns:
+            Dictionary with "items" (entry dictionaries) and "next_cursor"
+            (None on the last page)
+        """
+        query, params = self._where(kind, team_id)
+        if cursor:
+            timestamp, filename = decode_cursor(cursor)
+            query += " AND (timestamp < ? OR (timestamp = ? AND filename < ?))"
+            params.extend([timestamp, timestamp, filename])
+        query += " ORDER BY timestamp DESC, filename DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            self._ensure_fresh()
+            items = [self._entry(row) for row in self._conn.execute(query, params)]
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1]["timestamp"], items[-1]["filename"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def iter_handles(self, kind: str, team_id: Optional[str] = None,
+                     batch_size: int = 500) -> Iterator["BucketHandle"]:
+        """
+        Yield a lazy handle for every entry of a kind, newest first.
+
+        Entries are fetched from the index a page at a time and no body is
+        read until the caller asks for it.
+
+        Args:
+            kind: Filename prefix, e.g. "submission"
+            team_id: Optional team filter
+            batch_size: Entries fetched from the index per query
+
+        Yields:
+            BucketHandle for each entry
+        """
+        cursor = None
+        while True:
+            result = self.page(kind, team_id=team_id, cursor=cursor, limit=batch_size)
+            for entry in result["items"]:
+                yield BucketHandle(entry)
+            cursor = result["next_cursor"]
+            if cursor is None:
+                return
+
+    def count(self, kind: str, team_id: Optional[str] = None) -> int:
+        """Return the number of timestamped entries of a kind, optionally for one team."""
+        query, params = self._where(kind, team_id)
+        query = query.replace(_COLUMNS, "COUNT(*)", 1)
+        with self._lock:
+            self._ensure_fresh()
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def encode_cursor(timestamp: int, filename: str) -> str:
+    """Encode the last entry of a page as an opaque pagination cursor."""
+    raw = json.dumps([timestamp, filename], separators=(',', ':')).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Decode a pagination cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, filename = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(timestamp), str(filename)
+    except Exception as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+class BucketHandle:
+    """
+    Metadata for one bucket entry with the body loaded on access.
+
+    File bodies at or above MMAP_THRESHOLD_BYTES are read through a
+    read-only memory map, so raw() can hand them on without copying into
+    the heap. Segment records are read by seeking to their offset.
+    """
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.entry = entry
+        self.filename = entry["filename"]
+        self.team_id = entry["team_id"]
+        self.timestamp = entry["timestamp"]
+        self.size = entry["size"]
+        self.path = entry["path"]
+        self._data = None
+
+    def raw(self):
+        """
+        Return the JSON body as bytes, or as a read-only mmap for large files.
+
+        Raises:
+            OSError: If the file can no longer be read
+        """
+        offset = self.entry.get("offset")
+        if offset is not None:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                record = f.read(self.entry["length"])
+            return gzip.decompress(record) if self.entry.get("compressed") else record
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size and size >= MMAP_THRESHOLD_BYTES:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return f.read()
+
+    def load(self) -> Any:
+        """
+        Parse and cache the JSON body.
+
+        Raises:
+            OSError: If the file can no longer be read
+            ValueError: If the body is not valid JSON
+        """
+        if self._data is None:
+            raw = self.raw()
+            if isinstance(raw, mmap.mmap):
+                with raw:
+                    self._data = json.loads(raw[:])
+            else:
+                self._data = json.loads(raw)
+        return self._data
+
+    @property
+    def data(self) -> Any:
+        return self.load()
+
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self.entry)
+
+
+_indexes: Dict[str, BucketIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bucket_index(bucket_dir: str) -> Optional[BucketIndex]:
+    """
+    Return the shared index for a bucket directory.
+
+    Args:
+        bucket_dir: Bucket directory
+
+    Returns:
+        BucketIndex, or None if the directory does not exist
+    """
+    key = os.path.abspath(bucket_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None and not os.path.exists(index.index_path):
+            # Directory was removed and recreated; the old connection points at a deleted file
+            index.close()
+            index = None
+        if index is None:
+            if not os.path.isdir(key):
+                return None
+            index = BucketIndex(key)
+            _indexes[key] = index
+        return index
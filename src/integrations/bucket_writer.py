@@ -0,0 +1,233 @@
+"""
+BHIV Bucket Writer
+Writes bucket payloads as compact JSON in a flat, hash-sharded or NDJSON
+segment layout and records every write in the bucket index
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import logging
+
+from .bucket_index import SEGMENTS_DIRNAME, SEGMENT_INDEX_SUFFIX, get_bucket_index
+
+logger = logging.getLogger(__name__)
+
+# flat: {bucket}/{filename}
+# sharded: {bucket}/{kind}/{sha1(filename)[:2]}/{filename}
+# segment: records appended to {bucket}/segments/segment-*.ndjson[.gz]
+LAYOUTS = ("flat", "sharded", "segment")
+BUCKET_LAYOUT = os.getenv("BHIV_BUCKET_LAYOUT", "flat")
+BUCKET_COMPRESS = os.getenv("BHIV_BUCKET_COMPRESS", "false").lower() == "true"
+SEGMENT_MAX_BYTES = int(os.getenv("BHIV_BUCKET_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as compact JSON."""
+    return json.dumps(payload, separators=(',', ':')).encode("utf-8")
+
+
+def shard_relpath(filename: str) -> str:
+    """Return the sharded path of a file relative to the bucket directory."""
+    kind = filename.split("_", 1)[0]
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return os.path.join(kind, digest[:2], filename)
+
+
+def deduplicated_name(filename: str, attempt: int) -> str:
+    """Return filename with a "-{attempt}" suffix before the extension."""
+    root, ext = os.path.splitext(filename)
+    return f"{root}-{attempt}{ext}"
+
+
+class BucketWriter:
+    """
+    Writes payloads into one bucket directory.
+
+    Names never collide: if filename is already taken (e.g. two
+    execution_{second}.json writes in the same second), a "-{n}" suffix is
+    added instead of overwriting. Flat and sharded files are created with
+    O_EXCL; segment records claim their name with a plain INSERT into the
+    bucket index, held uncommitted until the record is written, so two
+    processes never get the same name. In segment mode each process appends to
+    its own rolling segment file; every record is a line of NDJSON (or an
+    independent gzip member when compressed, so the segment is still a
+    valid .ndjson.gz) and its offset is written to a sidecar .idx file as
+    well as the bucket index.
+    """
+
+    def __init__(self, bucket_dir: str, layout: Optional[str] = None, compress: Optional[bool] = None,
+                 segment_max_bytes: Optional[int] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            bucket_dir: Bucket directory
+            layout: "flat", "sharded" or "segment" (defaults to BHIV_BUCKET_LAYOUT)
+            compress: Gzip segment records (defaults to BHIV_BUCKET_COMPRESS)
+            segment_max_bytes: Size at which a new segment is started
+
+        Raises:
+            ValueError: If the layout is unknown
+        """
+        layout = layout or BUCKET_LAYOUT
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown bucket layout '{layout}'. Available: {', '.join(LAYOUTS)}")
+        self.bucket_dir = bucket_dir
+        self.layout = layout
+        self.compress = BUCKET_COMPRESS if compress is None else compress
+        self.segment_max_bytes = segment_max_bytes or SEGMENT_MAX_BYTES
+        self._lock = threading.Lock()
+        self._segment = None
+        self._segment_index = None
+        self._segment_relpath = None
+
+    def write(self, payload: Dict[str, Any], filename: str) -> Tuple[str, str]:
+        """
+        Write one payload.
+
+        Args:
+            payload: Dictionary to store
+            filename: Requested filename
+
+        Returns:
+            Tuple of (stored filename, path relative to the bucket directory);
+            the path is the segment file in segment mode
+        """
+        return self.write_batch([(filename, payload)])[0]
+
+    def write_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, str]]:
+        """
+        Write several payloads with a single index transaction; in segment
+        mode they are also appended with a single write.
+
+        Args:
+            items: List of (filename, payload) pairs
+
+        Returns:
+            (stored filename, relative path) tuples, in the order of items
+
+        Raises:
+            FileNotFoundError: If the bucket directory does not exist
+        """
+        index = get_bucket_index(self.bucket_dir)
+        if index is None:
+            raise FileNotFoundError(f"Bucket directory does not exist: {self.bucket_dir}")
+        encoded = [(filename, encode_payload(payload)) for filename, payload in items]
+        with self._lock, index.recording() as rows:
+            if self.layout == "segment":
+                return self._append_segment(index, encoded)
+            return [self._write_file(index, filename, body, rows) for filename, body in encoded]
+
+    def _write_file(self, index, filename: str, body: bytes, rows: List) -> Tuple[str, str]:
+        name = filename
+        attempt = 0
+        while True:
+            relpath = name if self.layout == "flat" else shard_relpath(name)
+            path = os.path.join(self.bucket_dir, relpath)
+            if self.layout == "sharded":
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                attempt += 1
+                name = deduplicated_name(filename, attempt)
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            rows.append(index.file_row(name, relpath))
+            return name, relpath
+
+    def _reserve_name(self, index, filename: str, make_row: Callable[[str], Optional[Tuple]]) -> str:
+        name = filename
+        attempt = 0
+        while True:
+            row = make_row(name)
+            if row is None or index.reserve(row):
+                return name
+            attempt += 1
+            name = deduplicated_name(filename, attempt)
+
+    def _open_segment(self) -> None:
+        self.close()
+        segments_dir = os.path.join(self.bucket_dir, SEGMENTS_DIRNAME)
+        os.makedirs(segments_dir, exist_ok=True)
+        # One writer per process per segment keeps appended offsets exact
+        name = f"segment-{int(time.time() * 1000)}-{os.getpid()}.ndjson" + (".gz" if self.compress else "")
+        self._segment_relpath = os.path.join(SEGMENTS_DIRNAME, name)
+        path = os.path.join(self.bucket_dir, self._segment_relpath)
+        self._segment = open(path, "ab")
+        self._segment_index = open(path + SEGMENT_INDEX_SUFFIX, "a")
+        logger.info(f"Opened bucket segment {path}")
+
+    def _append_segment(self, index, encoded: List[Tuple[str, bytes]]) -> List[Tuple[str, str]]:
+        if self._segment is None or not os.path.exists(os.path.join(self.bucket_dir, self._segment_relpath)):
+            self._open_segment()
+
+        offset = self._segment.tell()
+        buffer = bytearray()
+        index_lines = []
+        stored = []
+        for filename, body in encoded:
+            record = body + b"\n"
+            if self.compress:
+                record = gzip.compress(record, mtime=0)
+            record_offset = offset + len(buffer)
+            # The row is claimed now and committed by index.recording() after the write below
+            name = self._reserve_name(index, filename, lambda candidate: index.segment_row(
+                candidate, self._segment_relpath, record_offset, len(record), len(body), self.compress))
+            stored.append((name, self._segment_relpath))
+            index_lines.append(json.dumps({
+                "filename": name,
+                "offset": record_offset,
+                "length": len(record),
+                "size": len(body),
+                "compressed": self.compress
+            }, separators=(',', ':')) + "\n")
+            buffer += record
+
+        # Records first, then their offsets, so an interrupted write never
+        # leaves an offset pointing past the end of the segment
+        self._segment.write(buffer)
+        self._segment.flush()
+        self._segment_index.write("".join(index_lines))
+        self._segment_index.flush()
+
+        if self._segment.tell() >= self.segment_max_bytes:
+            self.close()
+        return stored
+
+    def close(self) -> None:
+        """Close the open segment, if any."""
+        if self._segment is not None:
+            self._segment.close()
+            self._segment_index.close()
+        self._segment = None
+        self._segment_index = None
+
+
+_writers: Dict[str, BucketWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_bucket_writer(bucket_dir: str) -> BucketWriter:
+    """
+    Return the shared writer for a bucket directory, configured from the
+    BHIV_BUCKET_* environment variables.
+
+    Args:
+        bucket_dir: Bucket directory
+
+    Returns:
+        BucketWriter
+    """
+    key = os.path.abspath(bucket_dir)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = BucketWriter(key)
+            _writers[key] = writer
+        return writer
@@ -0,0 +1,254 @@
+"""
+Consensus Aggregation Strategies
+Pluggable, NumPy-backed ways of turning a (evaluations x criteria) score matrix into consensus scores
+"""
+import json
+import os
+import threading
+from typing import Dict, Any, Callable, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def masked_median(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Median along axis -2 ignoring NaN entries.
+
+    np.sort places NaN last, so the median of the first ``counts`` entries
+    can be read off by position.
+
+    Args:
+        values: Array with evaluations on axis -2
+        counts: Number of non-NaN entries per column
+
+    Returns:
+        Array of medians with axis -2 removed (undefined where counts == 0)
+    """
+    ordered = np.sort(values, axis=-2)
+    last = max(values.shape[-2] - 1, 0)
+    lo = np.clip((counts - 1) // 2, 0, last)[..., None, :]
+    hi = np.clip(counts // 2, 0, last)[..., None, :]
+    return (np.take_along_axis(ordered, lo, axis=-2) + np.take_along_axis(ordered, hi, axis=-2))[..., 0, :] / 2
+
+
+def fill_missing_confidences(confidences: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Replace missing (None or NaN) confidences with the panel's mean reported confidence.
+
+    A judge that did not report a confidence then counts as an average judge
+    of its panel (axis -1) in confidence-weighted aggregation; a panel with
+    no reported confidence at all gets equal weights.
+
+    Args:
+        confidences: Per-evaluation confidences, or None
+
+    Returns:
+        Float array without NaN entries, or None if confidences is None
+    """
+    if confidences is None:
+        return None
+    conf = np.asarray(confidences, dtype=float)
+    missing = np.isnan(conf)
+    if not missing.any():
+        return conf
+    reported = (~missing).sum(axis=-1, keepdims=True)
+    panel_mean = np.where(missing, 0.0, conf).sum(axis=-1, keepdims=True) / np.maximum(reported, 1)
+    return np.where(missing, np.where(reported > 0, panel_mean, 1.0), conf)
+
+
+def _weights_for(matrix: np.ndarray, confidences: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (valid mask, per-entry weights) with missing entries weighted zero."""
+    valid = ~np.isnan(matrix)
+    if confidences is None:
+        return valid, valid.astype(float)
+    conf = np.clip(fill_missing_confidences(confidences), 0.0, None)[..., None]
+    return valid, np.where(valid, conf, 0.0)
+
+
+def _weighted_mean(matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    mass = weights.sum(axis=-2)
+    total = (weights * np.where(np.isnan(matrix), 0.0, matrix)).sum(axis=-2)
+    return np.where(mass > 0, total / np.where(mass > 0, mass, 1.0), np.nan)
+
+
+def mean_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None, **_) -> np.ndarray:
+    """Plain arithmetic mean of the available scores."""
+    _, weights = _weights_for(matrix, None)
+    return _weighted_mean(matrix, weights)
+
+
+def confidence_weighted_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None, **_) -> np.ndarray:
+    """Mean weighted by each judge's reported confidence (plain mean if confidences are missing or all zero)."""
+    _, weights = _weights_for(matrix, confidences)
+    weighted = _weighted_mean(matrix, weights)
+    return np.where(np.isnan(weighted), mean_strategy(matrix), weighted)
+
+
+def median_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None, **_) -> np.ndarray:
+    """Per-criterion median; a single outlier judge cannot move it."""
+    counts = (~np.isnan(matrix)).sum(axis=-2)
+    return np.where(counts > 0, masked_median(matrix, counts), np.nan)
+
+
+def trimmed_mean_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None,
+                          trim_fraction: float = 0.2, **_) -> np.ndarray:
+    """
+    Mean after dropping the highest and lowest scores.
+
+    ceil(trim_fraction * n) scores are trimmed from each end when at least
+    three judges scored a criterion, never leaving fewer than one score.
+    With three judges this drops the min and max.
+    """
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=-2)
+    ordered = np.sort(matrix, axis=-2)
+    trim = np.where(counts >= 3, np.minimum(np.ceil(trim_fraction * counts), (counts - 1) // 2), 0)
+    positions = np.arange(matrix.shape[-2]).reshape((-1, 1))
+    keep = (positions >= trim[..., None, :]) & (positions < (counts - trim)[..., None, :])
+    return _weighted_mean(ordered, keep.astype(float))
+
+
+def bayesian_shrinkage_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None,
+                                prior_means: Optional[np.ndarray] = None, prior_strength: float = 1.0,
+                                max_scores: Optional[np.ndarray] = None, **_) -> np.ndarray:
+    """
+    Confidence-weighted mean shrunk toward a prior (normally the event mean).
+
+    posterior = (sum(conf * score) + k * prior) / (sum(conf) + k), so thin or
+    low-confidence panels are pulled toward the event mean while confident
+    panels barely move. The prior defaults to the criterion midpoint.
+    """
+    _, weights = _weights_for(matrix, confidences)
+    if prior_means is None:
+        prior_means = np.asarray(max_scores, dtype=float) / 2 if max_scores is not None else np.zeros(matrix.shape[-1])
+    prior = np.asarray(prior_means, dtype=float)
+    mass = weights.sum(axis=-2)
+    total = (weights * np.where(np.isnan(matrix), 0.0, matrix)).sum(axis=-2)
+    return (total + prior_strength * prior) / (mass + prior_strength)
+
+
+AGGREGATION_STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {
+    "mean": mean_strategy,
+    "confidence_weighted": confidence_weighted_strategy,
+    "median": median_strategy,
+    "trimmed_mean": trimmed_mean_strategy,
+    "bayesian_shrinkage": bayesian_shrinkage_strategy,
+}
+
+DEFAULT_STRATEGY = os.getenv("CONSENSUS_STRATEGY", "confidence_weighted")
+
+
+def get_strategy(name: str) -> Callable[..., np.ndarray]:
+    """
+    Look up an aggregation strategy by name.
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    try:
+        return AGGREGATION_STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown consensus strategy '{name}'. Available: {', '.join(AGGREGATION_STRATEGIES)}")
+
+
+def apply_strategy(matrix: np.ndarray, confidences: Optional[np.ndarray] = None, name: str = DEFAULT_STRATEGY,
+                   **params) -> np.ndarray:
+    """
+    Compute per-criterion consensus with the named strategy.
+
+    Works on (evaluations x criteria) matrices and on batched
+    (submissions x evaluations x criteria) tensors. Criteria without any
+    score come back as NaN, except under Bayesian shrinkage which falls back
+    to the prior.
+    """
+    return get_strategy(name)(np.asarray(matrix, dtype=float), confidences, **params)
+
+
+class EventStrategyRegistry:
+    """
+    Per-event consensus strategy selection and running event means.
+
+    Selections can be preconfigured with the CONSENSUS_EVENT_STRATEGIES
+    environment variable, e.g. '{"finals": {"name": "trimmed_mean", "trim_fraction": 0.2}}'
+    or '{"finals": "median"}'.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._strategies: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._load_from_env()
+
+    def _load_from_env(self) -> None:
+        raw = os.getenv("CONSENSUS_EVENT_STRATEGIES")
+        if not raw:
+            return
+        try:
+            for event_id, spec in json.loads(raw).items():
+                if isinstance(spec, str):
+                    self.set_strategy(event_id, spec)
+                else:
+                    spec = dict(spec)
+                    self.set_strategy(event_id, spec.pop("name"), **spec)
+        except Exception as e:
+            logger.error(f"Invalid CONSENSUS_EVENT_STRATEGIES: {e}")
+
+    def set_strategy(self, event_id: str, name: str, **params) -> None:
+        """Select the consensus strategy (and its parameters) for an event."""
+        get_strategy(name)
+        with self.lock:
+            self._strategies[event_id] = (name, params)
+        logger.info(f"Consensus strategy for event {event_id} set to {name}")
+
+    def get_strategy(self, event_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+        """Return (strategy name, params) for an event, falling back to DEFAULT_STRATEGY."""
+        with self.lock:
+            if event_id and event_id in self._strategies:
+                name, params = self._strategies[event_id]
+                return name, dict(params)
+        return DEFAULT_STRATEGY, {}
+
+    def record_consensus(self, event_id: Optional[str], consensus: np.ndarray) -> None:
+        """Fold a submission's consensus vector into the running event mean."""
+        if not event_id:
+            return
+        consensus = np.nan_to_num(np.asarray(consensus, dtype=float))
+        with self.lock:
+            if event_id in self._sums:
+                self._sums[event_id] = self._sums[event_id] + consensus
+                self._counts[event_id] += 1
+            else:
+                self._sums[event_id] = consensus.copy()
+                self._counts[event_id] = 1
+
+    def event_mean(self, event_id: Optional[str]) -> Optional[np.ndarray]:
+        """Return the running per-criterion mean for an event, or None if unseen."""
+        with self.lock:
+            if not event_id or event_id not in self._sums:
+                return None
+            return self._sums[event_id] / self._counts[event_id]
+
+    def resolve(self, event_id: Optional[str] = None, name: Optional[str] = None,
+                **params) -> Tuple[str, Dict[str, Any]]:
+        """
+        Resolve the strategy to use for an aggregation call.
+
+        An explicit name wins over the event selection. Bayesian shrinkage
+        gets the running event mean as its prior unless one is given.
+        """
+        if name is None:
+            name, event_params = self.get_strategy(event_id)
+            params = {**event_params, **params}
+        if name == "bayesian_shrinkage" and params.get("prior_means") is None:
+            prior = self.event_mean(event_id)
+            if prior is not None:
+                params["prior_means"] = prior
+        return name, params
+
+
+# Global registry instance
+event_strategies = EventStrategyRegistry()
@@ -2,18 +2,26 @@
 Consensus Aggregation Logic
 Handles the aggregation of multiple judge scores into a final consensus score
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import numpy as np
 from .rubric import CRITERIA, WEIGHTS
+from .score_matrix import CRITERIA_ORDER, scores_to_matrix, aggregate_score_matrix
+from .aggregation_strategies import event_strategies
 import logging
 
 logger = logging.getLogger(__name__)
 
 class ConsensusAggregator:
-    def __init__(self):
+    def __init__(self, strategy: Optional[str] = None, **strategy_params):
         """
         Initialize the consensus aggregator.
+        
+        Args:
+            strategy: Aggregation strategy name; None uses the per-event selection
+            **strategy_params: Extra parameters for the strategy (e.g. trim_fraction)
         """
-        pass
+        self.strategy = strategy
+        self.strategy_params = strategy_params
 
     def calculate_weighted_average(self, scores: List[Dict[str, float]]) -> Dict[str, Any]:
         """
@@ -32,36 +40,13 @@ class ConsensusAggregator:
                 "reasoning": "No scores provided for aggregation"
             }
         
-        # Initialize aggregated scores
-        aggregated_scores = {criterion: [] for criterion in CRITERIA.keys()}
-        
-        # Collect all scores for each criterion
-        for score_set in scores:
-            for criterion in CRITERIA.keys():
-                if criterion in score_set:
-                    aggregated_scores[criterion].append(score_set[criterion])
-        
-        # Calculate average for each criterion
-        consensus_scores = {}
-        total_weighted_score = 0
-        total_max_score = 0
-        
-        for criterion, score_list in aggregated_scores.items():
-            if score_list:  # If there are scores for this criterion
-                avg_score = sum(score_list) / len(score_list)
-                consensus_scores[criterion] = round(avg_score, 2)
-                
-                # Calculate weighted contribution
-                weight = WEIGHTS[criterion]
-                weighted_contribution = avg_score * weight
-                total_weighted_score += weighted_contribution
-                total_max_score += CRITERIA[criterion] * weight
-            else:
-                # If no scores for this criterion, set to 0
-                consensus_scores[criterion] = 0
-        
-        # Calculate overall consensus score (normalized to 100)
-        overall_score = (total_weighted_score / total_max_score) * 100 if total_max_score > 0 else 0
+        # Aggregate the (evaluations x criteria) matrix in one vectorized pass
+        result = aggregate_score_matrix(scores_to_matrix(scores), detect_outliers=False)
+        consensus_scores = {
+            criterion: round(float(mean), 2) if count else 0
+            for criterion, mean, count in zip(CRITERIA_ORDER, result["means"], result["counts"])
+        }
+        overall_score = float(result["overall_score"])
         
         return {
             "criteria": consensus_scores,
@@ -70,12 +55,16 @@ class ConsensusAggregator:
             "individual_count": len(scores)
         }
 
-    def calculate_consensus_with_confidence(self, evaluations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def calculate_consensus_with_confidence(self, evaluations: List[Dict[str, Any]], event_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Calculate consensus taking into account confidence scores of each evaluation.
         
+        Uses the aggregator's strategy, or the one selected for event_id
+        (confidence-weighted mean by default).
+        
         Args:
             evaluations: List of evaluation dictionaries that include scores and confidence
+            event_id: Optional event ID used to select the strategy and prior
             
         Returns:
             Dictionary with consensus scores, confidence-adjusted reasoning
@@ -105,16 +94,33 @@ class ConsensusAggregator:
                 "reasoning": "No valid scores found in evaluations"
             }
         
-        # Calculate weighted average considering confidence
-        consensus_result = self.calculate_weighted_average(scores)
+        # Aggregate the criterion matrix with the selected strategy
+        strategy, params = event_strategies.resolve(event_id, self.strategy, **self.strategy_params)
+        result = aggregate_score_matrix(
+            scores_to_matrix(scores),
+            confidences=np.array(confidences, dtype=float),
+            detect_outliers=False,
+            strategy=strategy,
+            strategy_params=params
+        )
+        event_strategies.record_consensus(event_id, result["consensus"])
+        
+        consensus_scores = {
+            criterion: round(float(value), 2)
+            for criterion, value in zip(CRITERIA_ORDER, result["consensus"])
+        }
         
-        # Calculate average confidence
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        # Calculate average confidence over the evaluations that reported one
+        reported = [c for c in confidences if c is not None]
+        avg_confidence = sum(reported) / len(reported) if reported else None
         
         return {
-            **consensus_result,
-            "confidence": round(avg_confidence, 2),
-            "reasoning": f"Weighted average of {len(scores)} evaluations with confidence adjustment"
+            "criteria": consensus_scores,
+            "overall_score": round(float(result["consensus_overall_score"]), 2),
+            "individual_count": len(scores),
+            "strategy": strategy,
+            "confidence": round(avg_confidence, 2) if avg_confidence is not None else None,
+            "reasoning": f"{strategy.replace('_', ' ').capitalize()} consensus of {len(scores)} evaluations"
         }
 
     def calculate_disagreement_metrics(self, scores: List[Dict[str, float]]) -> Dict[str, Any]:
@@ -133,21 +139,15 @@ class ConsensusAggregator:
                 "notes": "Insufficient scores to calculate disagreement metrics"
             }
         
-        disagreement_metrics = {}
+        result = aggregate_score_matrix(scores_to_matrix(scores), detect_outliers=False)
         
-        for criterion in CRITERIA.keys():
-            criterion_scores = [score_set.get(criterion, 0) for score_set in scores if criterion in score_set]
-            
-            if len(criterion_scores) > 1:
-                # Calculate standard deviation as a measure of disagreement
-                mean_score = sum(criterion_scores) / len(criterion_scores)
-                variance = sum((score - mean_score) ** 2 for score in criterion_scores) / len(criterion_scores)
-                std_dev = variance ** 0.5
-                
+        disagreement_metrics = {}
+        for i, criterion in enumerate(CRITERIA_ORDER):
+            if result["counts"][i] > 1:
                 disagreement_metrics[criterion] = {
-                    "std_deviation": round(std_dev, 2),
-                    "range": round(max(criterion_scores) - min(criterion_scores), 2),
-                    "coefficient_of_variation": round(std_dev / mean_score if mean_score != 0 else 0, 2)
+                    "std_deviation": round(float(result["std"][i]), 2),
+                    "range": round(float(result["range"][i]), 2),
+                    "coefficient_of_variation": round(float(result["coefficient_of_variation"][i]), 2)
                 }
             else:
                 disagreement_metrics[criterion] = {
@@ -168,20 +168,22 @@ class ConsensusAggregator:
         }
 
 
-def aggregate_consensus(evaluations: List[Dict[str, Any]]) -> Dict[str, Any]:
+def aggregate_consensus(evaluations: List[Dict[str, Any]], event_id: Optional[str] = None, strategy: Optional[str] = None) -> Dict[str, Any]:
     """
     Public function to aggregate multiple evaluations into a consensus.
     
     Args:
         evaluations: List of evaluation dictionaries containing scores and confidence
+        event_id: Optional event ID used to select the aggregation strategy
+        strategy: Optional strategy name overriding the event selection
         
     Returns:
         Dictionary with consensus scores, confidence, and reasoning
     """
-    aggregator = ConsensusAggregator()
+    aggregator = ConsensusAggregator(strategy)
     
     # Calculate consensus with confidence
-    consensus_result = aggregator.calculate_consensus_with_confidence(evaluations)
+    consensus_result = aggregator.calculate_consensus_with_confidence(evaluations, event_id)
     
     # Calculate disagreement metrics
     scores_only = [eval_data["scores"] for eval_data in evaluations if "scores" in eval_data]
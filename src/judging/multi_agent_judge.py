@@ -3,20 +3,96 @@ Multi-Agent Judging System
 Implements 3 specialized judge agents for competition-grade judging
 """
 import os
+import threading
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 import logging
 from .rubric import CRITERIA, WEIGHTS
+from .score_matrix import CRITERIA_ORDER, scores_to_matrix, aggregate_score_matrix
+from .aggregation_strategies import event_strategies
+from .consensus import ConsensusAggregator
+from .response_parser import RUBRIC_SCHEMA, JudgeResponseParseError, parse_judge_response, build_repair_prompt
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-class MultiAgentJudge:
+
+class AdaptiveJudgingStats:
+    """Per-event counters for adaptive (early-stop) judging."""
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self._events: Dict[str, Dict[str, int]] = {}
+
+    def record(self, event_id: Optional[str], judges_available: int, judges_used: int) -> None:
+        """
+        Record one adaptive evaluation.
+
+        Args:
+            event_id: Event the submission belongs to
+            judges_available: Number of judges on the full panel
+            judges_used: Number of judges actually called
+        """
+        key = event_id or "default_event"
+        with self.lock:
+            stats = self._events.setdefault(key, {
+                "submissions": 0,
+                "judge_calls": 0,
+                "calls_saved": 0,
+                "escalations": 0
+            })
+            stats["submissions"] += 1
+            stats["judge_calls"] += judges_used
+            stats["calls_saved"] += judges_available - judges_used
+            if judges_used > 2:
+                stats["escalations"] += 1
+
+    def get_stats(self, event_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get adaptive judging stats for one event, or for all events.
+
+        Returns:
+            Dictionary of counters plus the share of calls saved
+        """
+        with self.lock:
+            if event_id is not None:
+                events = {event_id: dict(self._events.get(event_id, {}))}
+            else:
+                events = {key: dict(value) for key, value in self._events.items()}
+
+        for stats in events.values():
+            calls = stats.get("judge_calls", 0) + stats.get("calls_saved", 0)
+            stats["calls_saved_ratio"] = round(stats.get("calls_saved", 0) / calls, 3) if calls else 0.0
+        return events[event_id] if event_id is not None else events
+
+    def reset(self) -> None:
+        with self.lock:
+            self._events.clear()
+
+
+# Global stats shared by every MultiAgentJudge instance
+adaptive_stats = AdaptiveJudgingStats()
+
+
+class MultiAgentJudge:
+    def __init__(self, adaptive: Optional[bool] = None, disagreement_threshold: Optional[float] = None):
         """
         Initialize the Multi-Agent Judging System with 3 specialized judge agents.
+        
+        Args:
+            adaptive: Run two judges first and only call more when they disagree
+                (defaults to the JUDGE_ADAPTIVE environment variable)
+            disagreement_threshold: Largest per-criterion std deviation tolerated before
+                escalating to another judge (defaults to JUDGE_DISAGREEMENT_THRESHOLD or 1.0)
         """
+        if adaptive is None:
+            adaptive = os.getenv("JUDGE_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+        if disagreement_threshold is None:
+            disagreement_threshold = float(os.getenv("JUDGE_DISAGREEMENT_THRESHOLD", "1.0"))
+        self.adaptive = adaptive
+        self.disagreement_threshold = disagreement_threshold
+        
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not found in environment variables")
@@ -43,6 +119,48 @@ class MultiAgentJudge:
             }
         }
 
+    def _call_llm(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Send a chat completion request and return the message content.
+        
+        Args:
+            messages: Chat messages to send
+            
+        Returns:
+            Raw response text
+        """
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=800
+        )
+        return response.choices[0].message.content
+
+    def _parse_with_repair(self, messages: List[Dict[str, str]], evaluation_text: str) -> Dict[str, Any]:
+        """
+        Parse a judge response, issuing a single repair call if it is malformed.
+        
+        Args:
+            messages: The messages that produced evaluation_text
+            evaluation_text: Raw LLM response
+            
+        Returns:
+            Validated evaluation with clamped scores
+            
+        Raises:
+            JudgeResponseParseError: If the repaired response is still invalid
+        """
+        try:
+            return parse_judge_response(evaluation_text, RUBRIC_SCHEMA)
+        except JudgeResponseParseError as e:
+            logger.warning(f"Judge response failed validation ({e}), requesting repair")
+            repair_messages = messages + [
+                {"role": "assistant", "content": evaluation_text},
+                {"role": "user", "content": build_repair_prompt(evaluation_text, e, RUBRIC_SCHEMA)}
+            ]
+            return parse_judge_response(self._call_llm(repair_messages), RUBRIC_SCHEMA)
+
     def _get_specialized_evaluation(self, judge_id: str, submission_text: str) -> Dict[str, Any]:
         """
         Get evaluation from a specialized judge agent.
@@ -92,30 +210,19 @@ class MultiAgentJudge:
             }}
             """
             
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": f"You are an expert {judge_info['name']} evaluating hackathon submissions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=800
-            )
-            
-            # Extract the response
-            evaluation_text = response.choices[0].message.content
+            messages = [
+                {"role": "system", "content": f"You are an expert {judge_info['name']} evaluating hackathon submissions."},
+                {"role": "user", "content": prompt}
+            ]
+            evaluation_text = self._call_llm(messages)
             logger.info(f"LLM evaluation completed by {judge_info['name']}: {evaluation_text}")
-            
-            # For now, return mock structured response
-            # In production, you would properly parse the JSON response
-            specialty_score = 8 if specialty == "tech_depth" else 7
-            other_scores = {criterion: 7 if criterion != specialty else specialty_score for criterion in CRITERIA.keys()}
-            
+
+            parsed = self._parse_with_repair(messages, evaluation_text)
+
             return {
-                "scores": other_scores,
-                "explanation": f"Evaluation by {judge_info['name']}: {evaluation_text}",
-                "confidence": 0.85
+                "scores": parsed["scores"],
+                "explanation": f"Evaluation by {judge_info['name']}: {parsed['explanation']}",
+                "confidence": parsed["confidence"]
             }
             
         except Exception as e:
@@ -128,9 +235,30 @@ class MultiAgentJudge:
                 "confidence": 0.6
             }
 
+    def _max_disagreement(self, individual_evaluations: Dict[str, Any]) -> float:
+        """
+        Largest per-criterion standard deviation across the judges so far.
+        
+        Args:
+            individual_evaluations: Evaluations collected so far
+            
+        Returns:
+            Maximum std deviation over all criteria
+        """
+        scores = [eval_data["evaluation"]["scores"] for eval_data in individual_evaluations.values()]
+        metrics = ConsensusAggregator().calculate_disagreement_metrics(scores)
+        return max(
+            (m["std_deviation"] for m in metrics.get("criterion_metrics", {}).values()),
+            default=0
+        )
+
     def evaluate_submission(self, submission_text: str, team_id: str = None, tenant_id: str = None, event_id: str = None) -> Dict[str, Any]:
         """
         Evaluate a submission using all three specialized judge agents.
+        
+        In adaptive mode the first two judges run first and the remaining
+        judges are only called, one at a time, while their disagreement
+        exceeds the threshold.
 
         Args:
             submission_text: The submission text to evaluate
@@ -143,17 +271,26 @@ class MultiAgentJudge:
         """
         logger.info(f"Multi-agent evaluation started for team {team_id}")
 
-        # Collect evaluations from all judges
+        # Collect evaluations from the judges
         individual_evaluations = {}
         for judge_id in self.judges.keys():
+            if self.adaptive and len(individual_evaluations) >= 2:
+                disagreement = self._max_disagreement(individual_evaluations)
+                if disagreement <= self.disagreement_threshold:
+                    logger.info(f"Judges agree (max std {disagreement}) - skipping remaining judges for team {team_id}")
+                    break
+                logger.info(f"Judges disagree (max std {disagreement}) - calling {judge_id} for team {team_id}")
             evaluation = self._get_specialized_evaluation(judge_id, submission_text)
             individual_evaluations[judge_id] = {
                 "judge_info": self.judges[judge_id],
                 "evaluation": evaluation
             }
 
+        if self.adaptive:
+            adaptive_stats.record(event_id, len(self.judges), len(individual_evaluations))
+
         # Calculate consensus scores
-        consensus_scores = self._calculate_consensus_scores(individual_evaluations)
+        consensus_scores = self._calculate_consensus_scores(individual_evaluations, event_id)
 
         # Create result
         result = {
@@ -168,49 +305,44 @@ class MultiAgentJudge:
         logger.info(f"Multi-agent evaluation completed for team {team_id}")
         return result
 
-    def _calculate_consensus_scores(self, individual_evaluations: Dict[str, Any]) -> Dict[str, Any]:
+    def _calculate_consensus_scores(self, individual_evaluations: Dict[str, Any], event_id: str = None) -> Dict[str, Any]:
         """
         Calculate consensus scores from individual judge evaluations.
         
         Args:
             individual_evaluations: Dictionary with evaluations from all judges
+            event_id: Optional event ID used to select the aggregation strategy
             
         Returns:
             Dictionary with consensus scores and reasoning
         """
-        # Collect scores for each criterion
-        criterion_scores = {criterion: [] for criterion in CRITERIA.keys()}
-        
-        for judge_id, eval_data in individual_evaluations.items():
-            eval_scores = eval_data["evaluation"]["scores"]
-            for criterion, score in eval_scores.items():
-                if criterion in criterion_scores:
-                    criterion_scores[criterion].append(score)
-        
-        # Calculate weighted average for each criterion
-        final_scores = {}
-        total_weighted_score = 0
-        total_max_score = 0
+        # Scores outside the rubric are ignored by the matrix conversion
+        score_sets = [eval_data["evaluation"]["scores"] for eval_data in individual_evaluations.values()]
+        confidences = [eval_data["evaluation"].get("confidence") for eval_data in individual_evaluations.values()]
+        strategy, params = event_strategies.resolve(event_id)
+        result = aggregate_score_matrix(
+            scores_to_matrix(score_sets),
+            confidences=confidences,
+            count_missing_weight=True,
+            detect_outliers=False,
+            strategy=strategy,
+            strategy_params=params
+        )
+        event_strategies.record_consensus(event_id, result["consensus"])
         
-        for criterion, scores in criterion_scores.items():
-            # Calculate average of all judge scores for this criterion
-            avg_score = sum(scores) / len(scores) if scores else 0
-            final_scores[criterion] = round(avg_score, 2)
-            
-            # Calculate weighted contribution
-            weight = WEIGHTS[criterion]
-            weighted_contribution = avg_score * weight
-            total_weighted_score += weighted_contribution
-            total_max_score += CRITERIA[criterion] * weight
-        
-        # Calculate overall consensus score (normalized to 100)
-        consensus_score = (total_weighted_score / total_max_score) * 100 if total_max_score > 0 else 0
+        final_scores = {
+            criterion: round(float(value), 2)
+            for criterion, value in zip(CRITERIA_ORDER, result["consensus"])
+        }
+        total_max_score = float(result["total_max_score"])
+        consensus_score = float(result["consensus_overall_score"])
         
         return {
             "criteria": final_scores,
             "overall_score": round(consensus_score, 2),
             "max_possible_score": total_max_score * 100,
-            "reasoning_chain": "Weighted average of all three judge agents' scores"
+            "strategy": strategy,
+            "reasoning_chain": f"Weighted average of {'all three' if len(score_sets) == 3 else len(score_sets)} judge agents' scores ({strategy.replace('_', ' ')} consensus)"
         }
 
 
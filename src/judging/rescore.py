@@ -0,0 +1,221 @@
+"""
+Offline Rescore Job
+Recomputes stored judgment totals after rubric WEIGHTS change, without calling any LLM
+"""
+import json
+import os
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+from . import rubric
+from .score_matrix import CRITERIA_ORDER, scores_to_matrix, aggregate_score_matrix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = "data/rescore_checkpoint.json"
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Stored criteria scores are rounded to 2 dp, so a recomputed total can drift
+# by less than this without the weights having changed
+TOTAL_TOLERANCE = 0.005
+
+# Legacy judgments only store these fields; "quality" holds the tech_depth score
+LEGACY_FIELD_MAP = {
+    "clarity": "clarity",
+    "quality": "tech_depth",
+    "innovation": "innovation"
+}
+
+
+def stored_criteria_scores(judgment: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Return the per-criterion consensus scores stored on a judgment.
+
+    Args:
+        judgment: Judgment document from db.judgments
+
+    Returns:
+        Dictionary mapping criterion to score
+    """
+    criteria_scores = judgment.get("criteria_scores")
+    if isinstance(criteria_scores, dict) and criteria_scores:
+        return criteria_scores
+    return {
+        criterion: judgment[field]
+        for field, criterion in LEGACY_FIELD_MAP.items()
+        if judgment.get(field) is not None
+    }
+
+
+class RescoreJob:
+    """
+    Streams judgments through a cursor and writes a new version for each
+    submission whose total changes under the current rubric WEIGHTS.
+
+    Only the latest version per submission is rescored. Progress is
+    checkpointed after every batch, so an interrupted run can be resumed
+    with the same run_id. A submission whose latest version was written by
+    this run is already done, which covers a crash between a batch's write
+    and its checkpoint; where the unique (submission_hash, version) index
+    exists, a version inserted meanwhile by someone else is counted as done
+    as well. Totals are recomputed the way the live judge path computes
+    them, and a total within TOTAL_TOLERANCE of the stored one is left alone.
+    """
+
+    def __init__(self, db, batch_size: int = 500, checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+                 tenant_id: Optional[str] = None, event_id: Optional[str] = None):
+        """
+        Initialize the rescore job.
+
+        Args:
+            db: Database connection
+            batch_size: Judgments recomputed and written per bulk_write
+            checkpoint_path: File used to record progress
+            tenant_id: Optional tenant filter
+            event_id: Optional event filter
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.tenant_id = tenant_id
+        self.event_id = event_id
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            if os.path.exists(self.checkpoint_path):
+                with open(self.checkpoint_path, "r") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable rescore checkpoint: {e}")
+        return None
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _query(self, after_hash: Optional[str]) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if self.tenant_id:
+            query["tenant_id"] = self.tenant_id
+        if self.event_id:
+            query["event_id"] = self.event_id
+        if after_hash:
+            query["submission_hash"] = {"$gt": after_hash}
+        return query
+
+    def _rescore_batch(self, batch: List[Dict[str, Any]], run_id: str) -> List[InsertOne]:
+        """Recompute totals for a batch in one vectorized pass and build the new versions."""
+        matrix = scores_to_matrix([stored_criteria_scores(doc) for doc in batch])
+        weights = np.array([rubric.WEIGHTS.get(c, 0.0) for c in CRITERIA_ORDER], dtype=float)
+        max_scores = np.array([rubric.CRITERIA.get(c, 0.0) for c in CRITERIA_ORDER], dtype=float)
+        # Missing criteria count towards the maximum, as in MultiAgentJudge._calculate_consensus_scores
+        totals = aggregate_score_matrix(matrix[:, None, :], weights=weights, max_scores=max_scores,
+                                        count_missing_weight=True, detect_outliers=False)["overall_score"]
+
+        operations = []
+        now = int(time.time())
+        for doc, total in zip(batch, np.round(totals, 2).tolist()):
+            stored = doc.get("total_score")
+            if isinstance(stored, (int, float)) and abs(stored - total) < TOTAL_TOLERANCE:
+                continue
+            new_doc = {key: value for key, value in doc.items() if key != "_id"}
+            new_doc.update({
+                "total_score": total,
+                "version": doc.get("version", 1) + 1,
+                "rescored_from_version": doc.get("version", 1),
+                "rescore_run_id": run_id,
+                "weights": dict(rubric.WEIGHTS),
+                "timestamp": now
+            })
+            operations.append(InsertOne(new_doc))
+        return operations
+
+    def run(self, run_id: Optional[str] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Run (or resume) the rescore job.
+
+        Args:
+            run_id: Identifier for this run; resuming requires the same id
+            resume: Continue from the checkpoint when it belongs to run_id
+
+        Returns:
+            Summary with run_id, processed and updated counts, and duration
+        """
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint and (run_id is None or checkpoint.get("run_id") == run_id) and not checkpoint.get("completed"):
+            logger.info(f"Resuming rescore run {checkpoint['run_id']} after {checkpoint['last_submission_hash']}")
+        else:
+            checkpoint = {
+                "run_id": run_id or uuid.uuid4().hex,
+                "last_submission_hash": None,
+                "processed": 0,
+                "updated": 0,
+                "completed": False
+            }
+        run_id = checkpoint["run_id"]
+        start = time.time()
+
+        cursor = self.db.judgments.find(
+            self._query(checkpoint["last_submission_hash"]),
+            sort=[("submission_hash", 1), ("version", -1)],
+            batch_size=self.batch_size
+        )
+
+        batch: List[Dict[str, Any]] = []
+        previous_hash = checkpoint["last_submission_hash"]
+
+        def flush():
+            operations = self._rescore_batch(batch, run_id)
+            inserted = 0
+            if operations:
+                try:
+                    inserted = self.db.judgments.bulk_write(operations, ordered=False).inserted_count
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+                        raise
+                    inserted = e.details.get("nInserted", len(operations) - len(errors))
+                    logger.info(f"Rescore run {run_id}: {len(errors)} version(s) already present, skipped")
+            checkpoint["processed"] += len(batch)
+            checkpoint["updated"] += inserted
+            checkpoint["last_submission_hash"] = batch[-1]["submission_hash"]
+            self._save_checkpoint(checkpoint)
+            batch.clear()
+
+        for doc in cursor:
+            # Sorted by version descending, so the first document per hash is the latest
+            if doc.get("submission_hash") == previous_hash:
+                continue
+            previous_hash = doc.get("submission_hash")
+            # Latest version already written by this run: the submission is done
+            if doc.get("rescore_run_id") == run_id:
+                continue
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+
+        checkpoint["completed"] = True
+        self._save_checkpoint(checkpoint)
+
+        summary = {
+            "run_id": run_id,
+            "processed": checkpoint["processed"],
+            "updated": checkpoint["updated"],
+            "duration_seconds": round(time.time() - start, 3)
+        }
+        logger.info(f"Rescore run {run_id} completed: {summary}")
+        return summary
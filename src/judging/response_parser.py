@@ -0,0 +1,208 @@
+"""
+Judge Response Parser
+Extracts and validates the JSON block returned by judge LLMs
+"""
+import json
+import re
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from .rubric import CRITERIA
+
+logger = logging.getLogger(__name__)
+
+# Matches a fenced ```json ... ``` (or bare ```) block
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+
+
+class JudgeResponseParseError(ValueError):
+    """Raised when an LLM judge response cannot be parsed or validated."""
+    pass
+
+
+def extract_json_block(text: str) -> Dict[str, Any]:
+    """
+    Extract the first JSON object from an LLM response.
+
+    Tries, in order: the whole text, a fenced code block, and the first
+    balanced {...} span. The common case (model returns bare JSON) costs a
+    single json.loads call.
+
+    Args:
+        text: Raw LLM response text
+
+    Returns:
+        Parsed JSON object
+
+    Raises:
+        JudgeResponseParseError: If no JSON object can be found
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise JudgeResponseParseError("Empty response")
+
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+
+    match = _FENCE_RE.search(text)
+    if match:
+        try:
+            data = json.loads(match.group(1))
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+
+    # Fall back to scanning for the first balanced object
+    start = text.find("{")
+    while start != -1:
+        try:
+            data, _ = json.JSONDecoder().raw_decode(text, start)
+            if isinstance(data, dict):
+                return data
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+
+    raise JudgeResponseParseError("No JSON object found in response")
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """Coerce a score value (number, numeric string or {"score": n}) to float."""
+    if isinstance(value, dict):
+        value = value.get("score")
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+class ScoreSchema:
+    """
+    Validator compiled once from a criteria -> max score mapping.
+
+    Scores may be nested under ``scores_key`` (multi-agent format) or sit at
+    the top level of the object (single-judge format). Each score may be a
+    number or an object with a "score" field. Scores are clamped to
+    [0, max] and confidence to [0, 1].
+    """
+
+    def __init__(self, criteria: Dict[str, float], scores_key: Optional[str] = "scores",
+                 explanation_keys: Tuple[str, ...] = ("explanation", "overall_reasoning", "reasoning"),
+                 default_confidence: Optional[float] = 0.5):
+        """
+        Compile the schema.
+
+        Args:
+            criteria: Mapping of criterion name to maximum score
+            scores_key: Key holding the scores object, or None for top-level scores
+            explanation_keys: Keys checked (in order) for the free-text explanation
+            default_confidence: Confidence used when the model omits it; None leaves it
+                missing for the aggregation to handle
+        """
+        self._items = tuple((name, float(max_score)) for name, max_score in criteria.items())
+        self.scores_key = scores_key
+        self.explanation_keys = explanation_keys
+        self.default_confidence = default_confidence
+
+    @property
+    def criteria(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self._items)
+
+    def describe(self) -> str:
+        """Return a compact JSON template used in repair prompts."""
+        scores = {name: f"<number 0-{int(max_score)}>" for name, max_score in self._items}
+        template = {self.scores_key: scores} if self.scores_key else dict(scores)
+        template.update({"explanation": "<brief explanation>", "confidence": "<number 0-1>"})
+        return json.dumps(template)
+
+    def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate and normalise a parsed response.
+
+        Args:
+            data: Parsed JSON object
+
+        Returns:
+            Dictionary with "scores", "explanation" and "confidence"
+
+        Raises:
+            JudgeResponseParseError: If a criterion is missing or not numeric
+        """
+        source = data.get(self.scores_key) if self.scores_key else data
+        if not isinstance(source, dict):
+            raise JudgeResponseParseError(f"Missing '{self.scores_key}' object")
+
+        scores = {}
+        for name, max_score in self._items:
+            value = _to_number(source.get(name))
+            if value is None or value != value:  # reject missing and NaN
+                raise JudgeResponseParseError(f"Missing or non-numeric score for '{name}'")
+            scores[name] = min(max(value, 0.0), max_score)
+
+        explanation = ""
+        for key in self.explanation_keys:
+            if isinstance(data.get(key), str):
+                explanation = data[key]
+                break
+
+        confidence = _to_number(data.get("confidence"))
+        if confidence is None or confidence != confidence:
+            confidence = self.default_confidence
+
+        return {
+            "scores": scores,
+            "explanation": explanation,
+            "confidence": min(max(confidence, 0.0), 1.0) if confidence is not None else None
+        }
+
+
+# Default schema derived from the competition rubric
+RUBRIC_SCHEMA = ScoreSchema(CRITERIA)
+
+
+def parse_judge_response(text: str, schema: ScoreSchema = RUBRIC_SCHEMA) -> Dict[str, Any]:
+    """
+    Parse an LLM judge response into validated, clamped scores.
+
+    Args:
+        text: Raw LLM response text
+        schema: Compiled schema to validate against
+
+    Returns:
+        Dictionary with "scores", "explanation" and "confidence"
+
+    Raises:
+        JudgeResponseParseError: If the response cannot be parsed or validated
+    """
+    return schema.validate(extract_json_block(text))
+
+
+def build_repair_prompt(bad_response: str, error: Exception, schema: ScoreSchema = RUBRIC_SCHEMA) -> str:
+    """
+    Build a targeted prompt asking the model to fix its previous answer.
+
+    Args:
+        bad_response: The response that failed to parse
+        error: The parse error raised for it
+        schema: Schema the corrected response must satisfy
+
+    Returns:
+        Prompt text for the repair call
+    """
+    return (
+        f"Your previous answer could not be parsed: {error}.\n"
+        f"Previous answer:\n{bad_response}\n\n"
+        f"Respond with ONLY a JSON object in exactly this format, no prose:\n{schema.describe()}"
+    )
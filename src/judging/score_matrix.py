@@ -0,0 +1,226 @@
+"""
+Vectorized Score Aggregation
+NumPy-backed consensus and disagreement metrics over (evaluations x criteria) score matrices
+"""
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from .rubric import CRITERIA, WEIGHTS
+from .aggregation_strategies import masked_median, apply_strategy, fill_missing_confidences
+
+# Column order used for every score matrix
+CRITERIA_ORDER = tuple(CRITERIA.keys())
+
+
+def scores_to_matrix(score_sets: Sequence[Dict[str, float]], criteria: Sequence[str] = CRITERIA_ORDER) -> np.ndarray:
+    """
+    Convert a list of score dictionaries into an (evaluations x criteria) matrix.
+
+    Missing criteria are stored as NaN so they are ignored by the aggregation.
+
+    Args:
+        score_sets: List of dictionaries mapping criterion to score
+        criteria: Column order
+
+    Returns:
+        Float array of shape (len(score_sets), len(criteria))
+    """
+    matrix = np.full((len(score_sets), len(criteria)), np.nan)
+    for row, score_set in enumerate(score_sets):
+        for col, criterion in enumerate(criteria):
+            value = score_set.get(criterion)
+            if value is not None:
+                matrix[row, col] = value
+    return matrix
+
+
+def stack_score_matrices(batch: Sequence[Sequence[Dict[str, float]]], criteria: Sequence[str] = CRITERIA_ORDER) -> np.ndarray:
+    """
+    Build a (submissions x evaluations x criteria) tensor from per-submission score lists.
+
+    Submissions with fewer evaluations are padded with NaN rows.
+
+    Args:
+        batch: One list of score dictionaries per submission
+        criteria: Column order
+
+    Returns:
+        Float array of shape (len(batch), max_evaluations, len(criteria))
+    """
+    max_evals = max((len(score_sets) for score_sets in batch), default=0)
+    tensor = np.full((len(batch), max_evals, len(criteria)), np.nan)
+    for i, score_sets in enumerate(batch):
+        if score_sets:
+            tensor[i, :len(score_sets)] = scores_to_matrix(score_sets, criteria)
+    return tensor
+
+
+def criteria_vectors(criteria: Sequence[str] = CRITERIA_ORDER):
+    """Return (weights, max_scores) arrays aligned with the given column order."""
+    weights = np.array([WEIGHTS.get(c, 0.0) for c in criteria], dtype=float)
+    max_scores = np.array([CRITERIA.get(c, 0.0) for c in criteria], dtype=float)
+    return weights, max_scores
+
+
+def aggregate_score_matrix(
+    matrix: np.ndarray,
+    confidences: Optional[np.ndarray] = None,
+    weights: Optional[np.ndarray] = None,
+    max_scores: Optional[np.ndarray] = None,
+    outlier_fraction: float = 0.25,
+    count_missing_weight: bool = False,
+    detect_outliers: bool = True,
+    strategy: Optional[str] = None,
+    strategy_params: Optional[Dict[str, Any]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute consensus and disagreement metrics for one submission or a batch in a single pass.
+
+    The evaluation axis is always axis -2 and the criteria axis is -1, so
+    ``matrix`` may be (evaluations x criteria) or (submissions x evaluations x criteria).
+    NaN entries are treated as missing scores.
+
+    A score is flagged as an outlier when at least three judges scored the
+    criterion and its distance from their median exceeds ``outlier_fraction``
+    of the criterion maximum. A fixed gap is used rather than a z-score or
+    MAD because with three judges a single outlier inflates the spread
+    estimate enough to hide itself.
+
+    Args:
+        matrix: Score matrix or tensor
+        confidences: Optional per-evaluation confidences, shape matrix.shape[:-1]; missing
+            (None or NaN) entries count as the panel's mean reported confidence
+        weights: Criterion weights (defaults to the rubric WEIGHTS)
+        max_scores: Criterion maxima (defaults to the rubric CRITERIA)
+        outlier_fraction: Minimum gap from the median, as a fraction of the criterion max
+        count_missing_weight: Count criteria with no scores towards the maximum possible score
+        detect_outliers: Compute outlier flags (skipped by callers that only need the metrics)
+        strategy: Optional aggregation strategy name (see aggregation_strategies)
+        strategy_params: Extra parameters for the strategy
+
+    Returns:
+        Dictionary of arrays: means, confidence_weighted_means, counts, std, range,
+        coefficient_of_variation, disagreement_score, overall_score,
+        confidence_weighted_overall_score, total_max_score and outliers (None when
+        detect_outliers is False); with a strategy, also consensus and
+        consensus_overall_score
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    confidences = fill_missing_confidences(confidences)
+    default_weights, default_max = criteria_vectors()
+    weights = default_weights if weights is None else np.asarray(weights, dtype=float)
+    max_scores = default_max if max_scores is None else np.asarray(max_scores, dtype=float)
+
+    valid = ~np.isnan(matrix)
+    filled = np.where(valid, matrix, 0.0)
+    counts = valid.sum(axis=-2)
+    safe_counts = np.maximum(counts, 1)
+
+    means = np.where(counts > 0, filled.sum(axis=-2) / safe_counts, 0.0)
+
+    # Population standard deviation, range and CV (zero when fewer than two scores)
+    deviations = np.where(valid, matrix - means[..., None, :], 0.0)
+    spread = counts > 1
+    std = np.where(spread, np.sqrt((deviations ** 2).sum(axis=-2) / safe_counts), 0.0)
+    highs = np.where(valid, matrix, -np.inf).max(axis=-2, initial=-np.inf)
+    lows = np.where(valid, matrix, np.inf).min(axis=-2, initial=np.inf)
+    value_range = np.where(spread, highs - lows, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(spread & (means != 0), std / np.where(means != 0, means, 1.0), 0.0)
+
+    # Confidence-weighted means fall back to plain means when no confidence mass is present
+    if confidences is not None:
+        conf = np.where(valid, np.asarray(confidences, dtype=float)[..., None], 0.0)
+        conf_mass = conf.sum(axis=-2)
+        cw_means = np.where(conf_mass > 0, (conf * filled).sum(axis=-2) / np.where(conf_mass > 0, conf_mass, 1.0), means)
+    else:
+        cw_means = means
+
+    # Rubric-weighted overall scores normalised to 100
+    present = counts > 0
+    counted = np.ones_like(present) if count_missing_weight else present
+    total_max = (max_scores * weights * counted).sum(axis=-1)
+    safe_total = np.where(total_max > 0, total_max, 1.0)
+    overall = np.where(total_max > 0, (means * weights * present).sum(axis=-1) / safe_total * 100, 0.0)
+    cw_overall = np.where(total_max > 0, (cw_means * weights * present).sum(axis=-1) / safe_total * 100, 0.0)
+
+    # Strategy consensus over the same matrix
+    consensus = None
+    consensus_overall = None
+    if strategy is not None:
+        consensus = apply_strategy(matrix, confidences, strategy, max_scores=max_scores, **(strategy_params or {}))
+        consensus = np.where(present, np.nan_to_num(consensus), 0.0)
+        consensus_overall = np.where(total_max > 0, (consensus * weights).sum(axis=-1) / safe_total * 100, 0.0)
+
+    # Median-gap outlier flags
+    outliers = None
+    if detect_outliers and matrix.shape[-2]:
+        medians = masked_median(matrix, counts)
+        abs_dev = np.where(valid, np.abs(matrix - medians[..., None, :]), 0.0)
+        outliers = valid & (counts[..., None, :] > 2) & (abs_dev > outlier_fraction * max_scores)
+    elif detect_outliers:
+        outliers = np.zeros(matrix.shape, dtype=bool)
+
+    return {
+        "means": means,
+        "confidence_weighted_means": cw_means,
+        "counts": counts,
+        "std": std,
+        "range": value_range,
+        "coefficient_of_variation": cv,
+        "disagreement_score": std.mean(axis=-1) if std.shape[-1] else np.zeros(std.shape[:-1]),
+        "overall_score": overall,
+        "confidence_weighted_overall_score": cw_overall,
+        "total_max_score": total_max,
+        "outliers": outliers,
+        "consensus": consensus,
+        "consensus_overall_score": consensus_overall
+    }
+
+
+def aggregate_batch(
+    batch: Sequence[Sequence[Dict[str, float]]],
+    confidences: Optional[Sequence[Sequence[float]]] = None,
+    criteria: Sequence[str] = CRITERIA_ORDER
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate many submissions at once and return one summary dictionary per submission.
+
+    Args:
+        batch: One list of score dictionaries per submission
+        confidences: Optional per-submission lists of evaluation confidences
+        criteria: Column order
+
+    Returns:
+        List of dictionaries with criteria, overall_score, confidence-weighted
+        overall score, disagreement_score and outlier_count
+    """
+    if not batch:
+        return []
+    tensor = stack_score_matrices(batch, criteria)
+    conf = None
+    if confidences is not None:
+        conf = np.full(tensor.shape[:-1], np.nan)
+        for i, values in enumerate(confidences):
+            conf[i, :len(values)] = np.asarray(values, dtype=float)
+    weights, max_scores = criteria_vectors(criteria)
+    result = aggregate_score_matrix(tensor, conf, weights, max_scores)
+
+    means = np.round(result["means"], 2)
+    overall = np.round(result["overall_score"], 2)
+    cw_overall = np.round(result["confidence_weighted_overall_score"], 2)
+    disagreement = np.round(result["disagreement_score"], 2)
+    outlier_counts = result["outliers"].sum(axis=(-2, -1))
+
+    return [
+        {
+            "criteria": dict(zip(criteria, means[i].tolist())),
+            "overall_score": float(overall[i]),
+            "confidence_weighted_overall_score": float(cw_overall[i]),
+            "disagreement_score": float(disagreement[i]),
+            "outlier_count": int(outlier_counts[i]),
+            "individual_count": len(batch[i])
+        }
+        for i in range(len(batch))
+    ]
@@ -6,6 +6,7 @@ import openai
 from typing import Dict, Any
 from dotenv import load_dotenv
 import logging
+from .judging.response_parser import ScoreSchema, JudgeResponseParseError, parse_judge_response, build_repair_prompt
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +39,32 @@ class JudgingEngine:
             "quality": 0.4,
             "innovation": 0.3
         }
+        
+        # Compiled once; validates the 0-100 per-category scores returned by the LLM.
+        # A confidence the LLM omits stays None rather than a made-up value.
+        self.response_schema = ScoreSchema(
+            {category: 100 for category in self.rubric},
+            scores_key=None,
+            default_confidence=None
+        )
+
+    def _call_llm(self, messages: list) -> str:
+        """
+        Send a chat completion request and return the message content.
+        
+        Args:
+            messages: Chat messages to send
+            
+        Returns:
+            Raw response text
+        """
+        response = openai.ChatCompletion.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=1000
+        )
+        return response.choices[0].message.content
 
     def _get_llm_evaluation(self, submission_text: str) -> Dict[str, Any]:
         """
@@ -92,31 +119,29 @@ class JudgingEngine:
             }}
             """
             
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert hackathon judge evaluating submissions."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            # Extract the response
-            evaluation_text = response.choices[0].message.content
-            
-            # For simplicity, we'll parse this as a mock response
-            # In a production environment, you'd want to properly parse the JSON
+            messages = [
+                {"role": "system", "content": "You are an expert hackathon judge evaluating submissions."},
+                {"role": "user", "content": prompt}
+            ]
+            evaluation_text = self._call_llm(messages)
             logger.info(f"LLM evaluation completed: {evaluation_text}")
             
-            # Return mock structured response for now
+            try:
+                parsed = parse_judge_response(evaluation_text, self.response_schema)
+            except JudgeResponseParseError as e:
+                # One targeted repair call, then give up and use fallback scores
+                logger.warning(f"LLM response failed validation ({e}), requesting repair")
+                repair_messages = messages + [
+                    {"role": "assistant", "content": evaluation_text},
+                    {"role": "user", "content": build_repair_prompt(evaluation_text, e, self.response_schema)}
+                ]
+                evaluation_text = self._call_llm(repair_messages)
+                parsed = parse_judge_response(evaluation_text, self.response_schema)
+            
             return {
-                "clarity": 25,
-                "quality": 20,
-                "innovation": 35,
-                "reasoning": evaluation_text,
-                "confidence": 0.92
+                **parsed["scores"],
+                "reasoning": parsed["explanation"] or evaluation_text,
+                "confidence": parsed["confidence"]
             }
             
         except Exception as e:
@@ -0,0 +1,459 @@
+"""
+Hash-Chained Ledger for HackaVerse
+Append-only ledger used by StorageService and SecurityManager. Entries are
+written to an NDJSON data file with a fixed-size binary index beside it, so
+appends are O(1), reads seek straight to an entry by sequence number and
+verification resumes from the last verified checkpoint
+"""
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import logging
+
+from .canonical import canonical_bytes
+
+try:
+    import fcntl
+except ImportError:  # Windows: portalocker if installed, else process-local locking only
+    fcntl = None
+try:
+    import portalocker  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    portalocker = None
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FSYNC_BATCH = int(os.getenv("LEDGER_FSYNC_BATCH", "32"))
+LEDGER_FSYNC_INTERVAL = float(os.getenv("LEDGER_FSYNC_INTERVAL", "1.0"))
+
+# Index entry: data offset (uint64), record length (uint32), SHA256 digest
+INDEX_ENTRY = struct.Struct("<QI32s")
+
+
+class MemoryLedger:
+    """
+    In-memory hash-chained ledger.
+
+    Used when no ledger path is configured and when tests reset a ledger by
+    assigning a list; offers the same interface as FileLedger.
+    """
+
+    def __init__(self, hash_fn: Callable[[Dict[str, Any]], str], id_prefix: str = "",
+                 hash_field: str = "hash", genesis: Optional[str] = None,
+                 entries: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the ledger.
+
+        Args:
+            hash_fn: Hash of an entry without its hash field, as hex SHA256
+            id_prefix: Prefix of generated ids ("txn_" gives txn_1, txn_2, ...);
+                None keeps ids supplied by the caller
+            hash_field: Field holding the entry hash
+            genesis: previous_hash of the first entry
+            entries: Initial entries
+        """
+        self.hash_fn = hash_fn
+        self.id_prefix = id_prefix
+        self.hash_field = hash_field
+        self.genesis = genesis
+        self._entries = list(entries or [])
+        self._lock = threading.Lock()
+
+    @property
+    def last_hash(self) -> Optional[str]:
+        """Hash of the newest entry, or the genesis value when empty."""
+        return self._entries[-1][self.hash_field] if self._entries else self.genesis
+
+    def _chain(self, record: Dict[str, Any], seq: int, previous_hash: Optional[str]) -> Dict[str, Any]:
+        entry = dict(record)
+        if self.id_prefix is not None:
+            entry["id"] = f"{self.id_prefix}{seq + 1}"
+        entry["previous_hash"] = previous_hash
+        entry.pop(self.hash_field, None)
+        entry[self.hash_field] = self.hash_fn(entry)
+        return entry
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chain and append a record.
+
+        Args:
+            record: Entry fields; id, previous_hash and the hash are filled in
+
+        Returns:
+            The stored entry
+        """
+        with self._lock:
+            entry = self._chain(record, len(self._entries), self.last_hash)
+            self._entries.append(entry)
+        return dict(entry)
+
+    def get(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Return the entry at a zero-based sequence number, or None."""
+        if 0 <= seq < len(self._entries):
+            return dict(self._entries[seq])
+        return None
+
+    def get_by_id(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Return the entry with a generated id such as txn_42, or None."""
+        seq = parse_entry_id(entry_id, self.id_prefix)
+        return self.get(seq) if seq is not None else None
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return a slice of entries in append order."""
+        end = None if limit is None else offset + limit
+        return [dict(entry) for entry in self._entries[offset:end]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def verify(self, full: bool = False) -> bool:
+        """Recompute every hash and check the chain."""
+        previous_hash = self.genesis
+        for entry in self._entries:
+            unhashed = {k: v for k, v in entry.items() if k != self.hash_field}
+            if self.hash_fn(unhashed) != entry[self.hash_field] or entry["previous_hash"] != previous_hash:
+                return False
+            previous_hash = entry[self.hash_field]
+        return True
+
+    def sync(self) -> None:
+        """Nothing to flush for an in-memory ledger."""
+
+
+class FileLedger(MemoryLedger):
+    """
+    Append-only on-disk hash-chained ledger.
+
+    Layout for a ledger at `path`:
+      {path}.ndjson  one canonical JSON entry per line
+      {path}.idx     INDEX_ENTRY per entry: byte offset, length, digest
+      {path}.ckpt    last verified sequence number and hash
+      {path}.lock    held exclusively by the process appending
+
+    Appends write the entry and its index slot and flush them to the OS;
+    fsync runs once per fsync_batch appends or fsync_interval seconds,
+    whichever comes first, and on sync()/exit. Only the chain head and the
+    entry count are kept in memory; appends (under the file lock) and reads
+    re-read both from the index size, so several processes can share one
+    ledger and each sees the others' entries. On open, an index that is shorter than
+    the data file (crash between the two writes) is rebuilt from the tail
+    and a torn final line is truncated.
+    """
+
+    def __init__(self, path: str, hash_fn: Callable[[Dict[str, Any]], str], id_prefix: str = "",
+                 hash_field: str = "hash", genesis: Optional[str] = None,
+                 fsync_batch: int = LEDGER_FSYNC_BATCH, fsync_interval: float = LEDGER_FSYNC_INTERVAL):
+        """
+        Open or create the ledger.
+
+        Args:
+            path: Path prefix of the ledger files
+            hash_fn: Hash of an entry without its hash field, as hex SHA256
+            id_prefix: Prefix of generated ids
+            hash_field: Field holding the entry hash
+            genesis: previous_hash of the first entry
+            fsync_batch: Appends between fsyncs
+            fsync_interval: Maximum seconds between an append and its fsync
+        """
+        super().__init__(hash_fn, id_prefix=id_prefix, hash_field=hash_field, genesis=genesis)
+        self.path = path
+        self.data_path = f"{path}.ndjson"
+        self.index_path = f"{path}.idx"
+        self.checkpoint_path = f"{path}.ckpt"
+        self.lock_path = f"{path}.lock"
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._data = open(self.data_path, "a+b")
+        self._index = open(self.index_path, "a+b")
+        self._count = 0
+        self._head = genesis
+        with self._file_lock():
+            self._recover()
+        atexit.register(self.sync)
+
+    @contextmanager
+    def _file_lock(self):
+        # Opened per use: a descriptor inherited across fork would share the lock
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            elif portalocker is not None:
+                portalocker.lock(f, portalocker.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                elif portalocker is not None:
+                    portalocker.unlock(f)
+
+    def _refresh_tail(self, repair: bool = False) -> int:
+        """
+        Re-read the entry count and chain head from the index size, picking
+        up entries appended by other processes (thread lock held).
+
+        Args:
+            repair: Truncate a torn final slot; only under the file lock
+
+        Returns:
+            The entry count
+        """
+        if self._index.closed:
+            return self._count
+        size = os.fstat(self._index.fileno()).st_size
+        count = size // INDEX_ENTRY.size
+        if repair and size != count * INDEX_ENTRY.size:
+            # Torn slot from a writer that died mid-append
+            self._index.truncate(count * INDEX_ENTRY.size)
+        if count != self._count:
+            self._count = count
+            self._head = self._read_index(count - 1)[2].hex() if count else self.genesis
+        return count
+
+    def _read_index(self, seq: int):
+        self._index.flush()
+        raw = os.pread(self._index.fileno(), INDEX_ENTRY.size, seq * INDEX_ENTRY.size)
+        return INDEX_ENTRY.unpack(raw)
+
+    def _read_entry(self, offset: int, length: int) -> Dict[str, Any]:
+        self._data.flush()
+        return json.loads(os.pread(self._data.fileno(), length, offset))
+
+    def _recover(self) -> None:
+        data_size = os.path.getsize(self.data_path)
+        count = os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        # Drop index slots whose data never reached the disk
+        while count and sum(self._read_index(count - 1)[:2]) > data_size:
+            count -= 1
+        self._index.truncate(count * INDEX_ENTRY.size)
+
+        end = sum(self._read_index(count - 1)[:2]) if count else 0
+        if count:
+            self._head = self._read_entry(*self._read_index(count - 1)[:2])[self.hash_field]
+        if end < data_size:
+            # Index the complete lines written after the last index slot
+            rebuilt = 0
+            self._data.seek(end)
+            for line in self._data:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._index.write(INDEX_ENTRY.pack(end, len(line), bytes.fromhex(entry[self.hash_field])))
+                self._head = entry[self.hash_field]
+                end += len(line)
+                count += 1
+                rebuilt += 1
+            self._data.truncate(end)
+            self._index.flush()
+            logger.warning(f"Ledger {self.path}: re-indexed {rebuilt} entries, truncated to {end} bytes")
+        self._count = count
+
+    @property
+    def last_hash(self) -> Optional[str]:
+        """Hash of the newest entry, or the genesis value when empty."""
+        with self._lock:
+            self._refresh_tail()
+            return self._head
+
+    def append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chain and append a record.
+
+        Args:
+            record: Entry fields; id, previous_hash and the hash are filled in
+
+        Returns:
+            The stored entry
+        """
+        with self._lock, self._file_lock():
+            self._refresh_tail(repair=True)
+            entry = self._chain(record, self._count, self._head)
+            line = canonical_bytes(entry) + b"\n"
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            self._data.write(line)
+            self._data.flush()
+            self._index.write(INDEX_ENTRY.pack(offset, len(line), bytes.fromhex(entry[self.hash_field])))
+            self._index.flush()
+            self._count += 1
+            self._head = entry[self.hash_field]
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._fsync()
+        return entry
+
+    def _fsync(self) -> None:
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self) -> None:
+        """Fsync any appends not yet on disk."""
+        with self._lock:
+            if self._unsynced and not self._data.closed:
+                self._fsync()
+
+    def close(self) -> None:
+        """Fsync and close the ledger files."""
+        self.sync()
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+    def get(self, seq: int) -> Optional[Dict[str, Any]]:
+        """
+        Read one entry by seeking through the index.
+
+        Args:
+            seq: Zero-based sequence number
+
+        Returns:
+            The entry, or None if out of range
+        """
+        with self._lock:
+            if seq >= self._count:
+                self._refresh_tail()
+            if not 0 <= seq < self._count:
+                return None
+            offset, length, _ = self._read_index(seq)
+            return self._read_entry(offset, length)
+
+    def iter_entries(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over entries in append order without loading the whole ledger.
+
+        Args:
+            offset: First sequence number
+            limit: Maximum number of entries (None for all)
+
+        Yields:
+            Ledger entries
+        """
+        count = len(self)
+        end = count if limit is None else min(count, offset + limit)
+        for seq in range(max(0, offset), end):
+            entry = self.get(seq)
+            if entry is not None:
+                yield entry
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return a slice of entries in append order."""
+        return list(self.iter_entries(offset, limit))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._refresh_tail()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"seq": 0, "hash": self.genesis}
+
+    def _save_checkpoint(self, seq: int, last_hash: Optional[str]) -> None:
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"seq": seq, "hash": last_hash}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def verify(self, full: bool = False) -> bool:
+        """
+        Verify hashes and chain links.
+
+        Only entries appended since the last successful verification are
+        checked, starting from the checkpointed hash; full=True re-verifies
+        from the first entry.
+
+        Args:
+            full: Ignore the checkpoint
+
+        Returns:
+            True if the ledger is valid, False otherwise
+        """
+        checkpoint = {"seq": 0, "hash": self.genesis} if full else self._load_checkpoint()
+        start, previous_hash = checkpoint["seq"], checkpoint["hash"]
+        count = len(self)
+        if start > count:
+            start, previous_hash = 0, self.genesis
+        if start > 0:
+            # The checkpointed entry itself must still carry the checkpointed hash
+            _, _, digest = self._read_index(start - 1)
+            if digest.hex() != previous_hash:
+                return False
+
+        for seq in range(start, count):
+            with self._lock:
+                offset, length, digest = self._read_index(seq)
+                entry = self._read_entry(offset, length)
+            entry_hash = entry.get(self.hash_field)
+            unhashed = {k: v for k, v in entry.items() if k != self.hash_field}
+            if (self.hash_fn(unhashed) != entry_hash or digest.hex() != entry_hash
+                    or entry.get("previous_hash") != previous_hash):
+                logger.error(f"Ledger {self.path}: integrity check failed at entry {seq}")
+                return False
+            previous_hash = entry_hash
+
+        self._save_checkpoint(count, previous_hash)
+        return True
+
+
+def parse_entry_id(entry_id: str, id_prefix: Optional[str]) -> Optional[int]:
+    """
+    Map a generated id back to its zero-based sequence number.
+
+    Args:
+        entry_id: Id such as txn_42
+        id_prefix: Prefix the ledger generates ids with
+
+    Returns:
+        Sequence number, or None if the id was not generated with the prefix
+    """
+    if id_prefix is None or not entry_id.startswith(id_prefix):
+        return None
+    suffix = entry_id[len(id_prefix):]
+    return int(suffix) - 1 if suffix.isdigit() and int(suffix) > 0 else None
+
+
+_ledgers: Dict[str, FileLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def open_ledger(path: Optional[str], hash_fn: Callable[[Dict[str, Any]], str], **kwargs) -> MemoryLedger:
+    """
+    Return the shared ledger for a path, or a new in-memory ledger when no
+    path is configured.
+
+    Args:
+        path: Ledger path prefix; empty or None for an in-memory ledger
+        hash_fn: Entry hash function
+        **kwargs: id_prefix, hash_field and genesis, as for MemoryLedger
+
+    Returns:
+        FileLedger shared by every caller using the same path, or a MemoryLedger
+    """
+    if not path:
+        return MemoryLedger(hash_fn, **kwargs)
+    key = os.path.abspath(path)
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None or ledger._data.closed:
+            ledger = FileLedger(path, hash_fn, **kwargs)
+            _ledgers[key] = ledger
+        return ledger
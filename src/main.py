@@ -16,6 +16,8 @@ from src.input_handler import InputHandler
 from src.reasoning import ReasoningModule
 from src.executor import Executor
 from src.reward import RewardSystem
+from src.write_behind import WRITE_BEHIND_ENABLED, write_behind_queue
+from src.bucket_connector import fallback_reingester
 
 # Import database module
 from .database import connect_to_db_with_retry, close_db
@@ -126,9 +128,16 @@ async def startup_event():
     time.sleep(2)
     # Connect to database with retry logic
     connect_to_db_with_retry(retries=5, delay=2)
+    # Resume delivery of side effects journaled before the last shutdown
+    if WRITE_BEHIND_ENABLED:
+        write_behind_queue.start()
+    # Replay logs written to the fallback journal while MongoDB was down
+    fallback_reingester.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    write_behind_queue.stop()
+    fallback_reingester.stop()
     close_db()
 
 # Temporary CORS unlock for frontend integration verification
@@ -0,0 +1,193 @@
+"""
+Retry Policy for HackaVerse
+Retry decorator for sync and async callables with full-jitter exponential
+backoff, exception classification, a per-call deadline and a process-wide
+retry budget that stops retry storms against a struggling dependency
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "10"))
+RETRY_BUDGET_MAX_TOKENS = float(os.getenv("RETRY_BUDGET_MAX_TOKENS", "100"))
+
+
+class RetryBudget:
+    """
+    Token bucket shared by every retry in the process.
+
+    Each first attempt deposits `ratio` tokens and the bucket also refills
+    at `min_per_second`; each retry spends one token. When a dependency is
+    failing everywhere at once, retries are limited to roughly `ratio` of
+    the call rate instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND,
+                 max_tokens: float = RETRY_BUDGET_MAX_TOKENS):
+        """
+        Initialize a full budget.
+
+        Args:
+            ratio: Tokens deposited per first attempt
+            min_per_second: Tokens refilled per second regardless of traffic
+            max_tokens: Bucket capacity
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "retries": 0, "rejected": 0}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_call(self) -> None:
+        """Record a first attempt, depositing `ratio` tokens."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+            self._stats["calls"] += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Spend one token for a retry.
+
+        Returns:
+            True if the retry may proceed, False if the budget is exhausted
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats["retries"] += 1
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get budget usage.
+
+        Returns:
+            Dictionary with available tokens and call, retry and rejected counts
+        """
+        with self._lock:
+            self._refill()
+            return {"tokens": round(self._tokens, 3), **self._stats}
+
+
+# Global retry budget instance
+retry_budget = RetryBudget()
+
+
+def full_jitter_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff.
+
+    Args:
+        attempt: Zero-based index of the failed attempt
+        base: Delay ceiling after the first failure
+        cap: Upper bound on the delay ceiling
+
+    Returns:
+        Delay drawn uniformly from [0, min(cap, base * 2**attempt)]
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry(max_retries: int = 3, backoff: float = 1, max_backoff: float = 30.0,
+          retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+          give_up_on: Tuple[Type[BaseException], ...] = (),
+          should_retry: Optional[Callable[[BaseException], bool]] = None,
+          deadline: Optional[float] = None, budget: Optional[RetryBudget] = retry_budget):
+    """
+    Decorator to add retry logic to sync or async functions.
+
+    Coroutine functions are retried with asyncio.sleep, so the event loop
+    is never blocked; plain functions use time.sleep.
+
+    Args:
+        max_retries: Maximum number of attempts
+        backoff: Backoff base; the n-th retry waits up to backoff * 2**(n-1)
+        max_backoff: Upper bound on a single delay
+        retry_on: Exception types that are retried
+        give_up_on: Exception types that are raised immediately, even if
+            they are subclasses of retry_on
+        should_retry: Optional predicate with the final say on whether an
+            exception is retried (e.g. only 5xx responses)
+        deadline: Total seconds allowed for all attempts and delays; no retry
+            is started that would begin after it
+        budget: Shared retry budget, or None to retry without one
+
+    Returns:
+        Decorated function with retry logic
+    """
+    def classify(e: BaseException) -> bool:
+        if isinstance(e, give_up_on) or not isinstance(e, retry_on):
+            return False
+        return should_retry(e) if should_retry is not None else True
+
+    def next_delay(name: str, attempt: int, e: BaseException, started: float) -> Optional[float]:
+        """Return the delay before the next attempt, or None to give up."""
+        logger.warning(f"Attempt {attempt+1} failed for {name}: {str(e)}")
+        if attempt >= max_retries - 1:
+            logger.error(f"All {max_retries} attempts failed for {name}: {str(e)}")
+            return None
+        if not classify(e):
+            logger.info(f"Not retrying {name}: {type(e).__name__} is not retryable")
+            return None
+        delay = full_jitter_delay(attempt, backoff, max_backoff)
+        if deadline is not None and time.monotonic() - started + delay >= deadline:
+            logger.warning(f"Not retrying {name}: {deadline}s deadline would be exceeded")
+            return None
+        if budget is not None and not budget.try_acquire():
+            logger.warning(f"Not retrying {name}: process retry budget exhausted")
+            return None
+        return delay
+
+    def deco(f: Callable) -> Callable:
+        if inspect.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                started = time.monotonic()
+                if budget is not None:
+                    budget.record_call()
+                for attempt in range(max(1, max_retries)):
+                    try:
+                        return await f(*args, **kwargs)
+                    except Exception as e:
+                        delay = next_delay(f.__name__, attempt, e, started)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+            return async_wrapper
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            if budget is not None:
+                budget.record_call()
+            for attempt in range(max(1, max_retries)):
+                try:
+                    return f(*args, **kwargs)
+                except Exception as e:
+                    delay = next_delay(f.__name__, attempt, e, started)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+        return wrapper
+    return deco
@@ -4,10 +4,20 @@ import time
 import json
 from typing import Tuple, Optional
 from src.integrations.bhiv_connectors import send_to_core, save_to_bucket
+from src.write_behind import KIND_BUCKET, KIND_CORE, get_write_behind_queue
 
 logger = logging.getLogger(__name__)
 
 class RewardSystem:
+    def __init__(self, write_behind=None):
+        """
+        Args:
+            write_behind: WriteBehindQueue for side effects; defaults to the
+                global queue when WRITE_BEHIND_ENABLED is set, otherwise side
+                effects run inline
+        """
+        self.write_behind = write_behind if write_behind is not None else get_write_behind_queue()
+        
     def calculate_reward(self, action: str, outcome: Optional[str] = None, tenant_id: Optional[str] = None, event_id: Optional[str] = None) -> Tuple[float, str]:
         """
         Calculate reward for an action and optional outcome.
@@ -54,19 +64,26 @@ class RewardSystem:
             "event_id": event_id
         }
         
-        # Send to BHIV Core and save to BHIV Bucket
-        try:
-            core_resp = send_to_core(payload)
-            logger.info(f"Sent reward data to BHIV Core: {core_resp}")
-        except Exception as e:
-            logger.warning(f"Failed to send reward data to BHIV Core: {str(e)}")
-        
-        try:
-            filename = f"reward_{int(time.time())}.json"
-            bucket_path = save_to_bucket(payload, filename)
-            logger.info(f"Saved reward data to BHIV Bucket: {bucket_path}")
-        except Exception as e:
-            logger.warning(f"Failed to save reward data to BHIV Bucket: {str(e)}")
+        if self.write_behind is not None:
+            # Delivered by the write-behind worker
+            self.write_behind.enqueue_many([
+                (KIND_CORE, payload, None, None),
+                (KIND_BUCKET, payload, f"reward_{int(time.time())}.json", None)
+            ])
+        else:
+            # Send to BHIV Core and save to BHIV Bucket
+            try:
+                core_resp = send_to_core(payload)
+                logger.info(f"Sent reward data to BHIV Core: {core_resp}")
+            except Exception as e:
+                logger.warning(f"Failed to send reward data to BHIV Core: {str(e)}")
+            
+            try:
+                filename = f"reward_{int(time.time())}.json"
+                bucket_path = save_to_bucket(payload, filename)
+                logger.info(f"Saved reward data to BHIV Bucket: {bucket_path}")
+            except Exception as e:
+                logger.warning(f"Failed to save reward data to BHIV Bucket: {str(e)}")
 
         logger.info(f"Reward calculated: {reward}, Feedback: {feedback}")
         return float(reward), feedback
\ No newline at end of file
@@ -8,6 +8,9 @@ from datetime import datetime
 from ..logger import ksml_logger
 from ..auth import get_api_key
 from ..schemas.response import APIResponse
+from ..dead_letter import dead_letters
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
 import logging
 
 router = APIRouter(prefix="", tags=["admin"])
@@ -103,6 +106,49 @@ async def register_endpoint(team: TeamRegistration):
             data=None
         )
 
+@router.get("/dead-letters/stats", summary="Dead-letter queue depth and age", dependencies=[Depends(get_api_key)])
+async def dead_letter_stats():
+    """
+    Report the dead-letter queue: pending and replayed totals, pending depth
+    per kind and the age of the oldest pending record.
+    """
+    try:
+        return APIResponse(
+            success=True,
+            message="Dead-letter stats retrieved successfully",
+            data=dead_letters.get_stats()
+        )
+    except Exception as e:
+        return APIResponse(
+            success=False,
+            message=f"Error retrieving dead-letter stats: {str(e)}",
+            data=None
+        )
+
+@router.post("/dead-letters/replay", summary="Replay dead letters", dependencies=[Depends(get_api_key)])
+async def replay_dead_letters(kind: Optional[str] = None, limit: int = 100, rate: float = 10.0,
+                              import_legacy: bool = True):
+    """
+    Replay pending dead letters with rate limiting and idempotency keys.
+    
+    - **kind**: Optional kind filter (core_send, bucket_save, log_relay)
+    - **limit**: Maximum number of records to attempt
+    - **rate**: Maximum deliveries per second
+    - **import_legacy**: Import new lines from failed_core_sends.log and failed_transactions.json first
+    """
+    try:
+        imported = dead_letters.import_legacy_logs() if import_legacy else {}
+        # Replay sleeps between sends to honour the rate limit
+        summary = await run_in_threadpool(dead_letters.replay, kind=kind, limit=limit, rate_per_second=rate)
+        return APIResponse(
+            success=True,
+            message="Dead-letter replay completed",
+            data={"imported": imported, **summary, "stats": dead_letters.get_stats()}
+        )
+    except Exception as e:
+        logger.error(f"Error replaying dead letters: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 @router.post("/webhook/registration", summary="N8N webhook for team registration")
 async def webhook_registration(payload: TeamRegistration):
     """
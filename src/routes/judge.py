@@ -10,7 +10,8 @@ from ..database import get_db
 from ..security import create_entry, compute_payload_hash
 from ..reward import RewardSystem
 from ..replay_protection import check_replay
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
+from pymongo.errors import DuplicateKeyError
 import logging
 import hashlib
 import time
@@ -20,6 +21,44 @@ import time
 reward_system = RewardSystem()
 
 
+JUDGMENT_VERSION_ATTEMPTS = 5
+
+
+def insert_next_judgment_version(db, judgment_doc: Dict[str, Any]) -> int:
+    """
+    Insert a judgment as the next version of its submission.
+
+    (submission_hash, version) is unique, so a concurrent submit or rescore
+    that takes the same version makes the insert fail; the version is then
+    re-read and the insert retried.
+
+    Args:
+        db: Database connection
+        judgment_doc: Judgment without a version; the version is set on it
+
+    Returns:
+        The version the judgment was saved as
+
+    Raises:
+        DuplicateKeyError: If every attempt lost the race
+    """
+    for attempt in range(JUDGMENT_VERSION_ATTEMPTS):
+        existing_judgment = db.judgments.find_one(
+            {"submission_hash": judgment_doc["submission_hash"]},
+            sort=[("version", -1)]
+        )
+        judgment_doc["version"] = (existing_judgment["version"] + 1) if existing_judgment else 1
+        judgment_doc.pop("_id", None)
+        try:
+            db.judgments.insert_one(judgment_doc)
+            return judgment_doc["version"]
+        except DuplicateKeyError:
+            if attempt == JUDGMENT_VERSION_ATTEMPTS - 1:
+                raise
+            logger.info(
+                f"Judgment version {judgment_doc['version']} of {judgment_doc['submission_hash']} taken, retrying")
+
+
 def orchestrate_submission_flow(
     submission_text: str,
     team_id: str,
@@ -362,13 +401,6 @@ async def submit_and_score(request: JudgeRequest):
     # Extract consensus scores for the response
     consensus_scores = evaluation_result["criteria_scores"]
 
-    # Determine version for judgment
-    existing_judgment = db.judgments.find_one(
-        {"submission_hash": submission_hash},
-        sort=[("version", -1)]
-    )
-    version = (existing_judgment["version"] + 1) if existing_judgment else 1
-
     # Ensure confidence is always present and normalized to 0.0-1.0 for database storage
     raw_confidence = evaluation_result.get("confidence")
     if raw_confidence is None:
@@ -390,9 +422,9 @@ async def submit_and_score(request: JudgeRequest):
         "quality": consensus_scores.get("tech_depth", 0),
         "innovation": consensus_scores.get("innovation", 0),
         "total_score": evaluation_result["consensus_score"],
+        "criteria_scores": consensus_scores,
         "confidence": round(normalized_confidence, 2),
         "trace": evaluation_result["reasoning_chain"],
-        "version": version,
         "tenant_id": request.tenant_id,
         "event_id": request.event_id,
         "workspace_id": request.workspace_id,
@@ -400,7 +432,7 @@ async def submit_and_score(request: JudgeRequest):
     }
     if evaluation_result.get("fallback"):
         judgment_doc["fallback"] = True
-    db.judgments.insert_one(judgment_doc)
+    version = insert_next_judgment_version(db, judgment_doc)
     logger.info(f"Judgment saved for submission {submission_hash}, version {version}")
 
     # Log the judging response
@@ -498,6 +530,24 @@ async def get_rubric():
     ).dict()  # Use .dict() for Pydantic v1 compatibility
 
 
+@router.get("/adaptive-stats", response_model=Dict[str, Any], summary="Returns adaptive judging savings", dependencies=[Depends(get_api_key)])
+async def get_adaptive_stats(event_id: Optional[str] = None):
+    """
+    Returns per-event counters for adaptive (early-stop) judging.
+    
+    - **event_id**: Optional event ID; all events are returned when omitted
+    """
+    logger.info(f"Adaptive stats endpoint called for event={event_id}")
+    
+    from ..judging.multi_agent_judge import adaptive_stats
+    
+    return APIResponse(
+        success=True,
+        message="Adaptive judging stats retrieved successfully",
+        data={"event_id": event_id, "stats": adaptive_stats.get_stats(event_id)}
+    ).dict()  # Use .dict() for Pydantic v1 compatibility
+
+
 @router.post("/batch", response_model=Dict[str, Any], summary="Judge multiple submissions in batch", dependencies=[Depends(get_api_key)])
 async def batch_judge(request: BatchJudgeRequest):
     """
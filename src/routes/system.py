@@ -8,6 +8,8 @@ import os
 from ..logger import ksml_logger
 from ..database import get_db, get_db_status
 from ..schemas.response import APIResponse
+from ..write_behind import WRITE_BEHIND_ENABLED, write_behind_queue
+from ..retry import retry_budget
 
 router = APIRouter(tags=["system"])
 
@@ -115,6 +117,41 @@ async def test_db():
         data={"collections": collections}
     )
 
+@router.get("/write-behind", summary="Write-behind queue status")
+async def write_behind_status():
+    """
+    Report the depth and age of the write-behind side-effect queue.
+    
+    Returns:
+    - **success**: Boolean indicating success
+    - **message**: Status message
+    - **data**: Contains enabled flag, pending count, and oldest pending age
+    """
+    if not WRITE_BEHIND_ENABLED:
+        return APIResponse(success=True, message="Write-behind queue disabled", data={"enabled": False})
+    return APIResponse(
+        success=True,
+        message="Write-behind queue status",
+        data={"enabled": True, **write_behind_queue.get_stats()}
+    )
+
+@router.get("/retry-budget", summary="Process-wide retry budget")
+async def retry_budget_status():
+    """
+    Report the shared retry budget used by send_to_core, Transaction steps
+    and the retry decorator.
+    
+    Returns:
+    - **success**: Boolean indicating success
+    - **message**: Status message
+    - **data**: Contains available tokens and call, retry and rejected counts
+    """
+    return APIResponse(
+        success=True,
+        message="Retry budget status",
+        data=retry_budget.get_stats()
+    )
+
 @router.get("/ready", include_in_schema=False)
 async def system_ready():
     """
@@ -5,14 +5,18 @@ import time
 from fastapi import Header, HTTPException
 import os, hmac, hashlib
 from datetime import datetime
-import json
 import base64
 from typing import Dict, Any, Optional
 from collections import defaultdict
 import threading
 from typing import Tuple
 import secrets
-import uuid
+
+from .canonical import canonical_hash, canonical_json
+from .ledger import MemoryLedger, open_ledger
+
+# On-disk request ledger; empty keeps it in memory
+SECURITY_LEDGER_PATH = os.getenv("SECURITY_LEDGER_PATH", "data/ledger/security")
 
 
 class RateLimiter:
@@ -39,7 +43,24 @@ class SecurityManager:
         self.api_secret = os.getenv("SECURITY_SECRET_KEY", "default_secret_for_dev")
         self.rate_limiter = RateLimiter()
         self.lock = threading.Lock()
-        self.ledger = []  # Simple ledger storage for testing
+        self._ledger = None  # Opened on first use
+
+    @property
+    def ledger(self) -> MemoryLedger:
+        """The hash-chained request ledger, opened on first use."""
+        if self._ledger is None:
+            self._ledger = open_ledger(SECURITY_LEDGER_PATH, self._entry_hash, id_prefix="entry_",
+                                       hash_field="entry_hash", genesis="0")
+        return self._ledger
+
+    @ledger.setter
+    def ledger(self, entries: list) -> None:
+        # Assigning a list swaps in an in-memory ledger; the on-disk file is never rewritten
+        self._ledger = MemoryLedger(self._entry_hash, id_prefix="entry_", hash_field="entry_hash",
+                                    genesis="0", entries=entries)
+
+    def _entry_hash(self, entry: Dict[str, Any]) -> str:
+        return self._hash_ledger_entry(entry, include_hash=False)
 
     def generate_nonce(self) -> str:
         """
@@ -62,7 +83,7 @@ class SecurityManager:
         Returns:
             str: Hexadecimal signature
         """
-        message = f"{timestamp}{json.dumps(data, sort_keys=True)}{nonce}".encode('utf-8')
+        message = f"{timestamp}{canonical_json(data, compact=False)}{nonce}".encode('utf-8')
         return hmac.new(
             self.api_secret.encode('utf-8'),
             message,
@@ -126,7 +147,7 @@ class SecurityManager:
 
     def add_to_ledger(self, data: Dict[str, Any], nonce: str, timestamp: int, signature: str) -> Dict[str, Any]:
         """
-        Add an entry to the ledger (for testing purposes).
+        Add an entry to the ledger.
 
         Args:
             data: The data to add
@@ -137,45 +158,50 @@ class SecurityManager:
         Returns:
             Dict: The ledger entry
         """
-        id = str(uuid.uuid4())
-        data_hash = compute_payload_hash(data)
-        entry = {
-            "id": id,
-            "data_hash": data_hash,
+        return self.ledger.append({
+            "data_hash": compute_payload_hash(data),
             "nonce": nonce,
             "timestamp": timestamp,
-            "signature": signature,
-            "entry_hash": "",
-            "previous_hash": self.ledger[-1]["entry_hash"] if self.ledger else "0"
-        }
-        entry["entry_hash"] = self._hash_ledger_entry(entry, include_hash=False)
-        self.ledger.append(entry)
-        return entry
-
-    def get_ledger(self) -> list:
+            "signature": signature
+        })
+
+    def get_ledger(self, offset: int = 0, limit: Optional[int] = None) -> list:
         """
-        Get all ledger entries.
+        Get ledger entries.
+
+        Args:
+            offset: Index of the first entry
+            limit: Maximum number of entries (None for all)
 
         Returns:
             list: List of ledger entries
         """
-        return self.ledger
+        return self.ledger.entries(offset, limit)
+
+    def get_ledger_entry(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get one ledger entry by id (e.g. "entry_42") by seeking through the index.
+
+        Args:
+            entry_id: Ledger entry id
 
-    def verify_ledger_integrity(self) -> bool:
+        Returns:
+            Dict: The ledger entry, or None if not found
         """
-        Verify the integrity of the ledger.
+        return self.ledger.get_by_id(entry_id)
+
+    def verify_ledger_integrity(self, full: bool = False) -> bool:
+        """
+        Verify the integrity of the ledger, resuming from the last verified
+        entry unless full is set.
+
+        Args:
+            full: Re-verify every entry from the start
 
         Returns:
             bool: True if ledger is valid
         """
-        for i, entry in enumerate(self.ledger):
-            expected_hash = self._hash_ledger_entry(entry, include_hash=False)
-            if entry["entry_hash"] != expected_hash:
-                return False
-            if i > 0:
-                if entry["previous_hash"] != self.ledger[i-1]["entry_hash"]:
-                    return False
-        return True
+        return self.ledger.verify(full=full)
 
     def _hash_ledger_entry(self, entry: Dict[str, Any], include_hash: bool = True) -> str:
         """
@@ -191,8 +217,7 @@ class SecurityManager:
         data = entry.copy()
         if not include_hash and "entry_hash" in data:
             del data["entry_hash"]
-        message = json.dumps(data, sort_keys=True).encode('utf-8')
-        return hashlib.sha256(message).hexdigest()
+        return canonical_hash(data, compact=False)
 
 # Create a global security manager instance
 security_manager = SecurityManager()
@@ -363,9 +388,8 @@ def compute_payload_hash(payload: Dict[str, Any]) -> str:
     Returns:
         str: Hex hash of the payload
     """
-    # Sort keys for deterministic hashing
-    payload_str = json.dumps(payload, sort_keys=True)
-    return hashlib.sha256(payload_str.encode('utf-8')).hexdigest()
+    # Spaced canonical encoding: existing payload hashes depend on it
+    return canonical_hash(payload, compact=False)
 
 
 def compute_entry_hash(entry: Dict[str, Any]) -> str:
@@ -378,6 +402,5 @@ def compute_entry_hash(entry: Dict[str, Any]) -> str:
     Returns:
         str: Hex hash of the entry
     """
-    # Sort keys for deterministic hashing
-    entry_str = json.dumps(entry, sort_keys=True)
-    return hashlib.sha256(entry_str.encode('utf-8')).hexdigest()
\ No newline at end of file
+    # Spaced canonical encoding: existing provenance hashes depend on it
+    return canonical_hash(entry, compact=False)
\ No newline at end of file
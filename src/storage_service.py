@@ -3,20 +3,49 @@ Storage Service for HackaVerse
 Provides explicit and robust storage operations using BHIV bucket connector
 """
 
-import json
 import time
 import os
-import hashlib
-from typing import Dict, List, Any, Optional
-from src.integrations.bhiv_connectors import save_to_bucket
+from typing import Dict, Iterator, List, Any, Optional
+from src.integrations.bhiv_connectors import store_in_bucket
+from src.integrations.bucket_index import BucketHandle, get_bucket_index
+from src.canonical import canonical_hash
+from src.ledger import MemoryLedger, open_ledger
+
+# On-disk transaction ledger shared by all StorageService instances; empty keeps it in memory
+STORAGE_LEDGER_PATH = os.getenv("STORAGE_LEDGER_PATH", "data/ledger/storage_transactions")
 
 class StorageService:
     """Handles all storage operations for the hackathon system using BHIV bucket"""
     
-    def __init__(self):
-        """Initialize storage service"""
-        self.transaction_ledger = []  # For ledger chaining of transactions
-        self.last_transaction_hash = None  # Hash of the last transaction for chaining
+    def __init__(self, ledger_path: Optional[str] = STORAGE_LEDGER_PATH):
+        """
+        Initialize storage service
+        
+        Args:
+            ledger_path: Path prefix of the hash-chained transaction ledger
+                (None or empty for an in-memory ledger)
+        """
+        self._ledger = open_ledger(ledger_path, self._calculate_hash, id_prefix="txn_", hash_field="hash")
+    
+    @property
+    def transaction_ledger(self) -> MemoryLedger:
+        """The hash-chained transaction ledger"""
+        return self._ledger
+    
+    @transaction_ledger.setter
+    def transaction_ledger(self, entries: List[Dict[str, Any]]) -> None:
+        # Assigning a list swaps in an in-memory ledger; the on-disk file is never rewritten
+        self._ledger = MemoryLedger(self._calculate_hash, id_prefix="txn_", hash_field="hash", entries=entries)
+    
+    @property
+    def last_transaction_hash(self) -> Optional[str]:
+        """Hash of the last transaction, used as previous_hash of the next one"""
+        return self._ledger.last_hash
+    
+    @last_transaction_hash.setter
+    def last_transaction_hash(self, value: Optional[str]) -> None:
+        if value != self._ledger.last_hash:
+            raise ValueError("The ledger chain head follows the ledger and cannot be moved")
     
     def _calculate_hash(self, data: Dict[str, Any]) -> str:
         """
@@ -28,9 +57,7 @@ class StorageService:
         Returns:
             SHA256 hash as hex string
         """
-        # Create canonical representation of data
-        canonical_data = json.dumps(data, sort_keys=True, separators=(',', ':'))
-        return hashlib.sha256(canonical_data.encode('utf-8')).hexdigest()
+        return canonical_hash(data)
     
     def save_submission(self, team_id: str, submission_data: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -44,31 +71,23 @@ class StorageService:
             Dictionary with path and filename of saved submission
         """
         timestamp = int(time.time())
-        filename = f"submission_{team_id}_{timestamp}.json"
-        path = save_to_bucket(submission_data, filename)
+        stored = store_in_bucket(submission_data, f"submission_{team_id}_{timestamp}.json")
+        filename, path = stored["filename"], stored["path"]
         
-        # Add transaction to ledger with chaining
-        transaction_record = {
-            "id": f"txn_{len(self.transaction_ledger) + 1}",
+        # Add transaction to ledger with chaining; id, previous_hash and hash are filled in
+        self._ledger.append({
             "timestamp": timestamp,
             "action": "save_submission",
             "team_id": team_id,
-            "filename": filename,
-            "previous_hash": self.last_transaction_hash
-        }
-        
-        # Calculate hash for this transaction
-        transaction_record["hash"] = self._calculate_hash(transaction_record)
-        self.last_transaction_hash = transaction_record["hash"]
-        self.transaction_ledger.append(transaction_record)
+            "filename": filename
+        })
         
         return {"path": path, "filename": filename}
     
     def get_submission(self, team_id: str, timestamp: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
-        Retrieve a submission from the BHIV bucket (placeholder implementation)
-        In a real implementation, this would retrieve from the bucket
-        For now, we'll check local files for demonstration purposes
+        Retrieve a submission from the BHIV bucket
+        The latest submission is found through the bucket index rather than a directory scan
         
         Args:
             team_id: Unique identifier for the team
@@ -77,44 +96,35 @@ class StorageService:
         Returns:
             Submission data or None if not found
         """
-        # This is a simplified implementation for demonstration
-        # In a real BHIV implementation, this would retrieve from the bucket service
-        bucket_dir = os.getenv("BHIV_BUCKET_DIR", "./data/bucket")
-        
+        index = get_bucket_index(os.getenv("BHIV_BUCKET_DIR", "./data/bucket"))
+        if index is None:
+            return None
+            
         if timestamp:
-            filename = f"submission_{team_id}_{timestamp}.json"
-            filepath = os.path.join(bucket_dir, filename)
-            if os.path.exists(filepath):
-                try:
-                    with open(filepath, 'r') as f:
-                        return json.load(f)
-                except Exception:
-                    return None
+            entry = index.get(f"submission_{team_id}_{timestamp}.json")
         else:
-            # Find the latest submission for this team
-            try:
-                files = os.listdir(bucket_dir)
-                team_files = [f for f in files if f.startswith(f"submission_{team_id}_")]
-                if team_files:
-                    # Sort by timestamp and get the latest
-                    team_files.sort(reverse=True)
-                    latest_file = team_files[0]
-                    filepath = os.path.join(bucket_dir, latest_file)
-                    with open(filepath, 'r') as f:
-                        return json.load(f)
-            except Exception:
-                pass
-                
-        return None
+            entry = index.latest("submission", team_id=team_id)
+        if entry is None:
+            return None
+            
+        try:
+            return BucketHandle(entry).load()
+        except Exception:
+            return None
     
-    def list_submissions(self, team_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def list_submissions(self, team_id: Optional[str] = None, limit: Optional[int] = None,
+                         offset: int = 0, include_data: bool = True) -> List[Dict[str, Any]]:
         """
-        List all submissions in the BHIV bucket (placeholder implementation)
-        In a real implementation, this would list from the bucket
-        For now, we'll check local files for demonstration purposes
+        List submissions in the BHIV bucket, newest first
+        Filenames, team IDs and timestamps come from the bucket index; only the
+        files on the requested page are opened
         
         Args:
             team_id: Optional team ID to filter submissions
+            limit: Maximum number of submissions to return (None for all)
+            offset: Number of submissions to skip
+            include_data: Load each body into "data"; False returns metadata
+                (filename, team_id, timestamp, size, path) without opening any file
             
         Returns:
             List of submission metadata
@@ -122,88 +132,135 @@ class StorageService:
         submissions = []
         bucket_dir = os.getenv("BHIV_BUCKET_DIR", "./data/bucket")
         
-        try:
-            if not os.path.exists(bucket_dir):
-                return submissions
+        index = get_bucket_index(bucket_dir)
+        if index is None:
+            return submissions
+            
+        entries = index.list("submission", team_id=team_id, limit=limit, offset=offset)
+        if not include_data:
+            return [self._submission_metadata(entry, bucket_dir) for entry in entries]
+            
+        for entry in entries:
+            try:
+                data = BucketHandle(entry).load()
+            except Exception:
+                # Skip files that were removed or are not valid JSON
+                continue
                 
-            files = os.listdir(bucket_dir)
-            submission_files = [f for f in files if f.startswith("submission_") and f.endswith(".json")]
-            
-            for filename in submission_files:
-                filepath = os.path.join(bucket_dir, filename)
-                try:
-                    # Extract team_id and timestamp from filename
-                    # Format: submission_{team_id}_{timestamp}.json
-                    name_parts = filename.replace("submission_", "").replace(".json", "").split("_")
-                    if len(name_parts) >= 2:
-                        # Reconstruct team_id (it might contain underscores)
-                        file_team_id = "_".join(name_parts[:-1])  # All parts except the last (timestamp)
-                        timestamp_str = name_parts[-1]  # Last part is timestamp
-                        
-                        # Validate timestamp
-                        if timestamp_str.isdigit():
-                            timestamp = int(timestamp_str)
-                            
-                            # If filtering by team_id, skip if it doesn't match
-                            if team_id and file_team_id != team_id:
-                                continue
-                            
-                            # Read the file to get actual data
-                            with open(filepath, 'r') as f:
-                                data = json.load(f)
-                            
-                            submissions.append({
-                                "filename": filename,
-                                "team_id": file_team_id,
-                                "timestamp": timestamp,
-                                "path": filepath,
-                                "data": data
-                            })
-                except Exception:
-                    # Skip files that don't match the expected format
-                    continue
-                    
-        except Exception:
-            pass
+            submissions.append({
+                "filename": entry["filename"],
+                "team_id": entry["team_id"],
+                "timestamp": entry["timestamp"],
+                "path": os.path.join(bucket_dir, entry["relpath"]),
+                "data": data
+            })
             
-        # Sort by timestamp (newest first)
-        submissions.sort(key=lambda x: x["timestamp"], reverse=True)
         return submissions
     
-    def get_transaction_ledger(self) -> List[Dict[str, Any]]:
+    def _submission_metadata(self, entry: Dict[str, Any], bucket_dir: str) -> Dict[str, Any]:
+        return {
+            "filename": entry["filename"],
+            "team_id": entry["team_id"],
+            "timestamp": entry["timestamp"],
+            "size": entry["size"],
+            "path": os.path.join(bucket_dir, entry["relpath"])
+        }
+    
+    def list_submission_page(self, team_id: Optional[str] = None, cursor: Optional[str] = None,
+                             limit: int = 100) -> Dict[str, Any]:
+        """
+        List one page of submission metadata using cursor pagination
+        No submission file is opened
+        
+        Args:
+            team_id: Optional team ID to filter submissions
+            cursor: next_cursor returned by the previous page (None for the first page)
+            limit: Maximum number of submissions on the page
+            
+        Returns:
+            Dictionary with "items" (filename, team_id, timestamp, size, path)
+            and "next_cursor" (None on the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        bucket_dir = os.getenv("BHIV_BUCKET_DIR", "./data/bucket")
+        index = get_bucket_index(bucket_dir)
+        if index is None:
+            return {"items": [], "next_cursor": None}
+            
+        page = index.page("submission", team_id=team_id, cursor=cursor, limit=limit)
+        return {
+            "items": [self._submission_metadata(entry, bucket_dir) for entry in page["items"]],
+            "next_cursor": page["next_cursor"]
+        }
+    
+    def iter_submissions(self, team_id: Optional[str] = None, batch_size: int = 500) -> Iterator[BucketHandle]:
+        """
+        Iterate over submissions newest first without loading their bodies
+        Each handle exposes filename, team_id, timestamp, size and path;
+        call load() (or read .data) to parse the body on demand
+        
+        Args:
+            team_id: Optional team ID to filter submissions
+            batch_size: Index entries fetched per query
+            
+        Yields:
+            BucketHandle for each submission
+        """
+        index = get_bucket_index(os.getenv("BHIV_BUCKET_DIR", "./data/bucket"))
+        if index is None:
+            return
+        yield from index.iter_handles("submission", team_id=team_id, batch_size=batch_size)
+    
+    def count_submissions(self, team_id: Optional[str] = None) -> int:
+        """
+        Count submissions in the BHIV bucket without opening any files
+        
+        Args:
+            team_id: Optional team ID to filter submissions
+            
+        Returns:
+            Number of submissions
+        """
+        index = get_bucket_index(os.getenv("BHIV_BUCKET_DIR", "./data/bucket"))
+        return index.count("submission", team_id=team_id) if index else 0
+    
+    def get_transaction_ledger(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Get the transaction ledger with chaining
+        Entries are read from the ledger file, so only the requested slice is loaded
         
+        Args:
+            offset: Index of the first transaction
+            limit: Maximum number of transactions (None for all)
+            
         Returns:
             List of transaction records with hash chaining
         """
-        return self.transaction_ledger.copy()
+        return self._ledger.entries(offset, limit)
     
-    def verify_transaction_ledger_integrity(self) -> bool:
+    def get_transaction(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get one transaction by id (e.g. "txn_42") by seeking through the ledger index
+        
+        Args:
+            transaction_id: Transaction id
+            
+        Returns:
+            Transaction record or None if not found
+        """
+        return self._ledger.get_by_id(transaction_id)
+    
+    def verify_transaction_ledger_integrity(self, full: bool = False) -> bool:
         """
         Verify the integrity of the transaction ledger using hash chaining
+        Verification resumes from the last verified entry unless full is set
         
+        Args:
+            full: Re-verify every transaction from the start
+            
         Returns:
             True if ledger is valid, False otherwise
         """
-        if not self.transaction_ledger:
-            return True  # Empty ledger is valid
-            
-        previous_hash = None
-        for transaction in self.transaction_ledger:
-            # Verify the hash of the current transaction
-            transaction_copy = transaction.copy()
-            if "hash" in transaction_copy:
-                del transaction_copy["hash"]
-                
-            calculated_hash = self._calculate_hash(transaction_copy)
-            if calculated_hash != transaction["hash"]:
-                return False
-                
-            # Verify the chain (previous_hash should match the hash of the previous transaction)
-            if transaction["previous_hash"] != previous_hash:
-                return False
-                
-            previous_hash = transaction["hash"]
-            
-        return True
\ No newline at end of file
+        return self._ledger.verify(full=full)
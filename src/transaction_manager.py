@@ -3,119 +3,335 @@ Transaction Manager for HackaVerse
 Provides atomic transaction handling with retry logic for critical operations
 """
 
-import functools
+import asyncio
+import concurrent.futures
+import inspect
 import time
 import json
 import os
 import logging
-from typing import Any, Callable, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional, Sequence
+
+from .dead_letter import KIND_TRANSACTION, dead_letters
+# retry now lives in src.retry and is re-exported here for existing callers
+from .retry import full_jitter_delay, retry, retry_budget
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def retry(max_retries=3, backoff=1):
-    """
-    Decorator to add retry logic to functions with exponential backoff.
-    
-    Args:
-        max_retries: Maximum number of retry attempts
-        backoff: Backoff multiplier for retry delays
-        
-    Returns:
-        Decorated function with retry logic
-    """
-    def deco(f: Callable) -> Callable:
-        @functools.wraps(f)
-        def wrapper(*args, **kwargs):
-            last_exception: Optional[Exception] = None
-            for i in range(max_retries):
-                try:
-                    return f(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    logger.warning(f"Attempt {i+1} failed for {f.__name__}: {str(e)}")
-                    if i < max_retries - 1:  # Don't sleep on the last attempt
-                        time.sleep(backoff * (i + 1))
-            if last_exception:
-                logger.error(f"All {max_retries} attempts failed for {f.__name__}: {str(last_exception)}")
-                raise last_exception
-            else:
-                # This shouldn't happen, but just in case
-                raise Exception(f"All {max_retries} attempts failed for {f.__name__}")
-        return wrapper
-    return deco
+TRANSACTION_MAX_CONCURRENCY = int(os.getenv("TRANSACTION_MAX_CONCURRENCY", "8"))
 
 class TransactionError(Exception):
     """Exception raised when a transaction fails."""
     pass
 
 class Transaction:
-    """Manages a series of steps as a single atomic transaction."""
+    """
+    Manages a set of steps as a single transaction.
+
+    Steps form a dependency graph: a step starts once every step it depends
+    on has completed, so independent steps run concurrently. Coroutine
+    functions are awaited; plain functions run in worker threads. If any
+    step fails, no new steps are started, in-flight steps are allowed to
+    finish, and the compensations of all completed steps run in reverse
+    completion order.
+
+    Steps added with add_step depend on the previously added step, which
+    keeps the original strictly sequential behaviour. A transaction made
+    only of add_step plain functions is committed by commit() on the
+    calling thread, as it always was, so its steps may use thread-affine
+    resources such as sqlite connections and thread-locals.
+    """
     
-    def __init__(self, tx_id: str):
+    def __init__(self, tx_id: str, max_concurrency: int = TRANSACTION_MAX_CONCURRENCY):
         """
         Initialize a new transaction.
         
         Args:
             tx_id: Unique identifier for this transaction
+            max_concurrency: Maximum number of steps running at once
         """
         self.tx_id = tx_id
-        self._steps: List[Tuple[Callable, Tuple, dict]] = []
+        self.max_concurrency = max_concurrency
+        self._specs: List[Dict[str, Any]] = []
+        self.timings: Dict[str, Dict[str, Any]] = {}
         logger.info(f"Created transaction {tx_id}")
     
     def add_step(self, fn: Callable, *args, **kwargs) -> None:
         """
-        Add a step to the transaction.
+        Add a step that runs after the previously added step.
         
         Args:
             fn: Function to execute
             *args: Positional arguments for the function
             **kwargs: Keyword arguments for the function
         """
-        self._steps.append((fn, args, kwargs))
-        logger.debug(f"Added step {fn.__name__} to transaction {self.tx_id}")
+        depends_on = [self._specs[-1]["name"]] if self._specs else []
+        self.add_task(self._unique_name(getattr(fn, "__name__", "step")), fn, args=args, kwargs=kwargs,
+                      depends_on=depends_on)
+        self._specs[-1]["chained"] = True
+
+    @property
+    def _steps(self) -> List[Tuple[Callable, Tuple, dict]]:
+        """Read-only (fn, args, kwargs) view of the steps, in the order added."""
+        return [(spec["fn"], spec["args"], spec["kwargs"]) for spec in self._specs]
     
-    def commit(self) -> List[Any]:
+    def add_task(self, name: str, fn: Callable, args: Sequence = (), kwargs: Optional[dict] = None,
+                 depends_on: Sequence[str] = (), compensate: Optional[Callable[[Any], Any]] = None,
+                 max_retries: int = 1, backoff: float = 0.5) -> str:
         """
-        Execute all steps in the transaction sequentially.
+        Add a named step to the dependency graph.
         
+        Dependencies must name steps that were already added, so the graph
+        can never contain a cycle.
+        
+        Args:
+            name: Unique step name
+            fn: Function or coroutine function to execute
+            args: Positional arguments for the function
+            kwargs: Keyword arguments for the function
+            depends_on: Names of steps that must complete first
+            compensate: Called with the step's result if the transaction fails
+                after this step completed; may be a coroutine function
+            max_retries: Attempts before the step counts as failed; retries
+                draw on the process-wide retry budget
+            backoff: Full-jitter backoff base, doubled per attempt
+            
         Returns:
-            List of results from each step
+            The step name
             
         Raises:
-            TransactionError: If any step fails
+            ValueError: If the name is taken or a dependency is unknown
         """
-        logger.info(f"Committing transaction {self.tx_id} with {len(self._steps)} steps")
+        known = {spec["name"] for spec in self._specs}
+        if name in known:
+            raise ValueError(f"Step '{name}' already exists in transaction {self.tx_id}")
+        unknown = [dep for dep in depends_on if dep not in known]
+        if unknown:
+            raise ValueError(f"Step '{name}' depends on unknown steps: {unknown}")
+        
+        kwargs = kwargs or {}
+        self._specs.append({
+            "name": name,
+            "fn": fn,
+            "args": tuple(args),
+            "kwargs": kwargs,
+            "depends_on": list(depends_on),
+            "compensate": compensate,
+            "max_retries": max(1, max_retries),
+            "backoff": backoff,
+            "chained": False
+        })
+        logger.debug(f"Added step {name} to transaction {self.tx_id}")
+        return name
+    
+    def _unique_name(self, base: str) -> str:
+        names = {spec["name"] for spec in self._specs}
+        name, n = base, 1
+        while name in names:
+            n += 1
+            name = f"{base}_{n}"
+        return name
+    
+    @staticmethod
+    async def _call(fn: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    
+    async def _run_step(self, spec: Dict[str, Any], semaphore: asyncio.Semaphore) -> Any:
+        timing = self.timings[spec["name"]]
+        async with semaphore:
+            started = time.perf_counter()
+            timing["started_at"] = time.time()
+            timing["status"] = "running"
+            retry_budget.record_call()
+            try:
+                for attempt in range(spec["max_retries"]):
+                    timing["attempts"] = attempt + 1
+                    try:
+                        result = await self._call(spec["fn"], *spec["args"], **spec["kwargs"])
+                        timing["status"] = "completed"
+                        return result
+                    except Exception as e:
+                        logger.warning(f"Attempt {attempt+1} failed for step {spec['name']} "
+                                       f"in transaction {self.tx_id}: {str(e)}")
+                        if attempt == spec["max_retries"] - 1 or not retry_budget.try_acquire():
+                            timing["status"] = "failed"
+                            raise
+                        await asyncio.sleep(full_jitter_delay(attempt, spec["backoff"], 30.0))
+            finally:
+                timing["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    
+    def _start_commit(self) -> None:
+        logger.info(f"Committing transaction {self.tx_id} with {len(self._specs)} steps")
+        self.timings = {
+            spec["name"]: {"status": "pending", "attempts": 0, "started_at": None, "duration_ms": None,
+                           "depends_on": spec["depends_on"]}
+            for spec in self._specs
+        }
+
+    def _is_sync_chain(self) -> bool:
+        """True if every step was added with add_step and is a plain function."""
+        return all(spec["chained"] and not inspect.iscoroutinefunction(spec["fn"]) for spec in self._specs)
+
+    def _commit_inline(self) -> List[Any]:
+        """Run an add_step chain of plain functions one after another on the calling thread."""
+        self._start_commit()
         results = []
+        for position, spec in enumerate(self._specs):
+            timing = self.timings[spec["name"]]
+            started = time.perf_counter()
+            timing["started_at"] = time.time()
+            timing["status"] = "running"
+            timing["attempts"] = 1
+            retry_budget.record_call()
+            try:
+                results.append(spec["fn"](*spec["args"], **spec["kwargs"]))
+                timing["status"] = "completed"
+            except Exception as e:
+                timing["status"] = "failed"
+                for later in self._specs[position + 1:]:
+                    self.timings[later["name"]]["status"] = "skipped"
+                self._record_failure(spec["name"], e, [])
+                logger.error(f"Transaction {self.tx_id} failed: {str(e)}")
+                raise TransactionError(f"Transaction {self.tx_id} failed: {str(e)}") from e
+            finally:
+                timing["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"Transaction {self.tx_id} committed successfully")
+        return results
+
+    async def commit_async(self) -> List[Any]:
+        """
+        Execute the step graph on the running event loop.
         
-        try:
-            # Execute steps sequentially
-            for i, (fn, args, kwargs) in enumerate(self._steps):
-                logger.debug(f"Executing step {i+1}: {fn.__name__}")
-                result = fn(*args, **kwargs)
-                results.append(result)
-                logger.debug(f"Step {i+1} completed successfully")
-            
-            logger.info(f"Transaction {self.tx_id} committed successfully")
-            return results
-            
-        except Exception as e:
-            # Log failed transaction for manual review
-            error_info = {
-                "tx_id": self.tx_id,
-                "error": str(e),
-                "timestamp": time.time()
-            }
+        Returns:
+            List of results from each step, in the order the steps were added
             
-            # Ensure data directory exists
-            os.makedirs("data", exist_ok=True)
+        Raises:
+            TransactionError: If any step fails
+        """
+        self._start_commit()
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        results: Dict[str, Any] = {}
+        completed: List[str] = []
+        remaining = {spec["name"]: spec for spec in self._specs}
+        running: Dict[asyncio.Task, str] = {}
+        failure: Optional[Tuple[str, Exception]] = None
+        
+        while remaining or running:
+            if failure is None:
+                ready = [name for name, spec in remaining.items()
+                         if all(dep in results for dep in spec["depends_on"])]
+                for name in ready:
+                    spec = remaining.pop(name)
+                    logger.debug(f"Executing step {name}")
+                    running[asyncio.ensure_future(self._run_step(spec, semaphore))] = name
+            if not running:
+                break
             
+            done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    results[name] = task.result()
+                    completed.append(name)
+                    logger.debug(f"Step {name} completed successfully")
+                except Exception as e:
+                    if failure is None:
+                        failure = (name, e)
+        
+        if failure is None:
+            logger.info(f"Transaction {self.tx_id} committed successfully")
+            return [results[spec["name"]] for spec in self._specs]
+        
+        failed_step, error = failure
+        for name in remaining:
+            self.timings[name]["status"] = "skipped"
+        compensated = await self._compensate(completed, results)
+        self._record_failure(failed_step, error, compensated)
+        logger.error(f"Transaction {self.tx_id} failed: {str(error)}")
+        raise TransactionError(f"Transaction {self.tx_id} failed: {str(error)}") from error
+    
+    async def _compensate(self, completed: List[str], results: Dict[str, Any]) -> List[str]:
+        """Run compensations for completed steps in reverse completion order."""
+        specs = {spec["name"]: spec for spec in self._specs}
+        compensated = []
+        for name in reversed(completed):
+            compensate = specs[name]["compensate"]
+            if compensate is None:
+                continue
             try:
-                with open("data/failed_transactions.json", "a") as fh:
-                    fh.write(json.dumps(error_info) + "\n")
-                logger.info(f"Failed transaction {self.tx_id} logged to data/failed_transactions.json")
-            except Exception as log_error:
-                logger.error(f"Failed to log transaction error: {str(log_error)}")
+                await self._call(compensate, results[name])
+                self.timings[name]["status"] = "compensated"
+                compensated.append(name)
+            except Exception as e:
+                self.timings[name]["status"] = "compensation_failed"
+                logger.error(f"Compensation for step {name} in transaction {self.tx_id} failed: {str(e)}")
+        return compensated
+    
+    def _record_failure(self, failed_step: str, error: Exception, compensated: List[str]) -> None:
+        # Log failed transaction for manual review
+        error_info = {
+            "tx_id": self.tx_id,
+            "error": str(error),
+            "failed_step": failed_step,
+            "compensated": compensated,
+            "timestamp": time.time()
+        }
+        
+        # Ensure data directory exists
+        os.makedirs("data", exist_ok=True)
+        
+        try:
+            with open("data/failed_transactions.json", "a") as fh:
+                fh.write(json.dumps(error_info) + "\n")
+            logger.info(f"Failed transaction {self.tx_id} logged to data/failed_transactions.json")
+        except Exception as log_error:
+            logger.error(f"Failed to log transaction error: {str(log_error)}")
+        
+        try:
+            # Steps are arbitrary callables, so the dead letter records
+            # what ran for manual review rather than something replayable
+            dead_letters.add(KIND_TRANSACTION, {
+                "tx_id": self.tx_id,
+                "steps": [spec["name"] for spec in self._specs],
+                "failed_step": failed_step,
+                "compensated": compensated
+            }, error=str(error), source="transaction_manager")
+        except Exception as dlq_error:
+            logger.error(f"Failed to record dead letter: {str(dlq_error)}")
+    
+    def commit(self) -> List[Any]:
+        """
+        Execute the step graph and wait for it to finish.
+        
+        A chain of plain functions added with add_step runs on the calling
+        thread. Any other graph is safe to commit from synchronous code
+        running inside an event loop: it then runs on a separate thread with
+        its own loop.
+        
+        Returns:
+            List of results from each step, in the order the steps were added
             
-            logger.error(f"Transaction {self.tx_id} failed: {str(e)}")
-            raise TransactionError(f"Transaction {self.tx_id} failed: {str(e)}") from e
\ No newline at end of file
+        Raises:
+            TransactionError: If any step fails
+        """
+        if self._is_sync_chain():
+            return self._commit_inline()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.commit_async())
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.commit_async()).result()
+    
+    def get_timings(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-step timing from the last commit.
+        
+        Returns:
+            Dictionary keyed by step name with status, attempts, started_at
+            (epoch seconds), duration_ms and depends_on
+        """
+        return {name: dict(timing) for name, timing in self.timings.items()}
@@ -0,0 +1,391 @@
+"""
+Write-Behind Queue for BHIV side effects
+Executor and RewardSystem enqueue Core sends, bucket saves and log relays to
+an on-disk SQLite journal; a background worker delivers them in batches with
+retry, so requests return as soon as the compute is done
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+import requests
+
+from src.integrations.bhiv_connectors import send_to_core, save_batch_to_bucket
+from src.bucket_connector import relay_to_bucket, relay_many_to_bucket
+from src.dead_letter import KIND_BUCKET_SAVE, KIND_CORE_SEND, KIND_LOG_RELAY, dead_letters
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", "data/write_behind.sqlite3")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "8"))
+# Seconds a claimed batch stays reserved for its worker before others may take it over
+WRITE_BEHIND_LEASE_SECONDS = float(os.getenv("WRITE_BEHIND_LEASE_SECONDS", "120"))
+
+KIND_CORE = "core"
+KIND_BUCKET = "bucket"
+KIND_LOG = "log"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    filename TEXT,
+    actor TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT,
+    lease_until REAL,
+    claimed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_due ON jobs (status, next_attempt_at);
+"""
+
+# Columns added after the first release; journals created before get them on open
+_ADDED_COLUMNS = {"lease_until": "REAL", "claimed_by": "TEXT"}
+
+# Core is unreachable: the rest of the batch would only wait out the same timeout
+_CONNECTION_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def core_idempotency_key(job: Dict[str, Any]) -> str:
+    """Idempotency-Key for a Core send job: its id, plus its enqueue time so a recreated journal cannot reuse it."""
+    return f"write-behind-{job['id']}-{int(job['created_at'] * 1000000)}"
+
+
+class WriteBehindQueue:
+    """
+    Durable queue of side effects with a background delivery worker.
+
+    A job is only removed from the journal after it has been delivered, so
+    delivery is at-least-once: jobs pending at shutdown or crash are picked
+    up again when the worker next starts. Failed deliveries are retried with
+    exponential backoff; after max_attempts a job is moved to the
+    dead-letter queue, from where it can be replayed.
+
+    Workers sharing a journal (several server processes, or a restart that
+    overlaps the old process) claim a batch atomically by marking it
+    in_flight with a lease; a batch whose worker died becomes claimable
+    again when the lease expires. Core sends carry an Idempotency-Key
+    built from the job id, so a re-delivery after an expired lease can be
+    dropped by Core.
+    """
+
+    def __init__(self, journal_path: str = WRITE_BEHIND_JOURNAL, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS, base_delay: float = 1.0,
+                 max_delay: float = 300.0, poll_interval: float = 0.5, auto_start: bool = True,
+                 lease_seconds: float = WRITE_BEHIND_LEASE_SECONDS):
+        """
+        Initialize the queue. The journal is opened on first use.
+
+        Args:
+            journal_path: SQLite journal file
+            batch_size: Maximum jobs delivered per worker iteration
+            max_attempts: Attempts before a job is moved to the dead-letter queue
+            base_delay: Retry delay after the first failure, doubled per attempt
+            max_delay: Upper bound on the retry delay
+            poll_interval: Worker sleep when no job is due
+            auto_start: Start the worker on the first enqueue
+            lease_seconds: How long a claimed batch is reserved for this worker
+        """
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.auto_start = auto_start
+        self.lease_seconds = lease_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.journal_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.journal_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            with self._conn:
+                for column, column_type in _ADDED_COLUMNS.items():
+                    if column not in columns:
+                        self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        return self._conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], filename: Optional[str] = None,
+                actor: Optional[str] = None) -> int:
+        """
+        Add one side effect to the journal.
+
+        Args:
+            kind: KIND_CORE, KIND_BUCKET or KIND_LOG
+            payload: Payload to deliver
+            filename: Bucket filename (KIND_BUCKET only)
+            actor: Component whose audit log should record the outcome
+
+        Returns:
+            Job id
+        """
+        return self.enqueue_many([(kind, payload, filename, actor)])[0]
+
+    def enqueue_many(self, jobs: List[Tuple[str, Dict[str, Any], Optional[str], Optional[str]]]) -> List[int]:
+        """
+        Add several side effects to the journal in one transaction.
+
+        Args:
+            jobs: List of (kind, payload, filename, actor) tuples
+
+        Returns:
+            Job ids, in the order of jobs
+        """
+        now = time.time()
+        ids = []
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for kind, payload, filename, actor in jobs:
+                    cursor = conn.execute(
+                        "INSERT INTO jobs (kind, payload, filename, actor, next_attempt_at, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (kind, json.dumps(payload, default=str), filename, actor, now, now)
+                    )
+                    ids.append(cursor.lastrowid)
+        if self.auto_start:
+            self.start()
+        self._wake.set()
+        return ids
+
+    def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Mark up to limit due jobs in_flight for this worker and return them."""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            conn = self._db()
+            with conn:
+                # One statement, so two workers can never claim the same job
+                conn.execute(
+                    "UPDATE jobs SET status = 'in_flight', lease_until = ?, claimed_by = ? WHERE id IN ("
+                    "SELECT id FROM jobs WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                    "OR (status = 'in_flight' AND lease_until <= ?) ORDER BY id LIMIT ?)",
+                    (now + self.lease_seconds, token, now, now, limit)
+                )
+            rows = conn.execute(
+                "SELECT id, kind, payload, filename, actor, attempts, created_at FROM jobs "
+                "WHERE claimed_by = ? AND status = 'in_flight' ORDER BY id",
+                (token,)
+            ).fetchall()
+        return [
+            {"id": row[0], "kind": row[1], "payload": json.loads(row[2]), "filename": row[3],
+             "actor": row[4], "attempts": row[5], "created_at": row[6]}
+            for row in rows
+        ]
+
+    def _release(self, jobs: List[Dict[str, Any]], next_attempt_at: float) -> None:
+        """Return claimed jobs to pending without counting an attempt."""
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'pending', next_attempt_at = ?, lease_until = NULL, claimed_by = NULL "
+                    "WHERE id = ?",
+                    [(next_attempt_at, job["id"]) for job in jobs]
+                )
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+
+    def _ack(self, jobs: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.executemany("DELETE FROM jobs WHERE id = ?", [(job["id"],) for job in jobs])
+
+    def _retry(self, jobs: List[Dict[str, Any]], error: Exception) -> int:
+        """Reschedule failed jobs with backoff; return how many were dead-lettered."""
+        now = time.time()
+        dead = []
+        updates = []
+        for job in jobs:
+            attempts = job["attempts"] + 1
+            if attempts >= self.max_attempts:
+                logger.error(f"Write-behind job {job['id']} ({job['kind']}) failed {attempts} times: {error}")
+                self._dead_letter(job, error)
+                dead.append(job)
+                continue
+            updates.append((attempts, now + self._backoff(attempts), str(error), job["id"]))
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.executemany(
+                    "UPDATE jobs SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?, "
+                    "lease_until = NULL, claimed_by = NULL WHERE id = ?",
+                    updates
+                )
+        self._ack(dead)
+        return len(dead)
+
+    def _dead_letter(self, job: Dict[str, Any], error: Exception) -> None:
+        if job["kind"] == KIND_BUCKET:
+            kind, payload = KIND_BUCKET_SAVE, {"filename": job["filename"], "payload": job["payload"]}
+        elif job["kind"] == KIND_LOG:
+            kind, payload = KIND_LOG_RELAY, job["payload"]
+        else:
+            kind, payload = KIND_CORE_SEND, job["payload"]
+        dead_letters.add(kind, payload, error=str(error), source="write_behind")
+
+    def _audit(self, job: Dict[str, Any], intent: str, outcome: str, context: str) -> None:
+        if job.get("actor"):
+            relay_to_bucket({
+                "timestamp": datetime.now().isoformat(),
+                "intent": intent,
+                "actor": job["actor"],
+                "context": context,
+                "outcome": outcome
+            })
+
+    def _deliver_bucket(self, jobs: List[Dict[str, Any]]) -> None:
+        stored = save_batch_to_bucket([(job["filename"], job["payload"]) for job in jobs])
+        for job, result in zip(jobs, stored):
+            self._audit(job, "bucket_save", "success", f"Saved to BHIV Bucket: {result['path']}")
+
+    def _deliver_logs(self, jobs: List[Dict[str, Any]]) -> None:
+        records = [job["payload"] for job in jobs]
+        try:
+            relay_many_to_bucket(records)
+        except Exception as e:
+            # Same degraded-mode behaviour as synchronous relays: file fallback
+            logger.warning(f"Bulk log relay failed, falling back per record: {e}")
+            for record in records:
+                relay_to_bucket(record)
+
+    def process_once(self) -> Dict[str, int]:
+        """
+        Deliver one batch of due jobs.
+
+        Bucket saves are written with one save_batch_to_bucket call and log
+        relays with one insert_many; Core sends go one by one with a single
+        attempt each, since the journal already handles retry. When Core
+        cannot be reached, the remaining Core sends of the batch are put
+        back unattempted and wait as long as the failed one.
+
+        Returns:
+            Dictionary with delivered, retried and dead counts
+        """
+        jobs = self._claim(self.batch_size)
+        result = {"delivered": 0, "retried": 0, "dead": 0}
+        by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for job in jobs:
+            by_kind.setdefault(job["kind"], []).append(job)
+
+        def settle(batch, error=None):
+            if error is None:
+                self._ack(batch)
+                result["delivered"] += len(batch)
+            else:
+                dead = self._retry(batch, error)
+                result["retried"] += len(batch) - dead
+                result["dead"] += dead
+
+        for kind, batch in by_kind.items():
+            if kind == KIND_CORE:
+                for position, job in enumerate(batch):
+                    try:
+                        send_to_core(job["payload"], max_retries=1, log_failures=False,
+                                     idempotency_key=core_idempotency_key(job))
+                        self._audit(job, "core_communication", "success", "Successfully sent to BHIV Core")
+                        settle([job])
+                    except Exception as e:
+                        self._audit(job, "core_communication", "failure", f"Failed to send to BHIV Core: {str(e)}")
+                        settle([job], e)
+                        rest = batch[position + 1:]
+                        if isinstance(e, _CONNECTION_ERRORS) and rest:
+                            logger.warning(f"BHIV Core unreachable, deferring {len(rest)} queued sends")
+                            self._release(rest, time.time() + self._backoff(job["attempts"] + 1))
+                            break
+                continue
+            try:
+                if kind == KIND_BUCKET:
+                    self._deliver_bucket(batch)
+                elif kind == KIND_LOG:
+                    self._deliver_logs(batch)
+                else:
+                    raise ValueError(f"Unknown write-behind job kind '{kind}'")
+                settle(batch)
+            except Exception as e:
+                logger.warning(f"Write-behind {kind} delivery failed: {e}")
+                settle(batch, e)
+        return result
+
+    def _run(self) -> None:
+        logger.info("Write-behind worker started")
+        while not self._stop.is_set():
+            try:
+                result = self.process_once()
+            except Exception as e:
+                logger.error(f"Write-behind worker iteration failed: {e}")
+                result = {"delivered": 0}
+            if not result["delivered"]:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        logger.info("Write-behind worker stopped")
+
+    def start(self) -> None:
+        """Start the background worker if it is not running."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background worker; undelivered jobs stay in the journal."""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._worker = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and age.
+
+        Returns:
+            Dictionary with the pending count (including jobs in flight), the
+            in-flight count and the age in seconds of the oldest pending job
+        """
+        with self._lock:
+            conn = self._db()
+            pending, in_flight, oldest = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status = 'in_flight'), 0), MIN(created_at) FROM jobs"
+            ).fetchone()
+        return {
+            "pending": pending,
+            "in_flight": in_flight,
+            "oldest_pending_age_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "worker_running": self._worker is not None and self._worker.is_alive()
+        }
+
+
+# Global write-behind queue instance
+write_behind_queue = WriteBehindQueue()
+
+
+def get_write_behind_queue() -> Optional[WriteBehindQueue]:
+    """Return the global queue when WRITE_BEHIND_ENABLED is set, otherwise None."""
+    return write_behind_queue if WRITE_BEHIND_ENABLED else None
@@ -0,0 +1,263 @@
+# state_encoders.py
+"""
+State encoders for the RL engine.
+Turn an agent context dict into the state key used by the Q-table, and
+keep cardinality statistics so an unbounded state space is easy to spot.
+
+- JsonStateEncoder: the full context as sorted JSON (the original behaviour;
+  every distinct free-text value is a new state)
+- HashingStateEncoder: an allow-list of keys, numeric fields discretized
+  into bins, long text reduced to one of a few buckets, and the resulting
+  feature set hashed into a fixed number of states
+"""
+
+import os
+import bisect
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Encoder used by RLEngine when none is passed: "json" or "hashed"
+RL_STATE_ENCODER = os.getenv("RL_STATE_ENCODER", "json").lower()
+# Number of states the hashed encoder maps every context into
+RL_STATE_BUCKETS = int(os.getenv("RL_STATE_BUCKETS", "4096"))
+# Comma-separated context keys to keep (dotted for nested keys); empty keeps all
+RL_STATE_KEYS = [key.strip() for key in os.getenv("RL_STATE_KEYS", "").split(",") if key.strip()]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def stable_hash(text: str) -> int:
+    """64-bit hash that is the same in every process (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class NumericDiscretizer:
+    """Map a number to the index of the bin it falls in."""
+
+    def __init__(self, edges: Sequence[float]):
+        """
+        Initialize with sorted bin edges.
+
+        Args:
+            edges: Increasing bin edges; n edges make n + 1 bins, values
+                below edges[0] fall in bin 0 and values >= edges[-1] in bin n
+        """
+        self.edges = sorted(float(edge) for edge in edges)
+
+    @classmethod
+    def uniform(cls, low: float, high: float, bins: int) -> "NumericDiscretizer":
+        """
+        Evenly spaced bins over [low, high).
+
+        Args:
+            low: Lower edge of the first inner bin
+            high: Upper edge of the last inner bin
+            bins: Number of bins between low and high
+
+        Returns:
+            NumericDiscretizer instance
+        """
+        step = (high - low) / max(1, bins)
+        return cls([low + step * n for n in range(max(1, bins) + 1)])
+
+    def bin(self, value: float) -> int:
+        """Bin index of a value."""
+        return bisect.bisect_right(self.edges, float(value))
+
+
+class StateEncoder:
+    """
+    Base encoder: restricts the context to allowed keys and counts how
+    often each state is produced.
+    """
+
+    name = "base"
+    max_states: Optional[int] = None
+
+    def __init__(self, keys: Optional[Iterable[str]] = None):
+        """
+        Initialize encoder.
+
+        Args:
+            keys: Allow-list of context keys (dotted for nested keys);
+                None keeps every key
+        """
+        self.keys = list(keys) if keys else None
+        self._counts: Dict[str, int] = {}
+        self._observations = 0
+        self._lock = threading.Lock()
+
+    def _select(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Restrict a context to the allowed keys."""
+        if self.keys is None:
+            return context
+        selected = {}
+        for key in self.keys:
+            value: Any = context
+            for part in key.split("."):
+                if not isinstance(value, dict) or part not in value:
+                    break
+                value = value[part]
+            else:
+                selected[key] = value
+        return selected
+
+    def _encode(self, context: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def encode(self, context: Dict[str, Any]) -> str:
+        """
+        Encode a context as a state key and record it in the statistics.
+
+        Args:
+            context: Agent context
+
+        Returns:
+            State key
+        """
+        state = self._encode(self._select(context))
+        with self._lock:
+            self._observations += 1
+            self._counts[state] = self._counts.get(state, 0) + 1
+        return state
+
+    def get_stats(self, top: int = 5) -> Dict[str, Any]:
+        """
+        Get state-space cardinality statistics since the encoder was created.
+
+        Args:
+            top: Number of most frequent states to include
+
+        Returns:
+            Dictionary with observation, distinct and singleton state counts,
+            the state bound (None if unbounded), key lengths and top states
+        """
+        with self._lock:
+            counts = dict(self._counts)
+            observations = self._observations
+        distinct = len(counts)
+        most_common = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "encoder": self.name,
+            "observations": observations,
+            "distinct_states": distinct,
+            "singleton_states": sum(1 for count in counts.values() if count == 1),
+            # share of observations that produced a state not seen before
+            "new_state_rate": round(distinct / observations, 4) if observations else 0.0,
+            "max_states": self.max_states,
+            "avg_state_key_length": round(sum(map(len, counts)) / distinct, 1) if distinct else 0.0,
+            "top_states": [{"state": state[:80], "count": count} for state, count in most_common],
+        }
+
+
+class JsonStateEncoder(StateEncoder):
+    """The whole (allowed) context as sorted JSON."""
+
+    name = "json"
+
+    def _encode(self, context: Dict[str, Any]) -> str:
+        return json.dumps(context, sort_keys=True)
+
+
+class HashingStateEncoder(StateEncoder):
+    """
+    Feature-hashed states.
+
+    The context is flattened to features: numbers go through the field's
+    discretizer (if any), short strings are kept as categories, long text
+    becomes one of text_buckets values per field, and lists contribute one
+    feature per item. The sorted feature set is hashed into one of
+    n_buckets states, so the Q-table never holds more than n_buckets rows.
+    """
+
+    name = "hashed"
+
+    def __init__(self, n_buckets: int = RL_STATE_BUCKETS, keys: Optional[Iterable[str]] = None,
+                 discretizers: Optional[Dict[str, NumericDiscretizer]] = None,
+                 max_category_length: int = 32, text_buckets: int = 16):
+        """
+        Initialize encoder.
+
+        Args:
+            n_buckets: Number of distinct states
+            keys: Allow-list of context keys (dotted for nested keys)
+            discretizers: Discretizer per (dotted) numeric field
+            max_category_length: Longer strings are treated as free text
+            text_buckets: Values a free-text field can take
+        """
+        super().__init__(keys)
+        self.n_buckets = max(1, n_buckets)
+        self.max_states = self.n_buckets
+        self.discretizers = discretizers or {}
+        self.max_category_length = max_category_length
+        self.text_buckets = max(1, text_buckets)
+
+    def features(self, context: Dict[str, Any], text_tokens: bool = False) -> List[str]:
+        """
+        Sorted feature strings of the allowed part of a context.
+
+        Args:
+            context: Agent context
+            text_tokens: Emit one "field~token" feature per word of free
+                text instead of its text bucket (for linear models)
+
+        Returns:
+            List of "field=value" features
+        """
+        return self._features(self._select(context), text_tokens)
+
+    def _features(self, context: Dict[str, Any], text_tokens: bool = False) -> List[str]:
+        features = set()
+        stack: List[Tuple[str, Any]] = list(context.items())
+        while stack:
+            key, value = stack.pop()
+            if isinstance(value, dict):
+                stack.extend((f"{key}.{k}", v) for k, v in value.items())
+            elif isinstance(value, (list, tuple, set)):
+                stack.extend((key, item) for item in value)
+            elif isinstance(value, (bool, int, float)) or value is None:
+                features.add(f"{key}={self._number_value(key, value)}")
+            else:
+                text = " ".join(_TOKEN_RE.findall(str(value).lower()))
+                if len(text) <= self.max_category_length:
+                    features.add(f"{key}={text}")
+                elif text_tokens:
+                    features.update(f"{key}~{token}" for token in text.split())
+                else:
+                    features.add(f"{key}=text{stable_hash(text) % self.text_buckets}")
+        return sorted(features)
+
+    def _number_value(self, key: str, value: Any) -> str:
+        if isinstance(value, bool) or value is None:
+            return str(value)
+        discretizer = self.discretizers.get(key)
+        return f"bin{discretizer.bin(value)}" if discretizer else repr(value)
+
+    def _encode(self, context: Dict[str, Any]) -> str:
+        bucket = stable_hash("\x1f".join(self._features(context))) % self.n_buckets
+        return f"h{bucket}"
+
+
+def make_state_encoder(name: str = RL_STATE_ENCODER, **kwargs) -> StateEncoder:
+    """
+    Build an encoder by name.
+
+    Args:
+        name: "json" or "hashed"
+        **kwargs: Encoder arguments; keys defaults to RL_STATE_KEYS
+
+    Returns:
+        StateEncoder instance
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    kwargs.setdefault("keys", RL_STATE_KEYS or None)
+    if name == "json":
+        return JsonStateEncoder(**kwargs)
+    if name == "hashed":
+        return HashingStateEncoder(**kwargs)
+    raise ValueError(f"Unknown state encoder: {name}")
@@ -0,0 +1,47 @@
+"""
+Unit tests for adaptive (early-stop) multi-agent judging
+"""
+
+from unittest.mock import patch
+
+from src.judging.multi_agent_judge import MultiAgentJudge, adaptive_stats
+from src.judging.rubric import CRITERIA
+
+
+def _evaluation(score):
+    return {"scores": {c: score for c in CRITERIA}, "explanation": "test", "confidence": 0.8}
+
+
+class TestAdaptiveJudging:
+    """Test cases for the adaptive judging mode"""
+
+    def setup_method(self):
+        adaptive_stats.reset()
+
+    def test_agreeing_judges_skip_third(self):
+        judge = MultiAgentJudge(adaptive=True, disagreement_threshold=1.0)
+        with patch.object(judge, "_get_specialized_evaluation", side_effect=[_evaluation(7), _evaluation(8)]) as mock_eval:
+            result = judge.evaluate_submission("text", team_id="t1", event_id="e1")
+        assert mock_eval.call_count == 2
+        assert set(result["individual_scores"]) == {"judge_a", "judge_b"}
+        stats = adaptive_stats.get_stats("e1")
+        assert stats["calls_saved"] == 1
+        assert stats["escalations"] == 0
+
+    def test_disagreeing_judges_escalate(self):
+        judge = MultiAgentJudge(adaptive=True, disagreement_threshold=1.0)
+        side_effect = [_evaluation(9), _evaluation(3), _evaluation(6)]
+        with patch.object(judge, "_get_specialized_evaluation", side_effect=side_effect) as mock_eval:
+            result = judge.evaluate_submission("text", team_id="t1", event_id="e1")
+        assert mock_eval.call_count == 3
+        assert result["consensus_scores"]["criteria"]["usefulness"] == 6.0
+        stats = adaptive_stats.get_stats("e1")
+        assert stats["escalations"] == 1
+        assert stats["calls_saved"] == 0
+
+    def test_non_adaptive_calls_every_judge(self):
+        judge = MultiAgentJudge(adaptive=False)
+        with patch.object(judge, "_get_specialized_evaluation", return_value=_evaluation(7)) as mock_eval:
+            judge.evaluate_submission("text", event_id="e2")
+        assert mock_eval.call_count == 3
+        assert adaptive_stats.get_stats() == {}
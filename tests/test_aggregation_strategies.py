@@ -0,0 +1,96 @@
+"""
+Unit tests for consensus aggregation strategies
+"""
+
+import numpy as np
+import pytest
+
+from src.judging.aggregation_strategies import (
+    EventStrategyRegistry,
+    apply_strategy,
+    fill_missing_confidences,
+    get_strategy,
+)
+from src.judging.consensus import ConsensusAggregator
+from src.judging.score_matrix import CRITERIA_ORDER
+
+
+# One criterion, three judges, the third is an outlier
+PANEL = np.array([[8.0], [7.0], [1.0]])
+CONFIDENCES = np.array([0.9, 0.9, 0.2])
+
+
+class TestStrategies:
+    """Test cases for the individual strategies"""
+
+    def test_mean(self):
+        assert apply_strategy(PANEL, None, "mean")[0] == pytest.approx(16 / 3)
+
+    def test_confidence_weighted(self):
+        expected = (8 * 0.9 + 7 * 0.9 + 1 * 0.2) / 2.0
+        assert apply_strategy(PANEL, CONFIDENCES, "confidence_weighted")[0] == pytest.approx(expected)
+
+    def test_missing_confidence_counts_as_panel_mean(self):
+        conf = fill_missing_confidences([0.9, None, 0.3])
+        np.testing.assert_allclose(conf, [0.9, 0.6, 0.3])
+        expected = (8 * 0.9 + 7 * 0.6 + 1 * 0.3) / 1.8
+        assert apply_strategy(PANEL, [0.9, None, 0.3], "confidence_weighted")[0] == pytest.approx(expected)
+        # nobody reported a confidence: plain mean
+        assert apply_strategy(PANEL, [None, None, None], "confidence_weighted")[0] == pytest.approx(16 / 3)
+
+    def test_median_and_trimmed_mean_ignore_outlier(self):
+        assert apply_strategy(PANEL, None, "median")[0] == 7.0
+        assert apply_strategy(PANEL, None, "trimmed_mean")[0] == 7.0
+
+    def test_median_ignores_missing(self):
+        panel = np.array([[8.0], [np.nan], [6.0]])
+        assert apply_strategy(panel, None, "median")[0] == 7.0
+
+    def test_bayesian_shrinkage_pulls_toward_prior(self):
+        result = apply_strategy(np.array([[10.0]]), np.array([1.0]), "bayesian_shrinkage",
+                                prior_means=np.array([6.0]), prior_strength=1.0)
+        assert result[0] == pytest.approx(8.0)
+
+    def test_batched_tensor(self):
+        tensor = np.stack([PANEL, PANEL + 1])
+        assert apply_strategy(tensor, None, "median")[:, 0].tolist() == [7.0, 8.0]
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            get_strategy("mode")
+
+
+class TestEventSelection:
+    """Test cases for per-event strategy selection"""
+
+    def test_event_override_and_default(self):
+        registry = EventStrategyRegistry()
+        registry.set_strategy("finals", "trimmed_mean", trim_fraction=0.3)
+        assert registry.resolve("finals") == ("trimmed_mean", {"trim_fraction": 0.3})
+        assert registry.resolve("other")[0] == "confidence_weighted"
+
+    def test_bayesian_uses_event_mean(self):
+        registry = EventStrategyRegistry()
+        registry.record_consensus("e1", np.array([4.0, 6.0]))
+        registry.record_consensus("e1", np.array([6.0, 8.0]))
+        name, params = registry.resolve("e1", "bayesian_shrinkage")
+        np.testing.assert_allclose(params["prior_means"], [5.0, 7.0])
+
+    def test_aggregator_uses_confidence(self):
+        evaluations = [
+            {"scores": {c: 8 for c in CRITERIA_ORDER}, "confidence": 0.9},
+            {"scores": {c: 2 for c in CRITERIA_ORDER}, "confidence": 0.1},
+        ]
+        result = ConsensusAggregator().calculate_consensus_with_confidence(evaluations)
+        assert result["strategy"] == "confidence_weighted"
+        assert result["criteria"]["usefulness"] == pytest.approx(7.4)
+        assert result["confidence"] == 0.5
+
+    def test_aggregator_tolerates_missing_confidence(self):
+        evaluations = [
+            {"scores": {c: 8 for c in CRITERIA_ORDER}, "confidence": 0.9},
+            {"scores": {c: 2 for c in CRITERIA_ORDER}, "confidence": None},
+        ]
+        result = ConsensusAggregator().calculate_consensus_with_confidence(evaluations)
+        assert result["criteria"]["usefulness"] == pytest.approx(5.0)
+        assert result["confidence"] == 0.9
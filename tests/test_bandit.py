@@ -0,0 +1,153 @@
+"""
+Unit tests for the contextual bandit suggestion strategy
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import rl_engine
+from adaptive_agent import bandit as bandit_module
+from adaptive_agent.bandit import ContextFeaturizer, ContextualBandit
+from adaptive_agent.storage import WeightsRepository
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rl_engine, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+class TestContextFeaturizer:
+    """Test cases for ContextFeaturizer"""
+
+    def test_unit_norm_with_bias(self):
+        featurizer = ContextFeaturizer(dim=16)
+        x = featurizer.transform({"stage": "build", "user_text": "a long message about being stuck on a bug"})
+        assert x.shape == (16,)
+        assert np.linalg.norm(x) == pytest.approx(1.0)
+        assert x[0] > 0
+        assert np.array_equal(featurizer.transform({}), np.eye(16)[0])
+
+
+class TestContextualBandit:
+    """Test cases for ContextualBandit"""
+
+    def test_sherman_morrison_matches_direct_inverse(self, data_dir):
+        bandit = ContextualBandit("sm", dim=8, ridge=2.0, flush_every=10 ** 6)
+        bandit.register_actions(["a"])
+        contexts = [{"k": f"v{n % 5}", "n": n % 3} for n in range(40)]
+        for n, context in enumerate(contexts):
+            bandit.update(context, "a", float(n % 2))
+        xs = np.array([bandit.featurizer.transform(c) for c in contexts])
+        a = 2.0 * np.eye(8) + xs.T @ xs
+        assert bandit.a_inv[0] == pytest.approx(np.linalg.inv(a))
+        assert bandit.theta[0] == pytest.approx(np.linalg.solve(a, xs.T @ (np.arange(40) % 2)))
+
+    @pytest.mark.parametrize("policy", ["linucb", "thompson"])
+    def test_learns_best_suggestion_per_context(self, data_dir, policy):
+        rng = np.random.default_rng(0)
+        bandit = ContextualBandit("learn", policy=policy, dim=16, alpha=0.5, flush_every=10 ** 6, seed=0)
+        bandit.register_actions(["focus", "rest"])
+        best = {"tired": "rest", "distracted": "focus"}
+        for _ in range(300):
+            mood = rng.choice(list(best))
+            action = bandit.choose({"mood": mood})
+            bandit.update({"mood": mood}, action, 1.0 if action == best[mood] else -1.0)
+        for mood, action in best.items():
+            assert bandit.expected_reward({"mood": mood}, action) > 0.5
+        assert bandit.get_stats()["updates"]["focus"] + bandit.get_stats()["updates"]["rest"] == 300
+
+    def test_candidates_and_errors(self, data_dir):
+        bandit = ContextualBandit("candidates", dim=8)
+        with pytest.raises(ValueError):
+            bandit.choose({})
+        bandit.register_actions(["a", "b", "a"])
+        assert bandit.actions == ["a", "b"]
+        assert bandit.choose({}, candidates=["b"]) == "b"
+        assert bandit.scores({}, candidates=[]) == {}
+        with pytest.raises(ValueError):
+            bandit.choose({}, candidates=[])
+        with pytest.raises(ValueError):
+            ContextualBandit("bad", policy="epsilon")
+
+    def test_state_is_saved_atomically_and_reloaded(self, data_dir):
+        bandit = ContextualBandit("persist", dim=8, flush_every=2)
+        bandit.update({"k": "v"}, "a", 1.0)
+        assert not bandit.path.exists()
+        bandit.update({"k": "v"}, "b", -1.0)
+        assert bandit.path.exists() and not list(data_dir.glob("*.tmp"))
+
+        reloaded = ContextualBandit("persist", dim=8)
+        assert reloaded.actions == ["a", "b"]
+        assert reloaded.expected_reward({"k": "v"}, "a") == pytest.approx(bandit.expected_reward({"k": "v"}, "a"))
+        assert ContextualBandit("persist", dim=16).actions == []  # different feature size starts over
+
+
+    def test_saves_from_several_workers_are_merged(self, data_dir):
+        # Two instances of one agent stand in for two worker processes
+        contexts = [{"k": f"v{n % 4}"} for n in range(12)]
+        single = ContextualBandit("single", dim=8, flush_every=10 ** 6)
+        first = ContextualBandit("merged", dim=8, flush_every=10 ** 6)
+        second = ContextualBandit("merged", dim=8, flush_every=10 ** 6)
+        for n, context in enumerate(contexts):
+            worker = first if n % 2 else second
+            action = "a" if n % 3 else "b"
+            worker.update(context, action, float(n % 2))
+            single.update(context, action, float(n % 2))
+        first.save()
+        second.save()
+
+        reloaded = ContextualBandit("merged", dim=8)
+        assert reloaded.get_stats()["updates"] == single.get_stats()["updates"]
+        for action in ("a", "b"):
+            k, j = reloaded.action_ids[action], single.action_ids[action]
+            assert reloaded.a_inv[k] == pytest.approx(single.a_inv[j])
+            assert reloaded.theta[k] == pytest.approx(single.theta[j])
+        # the later save also adopted the earlier one's updates
+        assert second.get_stats()["updates"] == single.get_stats()["updates"]
+
+
+class TestStrategyFlag:
+    """Test cases for the ADAPTIVE_STRATEGY switch in the adaptive agent"""
+
+    def test_tuner_and_suggestion_engine_use_bandit(self, data_dir, monkeypatch):
+        from adaptive_agent import suggestion_engine, tuner
+
+        weights = WeightsRepository(data_dir / "weights.csv", write_delay=0)
+        weights.replace(pd.DataFrame({"suggestion_id": ["SUG-1", "SUG-2"], "text": ["one", "two"],
+                                      "weight": [0.0, 0.0]}))
+        monkeypatch.setattr(bandit_module, "_bandits", {})
+        for module in (suggestion_engine, tuner):
+            monkeypatch.setattr(module, "ADAPTIVE_STRATEGY", "linucb")
+            monkeypatch.setattr(module, "weights_repository", weights)
+        monkeypatch.setattr(tuner, "log_improvement", lambda *args: None)
+
+        for _ in range(5):
+            tuner.update_weight("SUG-2", 1, {"stage": "build"})
+        assert weights.get("SUG-2")["weight"] > 0.5
+        assert suggestion_engine.choose_suggestion({"stage": "build"})["suggestion_id"] == "SUG-2"
+        assert bandit_module.get_bandit("adaptive_feedback").counts.sum() == 5
+
+    @pytest.mark.parametrize("saved_actions", [None, ["SUG-1", "SUG-2"]])
+    def test_bandit_registered_when_q_table_already_has_actions(self, data_dir, monkeypatch, saved_actions):
+        from adaptive_agent import suggestion_engine
+
+        weights = WeightsRepository(data_dir / "weights.csv", write_delay=0)
+        weights.replace(pd.DataFrame({"suggestion_id": ["SUG-1", "SUG-2", "SUG-3"], "text": ["one", "two", "three"],
+                                      "weight": [0.0, 0.0, 0.0]}))
+        # the Q-table was loaded with every suggestion already in it
+        engine = rl_engine.RLEngine("adaptive_feedback", backend="memory")
+        engine.register_actions(weights.suggestion_ids())
+        if saved_actions:
+            # an older bandit snapshot that knows only some of the suggestions
+            old = ContextualBandit("adaptive_feedback")
+            old.register_actions(saved_actions)
+            old.save()
+        monkeypatch.setattr(bandit_module, "_bandits", {})
+        monkeypatch.setattr(suggestion_engine, "rl_engine", engine)
+        monkeypatch.setattr(suggestion_engine, "ADAPTIVE_STRATEGY", "thompson")
+        monkeypatch.setattr(suggestion_engine, "weights_repository", weights)
+
+        assert suggestion_engine.choose_suggestion({"stage": "build"})["suggestion_id"] in weights.suggestion_ids()
+        assert bandit_module.get_bandit("adaptive_feedback").actions == ["SUG-1", "SUG-2", "SUG-3"]
@@ -0,0 +1,123 @@
+"""
+Unit tests for the bucket fallback journal and re-ingester
+"""
+
+import json
+import multiprocessing
+import os
+from unittest.mock import patch
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import src.bucket_connector as bucket_module
+from src.bucket_connector import (
+    FallbackReingester,
+    reingest_fallback_logs,
+    relay_to_bucket,
+)
+
+
+@pytest.fixture
+def fallback_log(tmp_path, monkeypatch):
+    path = str(tmp_path / "bucket_fallback.log")
+    monkeypatch.setattr(bucket_module, "BUCKET_FALLBACK_LOG", path)
+    return path
+
+
+def _relay_many(writer, count):
+    with patch("src.bucket_connector.get_db", return_value=None):
+        for n in range(count):
+            relay_to_bucket({"writer": writer, "n": n, "pad": "x" * 40})
+
+
+def _lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestFallbackJournal:
+    """Test cases for the NDJSON fallback journal"""
+
+    @patch("src.bucket_connector.get_db", return_value=None)
+    def test_fallback_is_ndjson_with_record_id(self, mock_get_db, fallback_log):
+        relay_to_bucket({"intent": "a", "timestamp": "2025-01-01T00:00:00"})
+        relay_to_bucket({"intent": "a", "timestamp": "2025-01-01T00:00:00"})
+        records = _lines(fallback_log)
+        assert records[0]["intent"] == "a"
+        # Identical records get the same id, so they collapse on re-ingest
+        assert records[0]["_id"] == records[1]["_id"]
+
+    @patch("src.bucket_connector.get_db", return_value=None)
+    def test_rotation_is_size_capped(self, mock_get_db, fallback_log, monkeypatch):
+        monkeypatch.setattr(bucket_module, "BUCKET_FALLBACK_MAX_BYTES", 250)
+        monkeypatch.setattr(bucket_module, "BUCKET_FALLBACK_BACKUPS", 2)
+        for n in range(10):
+            relay_to_bucket({"n": n, "pad": "x" * 40})
+        rotated = bucket_module._rotated_fallback_files()
+        assert len(rotated) == 2
+        assert all(os.path.getsize(p) <= 250 for p in rotated + [fallback_log])
+        assert _lines(fallback_log)[-1]["n"] == 9
+
+    def test_rotation_across_processes(self, fallback_log, monkeypatch):
+        monkeypatch.setattr(bucket_module, "BUCKET_FALLBACK_MAX_BYTES", 400)
+        monkeypatch.setattr(bucket_module, "BUCKET_FALLBACK_BACKUPS", 10_000)
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_relay_many, args=(writer, 300)) for writer in range(3)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join(30)
+        assert [proc.exitcode for proc in procs] == [0, 0, 0]
+
+        files = bucket_module._rotated_fallback_files() + [fallback_log]
+        assert all(os.path.getsize(p) <= 400 for p in files)
+        assert sum(len(_lines(p)) for p in files) == 900
+
+    def test_rotation_tolerates_missing_files(self, fallback_log):
+        bucket_module._rotate_fallback()  # nothing to rotate
+        assert bucket_module._rotated_fallback_files() == []
+
+
+class TestReingest:
+    """Test cases for bulk re-ingest into db.logs"""
+
+    @patch("src.bucket_connector.get_db")
+    def test_reingest_inserts_and_removes_files(self, mock_get_db, fallback_log):
+        with open(fallback_log, "w") as f:
+            f.write(json.dumps({"_id": "abc", "intent": "a"}) + "\n")
+            f.write("2025-12-08T16:36:16.987364: {'intent': 'legacy', 'outcome': 'ok'}\n")
+            f.write("garbage\n")
+
+        summary = reingest_fallback_logs()
+        assert summary == {"files": 1, "inserted": 2, "duplicates": 0, "skipped": 1}
+        inserted = mock_get_db.return_value.logs.insert_many.call_args[0][0]
+        assert [r["intent"] for r in inserted] == ["a", "legacy"]
+        assert inserted[0]["_id"] == "abc"
+        assert not os.path.exists(fallback_log)
+        assert bucket_module._rotated_fallback_files() == []
+
+    @patch("src.bucket_connector.get_db")
+    def test_duplicates_are_ignored(self, mock_get_db, fallback_log):
+        with open(fallback_log, "w") as f:
+            f.write(json.dumps({"_id": "abc"}) + "\n" + json.dumps({"_id": "def"}) + "\n")
+        mock_get_db.return_value.logs.insert_many.side_effect = BulkWriteError(
+            {"writeErrors": [{"index": 0, "code": 11000}], "nInserted": 1}
+        )
+        assert reingest_fallback_logs()["duplicates"] == 1
+        assert bucket_module._rotated_fallback_files() == []
+
+    @patch("src.bucket_connector.get_db")
+    def test_failed_insert_keeps_file(self, mock_get_db, fallback_log):
+        with open(fallback_log, "w") as f:
+            f.write(json.dumps({"_id": "abc"}) + "\n")
+        mock_get_db.return_value.logs.insert_many.side_effect = Exception("mongo down")
+        with pytest.raises(Exception):
+            reingest_fallback_logs()
+        assert len(bucket_module._rotated_fallback_files()) == 1
+
+    @patch("src.bucket_connector.get_db", return_value=None)
+    def test_reingester_waits_for_database(self, mock_get_db, fallback_log):
+        relay_to_bucket({"intent": "a"})
+        assert FallbackReingester().run_once() is None
+        assert os.path.exists(fallback_log)
@@ -0,0 +1,129 @@
+"""
+Unit tests for the bucket index
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+import src.integrations.bhiv_connectors as bhiv_module
+from src.integrations.bucket_index import BucketIndex, get_bucket_index, parse_bucket_filename
+from src.storage_service import StorageService
+
+
+@pytest.fixture
+def bucket_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "bucket")
+    os.makedirs(directory)
+    monkeypatch.setattr(bhiv_module, "BUCKET_DIR", directory)
+    monkeypatch.setenv("BHIV_BUCKET_DIR", directory)
+    return directory
+
+
+def _write(directory, filename, payload=None):
+    with open(os.path.join(directory, filename), "w") as f:
+        json.dump(payload or {}, f)
+
+
+class TestParseFilename:
+    """Test cases for bucket filename parsing"""
+
+    def test_team_with_underscores(self):
+        assert parse_bucket_filename("submission_team_a_1700000000.json") == ("submission", "team_a", 1700000000)
+
+    def test_kind_and_timestamp_only(self):
+        assert parse_bucket_filename("reward_1700000000.json") == ("reward", None, 1700000000)
+
+    def test_invalid_timestamp_and_non_json(self):
+        assert parse_bucket_filename("submission_team_invalid.json") == ("submission", "team", None)
+        assert parse_bucket_filename("notes.txt") is None
+
+
+class TestBucketIndex:
+    """Test cases for BucketIndex"""
+
+    def test_save_to_bucket_records_entry(self, bucket_dir):
+        bhiv_module.save_to_bucket({"a": 1}, "submission_t1_100.json")
+        index = get_bucket_index(bucket_dir)
+        assert index.is_fresh()
+        assert index.latest("submission", "t1")["filename"] == "submission_t1_100.json"
+
+    def test_external_files_are_reconciled(self, bucket_dir):
+        index = BucketIndex(bucket_dir)
+        _write(bucket_dir, "submission_t1_100.json")
+        _write(bucket_dir, "submission_t1_200.json")
+        assert [e["timestamp"] for e in index.list("submission", "t1")] == [200, 100]
+
+        os.remove(os.path.join(bucket_dir, "submission_t1_200.json"))
+        assert index.latest("submission", "t1")["timestamp"] == 100
+
+    def test_fresh_index_does_not_list_directory(self, bucket_dir):
+        bhiv_module.save_to_bucket({}, "submission_t1_100.json")
+        index = get_bucket_index(bucket_dir)
+        index.list("submission")
+        with patch("src.integrations.bucket_index.os.listdir") as mock_listdir:
+            index.list("submission")
+            index.count("submission")
+        mock_listdir.assert_not_called()
+
+    def test_pagination(self, bucket_dir):
+        index = BucketIndex(bucket_dir)
+        for ts in range(1, 6):
+            _write(bucket_dir, f"submission_t{ts % 2}_{ts}.json")
+        _write(bucket_dir, "reward_9.json")
+        assert [e["timestamp"] for e in index.list("submission", limit=2, offset=1)] == [4, 3]
+        assert index.count("submission") == 5
+        assert index.count("submission", team_id="t1") == 3
+
+
+class TestStorageServiceIndex:
+    """Test cases for StorageService lookups through the index"""
+
+    def test_latest_and_paginated_listing(self, bucket_dir):
+        for ts in (100, 300, 200):
+            _write(bucket_dir, f"submission_team_x_{ts}.json", {"ts": ts})
+        _write(bucket_dir, "submission_team_xy_999.json", {"ts": 999})
+
+        service = StorageService()
+        assert service.get_submission("team_x") == {"ts": 300}
+        page = service.list_submissions("team_x", limit=2, offset=1)
+        assert [s["data"]["ts"] for s in page] == [200, 100]
+        assert service.count_submissions("team_x") == 3
+
+    def test_metadata_listing_does_not_open_files(self, bucket_dir):
+        _write(bucket_dir, "submission_team_x_100.json", {"ts": 100})
+        service = StorageService()
+        service.count_submissions()
+        with patch("builtins.open") as mock_open:
+            listing = service.list_submissions(include_data=False)
+            page = service.list_submission_page(limit=10)
+        mock_open.assert_not_called()
+        assert "data" not in listing[0]
+        assert page["items"][0]["size"] == os.path.getsize(os.path.join(bucket_dir, "submission_team_x_100.json"))
+
+    def test_cursor_pagination_covers_every_submission_once(self, bucket_dir):
+        for ts in (100, 100, 200, 300, 400):
+            _write(bucket_dir, f"submission_t{ts}_{len(os.listdir(bucket_dir))}_{ts}.json")
+        service = StorageService()
+        seen, cursor = [], None
+        while True:
+            page = service.list_submission_page(cursor=cursor, limit=2)
+            seen.extend(item["filename"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen)) == 5
+        with pytest.raises(ValueError):
+            service.list_submission_page(cursor="not-a-cursor")
+
+    def test_iter_submissions_loads_lazily(self, bucket_dir, monkeypatch):
+        _write(bucket_dir, "submission_team_x_100.json", {"ts": 100})
+        _write(bucket_dir, "submission_team_x_200.json", {"ts": 200})
+        handles = list(StorageService().iter_submissions("team_x", batch_size=1))
+        assert [h.timestamp for h in handles] == [200, 100]
+        assert handles[0]._data is None
+
+        monkeypatch.setattr("src.integrations.bucket_index.MMAP_THRESHOLD_BYTES", 1)
+        assert handles[0].data == {"ts": 200}
@@ -0,0 +1,136 @@
+"""
+Unit tests for the bucket writer layouts
+"""
+
+import gzip
+import json
+import multiprocessing
+import os
+from unittest.mock import patch
+
+import pytest
+
+import src.integrations.bhiv_connectors as bhiv_module
+import src.integrations.bucket_writer as writer_module
+from src.integrations.bucket_index import BucketIndex, get_bucket_index
+from src.integrations.bucket_writer import BucketWriter, shard_relpath
+from src.storage_service import StorageService
+
+
+@pytest.fixture
+def bucket_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "bucket")
+    os.makedirs(directory)
+    monkeypatch.setattr(bhiv_module, "BUCKET_DIR", directory)
+    monkeypatch.setenv("BHIV_BUCKET_DIR", directory)
+    return directory
+
+
+def _write_same_name(bucket_dir, writer, times):
+    # A fresh index connection and writer, as in a separate worker process
+    writer_module._writers.clear()
+    index = BucketIndex(bucket_dir)
+    segment_writer = BucketWriter(bucket_dir, layout="segment")
+    with patch.object(writer_module, "get_bucket_index", return_value=index):
+        for n in range(times):
+            segment_writer.write({"writer": writer, "n": n}, "submission_team_x_100.json")
+    segment_writer.close()
+
+
+def _use_writer(monkeypatch, bucket_dir, **kwargs):
+    writer = BucketWriter(os.path.abspath(bucket_dir), **kwargs)
+    monkeypatch.setitem(writer_module._writers, os.path.abspath(bucket_dir), writer)
+    return writer
+
+
+class TestFlatLayout:
+    """Test cases for the default flat layout"""
+
+    def test_same_second_names_do_not_overwrite(self, bucket_dir):
+        first = bhiv_module.save_to_bucket({"n": 1}, "execution_1700000000.json")
+        second = bhiv_module.save_to_bucket({"n": 2}, "execution_1700000000.json")
+        assert os.path.basename(second) == "execution_1700000000-1.json"
+        with open(first) as f:
+            assert json.load(f) == {"n": 1}
+        assert get_bucket_index(bucket_dir).count("execution") == 2
+
+    def test_payload_is_compact(self, bucket_dir):
+        path = bhiv_module.save_to_bucket({"a": [1, 2]}, "reward_1.json")
+        with open(path) as f:
+            assert f.read() == '{"a":[1,2]}'
+
+
+class TestShardedLayout:
+    """Test cases for the hash-sharded layout"""
+
+    def test_files_are_sharded_and_indexed(self, bucket_dir, monkeypatch):
+        _use_writer(monkeypatch, bucket_dir, layout="sharded")
+        result = StorageService().save_submission("team_x", {"title": "x"})
+        assert result["path"] == os.path.join(bucket_dir, shard_relpath(result["filename"]))
+        assert StorageService().get_submission("team_x") == {"title": "x"}
+
+        index = get_bucket_index(bucket_dir)
+        index.rebuild()
+        assert index.count("submission", team_id="team_x") == 1
+
+
+class TestSegmentLayout:
+    """Test cases for the NDJSON segment layout"""
+
+    def test_batched_records_are_readable_by_offset(self, bucket_dir, monkeypatch):
+        writer = _use_writer(monkeypatch, bucket_dir, layout="segment", compress=True)
+        stored = bhiv_module.save_batch_to_bucket([
+            ("submission_team_x_100.json", {"ts": 100}),
+            ("submission_team_x_100.json", {"ts": 101}),
+            ("submission_team_y_200.json", {"ts": 200}),
+        ])
+        assert [s["filename"] for s in stored][:2] == ["submission_team_x_100.json", "submission_team_x_100-1.json"]
+        assert len({s["path"] for s in stored}) == 1
+
+        service = StorageService()
+        assert service.get_submission("team_x", 100) == {"ts": 100}
+        assert sorted(s["data"]["ts"] for s in service.list_submissions("team_x")) == [100, 101]
+
+        # Gzip members concatenate, so the whole segment is ordinary .ndjson.gz
+        writer.close()
+        with gzip.open(stored[0]["path"], "rt") as f:
+            assert [json.loads(line)["ts"] for line in f] == [100, 101, 200]
+
+    def test_rebuild_reads_segment_offsets(self, bucket_dir, monkeypatch):
+        _use_writer(monkeypatch, bucket_dir, layout="segment")
+        bhiv_module.save_to_bucket({"ts": 300}, "submission_team_z_300.json")
+        index = get_bucket_index(bucket_dir)
+        index.rebuild()
+        assert StorageService().get_submission("team_z") == {"ts": 300}
+
+    def test_segments_roll_over(self, bucket_dir, monkeypatch):
+        writer = _use_writer(monkeypatch, bucket_dir, layout="segment", segment_max_bytes=1)
+        bhiv_module.save_to_bucket({"n": 1}, "reward_1.json")
+        assert writer._segment is None
+        bhiv_module.save_to_bucket({"n": 2}, "reward_2.json")
+        assert get_bucket_index(bucket_dir).count("reward") == 2
+
+    def test_unknown_layout(self, bucket_dir):
+        with pytest.raises(ValueError):
+            BucketWriter(bucket_dir, layout="zip")
+
+    def test_processes_never_share_a_segment_name(self, bucket_dir):
+        processes = [multiprocessing.get_context("fork").Process(target=_write_same_name, args=(bucket_dir, writer, 50))
+                     for writer in (1, 2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            assert process.exitcode == 0
+
+        service = StorageService()
+        loaded = [entry["data"] for entry in service.list_submissions("team_x")]
+        assert sorted((d["writer"], d["n"]) for d in loaded) == [(w, n) for w in (1, 2) for n in range(50)]
+
+    def test_reserved_names_roll_back_on_failure(self, bucket_dir):
+        index = get_bucket_index(bucket_dir)
+        with pytest.raises(RuntimeError):
+            with index.recording():
+                assert index.reserve(index.segment_row("reward_1.json", "segments/s", 0, 1, 1, False))
+                raise RuntimeError("write failed")
+        assert index.get("reward_1.json") is None
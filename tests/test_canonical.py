@@ -0,0 +1,96 @@
+"""
+Golden-hash tests for canonical encoding
+These hashes are persisted in ledgers and MongoDB; they must never change
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+import src.canonical as canonical_module
+from src.bucket_connector import _record_id
+from src.canonical import canonical_bytes, canonical_hash, canonical_json
+from src.dead_letter import idempotency_key
+from src.security import SecurityManager, compute_entry_hash, compute_payload_hash
+from src.storage_service import StorageService
+
+PAYLOAD = {"team_id": "team123", "action": "submit", "score": 87.5, "tags": ["ai", "ml"],
+           "nested": {"b": 2, "a": 1}, "note": "café"}
+PROVENANCE_ENTRY = {"previous_hash": "0", "timestamp": "2025-01-01T00:00:00", "actor": "system", "event": "judge",
+                    "event_id": "judge_1", "outcome": "ok", "payload_hash": "x", "entry_hash": "",
+                    "signature": "mock_signature"}
+TRANSACTION = {"id": "txn_1", "timestamp": 1700000000, "action": "save_submission", "team_id": "team_alpha",
+               "filename": "submission_team_alpha_1700000000.json", "previous_hash": None}
+# Values orjson encodes differently from json.dumps: exponent floats, >64-bit ints, non-ASCII
+AWKWARD_TRANSACTION = dict(TRANSACTION, score=0.00001, big=2 ** 70, name="é")
+
+GOLDEN = {
+    "payload": "3cd1d4b5c9c652c31a04647b01da97aa4ac0e61b13b86ecb223fa44772d817bc",
+    "provenance_entry": "374c6fe6fedfd70e4106f4be372ba256b6425c2721645978185d6978af22de18",
+    "transaction": "b0900f613498cc9996bfd44d5ae0acaa3e10b09b025f171e064ccd6ac96f4a02",
+    "awkward_transaction": "ebf4743ba24a3a3ca9ff3e0ca2b79ea9a5ad692432fb7fc31f22c7eb14a77c54",
+}
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def orjson_mode(request):
+    if request.param and canonical_module.orjson is None:
+        pytest.skip("orjson not installed")
+    with patch.object(canonical_module, "USE_ORJSON", request.param):
+        yield request.param
+
+
+class TestGoldenHashes:
+    """Hashes must match the values produced before the canonical module existed"""
+
+    def test_payload_hash(self, orjson_mode):
+        assert compute_payload_hash(PAYLOAD) == GOLDEN["payload"]
+
+    def test_provenance_entry_hash(self, orjson_mode):
+        assert compute_entry_hash(PROVENANCE_ENTRY) == GOLDEN["provenance_entry"]
+
+    def test_security_ledger_hash(self, orjson_mode):
+        entry = dict(PROVENANCE_ENTRY, entry_hash="ignored")
+        assert SecurityManager()._hash_ledger_entry(entry, include_hash=False) == compute_entry_hash(
+            {k: v for k, v in PROVENANCE_ENTRY.items() if k != "entry_hash"})
+
+    def test_transaction_hash(self, orjson_mode):
+        assert StorageService(ledger_path=None)._calculate_hash(TRANSACTION) == GOLDEN["transaction"]
+        assert canonical_hash(AWKWARD_TRANSACTION) == GOLDEN["awkward_transaction"]
+
+
+class TestCanonicalEncoding:
+    """Test cases for the encodings themselves"""
+
+    @pytest.mark.parametrize("value", [
+        PAYLOAD, TRANSACTION, AWKWARD_TRANSACTION, [1, 2.5, None, True], {"x": 1e16, "y": -0.0, "z": 123.456},
+        {"emoji": "\U0001f600"}, {"1": {"deep": [{"b": 1, "a": [0.1, 0.2]}]}},
+    ])
+    def test_matches_json_dumps(self, value, orjson_mode):
+        assert canonical_json(value) == json.dumps(value, sort_keys=True, separators=(',', ':'))
+        assert canonical_json(value, compact=False) == json.dumps(value, sort_keys=True)
+
+    def test_non_str_keys_fall_back(self, orjson_mode):
+        assert canonical_bytes({2: "b", 1: "a"}) == b'{"1":"a","2":"b"}'
+
+    def test_unserializable_raises(self, orjson_mode):
+        with pytest.raises(TypeError):
+            canonical_bytes({"when": object()})
+
+    def test_default_matches_json_dumps(self, orjson_mode):
+        value = {"when": datetime(2025, 1, 1), "id": 1, "tags": ["a"]}
+        assert canonical_bytes(value, default=str) == json.dumps(
+            value, sort_keys=True, separators=(',', ':'), default=str).encode("utf-8")
+        assert canonical_json(value, compact=False, default=str) == json.dumps(value, sort_keys=True, default=str)
+        # Serializable values take the usual path
+        assert canonical_bytes(PAYLOAD, default=str) == canonical_bytes(PAYLOAD)
+
+    def test_dead_letter_and_bucket_ids_unchanged(self, orjson_mode):
+        record = {"team": "t1", "at": datetime(2025, 1, 1), "score": 87.5}
+        legacy = json.dumps(record, sort_keys=True, separators=(',', ':'), default=str).encode("utf-8")
+        assert _record_id(record) == hashlib.sha1(legacy).hexdigest()
+        legacy = json.dumps(["core_send", record], sort_keys=True, separators=(',', ':'), default=str)
+        assert idempotency_key("core_send", record) == hashlib.sha256(legacy.encode("utf-8")).hexdigest()
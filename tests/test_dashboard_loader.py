@@ -0,0 +1,102 @@
+"""
+Unit tests for the dashboard's incremental bucket loader
+"""
+
+import json
+import os
+
+import pytest
+
+from dashboard_loader import BucketFrameLoader
+
+
+def write(directory, name, data, mtime_ns=None):
+    path = directory / name
+    path.write_text(json.dumps(data))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestBucketFrameLoader:
+    """Test cases for BucketFrameLoader"""
+
+    def test_parses_only_new_files(self, tmp_path):
+        for n in range(3):
+            write(tmp_path, f"reward_{n}.json", {"reward": n})
+        write(tmp_path, "execution_1.json", {"steps": 1})
+        loader = BucketFrameLoader(str(tmp_path), "reward")
+        assert loader.refresh() == []
+        assert loader.frame["reward"].tolist() == [0, 1, 2]
+
+        write(tmp_path, "reward_3.json", {"reward": 3, "outcome": "success"})
+        loader.refresh()
+        assert loader.get_stats()["files_parsed"] == 4
+        assert loader.frame["reward"].tolist() == [0, 1, 2, 3]
+        assert loader.frame["outcome"].isna().tolist() == [True, True, True, False]
+
+    def test_adds_filename(self, tmp_path):
+        write(tmp_path, "submission_team1_1.json", {"project": "p"})
+        loader = BucketFrameLoader(str(tmp_path), "submission", add_filename=True)
+        loader.refresh()
+        assert loader.frame["filename"].tolist() == ["submission_team1_1.json"]
+
+    def test_fingerprint_tracks_name_and_mtime(self, tmp_path):
+        write(tmp_path, "reward_1.json", {"reward": 1}, mtime_ns=10 ** 18)
+        loader = BucketFrameLoader(str(tmp_path), "reward")
+        fingerprint = loader.fingerprint(loader.scan())
+        assert loader.fingerprint(loader.scan()) == fingerprint
+        write(tmp_path, "execution_2.json", {})
+        assert loader.fingerprint(loader.scan()) == fingerprint
+        write(tmp_path, "reward_1.json", {"reward": 1}, mtime_ns=2 * 10 ** 18)
+        assert loader.fingerprint(loader.scan()) != fingerprint
+
+    def test_rewritten_or_removed_file_reloads(self, tmp_path):
+        write(tmp_path, "reward_1.json", {"reward": 1}, mtime_ns=10 ** 18)
+        write(tmp_path, "reward_2.json", {"reward": 2})
+        loader = BucketFrameLoader(str(tmp_path), "reward")
+        loader.refresh()
+        write(tmp_path, "reward_1.json", {"reward": 5}, mtime_ns=2 * 10 ** 18)
+        loader.refresh()
+        assert sorted(loader.frame["reward"].tolist()) == [2, 5]
+        os.remove(tmp_path / "reward_2.json")
+        loader.refresh()
+        assert loader.frame["reward"].tolist() == [5]
+        assert loader.get_stats()["full_reloads"] == 2
+
+    def test_unreadable_file_is_retried(self, tmp_path):
+        (tmp_path / "reward_1.json").write_text('{"reward": ')
+        loader = BucketFrameLoader(str(tmp_path), "reward")
+        errors = loader.refresh()
+        assert len(errors) == 1 and "reward_1.json" in errors[0]
+        assert len(loader.frame) == 0
+        write(tmp_path, "reward_1.json", {"reward": 1})
+        assert loader.refresh() == []
+        assert loader.frame["reward"].tolist() == [1]
+
+    @pytest.mark.parametrize("snapshot_format", ["parquet", "feather"])
+    def test_snapshot_round_trip(self, tmp_path, snapshot_format):
+        pytest.importorskip("pyarrow")
+        bucket, snapshots = tmp_path / "bucket", tmp_path / "snapshots"
+        bucket.mkdir()
+        write(bucket, "submission_a_1.json", {"project": "p1", "meta": {"lang": "py"}, "score": 1})
+        write(bucket, "submission_a_2.json", {"project": "p2", "meta": ["x"], "score": "high"})
+        loader = BucketFrameLoader(str(bucket), "submission", add_filename=True, snapshot_dir=str(snapshots),
+                                   snapshot_format=snapshot_format)
+        loader.refresh()
+        assert (snapshots / f"submission.{snapshot_format}").exists()
+
+        restarted = BucketFrameLoader(str(bucket), "submission", add_filename=True, snapshot_dir=str(snapshots),
+                                      snapshot_format=snapshot_format)
+        restarted.refresh()
+        stats = restarted.get_stats()
+        assert stats["snapshot_loads"] == 1 and stats["files_parsed"] == 0
+        assert restarted.frame.to_dict("records") == loader.frame.to_dict("records")
+
+        write(bucket, "submission_b_3.json", {"project": "p3"})
+        restarted.refresh()
+        assert restarted.get_stats()["files_parsed"] == 1
+        assert restarted.frame["project"].tolist() == ["p1", "p2", "p3"]
+
+    def test_unknown_snapshot_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            BucketFrameLoader(str(tmp_path), "reward", snapshot_format="csv")
@@ -0,0 +1,77 @@
+"""
+Unit tests for the dead-letter queue
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.dead_letter import (
+    KIND_CORE_SEND,
+    KIND_TRANSACTION,
+    DeadLetterQueue,
+    idempotency_key,
+)
+
+
+@pytest.fixture
+def dlq(tmp_path):
+    return DeadLetterQueue(str(tmp_path / "dead_letters.sqlite3"))
+
+
+class TestDeadLetterQueue:
+    """Test cases for DeadLetterQueue"""
+
+    def test_duplicates_are_stored_once(self, dlq):
+        assert dlq.add(KIND_CORE_SEND, {"a": 1, "b": 2}, error="down")
+        assert not dlq.add(KIND_CORE_SEND, {"b": 2, "a": 1}, error="down again")
+        assert dlq.get_stats()["pending"] == 1
+
+    def test_import_legacy_logs_is_incremental(self, dlq, tmp_path):
+        core_log = tmp_path / "failed_core_sends.log"
+        tx_log = tmp_path / "failed_transactions.json"
+        core_log.write_text(json.dumps({"timestamp": 1.0, "payload": {"n": 1}, "error": "x"}) + "\nnot json\n")
+        tx_log.write_text(json.dumps({"tx_id": "tx1", "error": "boom", "timestamp": 2.0}) + "\n")
+
+        assert dlq.import_legacy_logs(str(core_log), str(tx_log)) == {KIND_CORE_SEND: 1, KIND_TRANSACTION: 1}
+        assert dlq.import_legacy_logs(str(core_log), str(tx_log)) == {KIND_CORE_SEND: 0, KIND_TRANSACTION: 0}
+
+        with open(core_log, "a") as f:
+            f.write(json.dumps({"timestamp": 3.0, "payload": {"n": 2}, "error": "x"}) + "\n")
+        assert dlq.import_legacy_logs(str(core_log), str(tx_log))[KIND_CORE_SEND] == 1
+        assert dlq.get_stats()["pending_by_kind"] == {KIND_CORE_SEND: 2, KIND_TRANSACTION: 1}
+
+    @patch("src.integrations.bhiv_connectors.send_to_core")
+    def test_replay_sends_with_idempotency_key(self, mock_send, dlq):
+        dlq.add(KIND_CORE_SEND, {"n": 1})
+        dlq.add(KIND_TRANSACTION, {"tx_id": "tx1"})
+
+        summary = dlq.replay(rate_per_second=0)
+        assert summary == {"attempted": 1, "replayed": 1, "failed": 0, "skipped": 1, "stopped_early": False}
+        mock_send.assert_called_once_with({"n": 1}, max_retries=1, log_failures=False,
+                                          idempotency_key=idempotency_key(KIND_CORE_SEND, {"n": 1}))
+
+        # Replayed records are never sent again
+        assert dlq.replay(rate_per_second=0)["attempted"] == 0
+        assert dlq.get_stats()["replayed"] == 1
+
+    @patch("src.integrations.bhiv_connectors.send_to_core", side_effect=Exception("still down"))
+    def test_replay_stops_after_consecutive_failures(self, mock_send, dlq):
+        for n in range(5):
+            dlq.add(KIND_CORE_SEND, {"n": n})
+        summary = dlq.replay(rate_per_second=0, max_consecutive_failures=2)
+        assert summary["attempted"] == 2
+        assert summary["stopped_early"]
+        assert dlq.get_stats()["pending"] == 5
+
+    @patch("src.integrations.bhiv_connectors.send_to_core")
+    def test_replay_is_rate_limited(self, mock_send, dlq):
+        for n in range(3):
+            dlq.add(KIND_CORE_SEND, {"n": n})
+        with patch("src.dead_letter.time.sleep") as mock_sleep:
+            dlq.replay(rate_per_second=2)
+        # sleep is mocked, so the clock does not move: the waits are 0.5s and 1.0s
+        waits = [call.args[0] for call in mock_sleep.call_args_list]
+        assert len(waits) == 2
+        assert 0.4 < waits[0] <= 0.5 and 0.9 < waits[1] <= 1.0
@@ -0,0 +1,115 @@
+"""
+Unit tests for the append-optimized feedback store
+"""
+
+import json
+
+import pytest
+
+from adaptive_agent import feedback_store as feedback_store_module
+from adaptive_agent import storage
+from adaptive_agent.feedback_store import FeedbackStore
+
+HEADERS = ["timestamp", "suggestion_id", "feedback"]
+
+
+def make_store(directory, **kwargs):
+    kwargs.setdefault("buffer_size", 100)
+    kwargs.setdefault("flush_interval", 3600)
+    return FeedbackStore(directory, HEADERS, reward_field="feedback", **kwargs)
+
+
+def record(n, suggestion="SUG-1", reward=1):
+    return {"timestamp": f"2025-01-01T00:00:{n:02d}", "suggestion_id": suggestion, "feedback": reward}
+
+
+class TestFeedbackStore:
+    """Test cases for FeedbackStore"""
+
+    def test_appends_are_buffered(self, tmp_path):
+        store = make_store(tmp_path / "log", buffer_size=3)
+        store.append(record(1))
+        store.append(record(2))
+        assert not (tmp_path / "log" / "segment-00000001.ndjson").exists()
+        store.append(record(3))
+        assert store.to_frame()["timestamp"].tolist() == [f"2025-01-01T00:00:0{n}" for n in (1, 2, 3)]
+
+    def test_timer_flushes(self, tmp_path):
+        store = make_store(tmp_path / "log", flush_interval=0.05)
+        store.append(record(1))
+        store._timer.join(1.0)
+        assert (tmp_path / "log" / "segment-00000001.ndjson").exists()
+
+    def test_rollups(self, tmp_path):
+        store = make_store(tmp_path / "log")
+        for n, (suggestion, reward) in enumerate([("SUG-1", 1), ("SUG-1", -1), ("SUG-1", 1), ("SUG-2", "n/a")]):
+            store.append(record(n, suggestion, reward))
+        rollups = store.get_rollups()
+        assert rollups["SUG-1"] == {"count": 3, "rewarded": 3, "reward_sum": 1.0, "mean_reward": pytest.approx(1 / 3),
+                                    "first_seen": "2025-01-01T00:00:00", "last_seen": "2025-01-01T00:00:02"}
+        assert rollups["SUG-2"]["count"] == 1 and rollups["SUG-2"]["mean_reward"] is None
+
+    def test_segments_roll(self, tmp_path):
+        store = make_store(tmp_path / "log", buffer_size=1, segment_max_bytes=150)
+        for n in range(10):
+            store.append(record(n))
+        assert len(store._segments()) > 2
+        assert len(store.to_frame()) == 10
+        assert store.get_rollups()["SUG-1"]["count"] == 10
+
+    def test_processes_sharing_a_store_see_each_others_records(self, tmp_path):
+        first, second = make_store(tmp_path / "log"), make_store(tmp_path / "log")
+        first.append(record(1, "SUG-1"))
+        first.flush()
+        second.append(record(2, "SUG-2"))
+        assert set(second.get_rollups()) == {"SUG-1", "SUG-2"}
+        assert first.get_rollups()["SUG-2"]["count"] == 1
+
+        saved = json.loads((tmp_path / "log" / "rollups.json").read_text())
+        assert saved["rollups"]["SUG-1"]["count"] == 1
+        reopened = make_store(tmp_path / "log")
+        assert reopened.get_rollups().keys() == {"SUG-1", "SUG-2"}
+        assert reopened.get_rollups()["SUG-1"]["count"] == 1
+
+    def test_partial_line_is_ignored_until_complete(self, tmp_path):
+        store = make_store(tmp_path / "log", buffer_size=1)
+        store.append(record(1))
+        segment = tmp_path / "log" / "segment-00000001.ndjson"
+        with open(segment, "a") as f:
+            f.write('{"timestamp": "2025-01-01T00:00:09", "suggest')
+        assert store.get_rollups()["SUG-1"]["count"] == 1
+        with open(segment, "a") as f:
+            f.write('ion_id": "SUG-1", "feedback": 1}\n')
+        assert store.get_rollups()["SUG-1"]["count"] == 2
+
+    def test_imports_legacy_csv_once(self, tmp_path):
+        legacy = tmp_path / "feedback.csv"
+        legacy.write_text("timestamp,suggestion_id,feedback\n2025-01-01,SUG-1,1\n2025-01-02,SUG-1,-1\n")
+        store = make_store(tmp_path / "log", legacy_csv=legacy)
+        assert store.to_frame()["feedback"].tolist() == [1, -1]
+        assert make_store(tmp_path / "log", legacy_csv=legacy).get_rollups()["SUG-1"]["count"] == 2
+
+    @pytest.mark.parametrize("policy,expected", [("always", 3), ("never", 0)])
+    def test_fsync_policy(self, tmp_path, monkeypatch, policy, expected):
+        calls = []
+        monkeypatch.setattr(feedback_store_module.os, "fsync", calls.append)
+        store = make_store(tmp_path / "log", buffer_size=1, fsync=policy)
+        for n in range(3):
+            store.append(record(n))
+        assert len(calls) == expected
+        with pytest.raises(ValueError):
+            make_store(tmp_path / "other", fsync="sometimes")
+
+
+class TestStorageLogs:
+    """Test cases for storage.log_feedback on the feedback store"""
+
+    def test_log_and_load_feedback(self, tmp_path, monkeypatch):
+        store = FeedbackStore(tmp_path / "feedback", storage.FEEDBACK_HEADERS, reward_field="feedback")
+        monkeypatch.setattr(storage, "feedback_store", store)
+        storage.log_feedback("SUG-1", "=cmd", "Try a sprint", 1)
+        storage.log_feedback("SUG-1", "fine", "Try a sprint", -1)
+        df = storage.load_feedback()
+        assert df.columns.tolist() == storage.FEEDBACK_HEADERS
+        assert df["user_text"].tolist() == ["'=cmd", "fine"]
+        assert storage.feedback_rollups()["SUG-1"]["mean_reward"] == 0.0
@@ -0,0 +1,174 @@
+"""
+Unit tests for the on-disk hash-chained ledger
+"""
+
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from src import ledger as ledger_module
+from src.ledger import INDEX_ENTRY, FileLedger
+from src.security import SecurityManager
+from src.storage_service import StorageService
+
+
+def _hash(entry):
+    return StorageService._calculate_hash(None, entry)
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return str(tmp_path / "ledger" / "tx")
+
+
+def _open(path, **kwargs):
+    return FileLedger(path, _hash, id_prefix="txn_", **kwargs)
+
+
+def _append_many(ledger, writer, times):
+    for n in range(times):
+        ledger.append({"writer": writer, "n": n})
+    ledger.close()
+
+
+class TestFileLedger:
+    """Test cases for FileLedger"""
+
+    def test_chain_survives_reopen(self, ledger_path):
+        ledger = _open(ledger_path)
+        first = ledger.append({"action": "a"})
+        ledger.close()
+
+        reopened = _open(ledger_path)
+        second = reopened.append({"action": "b"})
+        assert first["previous_hash"] is None
+        assert second["id"] == "txn_2"
+        assert second["previous_hash"] == first["hash"]
+        assert reopened.get_by_id("txn_1") == first
+        assert reopened.entries(offset=1) == [second]
+        assert reopened.verify(full=True)
+
+    def test_index_is_fixed_size(self, ledger_path):
+        ledger = _open(ledger_path)
+        for n in range(5):
+            ledger.append({"n": n})
+        assert os.path.getsize(f"{ledger_path}.idx") == 5 * INDEX_ENTRY.size
+        assert ledger.get(3)["n"] == 3
+        assert ledger.get(5) is None
+
+    def test_fsync_is_batched(self, ledger_path, monkeypatch):
+        calls = []
+        monkeypatch.setattr("src.ledger.os.fsync", lambda fd: calls.append(fd))
+        ledger = _open(ledger_path, fsync_batch=3, fsync_interval=3600)
+        for n in range(7):
+            ledger.append({"n": n})
+        # Two batches of three, each fsyncing data and index
+        assert len(calls) == 4
+        ledger.sync()
+        assert len(calls) == 6
+
+    def test_verification_is_incremental_and_detects_tampering(self, ledger_path, monkeypatch):
+        ledger = _open(ledger_path)
+        for n in range(3):
+            ledger.append({"n": n})
+        assert ledger.verify()
+        with open(f"{ledger_path}.ckpt") as f:
+            assert json.load(f)["seq"] == 3
+
+        ledger.append({"n": 3})
+        verified = []
+        original = ledger.hash_fn
+        monkeypatch.setattr(ledger, "hash_fn", lambda e: verified.append(e["n"]) or original(e))
+        assert ledger.verify()
+        assert verified == [3]
+        monkeypatch.setattr(ledger, "hash_fn", original)
+
+        # Rewrite entry 1 in place with a different value of the same length
+        ledger.sync()
+        with open(f"{ledger_path}.ndjson", "r+b") as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace(b'"n":1', b'"n":9'))
+        assert ledger.verify()  # checkpointed entries are not rehashed
+        assert not ledger.verify(full=True)
+
+    def test_recovers_from_crash_between_writes(self, ledger_path):
+        ledger = _open(ledger_path)
+        ledger.append({"n": 0})
+        ledger.append({"n": 1})
+        ledger.close()
+        # Lose the last index slot and leave a torn line behind
+        with open(f"{ledger_path}.idx", "r+b") as f:
+            f.truncate(INDEX_ENTRY.size)
+        with open(f"{ledger_path}.ndjson", "ab") as f:
+            f.write(b'{"n":')
+
+        reopened = _open(ledger_path)
+        assert len(reopened) == 2
+        assert reopened.verify(full=True)
+        assert reopened.append({"n": 2})["previous_hash"] == reopened.get(1)["hash"]
+
+    @pytest.mark.skipif(ledger_module.fcntl is None, reason="cross-process appends need fcntl")
+    def test_appends_from_two_processes_keep_one_chain(self, ledger_path):
+        ledger = _open(ledger_path)
+        ledger.append({"writer": "setup"})
+        # The child inherits this ledger with the same cached count and head
+        process = multiprocessing.get_context("fork").Process(target=_append_many, args=(ledger, "child", 200))
+        process.start()
+        _append_many(_open(ledger_path), "parent", 200)
+        process.join(30)
+        assert process.exitcode == 0
+
+        reopened = _open(ledger_path)
+        assert len(reopened) == 401
+        entries = reopened.entries()
+        assert [entry["id"] for entry in entries] == [f"txn_{seq}" for seq in range(1, 402)]
+        assert sorted((e["writer"], e.get("n")) for e in entries[1:]) == sorted(
+            (writer, n) for writer in ("child", "parent") for n in range(200))
+        assert reopened.verify(full=True)
+
+    @pytest.mark.skipif(ledger_module.fcntl is None, reason="cross-process appends need fcntl")
+    def test_reads_see_appends_from_another_process(self, ledger_path):
+        ledger = _open(ledger_path)
+        ledger.append({"writer": "setup"})
+        assert ledger.verify()
+        process = multiprocessing.get_context("fork").Process(
+            target=_append_many, args=(_open(ledger_path), "child", 3))
+        process.start()
+        process.join(30)
+        assert process.exitcode == 0
+
+        assert len(ledger) == 4
+        assert ledger.get(3)["n"] == 2
+        assert [entry["id"] for entry in ledger.entries(offset=1)] == ["txn_2", "txn_3", "txn_4"]
+        assert ledger.last_hash == ledger.get(3)["hash"]
+        assert ledger.verify()
+        assert ledger._load_checkpoint()["seq"] == 4
+
+
+class TestLedgerConsumers:
+    """Test cases for StorageService and SecurityManager ledgers"""
+
+    def test_storage_service_ledger_is_shared_and_persistent(self, ledger_path, monkeypatch, tmp_path):
+        bucket_dir = str(tmp_path / "bucket")
+        os.makedirs(bucket_dir)
+        monkeypatch.setenv("BHIV_BUCKET_DIR", bucket_dir)
+        monkeypatch.setattr("src.integrations.bhiv_connectors.BUCKET_DIR", bucket_dir)
+        StorageService(ledger_path=ledger_path).save_submission("team_a", {"x": 1})
+        service = StorageService(ledger_path=ledger_path)
+        service.save_submission("team_b", {"x": 2})
+        ledger = service.get_transaction_ledger()
+        assert [t["team_id"] for t in ledger] == ["team_a", "team_b"]
+        assert service.get_transaction("txn_2")["previous_hash"] == ledger[0]["hash"]
+        assert service.verify_transaction_ledger_integrity()
+
+    def test_security_manager_ledger_on_disk(self, ledger_path, monkeypatch):
+        monkeypatch.setattr("src.security.SECURITY_LEDGER_PATH", ledger_path)
+        manager = SecurityManager()
+        entry = manager.add_to_ledger({"a": 1}, "nonce", 1, "sig")
+        assert entry["previous_hash"] == "0"
+        assert manager.get_ledger_entry(entry["id"]) == entry
+        assert manager.verify_ledger_integrity(full=True)
+        assert os.path.exists(f"{ledger_path}.ndjson")
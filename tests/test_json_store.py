@@ -0,0 +1,170 @@
+"""
+Unit tests for the indexed JSON store and DataManager on top of it
+"""
+
+import json
+
+import pytest
+
+import json_store
+from config import Config
+from data_manager import DataManager
+from json_store import JsonStore
+
+
+def write(path, records):
+    path.write_text(json.dumps(records))
+
+
+class TestJsonStore:
+    """Test cases for JsonStore"""
+
+    def test_loads_once_and_indexes(self, tmp_path):
+        path = tmp_path / "teams.json"
+        write(path, [{"id": "a", "team_name": "Alpha"}, {"id": "b", "team_name": "Beta"}])
+        store = JsonStore(str(path), indexes=("team_name",))
+        assert store.find_one("team_name", "Beta")["id"] == "b"
+        assert store.get("a")["team_name"] == "Alpha"
+        assert store.find("team_name", "Gamma") == []
+        assert [r["id"] for r in store.all()] == ["a", "b"]
+        assert store.get_stats()["loads"] == 1
+
+    def test_put_journals_instead_of_rewriting(self, tmp_path):
+        path = tmp_path / "scores.json"
+        write(path, [])
+        store = JsonStore(str(path), indexes=("team_name", "judge_name"), compact_every=100)
+        store.put({"id": "s1", "team_name": "Alpha", "judge_name": "J1"})
+        store.put({"id": "s2", "team_name": "Alpha", "judge_name": "J2"})
+        assert json.loads(path.read_text()) == []
+        assert len((tmp_path / "scores.json.journal").read_text().splitlines()) == 2
+        assert [r["id"] for r in store.find("team_name", "Alpha")] == ["s1", "s2"]
+        assert [r["id"] for r in store.find("judge_name", "J2")] == ["s2"]
+
+    def test_update_moves_index_entries(self, tmp_path):
+        store = JsonStore(str(tmp_path / "teams.json"), indexes=("team_name",))
+        store.put({"id": "a", "team_name": "Alpha"})
+        assert store.update("a", {"team_name": "Omega"})["team_name"] == "Omega"
+        assert store.find_one("team_name", "Alpha") is None
+        assert store.find_one("team_name", "Omega")["id"] == "a"
+        assert store.update("missing", {"team_name": "X"}) is None
+
+    def test_compaction_rewrites_file_and_empties_journal(self, tmp_path):
+        path = tmp_path / "teams.json"
+        store = JsonStore(str(path), indexes=("team_name",), compact_every=3)
+        for n in range(3):
+            store.put({"id": str(n), "team_name": f"T{n}"})
+        assert [r["id"] for r in json.loads(path.read_text())] == ["0", "1", "2"]
+        assert (tmp_path / "teams.json.journal").read_text() == ""
+        assert store.get_stats()["compactions"] == 1
+
+    def test_replaying_journal_twice_is_harmless(self, tmp_path):
+        path = tmp_path / "teams.json"
+        store = JsonStore(str(path))
+        store.put({"id": "a", "team_name": "Alpha"})
+        journal = (tmp_path / "teams.json.journal").read_text()
+        store.compact()
+        # crash between rewriting the file and emptying the journal
+        (tmp_path / "teams.json.journal").write_text(journal)
+        assert [r["id"] for r in JsonStore(str(path)).all()] == ["a"]
+
+    def test_sees_writes_from_another_process(self, tmp_path):
+        path = str(tmp_path / "teams.json")
+        first = JsonStore(path, indexes=("team_name",))
+        second = JsonStore(path, indexes=("team_name",))
+        assert second.all() == []
+        first.put({"id": "a", "team_name": "Alpha"})
+        assert second.find_one("team_name", "Alpha")["id"] == "a"
+        first.compact()
+        first.put({"id": "b", "team_name": "Beta"})
+        assert [r["id"] for r in second.all()] == ["a", "b"]
+
+    def test_partial_journal_line_waits(self, tmp_path):
+        path = tmp_path / "teams.json"
+        store = JsonStore(str(path))
+        store.put({"id": "a"})
+        with open(tmp_path / "teams.json.journal", "a") as f:
+            f.write('{"op": "put", "record": {"id"')
+        assert len(store) == 1
+        with open(tmp_path / "teams.json.journal", "a") as f:
+            f.write(': "b"}}\n')
+        assert len(store) == 2
+
+    def test_external_rewrite_reloads(self, tmp_path):
+        path = tmp_path / "problems.json"
+        write(path, [{"id": "p1"}])
+        store = JsonStore(str(path))
+        assert len(store) == 1
+        write(path, [{"id": "p1"}, {"id": "p2"}, {"id": "p3"}])
+        assert [r["id"] for r in store.all()] == ["p1", "p2", "p3"]
+
+    def test_version_changes_with_records(self, tmp_path):
+        path = str(tmp_path / "scores.json")
+        store = JsonStore(path)
+        version = store.version
+        assert store.version == version
+        store.put({"id": "a"})
+        assert store.version == version + 1
+        store.compact()
+        assert store.version == version + 1
+        JsonStore(path).put({"id": "b"})
+        assert store.version > version + 1
+
+    def test_records_without_unique_ids_are_kept(self, tmp_path):
+        path = tmp_path / "outreach.json"
+        write(path, [{"id": "x"}, {"id": "x"}, {"name": "no id"}])
+        store = JsonStore(str(path))
+        assert len(store) == 3
+        store.compact()
+        with pytest.raises(ValueError):
+            store.put({"name": "still no id"})
+
+
+class TestDataManagerStore:
+    """Test cases for DataManager backed by JsonStore"""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        for attr, name in [("PROBLEM_FILE", "problems.json"), ("TEAMS_FILE", "teams.json"),
+                           ("PROJECTS_FILE", "projects.json"), ("SCORES_FILE", "scores.json"),
+                           ("OUTREACH_FILE", "outreach.json")]:
+            monkeypatch.setattr(Config, attr, str(tmp_path / name))
+        monkeypatch.setattr(json_store, "_stores", {})
+        return DataManager()
+
+    def test_register_and_lookup(self, manager):
+        manager.register_team("Alpha", ["A"], "a@example.com", college="IIT")
+        with pytest.raises(ValueError):
+            manager.register_team("Alpha", ["B"], "b@example.com")
+        assert manager.get_team_by_name("Alpha")["college"] == "IIT"
+        assert len(manager.get_teams()) == 1
+
+    def test_resubmission_updates_project(self, manager):
+        manager.register_team("Alpha", ["A"], "a@example.com")
+        first = manager.submit_project("Alpha", "v1", "desc")
+        second = manager.submit_project("Alpha", "v2", "desc")
+        assert first == second
+        assert manager.get_project_by_team("Alpha")["project_title"] == "v2"
+        assert len(manager.get_projects()) == 1
+        with pytest.raises(ValueError):
+            manager.submit_project("Nobody", "v1", "desc")
+
+    def test_scores_by_team_and_judge(self, manager):
+        manager.submit_score("Alpha", "J1", {"usefulness": 8, "creativity": 6})
+        manager.submit_score("Alpha", "J2", {"usefulness": 6, "creativity": 4})
+        manager.submit_score("Beta", "J1", {"usefulness": 5, "creativity": 5})
+        assert len(manager.get_team_scores("Alpha")) == 2
+        assert [s["team_name"] for s in manager.get_judge_scores("J1")] == ["Alpha", "Beta"]
+        assert manager.calculate_team_average_score("Alpha")["total_average"] == 12.0
+
+    def test_outreach_status_and_save_json(self, manager):
+        contact_id = manager.add_outreach_contact("IIT", "Dr. X", "x@example.com")
+        assert manager.update_outreach_status(contact_id, "responded", "Interested")
+        assert not manager.update_outreach_status("missing", "responded")
+        contact = manager.get_outreach_data()[0]
+        assert contact["status"] == "responded" and contact["responses"][0]["note"] == "Interested"
+
+        assert manager.save_json(Config.PROBLEM_FILE, [{"id": "p1", "title": "T"}])
+        assert manager.get_problem_by_id("p1")["title"] == "T"
+        manager.compact()
+        with open(Config.OUTREACH_FILE) as f:
+            assert json.load(f)[0]["status"] == "responded"
@@ -0,0 +1,91 @@
+"""
+Unit tests for the single-pass DataManager leaderboard
+"""
+
+import random
+
+import pytest
+
+import data_manager
+import json_store
+from config import Config
+from data_manager import DataManager
+from json_store import JsonStore
+
+CRITERIA = ["usefulness", "creativity", "teamwork"]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    for attr, name in [("PROBLEM_FILE", "problems.json"), ("TEAMS_FILE", "teams.json"),
+                       ("PROJECTS_FILE", "projects.json"), ("SCORES_FILE", "scores.json"),
+                       ("OUTREACH_FILE", "outreach.json")]:
+        monkeypatch.setattr(Config, attr, str(tmp_path / name))
+    monkeypatch.setattr(json_store, "_stores", {})
+    monkeypatch.setattr(data_manager, "_score_aggregates", {})
+    manager = DataManager()
+    rng = random.Random(3)
+    for n in range(12):
+        manager.register_team(f"Team {n}", ["A"], f"t{n}@example.com", college=f"C{n % 3}")
+        if n % 4:
+            manager.submit_project(f"Team {n}", f"Project {n}", "desc")
+    for n in range(60):
+        manager.submit_score(f"Team {rng.randrange(10)}", f"Judge {n % 4}",
+                             {criteria: rng.randint(1, 10) for criteria in CRITERIA})
+    return manager
+
+
+def reference_average(manager, team_name):
+    """Averages as the original per-team scan computed them."""
+    team_scores = [s for s in manager.get_scores() if s.get("team_name") == team_name]
+    if not team_scores:
+        return {"total_average": 0.0, "criteria_averages": {}}
+    criteria = {c for s in team_scores for c in s["scores"]}
+    return {
+        "total_average": round(sum(s["total_score"] for s in team_scores) / len(team_scores), 2),
+        "criteria_averages": {c: round(sum(s["scores"][c] for s in team_scores if c in s["scores"])
+                                       / sum(1 for s in team_scores if c in s["scores"]), 2) for c in criteria},
+        "judge_count": len(team_scores),
+    }
+
+
+def check_against_reference(manager):
+    leaderboard = manager.get_leaderboard()
+    assert [entry["rank"] for entry in leaderboard] == list(range(1, 13))
+    totals = [entry["total_average"] for entry in leaderboard]
+    assert totals == sorted(totals, reverse=True)
+    for entry in leaderboard:
+        expected = reference_average(manager, entry["team_name"])
+        assert entry["total_average"] == expected["total_average"]
+        assert entry["criteria_averages"] == expected["criteria_averages"]
+        assert entry["judge_count"] == expected.get("judge_count", 0)
+        assert entry["has_submission"] == (manager.get_project_by_team(entry["team_name"]) is not None)
+        assert manager.calculate_team_average_score(entry["team_name"]) == expected
+
+
+class TestLeaderboard:
+    """Test cases for the leaderboard and score aggregates"""
+
+    def test_matches_per_team_computation(self, manager):
+        check_against_reference(manager)
+        unscored = manager.calculate_team_average_score("Team 11")
+        assert unscored == {"total_average": 0.0, "criteria_averages": {}}
+
+    def test_submit_score_updates_aggregates_in_place(self, manager):
+        manager.get_leaderboard()
+        path = manager.scores.path
+        aggregates = data_manager._score_aggregates[path][1]
+        manager.submit_score("Team 11", "Judge 9", {"usefulness": 9, "creativity": 9, "teamwork": 9})
+        assert data_manager._score_aggregates[path][1] is aggregates
+        assert data_manager._score_aggregates[path][0] == manager.scores.version
+        assert aggregates["Team 11"]["count"] == 1
+        check_against_reference(manager)
+
+    def test_scores_from_another_process_regroup(self, manager):
+        manager.get_leaderboard()
+        aggregates = data_manager._score_aggregates[manager.scores.path][1]
+        JsonStore(Config.SCORES_FILE).put({"id": "external", "team_name": "Team 11", "judge_name": "Judge 0",
+                                           "scores": {"usefulness": 2}, "total_score": 2})
+        assert manager.calculate_team_average_score("Team 11")["total_average"] == 2.0
+        assert data_manager._score_aggregates[manager.scores.path][1] is not aggregates
+        check_against_reference(manager)
@@ -0,0 +1,79 @@
+"""
+Unit tests for the offline Q-learning trainer
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import rl_engine
+from adaptive_agent.trainer import OfflineTrainer
+from rl_engine import QTable, RLEngine
+from state_encoders import JsonStateEncoder
+
+
+def feedback(rows):
+    return pd.DataFrame(rows, columns=["timestamp", "suggestion_id", "user_text", "suggestion_text", "feedback"])
+
+
+def online(rows, alpha=0.1, gamma=0.99, sequential=False):
+    """Reference: one update_q_value-style update per row, in order."""
+    table = QTable()
+    encoder = JsonStateEncoder()
+    states = [encoder.encode({"user_text": "" if pd.isna(r[2]) else r[2]}) for r in rows]
+    for n, (_, action, _, _, reward) in enumerate(rows):
+        state_id = table.state_id(states[n], create=True)
+        action_id = table.action_id(action)
+        next_id = table.state_id(states[n + 1]) if sequential and n + 1 < len(rows) else None
+        max_next = float(table.row(next_id).max()) if next_id is not None else 0.0
+        table.update(state_id, action_id, lambda q: q + alpha * (reward + gamma * max_next - q))
+    return table.to_dict()
+
+
+class TestOfflineTrainer:
+    """Test cases for OfflineTrainer"""
+
+    def test_repeated_cell_matches_sequential_updates(self):
+        rows = [("t", "SUG-1", "stuck", "", 1)] * 7 + [("t", "SUG-2", "stuck", "", -1)] * 3
+        trainer = OfflineTrainer(alpha=0.3, batch_size=64, state_encoder=JsonStateEncoder())
+        result = trainer.train(feedback(rows)).to_dict()
+        for state, row in online(rows, alpha=0.3).items():
+            assert result[state] == pytest.approx(row)
+
+    def test_epochs_converge_to_mean_reward(self):
+        rows = [("t", "SUG-1", "idle", "", 1), ("t", "SUG-1", "idle", "", 0)] * 50
+        trainer = OfflineTrainer(alpha=0.05, epochs=20, batch_size=8, seed=1, state_encoder=JsonStateEncoder())
+        table = trainer.train(feedback(rows))
+        assert table['{"user_text": "idle"}']["SUG-1"] == pytest.approx(0.5, abs=0.05)
+
+    def test_sequential_bootstraps_from_next_state(self):
+        rows = [("t", "SUG-1", "a", "", 0), ("t", "SUG-1", "b", "", 1), ("t", "SUG-1", "a", "", 0)]
+        trainer = OfflineTrainer(alpha=0.5, gamma=0.9, batch_size=1, shuffle=False, sequential=True,
+                                 state_encoder=JsonStateEncoder())
+        result = trainer.train(feedback(rows)).to_dict()
+        expected = online(rows, alpha=0.5, gamma=0.9, sequential=True)
+        for state, row in expected.items():
+            assert result[state] == pytest.approx(row)
+
+    def test_invalid_rows_are_skipped_and_empty_text_is_kept(self):
+        rows = [("t", "SUG-1", np.nan, "", 1), ("t", None, "x", "", 1), ("t", "SUG-2", "x", "", "n/a")]
+        trainer = OfflineTrainer(state_encoder=JsonStateEncoder())
+        transitions = trainer.build_transitions(feedback(rows), actions=["SUG-2", "SUG-1"])
+        assert len(transitions) == 1
+        assert transitions.q_table.states == ['{"user_text": ""}']
+        assert transitions.q_table.actions == ["SUG-2", "SUG-1"]
+
+    def test_warm_start_keeps_existing_states(self):
+        initial = QTable.from_dict({"old": {"SUG-1": 2.0}})
+        trainer = OfflineTrainer(state_encoder=JsonStateEncoder())
+        table = trainer.train(feedback([("t", "SUG-1", "new", "", 1)]), initial=initial)
+        assert table["old"]["SUG-1"] == 2.0
+        assert table['{"user_text": "new"}']["SUG-1"] == pytest.approx(0.1)
+
+    def test_snapshot_is_loaded_by_engine(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(rl_engine, "DATA_DIR", tmp_path)
+        trainer = OfflineTrainer(state_encoder=JsonStateEncoder())
+        trainer.train_to_snapshot(tmp_path / "offline_q_table.npz", feedback=feedback([("t", "SUG-1", "x", "", 1)]))
+        assert not list(tmp_path.glob("*.tmp"))
+        engine = RLEngine("offline", backend="memory")
+        assert engine.q_table['{"user_text": "x"}']["SUG-1"] == pytest.approx(0.1)
@@ -0,0 +1,70 @@
+"""
+Unit tests for the array-backed Q-table
+"""
+
+import json
+
+import pytest
+
+import rl_engine
+from rl_engine import QTable, RLEngine
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rl_engine, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+class TestQTable:
+    """Test cases for QTable"""
+
+    def test_grows_and_reads_like_a_dict(self):
+        table = QTable(capacity=1, action_capacity=1)
+        for n in range(10):
+            table.state_id(f"s{n}", create=True)
+        table["s3"]["a2"] = 1.5
+        table["s9"]["a1"] = -0.5
+        assert table["s3"]["a2"] == 1.5
+        assert table["s3"]["a1"] == 0.0
+        assert table.to_dict()["s9"] == {"a2": 0.0, "a1": -0.5}
+        with pytest.raises(KeyError):
+            table["missing"]
+
+    def test_npz_round_trip(self, tmp_path):
+        table = QTable.from_dict({"s1": {"a": 1.0}, "s2": {"b": 2.0}})
+        table.save(tmp_path / "q.npz")
+        assert QTable.load(tmp_path / "q.npz").to_dict() == {"s1": {"a": 1.0, "b": 0.0}, "s2": {"a": 0.0, "b": 2.0}}
+
+
+class TestRLEnginePersistence:
+    """Test cases for coalesced Q-table writes"""
+
+    def test_writes_are_coalesced(self, data_dir):
+        engine = RLEngine("coalesce", flush_every=3, flush_interval=3600, backend="memory")
+        engine.register_actions(["a1", "a2"])
+        engine.update_q_value("s", "a1", 1.0)
+        assert not engine.q_table_path.exists()
+        engine.update_q_value("s", "a1", 1.0)
+        assert engine.q_table_path.exists()
+
+        engine.update_q_value("s", "a2", 1.0)
+        engine.flush()
+        reloaded = RLEngine("coalesce", backend="memory")
+        assert reloaded.q_table["s"]["a2"] == pytest.approx(0.1)
+        assert reloaded.q_table["s"]["a1"] == engine.q_table["s"]["a1"]
+        assert reloaded.actions == ["a1", "a2"]
+
+    def test_timer_flushes_pending_changes(self, data_dir):
+        engine = RLEngine("timer", flush_every=100, flush_interval=0.05, backend="memory")
+        engine.update_q_value("s", "a", 1.0)
+        engine._flush_timer.join(1.0)
+        assert engine.q_table_path.exists()
+
+    def test_migrates_legacy_json(self, data_dir):
+        with open(data_dir / "legacy_q_table.json", "w") as f:
+            json.dump({"s": {"a1": 0.5, "a2": 0.25}}, f)
+        engine = RLEngine("legacy", epsilon=0.0, backend="memory")
+        assert engine.q_table["s"]["a1"] == 0.5
+        assert engine.choose_action("s") == "a1"
+        assert sorted(engine.actions) == ["a1", "a2"]
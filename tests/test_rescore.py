@@ -0,0 +1,204 @@
+"""
+Unit tests for the offline rescore job
+"""
+
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from src.judging import rubric
+from src.judging.rescore import RescoreJob, stored_criteria_scores
+from src.routes.judge import insert_next_judgment_version
+
+
+class FakeJudgments:
+    """Minimal stand-in for db.judgments supporting the queries used by RescoreJob"""
+
+    def __init__(self, docs):
+        self.docs = [dict(doc, _id=i) for i, doc in enumerate(docs)]
+        self.bulk_calls = 0
+
+    def find(self, query, sort=None, batch_size=None):
+        def matches(doc):
+            for key, value in query.items():
+                if isinstance(value, dict):
+                    if not doc.get(key) > value["$gt"]:
+                        return False
+                elif doc.get(key) != value:
+                    return False
+            return True
+        result = [doc for doc in self.docs if matches(doc)]
+        result.sort(key=lambda d: (d["submission_hash"], -d["version"]))
+        return iter(result)
+
+    def bulk_write(self, operations, ordered=True):
+        """Inserts with the unique (submission_hash, version) index enforced, like an unordered bulk_write"""
+        self.bulk_calls += 1
+        existing = {(d["submission_hash"], d["version"]) for d in self.docs}
+        inserted, errors = 0, []
+        for index, op in enumerate(operations):
+            key = (op._doc["submission_hash"], op._doc["version"])
+            if key in existing:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                continue
+            existing.add(key)
+            self.docs.append(dict(op._doc, _id=len(self.docs)))
+            inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+        return SimpleNamespace(inserted_count=inserted)
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.judgments = FakeJudgments(docs)
+
+
+FULL_SCORES = {"usefulness": 10, "innovation": 5, "tech_depth": 5, "clarity": 5, "impact": 5}
+
+
+@pytest.fixture
+def checkpoint_path():
+    directory = tempfile.mkdtemp()
+    yield os.path.join(directory, "checkpoint.json")
+
+
+class TestRescoreJob:
+    """Test cases for RescoreJob"""
+
+    def test_legacy_fields_are_mapped(self):
+        scores = stored_criteria_scores({"clarity": 6, "quality": 7, "innovation": 8})
+        assert scores == {"clarity": 6, "tech_depth": 7, "innovation": 8}
+
+    def test_rescores_latest_version_only(self, checkpoint_path):
+        db = FakeDB([
+            {"submission_hash": "a", "version": 1, "criteria_scores": FULL_SCORES, "total_score": 0},
+            {"submission_hash": "a", "version": 2, "criteria_scores": FULL_SCORES, "total_score": 60.0},
+            {"submission_hash": "b", "version": 1, "criteria_scores": FULL_SCORES, "total_score": 60.0},
+        ])
+        new_weights = {"usefulness": 0.6, "innovation": 0.1, "tech_depth": 0.1, "clarity": 0.1, "impact": 0.1}
+        with patch.dict(rubric.WEIGHTS, new_weights):
+            summary = RescoreJob(db, batch_size=1, checkpoint_path=checkpoint_path).run()
+
+        assert summary["processed"] == 2
+        assert summary["updated"] == 2
+        new_docs = [d for d in db.judgments.docs if d.get("rescore_run_id")]
+        assert {(d["submission_hash"], d["version"]) for d in new_docs} == {("a", 3), ("b", 2)}
+        assert all(d["total_score"] == 80.0 for d in new_docs)
+
+    def test_unchanged_totals_are_not_rewritten(self, checkpoint_path):
+        db = FakeDB([{"submission_hash": "a", "version": 1, "criteria_scores": FULL_SCORES, "total_score": 60.0}])
+        summary = RescoreJob(db, checkpoint_path=checkpoint_path).run()
+        assert summary["updated"] == 0
+        assert db.judgments.bulk_calls == 0
+
+    @pytest.mark.parametrize("doc", [
+        # Legacy judgment: missing criteria count towards the maximum, as on the live path
+        {"submission_hash": "a", "version": 1, "clarity": 6, "quality": 7, "innovation": 8, "total_score": 46.5},
+        # Rounding drift from the 2-dp criteria scores
+        {"submission_hash": "a", "version": 1, "criteria_scores": FULL_SCORES, "total_score": 60.004},
+    ], ids=["legacy", "drift"])
+    def test_totals_within_tolerance_are_not_rewritten(self, doc, checkpoint_path):
+        db = FakeDB([doc])
+        summary = RescoreJob(db, checkpoint_path=checkpoint_path).run()
+        assert summary["updated"] == 0
+
+    def test_resume_from_checkpoint(self, checkpoint_path):
+        docs = [{"submission_hash": h, "version": 1, "criteria_scores": FULL_SCORES, "total_score": 0} for h in "abcd"]
+        db = FakeDB(docs)
+        job = RescoreJob(db, batch_size=2, checkpoint_path=checkpoint_path)
+
+        original_rescore = job._rescore_batch
+        calls = {"count": 0}
+
+        def crash_on_second_batch(batch, run_id):
+            calls["count"] += 1
+            if calls["count"] == 2:
+                raise RuntimeError("interrupted")
+            return original_rescore(batch, run_id)
+
+        with patch.object(job, "_rescore_batch", side_effect=crash_on_second_batch):
+            with pytest.raises(RuntimeError):
+                job.run(run_id="run1")
+
+        summary = job.run(run_id="run1")
+        assert summary["processed"] == 4
+        rescored = sorted(d["submission_hash"] for d in db.judgments.docs if d.get("rescore_run_id") == "run1")
+        assert rescored == ["a", "b", "c", "d"]
+
+    def test_resume_after_crash_between_write_and_checkpoint(self, checkpoint_path):
+        docs = [{"submission_hash": h, "version": 1, "criteria_scores": FULL_SCORES, "total_score": 0} for h in "abcd"]
+        db = FakeDB(docs)
+        job = RescoreJob(db, batch_size=2, checkpoint_path=checkpoint_path)
+
+        original_save = job._save_checkpoint
+        calls = {"count": 0}
+
+        def crash_after_first_write(checkpoint):
+            calls["count"] += 1
+            if calls["count"] == 1:
+                raise RuntimeError("interrupted")
+            return original_save(checkpoint)
+
+        with patch.object(job, "_save_checkpoint", side_effect=crash_after_first_write):
+            with pytest.raises(RuntimeError):
+                job.run(run_id="run1")
+        assert db.judgments.bulk_calls == 1
+
+        summary = job.run(run_id="run1")
+        versions = sorted((d["submission_hash"], d["version"]) for d in db.judgments.docs)
+        assert versions == [(h, v) for h in "abcd" for v in (1, 2)]
+        assert summary["updated"] == 2
+
+    def test_version_inserted_meanwhile_counts_as_done(self, checkpoint_path):
+        db = FakeDB([{"submission_hash": h, "version": 1, "criteria_scores": FULL_SCORES, "total_score": 0}
+                     for h in "ab"])
+        original_bulk_write = db.judgments.bulk_write
+
+        def concurrent_rescore_first(operations, ordered=True):
+            db.judgments.docs.append({"submission_hash": "a", "version": 2, "total_score": 60.0, "_id": "other"})
+            return original_bulk_write(operations, ordered=ordered)
+
+        with patch.object(db.judgments, "bulk_write", side_effect=concurrent_rescore_first):
+            summary = RescoreJob(db, checkpoint_path=checkpoint_path).run()
+
+        assert summary["updated"] == 1
+        assert sorted((d["submission_hash"], d["version"]) for d in db.judgments.docs) == \
+            [("a", 1), ("a", 2), ("b", 1), ("b", 2)]
+
+
+class TestJudgmentVersions:
+    """Test cases for insert_next_judgment_version"""
+
+    def test_retries_with_a_fresh_version_when_taken(self):
+        stored = [{"submission_hash": "a", "version": 1}]
+
+        class Judgments:
+            def find_one(self, query, sort=None):
+                return max(stored, key=lambda d: d["version"])
+
+            def insert_one(self, doc):
+                if any(d["version"] == doc["version"] for d in stored):
+                    raise DuplicateKeyError("E11000 duplicate key error")
+                stored.append(dict(doc))
+
+        db = SimpleNamespace(judgments=Judgments())
+        real_find_one = db.judgments.find_one
+        calls = []
+
+        def racing_find_one(query, sort=None):
+            latest = real_find_one(query, sort)
+            if not calls:
+                # A concurrent submit takes version 2 between the read and the insert
+                stored.append({"submission_hash": "a", "version": 2})
+            calls.append(latest["version"])
+            return latest
+
+        db.judgments.find_one = racing_find_one
+        assert insert_next_judgment_version(db, {"submission_hash": "a"}) == 3
+        assert calls == [1, 2]
+        assert sorted(d["version"] for d in stored) == [1, 2, 3]
@@ -0,0 +1,104 @@
+"""
+Unit tests for the judge response parser
+"""
+
+import pytest
+from unittest.mock import patch
+
+from src.judging.response_parser import (
+    ScoreSchema,
+    JudgeResponseParseError,
+    extract_json_block,
+    parse_judge_response,
+)
+from src.judging.rubric import CRITERIA
+from src.judging.multi_agent_judge import MultiAgentJudge
+
+
+VALID_RESPONSE = (
+    '{"scores": {"usefulness": 8, "innovation": 7, "tech_depth": 9, "clarity": 6, "impact": 7},'
+    ' "explanation": "Solid work", "confidence": 0.9}'
+)
+
+
+class TestExtractJsonBlock:
+    """Test cases for JSON block extraction"""
+
+    def test_bare_json(self):
+        assert extract_json_block(VALID_RESPONSE)["confidence"] == 0.9
+
+    def test_fenced_json(self):
+        text = f"Here is my evaluation:\n```json\n{VALID_RESPONSE}\n```\nThanks!"
+        assert extract_json_block(text)["explanation"] == "Solid work"
+
+    def test_json_embedded_in_prose(self):
+        text = f"Sure. {VALID_RESPONSE} Let me know if you need more."
+        assert extract_json_block(text)["scores"]["tech_depth"] == 9
+
+    def test_no_json_raises(self):
+        with pytest.raises(JudgeResponseParseError):
+            extract_json_block("I cannot evaluate this submission.")
+
+
+class TestScoreSchema:
+    """Test cases for schema validation"""
+
+    def test_scores_are_clamped(self):
+        text = (
+            '{"scores": {"usefulness": 14, "innovation": -2, "tech_depth": "9", "clarity": 6, "impact": 7},'
+            ' "confidence": 3}'
+        )
+        result = parse_judge_response(text)
+        assert result["scores"]["usefulness"] == CRITERIA["usefulness"]
+        assert result["scores"]["innovation"] == 0
+        assert result["scores"]["tech_depth"] == 9
+        assert result["confidence"] == 1.0
+
+    def test_missing_criterion_raises(self):
+        with pytest.raises(JudgeResponseParseError):
+            parse_judge_response('{"scores": {"usefulness": 8}}')
+
+    def test_top_level_nested_scores(self):
+        schema = ScoreSchema({"clarity": 100, "quality": 100}, scores_key=None, default_confidence=0.92)
+        text = '{"clarity": {"score": 80, "explanation": "ok"}, "quality": {"score": 120}, "overall_reasoning": "Good"}'
+        result = parse_judge_response(text, schema)
+        assert result["scores"] == {"clarity": 80.0, "quality": 100.0}
+        assert result["explanation"] == "Good"
+        assert result["confidence"] == 0.92
+
+    def test_missing_confidence_can_stay_missing(self):
+        schema = ScoreSchema({"clarity": 100}, scores_key=None, default_confidence=None)
+        assert parse_judge_response('{"clarity": 80}', schema)["confidence"] is None
+        assert parse_judge_response('{"clarity": 80, "confidence": 1.4}', schema)["confidence"] == 1.0
+
+
+class TestMultiAgentJudgeParsing:
+    """Test cases for parsing inside the multi-agent judge"""
+
+    def _judge(self):
+        judge = MultiAgentJudge()
+        judge.api_key = "test-key"
+        return judge
+
+    def test_uses_llm_scores(self):
+        judge = self._judge()
+        with patch.object(judge, "_call_llm", return_value=VALID_RESPONSE) as mock_llm:
+            evaluation = judge._get_specialized_evaluation("judge_a", "My project")
+        assert mock_llm.call_count == 1
+        assert evaluation["scores"]["tech_depth"] == 9
+        assert evaluation["confidence"] == 0.9
+
+    def test_single_repair_call_on_bad_output(self):
+        judge = self._judge()
+        with patch.object(judge, "_call_llm", side_effect=["not json at all", VALID_RESPONSE]) as mock_llm:
+            evaluation = judge._get_specialized_evaluation("judge_b", "My project")
+        assert mock_llm.call_count == 2
+        assert evaluation["scores"]["usefulness"] == 8
+
+    def test_falls_back_when_repair_fails(self):
+        judge = self._judge()
+        with patch.object(judge, "_call_llm", side_effect=["garbage", "still garbage"]) as mock_llm:
+            evaluation = judge._get_specialized_evaluation("judge_c", "My project")
+        assert mock_llm.call_count == 2
+        assert evaluation["confidence"] == 0.6
+        assert all(score == 6 for score in evaluation["scores"].values())
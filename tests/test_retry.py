@@ -0,0 +1,98 @@
+"""
+Unit tests for the retry policy
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.retry import RetryBudget, full_jitter_delay, retry
+
+
+def _flaky(failures, exc=ConnectionError):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc("transient")
+        return "ok"
+    return fn, calls
+
+
+class TestRetryDecorator:
+    """Test cases for the retry decorator"""
+
+    @patch("src.retry.time.sleep")
+    def test_sync_retries_with_full_jitter(self, mock_sleep):
+        fn, calls = _flaky(2)
+        assert retry(max_retries=3, backoff=1, budget=RetryBudget())(fn)() == "ok"
+        assert len(calls) == 3
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+    def test_async_retries_without_blocking(self):
+        attempts = []
+
+        @retry(max_retries=3, backoff=0.01, budget=RetryBudget())
+        async def fetch():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise ConnectionError("transient")
+            return "ok"
+
+        with patch("src.retry.time.sleep") as mock_sleep:
+            assert asyncio.run(fetch()) == "ok"
+        mock_sleep.assert_not_called()
+        assert len(attempts) == 2
+
+    @patch("src.retry.time.sleep")
+    def test_classification(self, mock_sleep):
+        fn, calls = _flaky(5, exc=ValueError)
+        with pytest.raises(ValueError):
+            retry(max_retries=3, retry_on=(ConnectionError,), budget=None)(fn)()
+        assert len(calls) == 1
+
+        fn, calls = _flaky(5, exc=ConnectionRefusedError)
+        with pytest.raises(ConnectionRefusedError):
+            retry(max_retries=3, give_up_on=(ConnectionRefusedError,), budget=None)(fn)()
+        assert len(calls) == 1
+
+        fn, calls = _flaky(5)
+        with pytest.raises(ConnectionError):
+            retry(max_retries=3, should_retry=lambda e: False, budget=None)(fn)()
+        assert len(calls) == 1
+
+    @patch("src.retry.time.sleep")
+    def test_deadline_stops_retries(self, mock_sleep):
+        fn, calls = _flaky(5)
+        with patch("src.retry.full_jitter_delay", return_value=10.0):
+            with pytest.raises(ConnectionError):
+                retry(max_retries=5, deadline=5.0, budget=None)(fn)()
+        assert len(calls) == 1
+
+    @patch("src.retry.time.sleep")
+    def test_exhausted_budget_stops_retries(self, mock_sleep):
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=1)
+        fn, calls = _flaky(5)
+        with pytest.raises(ConnectionError):
+            retry(max_retries=5, budget=budget)(fn)()
+        # One token: one retry, then the budget rejects
+        assert len(calls) == 2
+        assert budget.get_stats()["rejected"] == 1
+
+
+class TestRetryBudget:
+    """Test cases for RetryBudget"""
+
+    def test_calls_deposit_tokens(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=1)
+        assert budget.try_acquire()
+        assert not budget.try_acquire()
+        budget.record_call()
+        budget.record_call()
+        assert budget.try_acquire()
+
+    def test_full_jitter_is_capped(self):
+        assert all(0 <= full_jitter_delay(10, 1.0, 5.0) <= 5.0 for _ in range(100))
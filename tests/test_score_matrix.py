@@ -0,0 +1,72 @@
+"""
+Unit tests for vectorized score aggregation
+"""
+
+import numpy as np
+import pytest
+
+from src.judging.consensus import ConsensusAggregator
+from src.judging.rubric import CRITERIA
+from src.judging.score_matrix import (
+    CRITERIA_ORDER,
+    aggregate_batch,
+    aggregate_score_matrix,
+    scores_to_matrix,
+    stack_score_matrices,
+)
+
+
+SCORES = [
+    {"usefulness": 8, "innovation": 7, "tech_depth": 9, "clarity": 6, "impact": 7},
+    {"usefulness": 6, "innovation": 8, "tech_depth": 7, "clarity": 6, "impact": 5},
+    {"usefulness": 7, "innovation": 6, "tech_depth": 2, "clarity": 7},
+]
+
+
+class TestScoreMatrix:
+    """Test cases for matrix conversion and aggregation"""
+
+    def test_missing_criteria_become_nan(self):
+        matrix = scores_to_matrix(SCORES)
+        assert matrix.shape == (3, len(CRITERIA))
+        assert np.isnan(matrix[2, CRITERIA_ORDER.index("impact")])
+
+    def test_matches_reference_metrics(self):
+        result = aggregate_score_matrix(scores_to_matrix(SCORES))
+        impact = CRITERIA_ORDER.index("impact")
+        assert result["counts"][impact] == 2
+        assert result["means"][impact] == pytest.approx(6.0)
+        assert result["std"][impact] == pytest.approx(1.0)
+        assert result["range"][impact] == pytest.approx(2.0)
+
+    def test_outlier_flagged(self):
+        result = aggregate_score_matrix(scores_to_matrix(SCORES))
+        tech_depth = CRITERIA_ORDER.index("tech_depth")
+        assert result["outliers"][2, tech_depth]
+        assert result["outliers"].sum() == 1
+
+    def test_confidence_weighting(self):
+        matrix = scores_to_matrix([{"usefulness": 10}, {"usefulness": 0}])
+        result = aggregate_score_matrix(matrix, confidences=np.array([0.9, 0.1]))
+        usefulness = CRITERIA_ORDER.index("usefulness")
+        assert result["means"][usefulness] == pytest.approx(5.0)
+        assert result["confidence_weighted_means"][usefulness] == pytest.approx(9.0)
+
+    def test_batch_matches_single(self):
+        batch = [SCORES, SCORES[:2], []]
+        tensor = stack_score_matrices(batch)
+        assert tensor.shape == (3, 3, len(CRITERIA))
+        batch_result = aggregate_score_matrix(tensor)
+        single = aggregate_score_matrix(scores_to_matrix(SCORES[:2]))
+        np.testing.assert_allclose(batch_result["overall_score"][1], single["overall_score"])
+        assert batch_result["overall_score"][2] == 0
+
+    def test_aggregate_batch_agrees_with_consensus_aggregator(self):
+        aggregator = ConsensusAggregator()
+        summaries = aggregate_batch([SCORES, SCORES[:2]])
+        for summary, score_sets in zip(summaries, [SCORES, SCORES[:2]]):
+            expected = aggregator.calculate_weighted_average(score_sets)
+            assert summary["overall_score"] == expected["overall_score"]
+            assert summary["criteria"] == expected["criteria"]
+            disagreement = aggregator.calculate_disagreement_metrics(score_sets)
+            assert summary["disagreement_score"] == pytest.approx(disagreement["disagreement_score"], abs=0.01)
@@ -0,0 +1,150 @@
+"""
+Unit tests for the memory-mapped Q-table shared across processes
+"""
+
+import multiprocessing
+
+import pytest
+
+import rl_engine
+from rl_engine import QTable, RLEngine, SharedQTable, get_rl_engine
+
+pytestmark = pytest.mark.skipif(rl_engine.fcntl is None, reason="shared Q-table needs fcntl")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rl_engine, "DATA_DIR", tmp_path)
+    return tmp_path
+
+
+def _increment(base_path, times):
+    table = SharedQTable.open(base_path)
+    state_id = table.state_id("s", create=True)
+    action_id = table.action_id("a")
+    for _ in range(times):
+        table.update(state_id, action_id, lambda q: q + 1.0)
+    table.sync()
+
+
+def _add_states(base_path, count):
+    table = SharedQTable.open(base_path)
+    for n in range(count):
+        table.state_id(f"child_{n}", create=True)
+        table[f"child_{n}"]["b"] = float(n)
+
+
+def _grow_and_increment(base_path, count):
+    table = SharedQTable.open(base_path)
+    for n in range(count):
+        table.action_id(f"b{n}")
+        table["s"][f"b{n}"] = float(n)
+    table.update(table.state_id("s"), table.action_id("a"), lambda q: q + 1.0)
+    table.sync()
+
+
+def _run(target, *args):
+    process = multiprocessing.get_context("fork").Process(target=target, args=args)
+    process.start()
+    return process
+
+
+class TestSharedQTable:
+    """Test cases for SharedQTable"""
+
+    def test_concurrent_updates_from_processes_are_not_lost(self, tmp_path):
+        base_path = tmp_path / "agent_q_table"
+        processes = [_run(_increment, base_path, 300) for _ in range(3)]
+        _increment(base_path, 300)
+        for process in processes:
+            process.join(30)
+            assert process.exitcode == 0
+        assert SharedQTable.open(base_path)["s"]["a"] == 1200.0
+
+    def test_sees_states_and_rows_added_by_other_processes(self, tmp_path):
+        base_path = tmp_path / "agent_q_table"
+        table = SharedQTable.open(base_path, initial_states=2)
+        table.state_id("mine", create=True)
+        table["mine"]["a"] = 1.0
+        process = _run(_add_states, base_path, 20)
+        process.join(30)
+        assert process.exitcode == 0
+
+        # the child doubled the file several times; this mapping is refreshed on demand
+        assert table["child_19"]["b"] == 19.0
+        assert len(table) == 21
+        assert table.to_dict()["mine"] == {"a": 1.0, "b": 0.0}
+        assert table.q_values.shape == (21, 2)
+
+    def test_actions_beyond_capacity_grow_the_table(self, tmp_path):
+        table = SharedQTable.open(tmp_path / "agent_q_table", max_actions=2)
+        state_id = table.state_id("s", create=True)
+        table.update(state_id, table.action_id("a1"), lambda q: 1.5)
+        for n in range(2, 6):
+            table.action_id(f"a{n}")
+        assert table.max_actions == 8
+        assert table.to_dict() == {"s": {"a1": 1.5, "a2": 0.0, "a3": 0.0, "a4": 0.0, "a5": 0.0}}
+
+    def test_other_processes_follow_a_grown_table(self, tmp_path):
+        base_path = tmp_path / "agent_q_table"
+        table = SharedQTable.open(base_path, max_actions=2)
+        state_id = table.state_id("s", create=True)
+        action_id = table.action_id("a")
+        table.update(state_id, action_id, lambda q: q + 1.0)
+        process = _run(_grow_and_increment, base_path, 40)
+        process.join(30)
+        assert process.exitcode == 0
+
+        # this process still maps the replaced file; the update must land in the new one
+        table.update(state_id, action_id, lambda q: q + 1.0)
+        assert len(table.actions) == 41
+        assert table.max_actions == 64
+        assert table["s"]["a"] == 3.0
+        assert table["s"]["b39"] == 39.0
+
+    def test_seed_only_fills_an_empty_table(self, tmp_path):
+        table = SharedQTable.open(tmp_path / "agent_q_table")
+        assert table.seed({"s1": {"a": 1.0}, "s2": {"b": 2.0}})
+        assert table.to_dict() == {"s1": {"a": 1.0, "b": 0.0}, "s2": {"a": 0.0, "b": 2.0}}
+        assert not table.seed({"s3": {"a": 3.0}})
+        assert "s3" not in table
+
+
+class TestRLEngineSharedBackend:
+    """Test cases for RLEngine on the shared backend"""
+
+    def test_engines_share_updates(self, data_dir):
+        first = RLEngine("shared", backend="shared")
+        second = RLEngine("shared", backend="shared")
+        first.register_actions(["a1", "a2"])
+        first.update_q_value("s", "a1", 1.0)
+        second.update_q_value("s", "a1", 1.0)
+        assert first.q_table["s"]["a1"] == pytest.approx(0.1 + 0.1 * (1.0 - 0.1))
+        assert second.q_table.actions == ["a1", "a2"]
+
+    def test_migrates_npz_snapshot(self, data_dir):
+        QTable.from_dict({"s": {"a1": 0.5, "a2": 0.25}}).save(data_dir / "migrate_q_table.npz")
+        engine = RLEngine("migrate", epsilon=0.0, backend="shared")
+        assert engine.q_table["s"]["a1"] == 0.5
+        assert engine.choose_action("s") == "a1"
+        assert (data_dir / "migrate_q_table.shm").exists()
+
+    def test_get_rl_engine_is_process_wide(self, data_dir, monkeypatch):
+        monkeypatch.setattr(rl_engine, "_engines", {})
+        engine = get_rl_engine("registry", backend="memory")
+        assert get_rl_engine("registry") is engine
+        assert engine.backend == "memory"
+
+    def test_registry_engines_are_flushed_by_one_exit_hook(self, data_dir, monkeypatch):
+        monkeypatch.setattr(rl_engine, "_engines", {})
+        registered = []
+        monkeypatch.setattr(rl_engine.atexit, "register", registered.append)
+        engine = get_rl_engine("exit", backend="memory", flush_every=100)
+        engine.register_actions(["a1"])
+        assert registered == []
+        rl_engine._flush_engines()
+        assert (data_dir / "exit_q_table.npz").exists()
+
+    def test_adaptive_agent_modules_share_one_engine(self):
+        from adaptive_agent import suggestion_engine, tuner
+        assert suggestion_engine.rl_engine is tuner.rl_engine
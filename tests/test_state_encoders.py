@@ -0,0 +1,84 @@
+"""
+Unit tests for RL state encoders
+"""
+
+import json
+
+import pytest
+
+import rl_engine
+from rl_engine import RLEngine
+from state_encoders import (HashingStateEncoder, JsonStateEncoder, NumericDiscretizer, make_state_encoder,
+                            stable_hash)
+
+
+class TestNumericDiscretizer:
+    """Test cases for NumericDiscretizer"""
+
+    def test_bins(self):
+        discretizer = NumericDiscretizer([0, 50, 80])
+        assert [discretizer.bin(v) for v in (-1, 0, 49.9, 50, 79, 80, 1000)] == [0, 1, 1, 2, 2, 3, 3]
+
+    def test_uniform(self):
+        discretizer = NumericDiscretizer.uniform(0, 100, 4)
+        assert discretizer.edges == [0, 25, 50, 75, 100]
+        assert discretizer.bin(30) == 2
+
+
+class TestStateEncoders:
+    """Test cases for JSON and hashed state encoders"""
+
+    def test_json_encoder_matches_legacy_states(self):
+        context = {"b": 1, "a": {"text": "hello"}}
+        assert JsonStateEncoder().encode(context) == json.dumps(context, sort_keys=True)
+        assert JsonStateEncoder(keys=["a.text"]).encode(context) == '{"a.text": "hello"}'
+
+    def test_hashed_encoder_is_bounded_and_generalizes(self):
+        encoder = HashingStateEncoder(n_buckets=8, keys=["stage", "progress", "user_text"],
+                                      discretizers={"progress": NumericDiscretizer([25, 50, 75])})
+        first = encoder.encode({"stage": "Build", "progress": 30, "user_text": "short", "request_id": "r1"})
+        # Different progress in the same bin, an ignored key and different case map to the same state
+        assert encoder.encode({"stage": "build", "progress": 45, "user_text": "Short!", "request_id": "r2"}) == first
+        states = {encoder.encode({"user_text": f"free text number {n} " * 5}) for n in range(200)}
+        assert states <= {f"h{n}" for n in range(8)}
+
+    def test_free_text_collapses_to_text_buckets(self):
+        encoder = HashingStateEncoder(n_buckets=1 << 20, text_buckets=4)
+        states = {encoder.encode({"user_text": f"I am stuck on bug number {n} in my project"}) for n in range(100)}
+        assert len(states) <= 4
+        assert encoder.features({"tags": ["a", "b"], "meta": {"ok": True}}) == ["meta.ok=True", "tags=a", "tags=b"]
+
+    def test_stable_hash_is_deterministic(self):
+        # pinned: states must map to the same bucket in every process and release
+        assert stable_hash("state") == 2435781236248007203
+
+    def test_stats(self):
+        encoder = HashingStateEncoder(n_buckets=16)
+        for n in range(10):
+            encoder.encode({"stage": "build" if n % 2 else "test"})
+        stats = encoder.get_stats()
+        assert stats["observations"] == 10
+        assert stats["distinct_states"] <= 2
+        assert stats["max_states"] == 16
+        assert stats["top_states"][0]["count"] == 5
+
+    def test_make_state_encoder(self):
+        assert isinstance(make_state_encoder("hashed", n_buckets=4), HashingStateEncoder)
+        with pytest.raises(ValueError):
+            make_state_encoder("unknown")
+
+
+class TestRLEngineStateEncoder:
+    """Test cases for RLEngine state encoding"""
+
+    def test_engine_uses_encoder_and_reports_stats(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(rl_engine, "DATA_DIR", tmp_path)
+        engine = RLEngine("encoded", backend="memory", state_encoder=HashingStateEncoder(n_buckets=4))
+        engine.register_actions(["a1"])
+        for n in range(50):
+            engine.update_q_value(engine.get_state({"user_text": f"message {n}"}), "a1", 1.0)
+        stats = engine.get_state_stats()
+        assert stats["encoder"] == "hashed"
+        assert stats["observations"] == 50
+        assert stats["q_table_states"] <= 4
+        assert stats["q_table_actions"] == 1
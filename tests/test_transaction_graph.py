@@ -0,0 +1,128 @@
+"""
+Unit tests for dependency-graph transactions
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.transaction_manager import Transaction, TransactionError
+
+
+@pytest.fixture(autouse=True)
+def isolated_failure_logs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with patch("src.transaction_manager.dead_letters") as mock_dlq:
+        yield mock_dlq
+
+
+class TestTransactionGraph:
+    """Test cases for concurrent steps, compensations and timings"""
+
+    def test_independent_steps_run_concurrently(self):
+        tx = Transaction("tx_parallel")
+        tx.add_task("save", lambda: "saved")
+        tx.add_task("judge", lambda: time.sleep(0.2) or "judged", depends_on=["save"])
+        tx.add_task("reward", lambda: time.sleep(0.2) or "rewarded", depends_on=["save"])
+        tx.add_task("log", lambda: "logged", depends_on=["judge", "reward"])
+
+        started = time.perf_counter()
+        assert tx.commit() == ["saved", "judged", "rewarded", "logged"]
+        assert time.perf_counter() - started < 0.38
+
+        timings = tx.get_timings()
+        assert timings["log"]["started_at"] >= timings["judge"]["started_at"] + 0.19
+        assert all(t["status"] == "completed" for t in timings.values())
+        assert timings["judge"]["duration_ms"] >= 190
+
+    def test_failure_runs_compensations_in_reverse(self, isolated_failure_logs):
+        undone = []
+        ran = []
+
+        def fail():
+            raise RuntimeError("judge down")
+
+        tx = Transaction("tx_fail")
+        tx.add_task("save", lambda: "s", compensate=lambda r: undone.append(("save", r)))
+        tx.add_task("reserve", lambda: "r", depends_on=["save"], compensate=lambda r: undone.append(("reserve", r)))
+        tx.add_task("judge", fail, depends_on=["reserve"])
+        tx.add_task("log", lambda: ran.append("log"), depends_on=["judge"])
+
+        with pytest.raises(TransactionError):
+            tx.commit()
+        assert undone == [("reserve", "r"), ("save", "s")]
+        assert ran == []
+        timings = tx.get_timings()
+        assert timings["judge"]["status"] == "failed"
+        assert timings["log"]["status"] == "skipped"
+        assert timings["save"]["status"] == "compensated"
+        record = isolated_failure_logs.add.call_args[0][1]
+        assert record["failed_step"] == "judge"
+        assert record["compensated"] == ["reserve", "save"]
+
+    def test_step_retries_with_backoff(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise RuntimeError("transient")
+            return "ok"
+
+        tx = Transaction("tx_retry")
+        tx.add_task("flaky", flaky, max_retries=3, backoff=0.01)
+        assert tx.commit() == ["ok"]
+        assert tx.get_timings()["flaky"]["attempts"] == 3
+
+    def test_coroutine_steps_and_running_loop(self):
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+
+        async def caller():
+            tx = Transaction("tx_async")
+            tx.add_task("a", fetch, args=(1,))
+            tx.add_task("b", fetch, kwargs={"value": 2}, depends_on=["a"])
+            # commit() from inside a running loop hands off to a worker thread
+            return tx.commit(), await tx.commit_async()
+
+        assert asyncio.run(caller()) == ([1, 2], [1, 2])
+
+    def test_invalid_graph(self):
+        tx = Transaction("tx_invalid")
+        tx.add_task("a", lambda: None)
+        with pytest.raises(ValueError):
+            tx.add_task("a", lambda: None)
+        with pytest.raises(ValueError):
+            tx.add_task("b", lambda: None, depends_on=["missing"])
+
+    def test_add_step_names_are_unique_and_sequential(self):
+        def step():
+            return 1
+
+        tx = Transaction("tx_seq")
+        tx.add_step(step)
+        tx.add_step(step)
+        assert [spec["name"] for spec in tx._specs] == ["step", "step_2"]
+        assert tx._specs[1]["depends_on"] == ["step"]
+
+    def test_add_step_chain_runs_on_calling_thread(self):
+        conn = sqlite3.connect(":memory:")
+        tx = Transaction("tx_thread")
+        tx.add_step(threading.get_ident)
+        tx.add_step(conn.execute, "SELECT 1")
+        results = tx.commit()
+        assert results[0] == threading.get_ident()
+        assert tx.get_timings()["execute"]["status"] == "completed"
+
+        failing = Transaction("tx_thread_fail")
+        failing.add_step(lambda: None)
+        failing.add_step(lambda: 1 / 0)
+        failing.add_step(lambda: None)
+        with pytest.raises(TransactionError):
+            failing.commit()
+        assert [t["status"] for t in failing.get_timings().values()] == ["completed", "failed", "skipped"]
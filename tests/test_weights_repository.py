@@ -0,0 +1,110 @@
+"""
+Unit tests for the cached weights repository
+"""
+
+import multiprocessing
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from adaptive_agent.storage import WeightsRepository
+
+
+@pytest.fixture
+def weights_csv(tmp_path):
+    path = tmp_path / "weights.csv"
+    path.write_text("suggestion_id,text,weight\nSUG-1,one,0.0\nSUG-2,two,0.5\n", encoding="utf-8")
+    return path
+
+
+def _slow_flush(path, weight, writing):
+    repo = WeightsRepository(path, write_delay=3600)
+    repo.set_weight("SUG-1", weight)
+    write = repo._write
+
+    def slow_write():
+        writing.set()
+        time.sleep(0.5)
+        write()
+
+    repo._write = slow_write
+    repo.flush()
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestWeightsRepository:
+    """Test cases for WeightsRepository"""
+
+    def test_reads_are_served_from_memory(self, weights_csv):
+        repo = WeightsRepository(weights_csv)
+        for _ in range(100):
+            assert repo.get("SUG-2")["weight"] == 0.5
+            assert repo.suggestion_ids() == ["SUG-1", "SUG-2"]
+        assert repo.get("missing") is None
+        assert repo.get_stats()["parses"] == 1
+
+    def test_external_edit_is_picked_up(self, weights_csv):
+        repo = WeightsRepository(weights_csv)
+        repo.get("SUG-1")
+        weights_csv.write_text("suggestion_id,text,weight\nSUG-1,one,0.0\nSUG-2,two,0.5\nSUG-3,three,1.0\n",
+                               encoding="utf-8")
+        assert repo.suggestion_ids() == ["SUG-1", "SUG-2", "SUG-3"]
+        assert repo.get_stats()["parses"] == 2
+
+    def test_changes_are_written_behind_atomically(self, weights_csv):
+        repo = WeightsRepository(weights_csv, write_delay=0.05)
+        repo.set_weight("SUG-1", 0.25)
+        repo.set_weight("SUG-1", 0.75)
+        assert not repo.set_weight("missing", 1.0)
+        assert pd.read_csv(weights_csv).set_index("suggestion_id").at["SUG-1", "weight"] == 0.0
+        assert repo.get("SUG-1")["weight"] == 0.75
+
+        repo._timer.join(1.0)
+        assert pd.read_csv(weights_csv).set_index("suggestion_id").at["SUG-1", "weight"] == 0.75
+        assert repo.get_stats()["writes"] == 1
+        assert repo.get_stats()["parses"] == 1  # its own write is not mistaken for an external edit
+        assert not list(weights_csv.parent.glob("*.tmp"))
+
+    def test_flush_merges_external_edits(self, weights_csv):
+        repo = WeightsRepository(weights_csv, write_delay=3600)
+        repo.set_weight("SUG-1", 0.9)
+        # another worker rewrites the file in the meantime
+        other = WeightsRepository(weights_csv, write_delay=0)
+        other.set_weight("SUG-2", -0.4)
+        bump_mtime(weights_csv)
+        repo.flush()
+
+        saved = pd.read_csv(weights_csv).set_index("suggestion_id")["weight"].to_dict()
+        assert saved == {"SUG-1": 0.9, "SUG-2": -0.4}
+        assert repo.get_stats()["pending"] == 0
+
+    def test_replace_keeps_columns_and_order(self, weights_csv):
+        repo = WeightsRepository(weights_csv)
+        df = repo.to_frame()
+        df.loc[len(df)] = ["SUG-0", "zero", 1.0]
+        repo.replace(df)
+        assert pd.read_csv(weights_csv)["suggestion_id"].tolist() == ["SUG-1", "SUG-2", "SUG-0"]
+        assert WeightsRepository(weights_csv).get("SUG-0") == {"suggestion_id": "SUG-0", "text": "zero",
+                                                               "weight": 1.0}
+
+    def test_concurrent_flushes_from_two_processes_keep_both_changes(self, weights_csv):
+        repo = WeightsRepository(weights_csv, write_delay=3600)
+        repo.get("SUG-2")
+        ctx = multiprocessing.get_context("fork")
+        writing = ctx.Event()
+        proc = ctx.Process(target=_slow_flush, args=(weights_csv, 0.9, writing))
+        proc.start()
+        assert writing.wait(5)
+        repo.set_weight("SUG-2", -0.4)
+        repo.flush()  # waits for the other process's write, then merges it
+        proc.join(5)
+        assert proc.exitcode == 0
+
+        saved = pd.read_csv(weights_csv).set_index("suggestion_id")["weight"].to_dict()
+        assert saved == {"SUG-1": 0.9, "SUG-2": -0.4}
@@ -0,0 +1,133 @@
+"""
+Unit tests for the write-behind side-effect queue
+"""
+
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.dead_letter import DeadLetterQueue
+from src.executor import Executor
+from src.reward import RewardSystem
+from src.write_behind import KIND_BUCKET, KIND_CORE, KIND_LOG, WriteBehindQueue, core_idempotency_key
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "write_behind.sqlite3")
+
+
+def _queue(journal, **kwargs):
+    kwargs.setdefault("auto_start", False)
+    kwargs.setdefault("base_delay", 0.0)
+    return WriteBehindQueue(journal_path=journal, **kwargs)
+
+
+class TestWriteBehindQueue:
+    """Test cases for WriteBehindQueue"""
+
+    @patch("src.write_behind.relay_many_to_bucket")
+    @patch("src.write_behind.save_batch_to_bucket")
+    @patch("src.write_behind.send_to_core")
+    def test_batches_by_kind(self, mock_core, mock_bucket, mock_relay, journal):
+        mock_bucket.side_effect = lambda items: [{"filename": f, "path": f} for f, _ in items]
+        queue = _queue(journal)
+        queue.enqueue_many([
+            (KIND_BUCKET, {"n": 1}, "reward_1.json", None),
+            (KIND_BUCKET, {"n": 2}, "reward_2.json", None),
+            (KIND_LOG, {"intent": "a"}, None, None),
+            (KIND_CORE, {"n": 3}, None, None),
+        ])
+        assert queue.process_once() == {"delivered": 4, "retried": 0, "dead": 0}
+        mock_bucket.assert_called_once()
+        assert len(mock_bucket.call_args[0][0]) == 2
+        mock_relay.assert_called_once_with([{"intent": "a"}])
+        mock_core.assert_called_once()
+        assert mock_core.call_args[0] == ({"n": 3},)
+        assert mock_core.call_args[1]["max_retries"] == 1 and not mock_core.call_args[1]["log_failures"]
+        assert mock_core.call_args[1]["idempotency_key"].startswith("write-behind-4-")
+        assert queue.get_stats()["pending"] == 0
+
+    @patch("src.write_behind.send_to_core", side_effect=Exception("core down"))
+    def test_failed_jobs_retry_then_dead_letter(self, mock_core, journal, tmp_path):
+        dlq = DeadLetterQueue(str(tmp_path / "dead_letters.sqlite3"))
+        queue = _queue(journal, max_attempts=2)
+        queue.enqueue(KIND_CORE, {"n": 1})
+        with patch("src.write_behind.dead_letters", dlq):
+            assert queue.process_once() == {"delivered": 0, "retried": 1, "dead": 0}
+            assert queue.process_once() == {"delivered": 0, "retried": 0, "dead": 1}
+        assert queue.get_stats()["pending"] == 0
+        assert dlq.get_stats()["pending_by_kind"] == {"core_send": 1}
+
+    def test_jobs_survive_restart(self, journal):
+        _queue(journal).enqueue(KIND_CORE, {"n": 1})
+        restarted = _queue(journal)
+        with patch("src.write_behind.send_to_core") as mock_core:
+            assert restarted.process_once()["delivered"] == 1
+        mock_core.assert_called_once()
+
+    def test_workers_sharing_a_journal_claim_disjoint_jobs(self, journal):
+        first, second = _queue(journal, batch_size=2), _queue(journal, batch_size=2, lease_seconds=0.05)
+        first.enqueue_many([(KIND_CORE, {"n": n}, None, None) for n in range(3)])
+        assert [job["payload"]["n"] for job in first._claim(2)] == [0, 1]
+        assert [job["payload"]["n"] for job in second._claim(2)] == [2]
+        assert second._claim(2) == []
+        assert first.get_stats()["in_flight"] == 3
+
+    def test_expired_lease_is_claimed_again_with_the_same_key(self, journal):
+        crashed = _queue(journal, lease_seconds=0.0)
+        crashed.enqueue(KIND_CORE, {"n": 1})
+        claimed = crashed._claim(10)
+        with patch("src.write_behind.send_to_core") as mock_core:
+            assert _queue(journal).process_once()["delivered"] == 1
+        assert mock_core.call_args[1]["idempotency_key"] == core_idempotency_key(claimed[0])
+
+    @patch("src.write_behind.send_to_core", side_effect=requests.ConnectionError("refused"))
+    def test_unreachable_core_stops_the_batch(self, mock_core, journal):
+        queue = _queue(journal, base_delay=60.0)
+        queue.enqueue_many([(KIND_CORE, {"n": n}, None, None) for n in range(5)])
+        assert queue.process_once() == {"delivered": 0, "retried": 1, "dead": 0}
+        assert mock_core.call_count == 1
+        assert queue._claim(10) == []  # the rest wait out the same backoff
+        attempts = [row[0] for row in queue._db().execute("SELECT attempts FROM jobs ORDER BY id")]
+        assert attempts == [1, 0, 0, 0, 0]
+
+    def test_background_worker_delivers(self, journal):
+        queue = _queue(journal, auto_start=True, poll_interval=0.01)
+        with patch("src.write_behind.send_to_core") as mock_core:
+            queue.enqueue(KIND_CORE, {"n": 1})
+            for _ in range(200):
+                if mock_core.called:
+                    break
+                time.sleep(0.01)
+            queue.stop()
+        mock_core.assert_called_once()
+
+
+class TestComponentsUseQueue:
+    """Test cases for Executor and RewardSystem in write-behind mode"""
+
+    @patch("src.executor.save_to_bucket")
+    @patch("src.executor.send_to_core")
+    @patch("src.executor.relay_to_bucket")
+    def test_executor_enqueues_side_effects(self, mock_relay, mock_core, mock_bucket, journal):
+        queue = _queue(journal)
+        result = Executor(write_behind=queue).execute("a -> b")
+        assert result == "Executed: a | Executed: b"
+        mock_core.assert_not_called()
+        mock_bucket.assert_not_called()
+        mock_relay.assert_not_called()
+        assert queue.get_stats()["pending"] == 5
+
+    @patch("src.reward.save_to_bucket")
+    @patch("src.reward.send_to_core")
+    def test_reward_enqueues_side_effects(self, mock_core, mock_bucket, journal):
+        queue = _queue(journal)
+        assert RewardSystem(write_behind=queue).calculate_reward("a|b", "success")[0] == 3.0
+        mock_core.assert_not_called()
+        mock_bucket.assert_not_called()
+        assert queue.get_stats()["pending"] == 2
+        assert os.path.exists(journal)